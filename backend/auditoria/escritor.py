@@ -0,0 +1,174 @@
+"""
+Escritura diferida de la auditoría.
+
+Las señales no insertan en la tabla durante la petición: dejan cada registro en
+una cola acotada en memoria y un hilo de fondo la vacía con bulk_create por
+lotes. Si la cola está llena o la base de datos falla, los registros se anexan
+a un archivo JSONL local (el "spool") que luego carga el comando
+`reprocesar_auditoria`. Nada de esto bloquea la respuesta.
+
+AUDITORIA_MODO en settings: 'async' (por defecto), 'sync' (inserta en el
+momento; útil en pruebas y scripts) u 'off'.
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections
+from django.utils.dateparse import parse_datetime
+
+from .models import Auditoria
+
+logger = logging.getLogger(__name__)
+
+# Fuera del árbol del código, igual que el valor por defecto de config/settings.py
+SPOOL_POR_DEFECTO = Path.home() / '.local' / 'state' / 'reservas' / 'auditoria_pendientes.jsonl'
+
+
+def _ajuste(nombre, por_defecto):
+    return getattr(settings, nombre, por_defecto)
+
+
+def a_modelo(entrada):
+    """dict de registro (de la cola o del spool) -> instancia sin guardar"""
+    timestamp = entrada.get('timestamp')
+    if isinstance(timestamp, str):
+        entrada = {**entrada, 'timestamp': parse_datetime(timestamp)}
+    return Auditoria(**entrada)
+
+
+def guardar(entradas):
+    Auditoria.objects.bulk_create([a_modelo(e) for e in entradas], batch_size=_ajuste('AUDITORIA_LOTE', 200))
+
+
+class Spool:
+    """Archivo JSONL de solo anexado con los registros que no se pudieron insertar"""
+
+    def __init__(self, ruta=None):
+        self._ruta = ruta
+        self._lock = threading.Lock()
+
+    @property
+    def ruta(self):
+        return Path(self._ruta or _ajuste('AUDITORIA_SPOOL', SPOOL_POR_DEFECTO))
+
+    def anexar(self, entradas):
+        lineas = ''.join(json.dumps(e, cls=DjangoJSONEncoder) + '\n' for e in entradas)
+        with self._lock:
+            self.ruta.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.ruta, 'a', encoding='utf-8') as archivo:
+                archivo.write(lineas)
+                archivo.flush()
+                os.fsync(archivo.fileno())
+
+    def tomar(self):
+        """
+        Aparta el spool actual renombrándolo (los nuevos registros van a un
+        archivo nuevo) y devuelve la ruta apartada, o None si no hay nada.
+        """
+        with self._lock:
+            if not self.ruta.exists():
+                return None
+            apartado = self.ruta.with_name(f'{self.ruta.name}.{time.time_ns()}.procesando')
+            os.replace(self.ruta, apartado)
+            return apartado
+
+
+class EscritorAuditoria:
+
+    def __init__(self, spool=None):
+        self.spool = spool or Spool()
+        self._cola = None
+        self._hilo = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _iniciar(self):
+        # Tras un fork (gunicorn, multiprocessing) el hilo no sobrevive: se crea otro
+        with self._lock:
+            if self._hilo is not None and self._hilo.is_alive() and self._pid == os.getpid():
+                return
+            self._cola = queue.Queue(maxsize=_ajuste('AUDITORIA_COLA_MAX', 10000))
+            self._pid = os.getpid()
+            self._hilo = threading.Thread(target=self._ejecutar, name='auditoria-escritor', daemon=True)
+            self._hilo.start()
+
+    def registrar(self, entrada):
+        self.registrar_lote([entrada])
+
+    def registrar_lote(self, entradas):
+        modo = _ajuste('AUDITORIA_MODO', 'async')
+        if modo == 'off' or not entradas:
+            return
+        if modo == 'sync':
+            self._escribir(entradas)
+            return
+
+        self._iniciar()
+        desbordadas = []
+        for entrada in entradas:
+            try:
+                self._cola.put_nowait(entrada)
+            except queue.Full:
+                # Base de datos lenta: no se hace esperar a la petición
+                desbordadas.append(entrada)
+        if desbordadas:
+            self.spool.anexar(desbordadas)
+
+    def _tomar_lote(self, primero):
+        lote = [primero]
+        maximo = _ajuste('AUDITORIA_LOTE', 200)
+        while len(lote) < maximo:
+            try:
+                lote.append(self._cola.get_nowait())
+            except queue.Empty:
+                break
+        return lote
+
+    def _escribir(self, lote):
+        try:
+            guardar(lote)
+        except Exception:
+            logger.exception("No se pudo insertar la auditoría; %s registros van al spool", len(lote))
+            self.spool.anexar(lote)
+
+    def _ejecutar(self):
+        while True:
+            primero = self._cola.get()
+            close_old_connections()
+            self._escribir(self._tomar_lote(primero))
+
+    def vaciar(self):
+        """Escribe lo que quede en la cola desde el hilo actual (pruebas, scripts)"""
+        if self._cola is None or self._pid != os.getpid():
+            return
+        while True:
+            try:
+                primero = self._cola.get_nowait()
+            except queue.Empty:
+                return
+            self._escribir(self._tomar_lote(primero))
+
+    def al_salir(self):
+        # Al terminar el proceso no se arriesga la base de datos: lo pendiente va al spool
+        if self._cola is None or self._pid != os.getpid():
+            return
+        pendientes = []
+        while True:
+            try:
+                pendientes.append(self._cola.get_nowait())
+            except queue.Empty:
+                break
+        if pendientes:
+            self.spool.anexar(pendientes)
+
+
+escritor = EscritorAuditoria()
+atexit.register(escritor.al_salir)
@@ -0,0 +1,44 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from auditoria import particiones
+
+
+class Command(BaseCommand):
+    help = (
+        'Mantiene las particiones mensuales de la auditoría: crea las de los próximos meses '
+        'y retira (archivando en .jsonl.gz) las que superan la retención'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--meses-adelante', type=int, default=3, help='Meses futuros con partición creada')
+        parser.add_argument(
+            '--retencion', type=int, default=settings.AUDITORIA_RETENCION_MESES,
+            help='Meses completos que se conservan en la base de datos (0 = sin límite)'
+        )
+        parser.add_argument(
+            '--directorio', default=settings.AUDITORIA_ARCHIVO_DIR,
+            help='Dónde se dejan los meses archivados'
+        )
+        parser.add_argument('--sin-archivo', action='store_true', help='Borrar los meses vencidos sin exportarlos')
+
+    def handle(self, *args, **options):
+        if not particiones.soportado():
+            raise CommandError('El particionado de la auditoría requiere PostgreSQL')
+
+        hoy = timezone.now().date()
+        creadas = particiones.crear_particiones(hoy, particiones.sumar_meses(hoy, options['meses_adelante']))
+        for nombre in creadas:
+            self.stdout.write(f'Creada {nombre}')
+
+        if options['retencion'] <= 0:
+            return
+        limite = particiones.sumar_meses(particiones.mes_de(hoy), -options['retencion'])
+        directorio = None if options['sin_archivo'] else options['directorio']
+        # Las desconectadas son de una ejecución anterior que no alcanzó a archivarlas
+        vencidas = {**particiones.desconectadas(), **particiones.particiones()}
+        for mes in sorted(m for m in vencidas if m < limite):
+            filas = particiones.archivar(mes, directorio)
+            detalle = f'{filas} filas archivadas en {directorio}' if filas is not None else 'sin archivo'
+            self.stdout.write(self.style.SUCCESS(f'Retirada {particiones.nombre_particion(mes)} ({detalle})'))
@@ -0,0 +1,41 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from auditoria.escritor import escritor, guardar
+
+
+class Command(BaseCommand):
+    help = 'Inserta en la base de datos los registros de auditoría que quedaron en el spool local'
+
+    def handle(self, *args, **options):
+        spool = escritor.spool
+        spool.tomar()
+        # Incluye lo que haya dejado a medias una ejecución anterior
+        apartados = sorted(spool.ruta.parent.glob(f'{spool.ruta.name}.*.procesando'))
+        if not apartados:
+            self.stdout.write('No hay registros pendientes')
+            return
+
+        total = 0
+        for ruta in apartados:
+            entradas, invalidas = [], 0
+            with open(ruta, encoding='utf-8') as archivo:
+                for linea in archivo:
+                    try:
+                        entradas.append(json.loads(linea))
+                    except json.JSONDecodeError:
+                        # Línea truncada por una caída a mitad de escritura
+                        invalidas += 1
+            try:
+                with transaction.atomic():
+                    guardar(entradas)
+            except Exception as exc:
+                raise CommandError(f'No se pudo cargar {ruta.name} (se conserva para reintentar): {exc}')
+            ruta.unlink()
+            total += len(entradas)
+            if invalidas:
+                self.stderr.write(f'{ruta.name}: {invalidas} líneas ilegibles descartadas')
+
+        self.stdout.write(self.style.SUCCESS(f'{total} registros de auditoría cargados'))
@@ -0,0 +1,66 @@
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+# Petición en curso, para saber quién hizo el cambio y desde qué IP
+_peticion = ContextVar('auditoria_peticion', default=None)
+
+
+def ip_origen(request):
+    """
+    REMOTE_ADDR, salvo que la petición venga de un proxy de
+    AUDITORIA_PROXIES_CONFIABLES: entonces la última IP de X-Forwarded-For que
+    no es uno de esos proxies (las anteriores las pudo escribir el cliente).
+    """
+    remota = request.META.get('REMOTE_ADDR')
+    confiables = set(getattr(settings, 'AUDITORIA_PROXIES_CONFIABLES', ()))
+    reenviada = request.META.get('HTTP_X_FORWARDED_FOR')
+    if not reenviada or remota not in confiables:
+        return remota
+    for ip in reversed([ip.strip() for ip in reenviada.split(',') if ip.strip()]):
+        if ip not in confiables:
+            return ip
+    return remota
+
+
+def contexto_actual():
+    """(usuario_id, ip) de la petición en curso, o (None, None) fuera de una petición"""
+    request = _peticion.get()
+    if request is None:
+        return None, None
+    # DRF copia el usuario autenticado (JWT) a la petición de Django
+    usuario = getattr(request, 'user', None)
+    usuario_id = usuario.pk if usuario is not None and usuario.is_authenticated else None
+    return usuario_id, ip_origen(request)
+
+
+class ContextoAuditoriaMiddleware:
+    """
+    Deja la petición disponible para las señales de auditoría. En ASGI las
+    vistas síncronas corren con sync_to_async, que copia el contexto, así que
+    las señales ven la misma petición.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = _peticion.set(request)
+        try:
+            return self.get_response(request)
+        finally:
+            _peticion.reset(token)
+
+    async def __acall__(self, request):
+        token = _peticion.set(request)
+        try:
+            return await self.get_response(request)
+        finally:
+            _peticion.reset(token)
@@ -0,0 +1,93 @@
+"""
+Convierte auditoria_auditoria en una tabla particionada por mes (solo PostgreSQL).
+
+PostgreSQL exige que la clave primaria de una tabla particionada incluya la
+columna de partición, por eso la PK pasa a ser (id, timestamp); para Django el
+modelo sigue teniendo `id` como clave. Las filas existentes se copian a las
+particiones de sus meses. Ver auditoria/particiones.py.
+"""
+from django.db import migrations
+from django.utils import timezone
+
+from auditoria import particiones
+
+# Particiones que se dejan creadas hacia adelante
+MESES_ADELANTE = 3
+
+
+def particionar(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    tabla = particiones.TABLA
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid WHERE c.relname = %s", [tabla])
+        if cursor.fetchone():
+            return
+        cursor.execute(f'SELECT MIN("timestamp"), MAX(id) FROM "{tabla}"')
+        minimo, max_id = cursor.fetchone()
+
+        cursor.execute(f'ALTER TABLE "{tabla}" RENAME TO "{tabla}_previa"')
+        cursor.execute(f'CREATE SEQUENCE "{tabla}_id_seq"')
+        cursor.execute(f"""
+            CREATE TABLE "{tabla}" (
+                "id" bigint NOT NULL DEFAULT nextval('{tabla}_id_seq'),
+                "accion" varchar(50) NOT NULL,
+                "tabla_afectada" varchar(50) NOT NULL,
+                "registro_id" integer NULL,
+                "valores_previos" jsonb NULL,
+                "valores_nuevos" jsonb NULL,
+                "ip_origen" inet NULL,
+                "timestamp" timestamp with time zone NOT NULL,
+                "usuario_id" bigint NULL
+                    REFERENCES "usuarios_usuario" ("id") DEFERRABLE INITIALLY DEFERRED,
+                PRIMARY KEY ("id", "timestamp")
+            ) PARTITION BY RANGE ("timestamp")
+        """)
+        cursor.execute(f'ALTER SEQUENCE "{tabla}_id_seq" OWNED BY "{tabla}"."id"')
+        if max_id:
+            cursor.execute(f"SELECT setval('{tabla}_id_seq', %s)", [max_id])
+        # Los índices del modelo, ahora locales a cada partición
+        cursor.execute(f'CREATE INDEX "auditoria_a_usuario_f04d18_idx" ON "{tabla}" ("usuario_id", "timestamp")')
+        cursor.execute(f'CREATE INDEX "auditoria_a_tabla_a_e1b1c0_idx" ON "{tabla}" ("tabla_afectada", "timestamp")')
+        cursor.execute(f'CREATE INDEX "{tabla}_timestamp_idx" ON "{tabla}" ("timestamp")')
+
+    hoy = timezone.now().date()
+    particiones.crear_particiones(
+        minimo.date() if minimo else hoy, particiones.sumar_meses(hoy, MESES_ADELANTE), schema_editor.connection,
+    )
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f'INSERT INTO "{tabla}" SELECT "id", "accion", "tabla_afectada", "registro_id", '
+                       f'"valores_previos", "valores_nuevos", "ip_origen", "timestamp", "usuario_id" FROM "{tabla}_previa"')
+        cursor.execute(f'DROP TABLE "{tabla}_previa"')
+
+
+def revertir(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    tabla = particiones.TABLA
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f'CREATE TABLE "{tabla}_plana" (LIKE "{tabla}" INCLUDING DEFAULTS)')
+        cursor.execute(f'INSERT INTO "{tabla}_plana" SELECT * FROM "{tabla}"')
+        cursor.execute(f'ALTER SEQUENCE "{tabla}_id_seq" OWNED BY "{tabla}_plana"."id"')
+        cursor.execute(f'DROP TABLE "{tabla}" CASCADE')
+        cursor.execute(f'ALTER TABLE "{tabla}_plana" RENAME TO "{tabla}"')
+        cursor.execute(f'ALTER TABLE "{tabla}" ADD PRIMARY KEY ("id")')
+        cursor.execute(
+            f'ALTER TABLE "{tabla}" ADD FOREIGN KEY ("usuario_id") REFERENCES "usuarios_usuario" ("id") '
+            'DEFERRABLE INITIALLY DEFERRED'
+        )
+        cursor.execute(f'CREATE INDEX "auditoria_a_usuario_f04d18_idx" ON "{tabla}" ("usuario_id", "timestamp")')
+        cursor.execute(f'CREATE INDEX "auditoria_a_tabla_a_e1b1c0_idx" ON "{tabla}" ("tabla_afectada", "timestamp")')
+        cursor.execute(f'CREATE INDEX "{tabla}_timestamp_idx" ON "{tabla}" ("timestamp")')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auditoria', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(particionar, revertir),
+    ]
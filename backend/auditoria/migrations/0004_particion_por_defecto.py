@@ -0,0 +1,38 @@
+"""
+Agrega la partición por defecto de auditoria_auditoria (solo PostgreSQL): un
+registro de un mes sin partición se guarda ahí en vez de fallar. Ver
+auditoria/particiones.py.
+"""
+from django.db import migrations
+
+from auditoria import particiones
+
+
+def crear(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    particiones.crear_particion_defecto(schema_editor.connection)
+
+
+def revertir(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    # Las filas de la partición por defecto pasan a particiones mensuales antes de borrarla
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f'SELECT MIN("timestamp"), MAX("timestamp") FROM "{particiones.PARTICION_DEFECTO}"')
+        minimo, maximo = cursor.fetchone()
+    if minimo:
+        particiones.crear_particiones(minimo.date(), maximo.date(), schema_editor.connection)
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f'DROP TABLE "{particiones.PARTICION_DEFECTO}"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auditoria', '0003_particionar_auditoria'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear, revertir),
+    ]
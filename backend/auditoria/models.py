@@ -2,6 +2,26 @@ from django.db import models
 from django.utils import timezone
 from usuarios.models import Usuario
 
+class AuditoriaQuerySet(models.QuerySet):
+    """
+    Filtros pensados para la tabla particionada por mes: con un rango de
+    `timestamp` PostgreSQL solo lee las particiones de esos meses.
+    """
+
+    def rango(self, desde, hasta):
+        """Registros con desde <= timestamp < hasta"""
+        return self.filter(timestamp__gte=desde, timestamp__lt=hasta)
+
+    def de_usuario(self, usuario_id):
+        return self.filter(usuario_id=usuario_id)
+
+    def de_tabla(self, tabla, registro_id=None):
+        consulta = self.filter(tabla_afectada=tabla)
+        if registro_id is not None:
+            consulta = consulta.filter(registro_id=registro_id)
+        return consulta
+
+
 class Auditoria(models.Model):
     """Registro de auditoría del sistema"""
     
@@ -58,6 +78,8 @@ class Auditoria(models.Model):
         db_index=True
     )
     
+    objects = AuditoriaQuerySet.as_manager()
+    
     class Meta:
         verbose_name = 'Registro de Auditoría'
         verbose_name_plural = 'Registros de Auditoría'
@@ -0,0 +1,184 @@
+"""
+Particionado mensual de auditoria_auditoria (solo PostgreSQL).
+
+La tabla está particionada por rango de `timestamp`, una partición por mes
+(auditoria_auditoria_pAAAAMM, límites en UTC). Así:
+- una consulta con rango de fechas solo recorre las particiones del rango
+  (PostgreSQL las poda solo; ver AuditoriaQuerySet.rango),
+- purgar un mes es desconectar y borrar su partición, sin DELETE fila a fila.
+
+Si falta la partición de un mes, las filas caen en la partición por defecto
+(auditoria_auditoria_default) en vez de fallar. Al crear después la del mes
+(`particiones_auditoria`), sus filas se mueven desde la de defecto en la misma
+transacción: PostgreSQL no deja conectar una partición cuyo rango tenga filas
+en la de defecto. En otros motores (SQLite en desarrollo) todo esto no hace nada.
+
+Las funciones usan la conexión por defecto salvo que reciban `conexion`; las
+migraciones pasan schema_editor.connection para respetar --database.
+"""
+import gzip
+import json
+import os
+import re
+from datetime import date
+from pathlib import Path
+
+from django.db import connection, transaction
+
+TABLA = 'auditoria_auditoria'
+PARTICION_DEFECTO = f'{TABLA}_default'
+_PATRON_PARTICION = re.compile(rf'^{TABLA}_p(\d{{4}})(\d{{2}})$')
+
+# Filas por ida a la base de datos al exportar una partición
+TAMANO_LECTURA = 5000
+
+
+def soportado(conexion=None):
+    return (conexion or connection).vendor == 'postgresql'
+
+
+def mes_de(fecha):
+    return date(fecha.year, fecha.month, 1)
+
+
+def sumar_meses(mes, cantidad):
+    indice = mes.year * 12 + (mes.month - 1) + cantidad
+    return date(indice // 12, indice % 12 + 1, 1)
+
+
+def nombre_particion(mes):
+    return f'{TABLA}_p{mes.year:04d}{mes.month:02d}'
+
+
+def mes_particion(nombre):
+    coincidencia = _PATRON_PARTICION.match(nombre)
+    if not coincidencia:
+        return None
+    return date(int(coincidencia.group(1)), int(coincidencia.group(2)), 1)
+
+
+def particiones(conexion=None):
+    """{mes: nombre} de las particiones conectadas a la tabla"""
+    with (conexion or connection).cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT hija.relname
+            FROM pg_inherits
+            JOIN pg_class padre ON padre.oid = pg_inherits.inhparent
+            JOIN pg_class hija ON hija.oid = pg_inherits.inhrelid
+            WHERE padre.relname = %s
+            """,
+            [TABLA],
+        )
+        nombres = [fila[0] for fila in cursor.fetchall()]
+    return {mes_particion(nombre): nombre for nombre in nombres if mes_particion(nombre)}
+
+
+def desconectadas(conexion=None):
+    """{mes: nombre} de particiones desconectadas que aún no se archivaron (ejecución interrumpida)"""
+    conexion = conexion or connection
+    conectadas = set(particiones(conexion).values())
+    with conexion.cursor() as cursor:
+        cursor.execute(
+            "SELECT tablename FROM pg_tables WHERE schemaname = current_schema() AND tablename LIKE %s",
+            [f'{TABLA}\\_p%'],
+        )
+        nombres = [fila[0] for fila in cursor.fetchall()]
+    return {
+        mes_particion(nombre): nombre for nombre in nombres
+        if mes_particion(nombre) and nombre not in conectadas
+    }
+
+
+def _existe(cursor, nombre):
+    cursor.execute('SELECT to_regclass(%s) IS NOT NULL', [f'"{nombre}"'])
+    return cursor.fetchone()[0]
+
+
+def crear_particion_defecto(conexion=None):
+    """Crea la partición por defecto si no existe"""
+    with (conexion or connection).cursor() as cursor:
+        cursor.execute(f'CREATE TABLE IF NOT EXISTS "{PARTICION_DEFECTO}" PARTITION OF "{TABLA}" DEFAULT')
+
+
+def crear_particion(mes, conexion=None):
+    """
+    Crea la partición del mes si no existe, moviendo a ella las filas del mes
+    que estaban en la partición por defecto. Devuelve True si la creó.
+    """
+    conexion = conexion or connection
+    nombre = nombre_particion(mes)
+    if mes in particiones(conexion):
+        return False
+    desde, hasta = f'{mes.isoformat()} 00:00:00+00', f'{sumar_meses(mes, 1).isoformat()} 00:00:00+00'
+    rango = f"FOR VALUES FROM ('{desde}') TO ('{hasta}')"
+    with transaction.atomic(using=conexion.alias), conexion.cursor() as cursor:
+        if not _existe(cursor, PARTICION_DEFECTO):
+            cursor.execute(f'CREATE TABLE IF NOT EXISTS "{nombre}" PARTITION OF "{TABLA}" {rango}')
+            return True
+        cursor.execute(f'CREATE TABLE IF NOT EXISTS "{nombre}" (LIKE "{TABLA}" INCLUDING DEFAULTS)')
+        cursor.execute(
+            f'WITH movidas AS (DELETE FROM "{PARTICION_DEFECTO}" WHERE "timestamp" >= %s AND "timestamp" < %s RETURNING *) '
+            f'INSERT INTO "{nombre}" SELECT * FROM movidas',
+            [desde, hasta],
+        )
+        # Revisa que la de defecto ya no tenga filas del rango; los índices del padre se crean solos
+        cursor.execute(f'ALTER TABLE "{TABLA}" ATTACH PARTITION "{nombre}" {rango}')
+    return True
+
+
+def crear_particiones(desde, hasta, conexion=None):
+    """Asegura una partición por cada mes de [desde, hasta]. Devuelve las creadas."""
+    creadas = []
+    mes = mes_de(desde)
+    while mes <= mes_de(hasta):
+        if crear_particion(mes, conexion):
+            creadas.append(nombre_particion(mes))
+        mes = sumar_meses(mes, 1)
+    return creadas
+
+
+def _exportar(nombre, destino, conexion):
+    """Escribe la partición en `destino` (JSONL comprimido) con un cursor de servidor"""
+    temporal = destino.with_suffix(destino.suffix + '.tmp')
+    filas = 0
+    conexion.ensure_connection()
+    with transaction.atomic(using=conexion.alias), conexion.connection.cursor(name=f'exportar_{nombre}') as cursor:
+        cursor.itersize = TAMANO_LECTURA
+        cursor.execute(f'SELECT row_to_json(t)::text FROM "{nombre}" t ORDER BY id')
+        with gzip.open(temporal, 'wt', encoding='utf-8') as archivo:
+            for (fila,) in cursor:
+                archivo.write(fila + '\n')
+                filas += 1
+    os.replace(temporal, destino)
+    return filas
+
+
+def archivar(mes, directorio=None, conexion=None):
+    """
+    Retira la partición del mes: la desconecta (operación de metadatos), la
+    exporta a `directorio`/auditoria_AAAAMM.jsonl.gz si se indica y la borra.
+    Devuelve la cantidad de filas exportadas (None si no se exportó).
+    """
+    conexion = conexion or connection
+    nombre = nombre_particion(mes)
+    with conexion.cursor() as cursor:
+        if mes in particiones(conexion):
+            cursor.execute(f'ALTER TABLE "{TABLA}" DETACH PARTITION "{nombre}"')
+
+    filas = None
+    if directorio:
+        directorio = Path(directorio)
+        directorio.mkdir(parents=True, exist_ok=True)
+        filas = _exportar(nombre, directorio / f'auditoria_{mes.year:04d}{mes.month:02d}.jsonl.gz', conexion)
+
+    with conexion.cursor() as cursor:
+        cursor.execute(f'DROP TABLE IF EXISTS "{nombre}"')
+    return filas
+
+
+def leer_archivo(ruta):
+    """Registros de un mes archivado (para consultas puntuales o restauración)"""
+    with gzip.open(ruta, 'rt', encoding='utf-8') as archivo:
+        for linea in archivo:
+            yield json.loads(linea)
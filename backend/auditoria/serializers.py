@@ -0,0 +1,10 @@
+from rest_framework import serializers
+from .models import Auditoria
+
+class AuditoriaSerializer(serializers.ModelSerializer):
+    usuario_email = serializers.EmailField(source='usuario.email', read_only=True, default=None)
+    accion_display = serializers.CharField(source='get_accion_display', read_only=True)
+    
+    class Meta:
+        model = Auditoria
+        fields = '__all__'
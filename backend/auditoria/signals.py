@@ -0,0 +1,139 @@
+"""
+Captura de cambios para la auditoría.
+
+Los valores previos salen de la instantánea que guarda ValoresDBMixin al leer
+la fila (sin consultas extra). En pre_save se copia esa instantánea, porque
+otras señales post_save (p. ej. reservas/signals.py) la sincronizan antes de
+que llegue la de auditoría. Solo se registran los campos que cambiaron, y el
+registro se encola recién cuando la transacción confirma.
+"""
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.utils import timezone
+
+from usuarios.models import Usuario
+from espacios.models import Espacio
+from elementos.models import Elemento
+from reservas.models import Reserva
+from .escritor import escritor
+from .middleware import contexto_actual
+
+MODELOS_AUDITADOS = (Reserva, Espacio, Elemento, Usuario)
+
+# Se registra que cambiaron, pero nunca su valor
+CAMPOS_OCULTOS = {'password'}
+VALOR_OCULTO = '***'
+
+# Campos que cambian solos en cada save y no aportan a la auditoría
+CAMPOS_IGNORADOS = {'fecha_actualizacion'}
+
+ACCION_POR_ESTADO = {'aprobada': 'APPROVE', 'rechazada': 'REJECT'}
+
+_codificador = DjangoJSONEncoder()
+
+
+def _json(valor):
+    if valor is None or isinstance(valor, (str, int, float, bool, list, dict)):
+        return valor
+    return _codificador.default(valor)
+
+
+def _valor(campo, valor):
+    return VALOR_OCULTO if campo in CAMPOS_OCULTOS else _json(valor)
+
+
+def _campos(instance, update_fields=None):
+    campos = [
+        f.attname for f in instance._meta.concrete_fields
+        if f.attname not in CAMPOS_IGNORADOS
+    ]
+    if update_fields:
+        nombres = {instance._meta.get_field(nombre).attname for nombre in update_fields}
+        campos = [campo for campo in campos if campo in nombres]
+    return campos
+
+
+def diferencias(previos, instance, campos):
+    """({campo: anterior}, {campo: nuevo}) solo con los campos que cambiaron"""
+    antes, despues = {}, {}
+    for campo in campos:
+        nuevo = getattr(instance, campo)
+        if campo in previos and previos[campo] == nuevo:
+            continue
+        if campo in previos:
+            antes[campo] = _valor(campo, previos[campo])
+        despues[campo] = _valor(campo, nuevo)
+    return antes, despues
+
+
+def _entrada(instance, accion, previos, nuevos, contexto, timestamp):
+    usuario_id, ip = contexto
+    return {
+        'usuario_id': usuario_id,
+        'accion': accion,
+        'tabla_afectada': instance._meta.db_table,
+        'registro_id': instance.pk,
+        'valores_previos': previos or None,
+        'valores_nuevos': nuevos or None,
+        'ip_origen': ip,
+        'timestamp': timestamp,
+    }
+
+
+def _encolar(instance, accion, previos, nuevos):
+    entrada = _entrada(instance, accion, previos, nuevos, contexto_actual(), timezone.now())
+    # Un cambio revertido no se audita
+    transaction.on_commit(lambda: escritor.registrar(entrada))
+
+
+def _accion(creado, despues):
+    if creado:
+        return 'CREATE'
+    return ACCION_POR_ESTADO.get(despues.get('estado'), 'UPDATE')
+
+
+def antes_de_guardar(sender, instance, **kwargs):
+    instance._auditoria_previos = dict(getattr(instance, '_valores_db', {}))
+
+
+def guardado(sender, instance, created, update_fields=None, **kwargs):
+    campos = _campos(instance, update_fields)
+    previos = instance.__dict__.pop('_auditoria_previos', {})
+    if created:
+        previos = {}
+    antes, despues = diferencias(previos, instance, campos)
+    if not created and not despues:
+        return
+    _encolar(instance, _accion(created, despues), antes, despues)
+    instance.sincronizar_valores_db(campos)
+
+
+def eliminado(sender, instance, **kwargs):
+    campos = _campos(instance)
+    _encolar(instance, 'DELETE', {campo: _valor(campo, getattr(instance, campo)) for campo in campos}, None)
+
+
+def registrar_lote(instancias, previos=None, campos=None):
+    """
+    Auditoría de filas escritas con bulk_create o QuerySet.update(), que no
+    emiten señales. Sin `previos` cada instancia se registra como CREATE; con
+    `previos` ({pk: {campo: valor anterior}}) solo los `campos` que cambiaron.
+    Igual que en las señales, se encola todo junto al confirmar la transacción.
+    """
+    contexto, ahora = contexto_actual(), timezone.now()
+    entradas = []
+    for instance in instancias:
+        anteriores = {} if previos is None else previos.get(instance.pk, {})
+        antes, despues = diferencias(anteriores, instance, _campos(instance, campos))
+        if previos is not None and not despues:
+            continue
+        entradas.append(_entrada(instance, _accion(previos is None, despues), antes, despues, contexto, ahora))
+    if entradas:
+        transaction.on_commit(lambda: escritor.registrar_lote(entradas))
+
+
+for modelo in MODELOS_AUDITADOS:
+    pre_save.connect(antes_de_guardar, sender=modelo, dispatch_uid=f'auditoria_pre_{modelo.__name__}')
+    post_save.connect(guardado, sender=modelo, dispatch_uid=f'auditoria_post_{modelo.__name__}')
+    post_delete.connect(eliminado, sender=modelo, dispatch_uid=f'auditoria_del_{modelo.__name__}')
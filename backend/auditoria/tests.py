@@ -1,3 +1,262 @@
-from django.test import TestCase
+import io
+import json
+import os
+import queue
+import tempfile
+import threading
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from pathlib import Path
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import AsyncClient, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from usuarios.autenticacion import TokenConRolSerializer
+from usuarios.models import Usuario, Rol, Carrera
+from espacios.models import Espacio
+from reservas.models import Reserva
+from . import particiones, signals
+from .escritor import EscritorAuditoria, Spool
+from .middleware import contexto_actual, ip_origen
+from .models import Auditoria
+
+
+@override_settings(AUDITORIA_MODO='sync')
+class CapturaAuditoriaTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        carrera = Carrera.objects.create(nombre_carrera='Ingeniería en Informática', area='Tecnología')
+        cls.admin = Usuario.objects.create_user(
+            email='admin@inacap.cl', password='x', nombre='Ana', apellido='Admin',
+            rol=Rol.objects.create(nombre_rol='admin'), carrera=carrera
+        )
+        cls.espacio = Espacio.objects.create(nombre='Sala 1', tipo='salon', capacidad=30, ubicacion='Edificio A')
+
+    def setUp(self):
+        # Un fallo de escritura no debe dejar el spool en el directorio de trabajo
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        ajustes = override_settings(AUDITORIA_SPOOL=str(Path(directorio.name) / 'pendientes.jsonl'))
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.reserva = Reserva.objects.create(
+            usuario=self.admin, espacio=self.espacio, fecha_reserva=date.today() + timedelta(days=1),
+            hora_inicio=time(9), hora_fin=time(10), motivo='Clase',
+        )
+
+    def test_aprobar_registra_solo_lo_que_cambio(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            respuesta = self.client.post(f'/api/reservas/{self.reserva.id}/aprobar/', REMOTE_ADDR='10.0.0.7')
+        self.assertEqual(respuesta.status_code, 200)
+
+        registro = Auditoria.objects.get(accion='APPROVE')
+        self.assertEqual(registro.tabla_afectada, 'reservas_reserva')
+        self.assertEqual(registro.registro_id, self.reserva.id)
+        self.assertEqual(registro.usuario, self.admin)
+        self.assertEqual(registro.ip_origen, '10.0.0.7')
+        self.assertEqual(registro.valores_previos, {'estado': 'pendiente'})
+        self.assertEqual(registro.valores_nuevos, {'estado': 'aprobada'})
+
+    def test_creacion_en_lote_se_audita(self):
+        manana = (date.today() + timedelta(days=1)).isoformat()
+        items = [
+            {'espacio': self.espacio.id, 'fecha_reserva': manana, 'hora_inicio': f'{hora}:00', 'hora_fin': f'{hora + 1}:00', 'motivo': 'Taller'}
+            for hora in (11, 12)
+        ]
+        with self.captureOnCommitCallbacks(execute=True):
+            respuesta = self.client.post('/api/reservas/bulk/', {'reservas': items}, format='json', REMOTE_ADDR='10.0.0.8')
+        self.assertEqual(respuesta.status_code, 201)
+
+        ids = {r['id'] for r in respuesta.data['resultados']}
+        registros = Auditoria.objects.filter(tabla_afectada='reservas_reserva', accion='CREATE', registro_id__in=ids)
+        self.assertEqual(registros.count(), 2)
+        for registro in registros:
+            self.assertEqual((registro.usuario, registro.ip_origen), (self.admin, '10.0.0.8'))
+            self.assertEqual(registro.valores_nuevos['motivo'], 'Taller')
+
+    def test_x_forwarded_for_solo_desde_proxies_confiables(self):
+        peticion = mock.Mock(META={'REMOTE_ADDR': '10.0.0.1', 'HTTP_X_FORWARDED_FOR': '1.2.3.4, 10.0.0.5'})
+        # Sin proxies configurados cualquier cliente podría falsear la cabecera
+        self.assertEqual(ip_origen(peticion), '10.0.0.1')
+        with override_settings(AUDITORIA_PROXIES_CONFIABLES=['10.0.0.1']):
+            # Lo que antecede a la IP que agregó el proxy lo pudo escribir el cliente
+            self.assertEqual(ip_origen(peticion), '10.0.0.5')
+        with override_settings(AUDITORIA_PROXIES_CONFIABLES=['10.0.0.1', '10.0.0.5']):
+            self.assertEqual(ip_origen(peticion), '1.2.3.4')
+        peticion.META['REMOTE_ADDR'] = '10.0.0.2'
+        with override_settings(AUDITORIA_PROXIES_CONFIABLES=['10.0.0.1']):
+            self.assertEqual(ip_origen(peticion), '10.0.0.2')
+
+    @override_settings(AUDITORIA_PROXIES_CONFIABLES=['127.0.0.1'])
+    async def test_contexto_de_la_peticion_bajo_asgi(self):
+        contextos = []
+
+        def capturar():
+            contextos.append(contexto_actual())
+            return contextos[-1]
+
+        token = str(TokenConRolSerializer.get_token(self.admin).access_token)
+        with mock.patch.object(signals, 'contexto_actual', side_effect=capturar):
+            respuesta = await AsyncClient().post(
+                f'/api/reservas/{self.reserva.id}/aprobar/',
+                headers={'Authorization': f'Bearer {token}', 'X-Forwarded-For': '10.0.0.9'},
+            )
+        self.assertEqual(respuesta.status_code, 200)
+        # La señal corre en el hilo de la vista y ve la petición que fijó el middleware
+        self.assertEqual(contextos, [(self.admin.pk, '10.0.0.9')])
+
+    def test_guardar_sin_cambios_no_registra(self):
+        reserva = Reserva.objects.get(pk=self.reserva.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            reserva.save()
+        self.assertFalse(Auditoria.objects.filter(accion='UPDATE').exists())
+
+    def test_password_se_oculta(self):
+        usuario = Usuario.objects.get(pk=self.admin.pk)
+        usuario.set_password('otra')
+        with self.captureOnCommitCallbacks(execute=True):
+            usuario.save()
+        registro = Auditoria.objects.get(tabla_afectada='usuarios_usuario', accion='UPDATE')
+        self.assertEqual(registro.valores_nuevos, {'password': '***'})
+
+    def test_cambio_revertido_no_se_audita(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    Espacio.objects.create(nombre='Sala 2', tipo='salon', capacidad=10, ubicacion='Edificio B')
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.assertFalse(Auditoria.objects.filter(tabla_afectada='espacios_espacio').exists())
+
+
+class EscritorAuditoriaTest(TestCase):
+
+    def setUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directorio.cleanup)
+        self.ruta = Path(self.directorio.name) / 'pendientes.jsonl'
+        ajustes = override_settings(AUDITORIA_SPOOL=str(self.ruta))
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+    def entrada(self, registro_id):
+        return {
+            'usuario_id': None, 'accion': 'UPDATE', 'tabla_afectada': 'espacios_espacio', 'registro_id': registro_id,
+            'valores_previos': {'capacidad': 10}, 'valores_nuevos': {'capacidad': 20}, 'ip_origen': None,
+            'timestamp': timezone.now(),
+        }
+
+    def test_cola_llena_va_al_spool_y_se_reprocesa(self):
+        escritor = EscritorAuditoria(Spool(self.ruta))
+        # Cola de un registro y sin hilo de fondo: el test la vacía a mano
+        escritor._cola = queue.Queue(maxsize=1)
+        escritor._hilo = threading.current_thread()
+        escritor._pid = os.getpid()
+
+        escritor.registrar(self.entrada(1))
+        escritor.registrar(self.entrada(2))
+        self.assertFalse(Auditoria.objects.exists())
+        self.assertEqual(json.loads(self.ruta.read_text())['registro_id'], 2)
+
+        escritor.vaciar()
+        self.assertEqual(list(Auditoria.objects.values_list('registro_id', flat=True)), [1])
+
+        call_command('reprocesar_auditoria', stdout=io.StringIO())
+        self.assertEqual(sorted(Auditoria.objects.values_list('registro_id', flat=True)), [1, 2])
+        self.assertEqual(list(self.ruta.parent.iterdir()), [])
+
+    def test_error_de_base_de_datos_va_al_spool(self):
+        escritor = EscritorAuditoria(Spool(self.ruta))
+        invalida = {**self.entrada(3), 'campo_inexistente': 1}
+        with override_settings(AUDITORIA_MODO='sync'), self.assertLogs('auditoria.escritor', 'ERROR'):
+            escritor.registrar(invalida)
+        self.assertFalse(Auditoria.objects.exists())
+        self.assertIn('campo_inexistente', self.ruta.read_text())
+
+
+class ConsultaAuditoriaTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        carrera = Carrera.objects.create(nombre_carrera='Ingeniería en Informática', area='Tecnología')
+        cls.admin = Usuario.objects.create_user(
+            email='admin@inacap.cl', password='x', nombre='Ana', apellido='Admin',
+            rol=Rol.objects.create(nombre_rol='admin'), carrera=carrera
+        )
+        cls.solicitante = Usuario.objects.create_user(
+            email='docente@inacap.cl', password='x', nombre='Pedro', apellido='Docente',
+            rol=Rol.objects.create(nombre_rol='solicitante'), carrera=carrera
+        )
+        ahora = timezone.now()
+        Auditoria.objects.bulk_create([
+            Auditoria(usuario=cls.admin, accion='UPDATE', tabla_afectada='espacios_espacio', registro_id=1,
+                      timestamp=ahora - timedelta(days=dias))
+            for dias in (0, 3, 40)
+        ])
+
+    def test_rango_es_semiabierto(self):
+        ahora = timezone.now()
+        self.assertEqual(Auditoria.objects.rango(ahora - timedelta(days=10), ahora + timedelta(seconds=1)).count(), 2)
+        self.assertEqual(Auditoria.objects.de_tabla('espacios_espacio', 1).rango(ahora - timedelta(days=39), ahora).count(), 2)
+
+    def test_api_solo_admin_y_con_rango(self):
+        client = APIClient()
+        client.force_authenticate(self.solicitante)
+        self.assertEqual(client.get('/api/auditoria/').status_code, 403)
+
+        client.force_authenticate(self.admin)
+        self.assertEqual(len(client.get('/api/auditoria/').data), 2)
+        hasta = timezone.localdate()
+        desde = hasta - timedelta(days=60)
+        respuesta = client.get('/api/auditoria/', {'desde': desde.isoformat(), 'hasta': hasta.isoformat(), 'usuario': self.admin.id})
+        self.assertEqual(len(respuesta.data), 3)
+        respuesta = client.get('/api/auditoria/', {'desde': (hasta - timedelta(days=200)).isoformat()})
+        self.assertEqual(respuesta.status_code, 400)
+
+    def test_meses_de_particion(self):
+        self.assertEqual(particiones.sumar_meses(date(2025, 11, 1), 3), date(2026, 2, 1))
+        self.assertEqual(particiones.sumar_meses(date(2025, 1, 1), -1), date(2024, 12, 1))
+        nombre = particiones.nombre_particion(date(2026, 3, 1))
+        self.assertEqual(nombre, 'auditoria_auditoria_p202603')
+        self.assertEqual(particiones.mes_particion(nombre), date(2026, 3, 1))
+        self.assertIsNone(particiones.mes_particion('auditoria_auditoria_previa'))
+
+    def test_migracion_usa_la_conexion_recibida(self):
+        # Con migrate --database=<alias> la migración pasa schema_editor.connection
+        otra = mock.MagicMock(vendor='postgresql')
+        self.assertTrue(particiones.soportado(otra))
+        with mock.patch.object(connection, 'cursor') as cursor_global:
+            particiones.crear_particion_defecto(otra)
+        cursor_global.assert_not_called()
+        otra.cursor.return_value.__enter__.return_value.execute.assert_called_once_with(
+            'CREATE TABLE IF NOT EXISTS "auditoria_auditoria_default" PARTITION OF "auditoria_auditoria" DEFAULT'
+        )
+
+
+@skipUnless(connection.vendor == 'postgresql', 'El particionado de la auditoría requiere PostgreSQL')
+class ParticionesPostgresTest(TestCase):
+
+    def filas(self, tabla, registro_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT COUNT(*) FROM "{tabla}" WHERE id = %s', [registro_id])
+            return cursor.fetchone()[0]
+
+    def test_mes_sin_particion_cae_en_defecto_y_se_mueve_al_crearla(self):
+        mes = particiones.sumar_meses(particiones.mes_de(timezone.now().date()), 120)
+        momento = datetime(mes.year, mes.month, 15, 12, tzinfo=dt_timezone.utc)
+        registro = Auditoria.objects.create(accion='UPDATE', tabla_afectada='reservas_reserva', timestamp=momento)
+        self.assertNotIn(mes, particiones.particiones())
+        self.assertEqual(self.filas(particiones.PARTICION_DEFECTO, registro.pk), 1)
+
+        self.assertTrue(particiones.crear_particion(mes))
+        self.assertIn(mes, particiones.particiones())
+        self.assertEqual(self.filas(particiones.PARTICION_DEFECTO, registro.pk), 0)
+        self.assertEqual(self.filas(particiones.nombre_particion(mes), registro.pk), 1)
+        self.assertEqual(Auditoria.objects.get(pk=registro.pk).timestamp, momento)
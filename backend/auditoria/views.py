@@ -1,3 +1,60 @@
-from django.shortcuts import render
+from datetime import datetime, time, timedelta
 
-# Create your views here.
+from django.utils import timezone
+from rest_framework import viewsets
+from rest_framework.exceptions import ValidationError
+
+from usuarios.permissions import IsAdminUserCustom
+from .models import Auditoria
+from .serializers import AuditoriaSerializer
+
+# Las consultas siempre llevan rango de fechas, así solo tocan las particiones de esos meses
+MAX_DIAS_CONSULTA = 93
+
+
+class AuditoriaViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Historial de auditoría (solo admin).
+    ?desde=YYYY-MM-DD&hasta=YYYY-MM-DD (ambos incluidos; por defecto, los últimos 7 días)
+    y opcionalmente &usuario=, &tabla=, &registro=, &accion=.
+    """
+    queryset = Auditoria.objects.select_related('usuario')
+    serializer_class = AuditoriaSerializer
+    permission_classes = [IsAdminUserCustom]
+    cursor_ordering = ('-timestamp', '-id')
+
+    def _rango(self):
+        params = self.request.query_params
+        hoy = timezone.localdate()
+        try:
+            hasta = datetime.strptime(params['hasta'], '%Y-%m-%d').date() if params.get('hasta') else hoy
+            desde = datetime.strptime(params['desde'], '%Y-%m-%d').date() if params.get('desde') else hasta - timedelta(days=6)
+        except ValueError:
+            raise ValidationError("Las fechas deben tener formato YYYY-MM-DD")
+        if hasta < desde:
+            raise ValidationError("'hasta' debe ser posterior a 'desde'")
+        if (hasta - desde).days >= MAX_DIAS_CONSULTA:
+            raise ValidationError(f"El rango no puede superar {MAX_DIAS_CONSULTA} días")
+        zona = timezone.get_current_timezone()
+        return (
+            timezone.make_aware(datetime.combine(desde, time.min), zona),
+            timezone.make_aware(datetime.combine(hasta + timedelta(days=1), time.min), zona),
+        )
+
+    def get_queryset(self):
+        queryset = self.queryset.all()
+        if self.action != 'list':
+            return queryset
+        params = self.request.query_params
+        queryset = queryset.rango(*self._rango())
+        try:
+            if params.get('usuario'):
+                queryset = queryset.de_usuario(int(params['usuario']))
+            if params.get('tabla'):
+                registro = params.get('registro')
+                queryset = queryset.de_tabla(params['tabla'], int(registro) if registro else None)
+        except ValueError:
+            raise ValidationError("'usuario' y 'registro' deben ser IDs numéricos")
+        if params.get('accion'):
+            queryset = queryset.filter(accion=params['accion'])
+        return queryset
@@ -3,6 +3,17 @@ ASGI config for config project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Es el punto de entrada recomendado: el stream de eventos
+(/api/eventos/stream/) mantiene conexiones abiertas, y bajo ASGI cada una
+cuesta una corrutina en vez de un worker. Por ejemplo:
+
+    uvicorn config.asgi:application --workers 4
+    gunicorn config.asgi:application -k uvicorn.workers.UvicornWorker -w 4
+
+Con varios workers usar EVENTOS_BACKEND=postgres. Servido por WSGI
+(config/wsgi.py) el stream funciona igual pero se cierra cada
+EVENTOS_WSGI_DURACION segundos para liberar el worker.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
 """
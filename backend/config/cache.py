@@ -0,0 +1,139 @@
+"""
+Caché de lectura versionada (read-through) para catálogos y estadísticas.
+
+Cada familia de datos ('espacios', 'elementos', 'carreras', 'reservas') tiene
+una generación guardada en la caché. Las entradas se guardan bajo una clave
+que incluye la generación de todo lo que usaron para calcularse, así que
+invalidar es solo incrementar un número (`invalidar`): las entradas viejas
+quedan inalcanzables y expiran por su TTL, sin borrar claves una por una.
+
+- Las señales de cada app llaman a `invalidar` al guardar o borrar. Se invalida
+  al momento y otra vez al confirmar la transacción: un lector que alcance a
+  recalcular con los datos previos entre medio deja su entrada bajo una
+  generación que el segundo incremento vuelve obsoleta.
+- Si la generación se pierde (desalojo de la caché), se vuelve a crear con un
+  valor basado en la hora, que no coincide con ninguna anterior.
+- Al faltar una entrada, solo un proceso la recalcula (candado con cache.add);
+  los demás esperan un momento a que aparezca en lugar de repetir la consulta.
+- Los aciertos y fallos se cuentan por familia en el proceso (`metricas`).
+
+El backend se elige con CACHE_BACKEND en settings: 'memoria' (por proceso),
+'archivo' (compartido entre procesos del mismo servidor) o 'redis'.
+"""
+import hashlib
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+PREFIJO = 'rt'
+# Intervalo con que un proceso revisa si otro ya dejó el valor que está calculando
+INTERVALO_ESPERA = 0.05
+
+_FALTA = object()
+_metricas = defaultdict(Counter)
+_lock_metricas = threading.Lock()
+
+
+def _clave_generacion(familia):
+    return f'{PREFIJO}:gen:{familia}'
+
+
+def _nueva_generacion():
+    return time.time_ns() // 1000
+
+
+def _contar(familia, evento):
+    with _lock_metricas:
+        _metricas[familia][evento] += 1
+
+
+def generaciones(familias):
+    """Generación actual de cada familia (una sola lectura a la caché)"""
+    claves = [_clave_generacion(familia) for familia in familias]
+    actuales = cache.get_many(claves)
+    resultado = []
+    for familia, clave in zip(familias, claves):
+        valor = actuales.get(clave)
+        if valor is None:
+            cache.add(clave, _nueva_generacion(), timeout=None)
+            valor = cache.get(clave)
+        resultado.append(valor)
+    return resultado
+
+
+def _incrementar(familias):
+    for familia in familias:
+        clave = _clave_generacion(familia)
+        try:
+            cache.incr(clave)
+        except ValueError:
+            cache.add(clave, _nueva_generacion(), timeout=None)
+
+
+def invalidar(*familias):
+    """Vuelve obsoletas las entradas que dependen de `familias` (ahora y al confirmar)"""
+    _incrementar(familias)
+    transaction.on_commit(lambda: _incrementar(familias))
+
+
+def clave_entrada(familia, dependencias, parametros):
+    version = '.'.join(str(g) for g in generaciones(dependencias))
+    resumen = hashlib.md5(repr(parametros).encode(), usedforsecurity=False).hexdigest()
+    return f'{PREFIJO}:{familia}:{version}:{resumen}'
+
+
+def obtener(familia, dependencias, parametros, calcular, timeout=None):
+    """
+    Devuelve el valor cacheado para (familia, parametros) o lo calcula con
+    `calcular()`. `dependencias` son las familias cuyas generaciones forman la
+    clave; `parametros` debe tener un repr estable (tuplas, str, fechas).
+    """
+    clave = clave_entrada(familia, dependencias, parametros)
+    valor = cache.get(clave, _FALTA)
+    if valor is not _FALTA:
+        _contar(familia, 'aciertos')
+        return valor
+    _contar(familia, 'fallos')
+
+    espera = settings.CACHE_ESPERA_CALCULO
+    candado = f'{clave}:calculando'
+    if not cache.add(candado, 1, timeout=espera):
+        # Otro proceso la está calculando: se espera su resultado
+        _contar(familia, 'esperas')
+        limite = time.monotonic() + espera
+        while time.monotonic() < limite:
+            time.sleep(INTERVALO_ESPERA)
+            valor = cache.get(clave, _FALTA)
+            if valor is not _FALTA:
+                return valor
+        candado = None
+
+    try:
+        valor = calcular()
+        cache.set(clave, valor, timeout=timeout)
+        _contar(familia, 'calculos')
+    finally:
+        if candado:
+            cache.delete(candado)
+    return valor
+
+
+def metricas():
+    """{familia: {'aciertos', 'fallos', 'esperas', 'calculos', 'tasa_aciertos'}} de este proceso"""
+    with _lock_metricas:
+        copia = {familia: dict(contadores) for familia, contadores in _metricas.items()}
+    for contadores in copia.values():
+        for evento in ('aciertos', 'fallos', 'esperas', 'calculos'):
+            contadores.setdefault(evento, 0)
+        consultas = contadores['aciertos'] + contadores['fallos']
+        contadores['tasa_aciertos'] = round(contadores['aciertos'] / consultas, 3) if consultas else None
+    return copia
+
+
+def reiniciar_metricas():
+    with _lock_metricas:
+        _metricas.clear()
@@ -0,0 +1,224 @@
+"""
+Captura de consultas lentas.
+
+El contador de consultas de MetricasMiddleware (config/metricas.py) ya
+envuelve cada consulta de la petición con connection.execute_wrapper; cuando
+una supera CONSULTAS_LENTAS_UMBRAL_MS llama a `registrar`, que:
+- normaliza el SQL a una huella (literales, parámetros y listas IN colapsados),
+- la registra en el log 'consultas_lentas' con la vista/acción y la línea del
+  código del proyecto que la originó,
+- acumula por huella: cantidad, tiempo total y máximo, vistas y sitios,
+- cada CONSULTAS_LENTAS_MUESTREO consultas lentas guarda el plan de una con
+  EXPLAIN (ANALYZE, BUFFERS) en PostgreSQL (EXPLAIN QUERY PLAN en SQLite).
+  Solo se muestrean SELECT sin efectos (ANALYZE vuelve a ejecutar la consulta).
+
+Fuera de las peticiones (comandos como procesar_reportes o
+enviar_notificaciones, el hilo escritor de auditoría) no hay middleware: cada
+conexión nueva recibe al abrirse un `CapturaConsultas` permanente (señal
+connection_created, conectada en ReservasConfig.ready) que registra las lentas
+bajo el comando o el hilo que las ejecutó. Durante una petición deja el
+registro al contador del middleware para no contarlas dos veces.
+
+Las estadísticas viven en el proceso y se vuelcan junto con las métricas en
+METRICAS_DIR; `manage.py consultas_lentas` las suma y muestra.
+"""
+import hashlib
+import logging
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+
+logger = logging.getLogger('consultas_lentas')
+
+_LITERAL_TEXTO = re.compile(r"'(?:[^']|'')*'")
+_NUMERO = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PARAMETRO = re.compile(r'%s|\?')
+_LISTA = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_ESPACIOS = re.compile(r'\s+')
+# Consultas que no se vuelven a ejecutar con EXPLAIN ANALYZE
+_CON_EFECTOS = re.compile(r'\b(pg_notify|nextval|setval|pg_advisory\w*)\b|\bFOR\s+(NO\s+KEY\s+)?UPDATE\b', re.IGNORECASE)
+
+# Sitios dentro del proyecto que no cuentan como origen de la consulta
+_RAIZ = str(Path(settings.BASE_DIR).resolve())
+_PROPIOS = ('config/metricas.py', 'config/consultas_lentas.py')
+MAX_SITIOS = 5
+
+
+def huella(sql):
+    """SQL normalizado: mismas consultas con distintos valores dan la misma huella"""
+    normalizado = _LITERAL_TEXTO.sub('?', sql)
+    normalizado = _PARAMETRO.sub('?', normalizado)
+    normalizado = _NUMERO.sub('?', normalizado)
+    normalizado = _LISTA.sub('(...)', normalizado)
+    return _ESPACIOS.sub(' ', normalizado).strip()
+
+
+def id_huella(normalizado):
+    return hashlib.md5(normalizado.encode(), usedforsecurity=False).hexdigest()[:12]
+
+
+def sitio_llamada():
+    """'archivo.py:línea en función' del primer marco del proyecto fuera de esta instrumentación"""
+    marco = sys._getframe(2)
+    while marco is not None:
+        archivo = marco.f_code.co_filename
+        if archivo.startswith(_RAIZ) and 'site-packages' not in archivo and not archivo.endswith(_PROPIOS):
+            relativo = archivo[len(_RAIZ):].lstrip('/\\')
+            return f'{relativo}:{marco.f_lineno} en {marco.f_code.co_name}'
+        marco = marco.f_back
+    return 'desconocido'
+
+
+def explicar(conexion, sql, params):
+    """Plan de la consulta con un cursor de la conexión sin envolver (no vuelve a pasar por los wrappers)"""
+    if not sql.lstrip().upper().startswith('SELECT') or _CON_EFECTOS.search(sql):
+        return None
+    crudo = conexion.connection.cursor()
+    try:
+        if conexion.vendor == 'postgresql':
+            if conexion.in_atomic_block or not conexion.get_autocommit():
+                # Dentro de una transacción, un error en el EXPLAIN no debe abortarla
+                abrir = ['SAVEPOINT explain_consulta_lenta']
+                cerrar = ['ROLLBACK TO SAVEPOINT explain_consulta_lenta', 'RELEASE SAVEPOINT explain_consulta_lenta']
+            else:
+                # En autocommit no se puede usar SAVEPOINT: se abre una transacción propia y se descarta
+                abrir, cerrar = ['BEGIN'], ['ROLLBACK']
+            for sentencia in abrir:
+                crudo.execute(sentencia)
+            try:
+                crudo.execute(f'EXPLAIN (ANALYZE, BUFFERS) {sql}', params)
+                plan = '\n'.join(fila[0] for fila in crudo.fetchall())
+            finally:
+                for sentencia in cerrar:
+                    crudo.execute(sentencia)
+            return plan
+        if conexion.vendor == 'sqlite':
+            crudo.execute(f'EXPLAIN QUERY PLAN {sql.replace("%s", "?")}', params or ())
+            return '\n'.join(str(fila[-1]) for fila in crudo.fetchall())
+        return None
+    except Exception:
+        logger.debug("No se pudo obtener el plan de la consulta lenta", exc_info=True)
+        return None
+    finally:
+        crudo.close()
+
+
+class Registro:
+    """Estadísticas por huella de las consultas lentas de este proceso"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._huellas = {}
+        self._lentas = 0
+
+    def registrar(self, conexion, sql, params, many, duracion, vista):
+        normalizado = huella(sql)
+        identificador = id_huella(normalizado)
+        sitio = sitio_llamada()
+        logger.warning(
+            "Consulta lenta %.1f ms [%s] vista=%s sitio=%s: %s",
+            duracion * 1000, identificador, vista, sitio, normalizado,
+        )
+
+        muestreo = settings.CONSULTAS_LENTAS_MUESTREO
+        with self._lock:
+            self._lentas += 1
+            muestrear = muestreo and self._lentas % muestreo == 0
+            datos = self._huellas.get(identificador)
+            if datos is None:
+                datos = self._huellas[identificador] = {
+                    'sql': normalizado, 'cantidad': 0, 'total': 0.0, 'maximo': 0.0,
+                    'vistas': Counter(), 'sitios': Counter(), 'plan': None,
+                }
+            datos['cantidad'] += 1
+            datos['total'] += duracion
+            datos['maximo'] = max(datos['maximo'], duracion)
+            datos['vistas'][vista] += 1
+            if sitio in datos['sitios'] or len(datos['sitios']) < MAX_SITIOS:
+                datos['sitios'][sitio] += 1
+
+        if muestrear and not many:
+            plan = explicar(conexion, sql, params)
+            if plan:
+                logger.warning("Plan de la consulta lenta [%s]:\n%s", identificador, plan)
+                with self._lock:
+                    datos['plan'] = plan
+
+    def instantanea(self):
+        with self._lock:
+            return {
+                identificador: {**datos, 'vistas': dict(datos['vistas']), 'sitios': dict(datos['sitios'])}
+                for identificador, datos in self._huellas.items()
+            }
+
+    def reiniciar(self):
+        with self._lock:
+            self._huellas.clear()
+            self._lentas = 0
+
+
+registro = Registro()
+
+
+def combinar(instantaneas):
+    """Suma las estadísticas por huella de varios procesos"""
+    combinado = {}
+    for instantanea in instantaneas:
+        for identificador, datos in instantanea.items():
+            acumulado = combinado.get(identificador)
+            if acumulado is None:
+                combinado[identificador] = {
+                    **datos, 'vistas': Counter(datos['vistas']), 'sitios': Counter(datos['sitios']),
+                }
+                continue
+            acumulado['cantidad'] += datos['cantidad']
+            acumulado['total'] += datos['total']
+            acumulado['maximo'] = max(acumulado['maximo'], datos['maximo'])
+            acumulado['vistas'].update(datos['vistas'])
+            acumulado['sitios'].update(datos['sitios'])
+            acumulado['plan'] = acumulado['plan'] or datos['plan']
+    return combinado
+
+
+def origen():
+    """Etiqueta de las consultas sin petición: el hilo con nombre propio o el comando de manage.py"""
+    hilo = threading.current_thread()
+    if hilo is not threading.main_thread():
+        return f'hilo:{hilo.name}'
+    if len(sys.argv) > 1 and Path(sys.argv[0]).name == 'manage.py':
+        return f'comando:{sys.argv[1]}'
+    return f'proceso:{Path(sys.argv[0]).name}' if sys.argv and sys.argv[0] else 'proceso'
+
+
+class CapturaConsultas:
+    """Wrapper permanente de la conexión: registra las consultas lentas que no pasan por MetricasMiddleware"""
+
+    def __call__(self, execute, sql, params, many, context):
+        conexion = context['connection']
+        if any(getattr(wrapper, 'registra_consultas_lentas', False) for wrapper in conexion.execute_wrappers):
+            return execute(sql, params, many, context)
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duracion = time.perf_counter() - inicio
+            if duracion >= settings.CONSULTAS_LENTAS_UMBRAL_MS / 1000:
+                registro.registrar(conexion, sql, params, many, duracion, origen())
+                # Los comandos y workers de larga duración también vuelcan cada METRICAS_INTERVALO_VOLCADO
+                from .metricas import volcador
+                volcador.tal_vez_volcar(time.perf_counter())
+
+
+captura = CapturaConsultas()
+
+
+def instalar(sender, connection, **kwargs):
+    """Receptor de connection_created; execute_wrappers sobrevive a las reconexiones del mismo alias"""
+    if captura not in connection.execute_wrappers:
+        # Al principio de la lista: un execute_wrapper() abierto cuando se abrió la conexión saca el último al cerrar
+        connection.execute_wrappers.insert(0, captura)
@@ -0,0 +1,335 @@
+"""
+Métricas por vista: latencia, consultas SQL, tiempo en la base de datos y
+tamaño de la respuesta.
+
+MetricasMiddleware identifica la vista y la acción de DRF que atendió la
+petición (p. ej. 'ReservaViewSet.estadisticas') y suma la medición a
+histogramas en memoria: cada observación es un bisect y unos incrementos de
+enteros bajo un lock, sin asignar objetos por petición más allá del contador
+de consultas. También agrega la cabecera Server-Timing.
+
+GET /metrics devuelve todo en formato de texto de Prometheus.
+
+Con varios procesos (gunicorn), si METRICAS_DIR está configurado cada proceso
+vuelca su estado en METRICAS_DIR/metricas_<pid>.json cada
+METRICAS_INTERVALO_VOLCADO segundos y al terminar; /metrics suma los archivos
+de los demás procesos con el estado en vivo del que responde. El mismo volcado
+lleva las estadísticas de consultas lentas (config/consultas_lentas.py). Los contadores
+son acumulados: al reiniciar el servicio hay que vaciar el directorio.
+"""
+import atexit
+import hmac
+import json
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connection
+from django.http import HttpResponse, HttpResponseForbidden
+
+from . import cache as cache_lectura, consultas_lentas
+
+# Límites superiores de cada bucket (el último bucket, +Inf, es implícito)
+BUCKETS = {
+    'latencia': (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+    'tiempo_db': (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+    'consultas': (0, 1, 2, 5, 10, 20, 50, 100, 200),
+    'tamano': (1_000, 10_000, 100_000, 1_000_000, 10_000_000),
+}
+METRICAS_PROMETHEUS = {
+    'latencia': ('http_peticion_segundos', 'Duración de la petición por vista'),
+    'tiempo_db': ('http_peticion_db_segundos', 'Tiempo en la base de datos por petición'),
+    'consultas': ('http_peticion_consultas', 'Consultas SQL por petición'),
+    'tamano': ('http_respuesta_bytes', 'Tamaño del cuerpo de la respuesta'),
+}
+VISTA_SIN_RESOLVER = 'sin_vista'
+
+
+def nombre_vista(view_func, metodo):
+    """'Clase.accion' para ViewSets de DRF, 'Clase' para otras vistas de clase y el nombre de la función en el resto"""
+    clase = getattr(view_func, 'cls', None) or getattr(view_func, 'view_class', None)
+    if clase is None:
+        return getattr(view_func, '__name__', VISTA_SIN_RESOLVER)
+    acciones = getattr(view_func, 'actions', None)
+    if acciones:
+        return f'{clase.__name__}.{acciones.get(metodo.lower(), metodo.lower())}'
+    return clase.__name__
+
+
+class Registro:
+    """Histogramas por (vista, método) y conteo de respuestas por código, de este proceso"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series = {}
+        self._codigos = {}
+
+    def _serie_nueva(self):
+        serie = {}
+        for nombre, limites in BUCKETS.items():
+            serie[nombre] = [0] * (len(limites) + 1)
+            serie[f'{nombre}_suma'] = 0
+        return serie
+
+    def registrar(self, vista, metodo, codigo, latencia, consultas, tiempo_db, tamano):
+        indices = (
+            ('latencia', latencia, bisect_left(BUCKETS['latencia'], latencia)),
+            ('tiempo_db', tiempo_db, bisect_left(BUCKETS['tiempo_db'], tiempo_db)),
+            ('consultas', consultas, bisect_left(BUCKETS['consultas'], consultas)),
+            ('tamano', tamano, bisect_left(BUCKETS['tamano'], tamano)),
+        )
+        clave = (vista, metodo)
+        with self._lock:
+            serie = self._series.get(clave)
+            if serie is None:
+                serie = self._series[clave] = self._serie_nueva()
+            for nombre, valor, indice in indices:
+                serie[nombre][indice] += 1
+                serie[f'{nombre}_suma'] += valor
+            clave_codigo = (vista, codigo)
+            self._codigos[clave_codigo] = self._codigos.get(clave_codigo, 0) + 1
+
+    def instantanea(self):
+        """Estado serializable a JSON (para volcarlo o combinarlo)"""
+        with self._lock:
+            series = [
+                {'vista': vista, 'metodo': metodo, **{k: list(v) if isinstance(v, list) else v for k, v in serie.items()}}
+                for (vista, metodo), serie in self._series.items()
+            ]
+            codigos = [[vista, codigo, total] for (vista, codigo), total in self._codigos.items()]
+        return {
+            'series': series, 'codigos': codigos, 'cache': cache_lectura.metricas(),
+            'consultas_lentas': consultas_lentas.registro.instantanea(),
+        }
+
+    def reiniciar(self):
+        with self._lock:
+            self._series.clear()
+            self._codigos.clear()
+
+
+registro = Registro()
+
+
+def combinar(instantaneas):
+    """Suma instantáneas de varios procesos"""
+    series, codigos, cache = {}, {}, {}
+    for instantanea in instantaneas:
+        for serie in instantanea.get('series', []):
+            clave = (serie['vista'], serie['metodo'])
+            acumulada = series.setdefault(clave, {'vista': serie['vista'], 'metodo': serie['metodo']})
+            for nombre in BUCKETS:
+                if nombre in acumulada:
+                    acumulada[nombre] = [a + b for a, b in zip(acumulada[nombre], serie[nombre])]
+                    acumulada[f'{nombre}_suma'] += serie[f'{nombre}_suma']
+                else:
+                    acumulada[nombre] = list(serie[nombre])
+                    acumulada[f'{nombre}_suma'] = serie[f'{nombre}_suma']
+        for vista, codigo, total in instantanea.get('codigos', []):
+            codigos[(vista, codigo)] = codigos.get((vista, codigo), 0) + total
+        for familia, contadores in instantanea.get('cache', {}).items():
+            acumulados = cache.setdefault(familia, {})
+            for evento in ('aciertos', 'fallos', 'esperas', 'calculos'):
+                acumulados[evento] = acumulados.get(evento, 0) + contadores.get(evento, 0)
+    return {
+        'series': list(series.values()),
+        'codigos': [[vista, codigo, total] for (vista, codigo), total in codigos.items()],
+        'cache': cache,
+    }
+
+
+def _etiquetas(**valores):
+    partes = []
+    for nombre, valor in valores.items():
+        valor = str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        partes.append(f'{nombre}="{valor}"')
+    return '{' + ','.join(partes) + '}'
+
+
+def _formatear(numero):
+    return repr(float(numero)) if isinstance(numero, float) else str(numero)
+
+
+def exportar_prometheus(datos):
+    lineas = []
+    series = sorted(datos['series'], key=lambda s: (s['vista'], s['metodo']))
+    for nombre, (metrica, ayuda) in METRICAS_PROMETHEUS.items():
+        lineas.append(f'# HELP {metrica} {ayuda}')
+        lineas.append(f'# TYPE {metrica} histogram')
+        limites = [_formatear(limite) for limite in BUCKETS[nombre]] + ['+Inf']
+        for serie in series:
+            acumulado = 0
+            for limite, cantidad in zip(limites, serie[nombre]):
+                acumulado += cantidad
+                etiquetas = _etiquetas(vista=serie['vista'], metodo=serie['metodo'], le=limite)
+                lineas.append(f'{metrica}_bucket{etiquetas} {acumulado}')
+            etiquetas = _etiquetas(vista=serie['vista'], metodo=serie['metodo'])
+            lineas.append(f'{metrica}_sum{etiquetas} {_formatear(serie[f"{nombre}_suma"])}')
+            lineas.append(f'{metrica}_count{etiquetas} {acumulado}')
+
+    lineas.append('# HELP http_respuestas_total Respuestas por vista y código HTTP')
+    lineas.append('# TYPE http_respuestas_total counter')
+    for vista, codigo, total in sorted(datos['codigos']):
+        lineas.append(f'http_respuestas_total{_etiquetas(vista=vista, codigo=codigo)} {total}')
+
+    lineas.append('# HELP cache_lectura_total Eventos de la caché versionada por familia (config/cache.py)')
+    lineas.append('# TYPE cache_lectura_total counter')
+    for familia, contadores in sorted(datos['cache'].items()):
+        for evento in ('aciertos', 'fallos', 'esperas', 'calculos'):
+            lineas.append(f'cache_lectura_total{_etiquetas(familia=familia, evento=evento)} {contadores.get(evento, 0)}')
+    return '\n'.join(lineas) + '\n'
+
+
+class Volcador:
+    """Escribe la instantánea del proceso en el directorio compartido y lee las de los demás"""
+
+    def __init__(self):
+        self._proximo = 0
+        self._lock = threading.Lock()
+        atexit.register(self.volcar)
+
+    @staticmethod
+    def directorio():
+        directorio = getattr(settings, 'METRICAS_DIR', None)
+        return Path(directorio) if directorio else None
+
+    @staticmethod
+    def _archivo(directorio, pid):
+        return directorio / f'metricas_{pid}.json'
+
+    def volcar(self):
+        directorio = self.directorio()
+        if directorio is None:
+            return
+        directorio.mkdir(parents=True, exist_ok=True)
+        descriptor, temporal = tempfile.mkstemp(dir=directorio, suffix='.tmp')
+        with os.fdopen(descriptor, 'w') as archivo:
+            json.dump(registro.instantanea(), archivo)
+        os.replace(temporal, self._archivo(directorio, os.getpid()))
+
+    def tal_vez_volcar(self, ahora):
+        """Llamado en cada petición; vuelca a lo más una vez por intervalo"""
+        if ahora < self._proximo or self.directorio() is None:
+            return
+        with self._lock:
+            if ahora < self._proximo:
+                return
+            self._proximo = ahora + settings.METRICAS_INTERVALO_VOLCADO
+        self.volcar()
+
+    def otros_procesos(self, incluir_propio=False):
+        directorio = self.directorio()
+        if directorio is None or not directorio.exists():
+            return []
+        propio = self._archivo(directorio, os.getpid())
+        instantaneas = []
+        for ruta in directorio.glob('metricas_*.json'):
+            if ruta == propio and not incluir_propio:
+                continue
+            try:
+                instantaneas.append(json.loads(ruta.read_text()))
+            except (OSError, ValueError):
+                # El proceso lo está reemplazando o quedó incompleto: se omite en esta lectura
+                continue
+        return instantaneas
+
+
+volcador = Volcador()
+
+
+class _ContadorConsultas:
+    """Wrapper de ejecución: cuenta y mide las consultas y pasa las lentas a consultas_lentas"""
+    __slots__ = ('request', 'umbral', 'consultas', 'tiempo')
+    # consultas_lentas.CapturaConsultas no registra lo que ya registra este contador
+    registra_consultas_lentas = True
+
+    def __init__(self, request):
+        self.request = request
+        self.umbral = settings.CONSULTAS_LENTAS_UMBRAL_MS / 1000
+        self.consultas = 0
+        self.tiempo = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duracion = time.perf_counter() - inicio
+            self.tiempo += duracion
+            self.consultas += 1
+            if duracion >= self.umbral:
+                vista = getattr(self.request, '_vista_metricas', VISTA_SIN_RESOLVER)
+                consultas_lentas.registro.registrar(context['connection'], sql, params, many, duracion, vista)
+
+
+class MetricasMiddleware:
+    """
+    Mide cada petición y la registra bajo la vista que la atendió. Funciona
+    bajo WSGI y ASGI: en ASGI el contador se instala en el hilo donde Django
+    ejecuta el ORM de esa petición (la conexión es propia de cada hilo).
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._vista_metricas = nombre_vista(view_func, request.method)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        inicio = time.perf_counter()
+        contador = _ContadorConsultas(request)
+        with connection.execute_wrapper(contador):
+            response = self.get_response(request)
+        return self._registrar(request, response, inicio, contador)
+
+    async def __acall__(self, request):
+        inicio = time.perf_counter()
+        contador = _ContadorConsultas(request)
+        # `connection` se resuelve dentro del hilo de la petición, no en el del loop
+        await sync_to_async(lambda: connection.execute_wrappers.append(contador))()
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(lambda: connection.execute_wrappers.remove(contador))()
+        return self._registrar(request, response, inicio, contador)
+
+    def _registrar(self, request, response, inicio, contador):
+        duracion = time.perf_counter() - inicio
+        # Las respuestas en streaming (PDF, SSE) no se leen: se usa Content-Length si lo traen
+        tamano = int(response.get('Content-Length') or 0) if response.streaming else len(response.content)
+        registro.registrar(
+            getattr(request, '_vista_metricas', VISTA_SIN_RESOLVER), request.method, response.status_code,
+            duracion, contador.consultas, contador.tiempo, tamano,
+        )
+        response['Server-Timing'] = (
+            f'app;dur={duracion * 1000:.1f}, '
+            f'db;dur={contador.tiempo * 1000:.1f};desc="{contador.consultas} consultas"'
+        )
+        volcador.tal_vez_volcar(inicio)
+        return response
+
+
+def vista_metricas(request):
+    """
+    GET /metrics en formato de texto de Prometheus. Exige 'Authorization: Bearer
+    <METRICAS_TOKEN>'; sin token configurado solo responde con DEBUG activo.
+    """
+    token = getattr(settings, 'METRICAS_TOKEN', '')
+    if not token:
+        if not settings.DEBUG:
+            return HttpResponseForbidden()
+    elif not hmac.compare_digest(request.META.get('HTTP_AUTHORIZATION', ''), f'Bearer {token}'):
+        return HttpResponseForbidden()
+    datos = combinar([registro.instantanea(), *volcador.otros_procesos()])
+    return HttpResponse(exportar_prometheus(datos), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,126 @@
+import hashlib
+
+from django.conf import settings
+from django.db import models
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+from . import cache as cache_lectura
+
+
+class ValoresDBMixin:
+    """
+    Conserva los valores con que la instancia se leyó de la base de datos en
+    `_valores_db`, para que las señales puedan comparar el estado previo sin
+    volver a consultar la fila.
+    """
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._valores_db = {
+            nombre: valor for nombre, valor in zip(field_names, values)
+            if valor is not models.DEFERRED
+        }
+        return instance
+
+    def sincronizar_valores_db(self, campos):
+        """Marca los campos indicados como ya persistidos (se llama después de guardar)"""
+        valores = getattr(self, '_valores_db', {})
+        valores.update({campo: getattr(self, campo) for campo in campos})
+        self._valores_db = valores
+
+
+class _NoModificado(Exception):
+
+    def __init__(self, respuesta):
+        self.respuesta = respuesta
+
+
+class RespuestaCondicionalMixin:
+    """
+    Respuestas condicionales (ETag / Last-Modified) para ViewSets de catálogo.
+
+    La versión de la tabla es (MAX(fecha_actualizacion), COUNT(*)): el máximo
+    cambia con cada save() y el conteo con cada borrado. Se obtiene con una
+    sola consulta después de autenticar y verificar permisos, y si el cliente
+    ya tiene esa versión se responde 304 sin consultar ni serializar nada más.
+    El navegador revalida solo (Cache-Control: no-cache), así que el frontend
+    no necesita cambios.
+
+    Los modelos deben tener `fecha_actualizacion` con auto_now y no modificarse
+    con QuerySet.update(), que no lo actualiza.
+    """
+    # Acciones cuyo resultado depende solo de la tabla del ViewSet
+    acciones_condicionales = ('list', 'retrieve')
+
+    def _version_tabla(self):
+        modelo = self.get_queryset().model
+        version = modelo._default_manager.aggregate(
+            ultima=models.Max('fecha_actualizacion'), total=models.Count('pk'),
+        )
+        return version['ultima'], version['total']
+
+    def _etag(self, request, ultima, total):
+        # La ruta con sus parámetros y el formato pedido distinguen respuestas con contenido distinto
+        clave = '|'.join([
+            request.get_full_path(), request.META.get('HTTP_ACCEPT', ''),
+            ultima.isoformat() if ultima else '', str(total),
+        ])
+        return '"%s"' % hashlib.md5(clave.encode(), usedforsecurity=False).hexdigest()
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self._condicional = None
+        if request.method not in ('GET', 'HEAD') or self.action not in self.acciones_condicionales:
+            return
+        ultima, total = self._version_tabla()
+        etag = self._etag(request, ultima, total)
+        ultima_modificacion = ultima.timestamp() if ultima else None
+        self._condicional = (etag, ultima_modificacion)
+        respuesta = get_conditional_response(request, etag=etag, last_modified=ultima_modificacion)
+        if respuesta is not None:
+            raise _NoModificado(respuesta)
+
+    def handle_exception(self, exc):
+        if isinstance(exc, _NoModificado):
+            return exc.respuesta
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        condicional = getattr(self, '_condicional', None)
+        if condicional and response.status_code in (200, 304):
+            etag, ultima_modificacion = condicional
+            response['ETag'] = etag
+            if ultima_modificacion is not None:
+                response['Last-Modified'] = http_date(ultima_modificacion)
+            # Cada cliente guarda su copia y la revalida en cada uso
+            response['Cache-Control'] = 'private, no-cache'
+            patch_vary_headers(response, ['Authorization'])
+        return response
+
+
+class CacheLecturaMixin:
+    """
+    Sirve `list` (y las acciones que usen `respuesta_cacheada`) desde la caché
+    versionada de config/cache.py. La clave es la URL completa, así los
+    parámetros (?fields=, ?cursor=, filtros) separan las entradas. Los datos
+    del catálogo no dependen del usuario, solo de `familia_cache`.
+    """
+    familia_cache = None
+    dependencias_cache = None
+
+    def respuesta_cacheada(self, calcular):
+        datos = cache_lectura.obtener(
+            self.familia_cache,
+            self.dependencias_cache or (self.familia_cache,),
+            self.request.build_absolute_uri(),
+            calcular,
+            timeout=settings.CACHE_CATALOGOS_TTL,
+        )
+        return Response(datos)
+
+    def list(self, request, *args, **kwargs):
+        return self.respuesta_cacheada(lambda: super(CacheLecturaMixin, self).list(request, *args, **kwargs).data)
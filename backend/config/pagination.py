@@ -0,0 +1,24 @@
+from rest_framework.pagination import CursorPagination
+
+
+class PaginacionCursorOpcional(CursorPagination):
+    """
+    Paginación por cursor (keyset): cada página filtra a partir de la última
+    fila vista en lugar de usar OFFSET, así una página profunda cuesta lo mismo
+    que la primera.
+
+    Es opcional para no romper a los clientes que esperan un arreglo: solo se
+    activa si la petición trae ?cursor= o ?page_size=. El orden se toma del
+    atributo `cursor_ordering` de la vista (por defecto, 'id').
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    ordering = ('id',)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if self.cursor_query_param not in params and self.page_size_query_param not in params:
+            return None
+        self.ordering = getattr(view, 'cursor_ordering', self.ordering)
+        return super().paginate_queryset(queryset, request, view)
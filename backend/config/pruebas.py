@@ -0,0 +1,187 @@
+"""
+Utilidades compartidas por los tests de rendimiento de las apps.
+
+ConsultasAcotadasMixin mide un endpoint con un conjunto de datos pequeño y
+uno grande (TAMANOS) y falla si el número de consultas cambia entre ambos
+(un N+1) o supera el máximo esperado. Cada clase de test define
+`poblar(tamano)`, que deja al menos `tamano` filas en los datos que lista.
+ConsultasAdminTestCase agrega lo que comparten los tests de los catálogos
+(elementos, espacios, usuarios): el admin que hace las peticiones, la caché
+vacía en cada test y contadores para crear filas y objetos nuevos.
+
+En cada medición se registra además el tiempo total de la petición y el de
+serialización (el acceso a `.data` del serializer principal, que incluye
+leer el queryset si aún no estaba evaluado). Los tiempos no se verifican
+por defecto, porque dependen de la máquina:
+- PRUEBAS_RENDIMIENTO_SALIDA=archivo.json los guarda al terminar cada clase.
+- PRUEBAS_RENDIMIENTO_BASE=archivo.json los compara con una corrida anterior
+  de la misma máquina y falla si la serialización del conjunto grande tarda
+  más de FACTOR_REGRESION veces lo registrado (con MARGEN_MS de holgura).
+"""
+import json
+import os
+import time
+from contextlib import contextmanager
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.serializers import BaseSerializer
+from rest_framework.test import APIClient
+
+FACTOR_REGRESION = 2.0
+MARGEN_MS = 5.0
+
+# {'Clase.test': {tamano: {'consultas', 'total_ms', 'serializacion_ms'}}} de esta corrida
+tiempos = {}
+_base = None
+
+
+@contextmanager
+def medir_serializacion():
+    """Acumula en la lista entregada la duración de cada acceso a `serializer.data`"""
+    duraciones = []
+    data = BaseSerializer.data
+
+    def data_medida(serializer):
+        inicio = time.perf_counter()
+        try:
+            return data.fget(serializer)
+        finally:
+            duraciones.append(time.perf_counter() - inicio)
+
+    # Serializer.data y ListSerializer.data llaman a BaseSerializer.data una vez;
+    # los anidados usan to_representation, así que no se cuentan dos veces.
+    with mock.patch.object(BaseSerializer, 'data', property(data_medida)):
+        yield duraciones
+
+
+def base_tiempos():
+    global _base
+    if _base is None:
+        archivo = os.environ.get('PRUEBAS_RENDIMIENTO_BASE')
+        _base = {}
+        if archivo and os.path.exists(archivo):
+            with open(archivo) as f:
+                _base = json.load(f)
+    return _base
+
+
+def guardar_tiempos():
+    archivo = os.environ.get('PRUEBAS_RENDIMIENTO_SALIDA')
+    if archivo:
+        with open(archivo, 'w') as f:
+            json.dump(tiempos, f, indent=2, sort_keys=True)
+
+
+class ConsultasAcotadasMixin:
+    """
+    Verifica que un endpoint ejecute un número fijo de consultas sin importar
+    cuántas filas devuelve: se mide con un conjunto pequeño y uno grande.
+    """
+    TAMANOS = (3, 15)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        guardar_tiempos()
+
+    def poblar(self, tamano):
+        """Deja al menos `tamano` filas en los datos que lista el endpoint"""
+        raise NotImplementedError(f'{type(self).__name__} debe definir poblar(tamano) para usar assertConsultasAcotadas')
+
+    def medir(self, usuario, metodo, url, datos=None):
+        """Consultas, milisegundos totales y de serialización de una petición"""
+        client = APIClient()
+        # Usuario recién leído: así la consulta del rol se cuenta en cada medición
+        client.force_authenticate(type(usuario).objects.get(pk=usuario.pk))
+        with CaptureQueriesContext(connection) as contexto, medir_serializacion() as serializacion:
+            inicio = time.perf_counter()
+            response = getattr(client, metodo)(url, datos, format='json') if datos is not None else getattr(client, metodo)(url)
+            contenido = b''.join(response.streaming_content) if response.streaming else response.content
+            total = time.perf_counter() - inicio
+        self.assertLess(response.status_code, 400, contenido[:300])
+        return {
+            'consultas': len(contexto.captured_queries),
+            'total_ms': round(total * 1000, 2),
+            'serializacion_ms': round(sum(serializacion) * 1000, 2),
+        }
+
+    def assertConsultasAcotadas(self, url, maximo, usuario=None, metodo='get', datos=None, calentar=False):
+        """
+        `url` y `datos` pueden ser funciones que reciben el tamaño, para las
+        acciones que necesitan un objeto nuevo en cada medición (aprobar, borrar).
+        Con `calentar`, una petición previa sin medir crea las filas que solo la
+        primera escritura inserta (resúmenes del día, contadores de notificaciones).
+        """
+        usuario = usuario or self.admin
+
+        def pedir(tamano):
+            return self.medir(
+                usuario, metodo, url(tamano) if callable(url) else url, datos(tamano) if callable(datos) else datos,
+            )
+
+        mediciones = {}
+        for indice, tamano in enumerate(self.TAMANOS):
+            self.poblar(tamano)
+            if calentar and indice == 0:
+                pedir(tamano)
+            mediciones[tamano] = pedir(tamano)
+        self._registrar_tiempos(mediciones)
+
+        descripcion = f"{metodo.upper()} {url if not callable(url) else self.id()}"
+        conteos = {tamano: medicion['consultas'] for tamano, medicion in mediciones.items()}
+        self.assertEqual(
+            len(set(conteos.values())), 1,
+            f"{descripcion}: las consultas crecen con el número de filas {conteos}"
+        )
+        mayor = conteos[self.TAMANOS[-1]]
+        self.assertLessEqual(mayor, maximo, f"{descripcion}: {mayor} consultas (máximo {maximo})")
+
+    def _registrar_tiempos(self, mediciones):
+        clave = self.id().rsplit('.', 2)[-2] + '.' + self._testMethodName
+        tiempos[clave] = {str(tamano): medicion for tamano, medicion in mediciones.items()}
+
+        anterior = base_tiempos().get(clave, {}).get(str(self.TAMANOS[-1]))
+        if anterior:
+            actual = mediciones[self.TAMANOS[-1]]['serializacion_ms']
+            limite = anterior['serializacion_ms'] * FACTOR_REGRESION + MARGEN_MS
+            self.assertLessEqual(
+                actual, limite,
+                f"{clave}: la serialización tardó {actual} ms (base {anterior['serializacion_ms']} ms)"
+            )
+
+
+class ConsultasAdminTestCase(ConsultasAcotadasMixin, TestCase):
+    """
+    Base de los tests de consultas de los catálogos. Las subclases agregan sus
+    datos en setUpTestData (llamando a super) y definen `poblar` con `completar`.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        from usuarios.models import Rol, Usuario
+
+        cls.admin = Usuario.objects.create_user(
+            email='admin@inacap.cl', password='x', nombre='Ana', apellido='Admin',
+            rol=Rol.objects.create(nombre_rol='admin')
+        )
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        # Filas ya creadas por poblar y objetos creados con siguiente()
+        self.total = self.nuevos = 0
+
+    def completar(self, tamano, crear):
+        """Llama a crear(i) por cada fila que falta para llegar a `tamano`"""
+        for i in range(self.total, tamano):
+            crear(i)
+        self.total = max(self.total, tamano)
+
+    def siguiente(self):
+        """Número para el objeto nuevo de cada medición (aprobar, editar, borrar)"""
+        self.nuevos += 1
+        return self.nuevos
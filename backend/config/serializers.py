@@ -0,0 +1,61 @@
+from rest_framework import serializers
+
+
+def _lista_param(request, nombre):
+    valor = request.query_params.get(nombre)
+    if valor is None:
+        return None
+    return {campo.strip() for campo in valor.split(',') if campo.strip()}
+
+
+class CamposDinamicosMixin:
+    """
+    Selección de campos por query string en las lecturas (GET):
+
+    - ?fields=id,estado      devuelve solo esos campos.
+    - ?expand=espacio_detalle incluye ese campo anidado.
+
+    Los campos anidados de `Meta.expandibles` se omiten en cuanto el cliente usa
+    fields o expand, salvo que los pida explícitamente. Sin ninguno de los dos
+    parámetros la respuesta no cambia. Solo afecta al serializer raíz, no a los
+    que van anidados dentro de otro.
+    """
+
+    @classmethod
+    def seleccion(cls, request):
+        """Predicado nombre -> bool con los campos a devolver, o None si no hay selección"""
+        if request is None or request.method != 'GET':
+            return None
+        fields = _lista_param(request, 'fields')
+        expand = _lista_param(request, 'expand')
+        if fields is None and expand is None:
+            return None
+
+        expand = expand or set()
+        expandibles = set(getattr(cls.Meta, 'expandibles', ()))
+        if fields is None:
+            return lambda nombre: nombre not in expandibles or nombre in expand
+        return lambda nombre: nombre in fields or nombre in expand
+
+    @classmethod
+    def expandidos(cls, request):
+        """Campos de Meta.expandibles que irán en la respuesta"""
+        expandibles = getattr(cls.Meta, 'expandibles', ())
+        incluye = cls.seleccion(request)
+        if incluye is None:
+            return set(expandibles)
+        return {nombre for nombre in expandibles if incluye(nombre)}
+
+    def _es_raiz(self):
+        if self.parent is None:
+            return True
+        return isinstance(self.parent, serializers.ListSerializer) and self.parent.parent is None
+
+    def get_fields(self):
+        campos = super().get_fields()
+        if not self._es_raiz():
+            return campos
+        incluye = self.seleccion(self.context.get('request'))
+        if incluye is None:
+            return campos
+        return {nombre: campo for nombre, campo in campos.items() if incluye(nombre)}
@@ -5,7 +5,7 @@ Generated by 'django-admin startproject' using Django 4.2.7.
 """
 
 from pathlib import Path
-from decouple import config
+from decouple import Csv, config
 from datetime import timedelta
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -51,6 +51,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware', # <--- DEBE SER EL PRIMERO
+    'config.metricas.MetricasMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -58,6 +59,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'auditoria.middleware.ContextoAuditoriaMiddleware',
 ]
 
 ROOT_URLCONF = 'config.urls'
@@ -140,13 +142,13 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # REST Framework Configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'usuarios.autenticacion.JWTAuthenticationCacheada',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
-    #'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
-    #'PAGE_SIZE': 20,
+    # Cursor opcional: se activa con ?cursor= o ?page_size= (config/pagination.py)
+    'DEFAULT_PAGINATION_CLASS': 'config.pagination.PaginacionCursorOpcional',
 }
 
 # JWT Settings
@@ -158,8 +160,45 @@ SIMPLE_JWT = {
     'ALGORITHM': 'HS256',
     'SIGNING_KEY': SECRET_KEY,
     'AUTH_HEADER_TYPES': ('Bearer',),
+    # Agrega el rol y la carrera como claims del token
+    'TOKEN_OBTAIN_SERIALIZER': 'usuarios.autenticacion.TokenConRolSerializer',
 }
 
+# Caché de Django, usada por la caché versionada de catálogos y estadísticas (config/cache.py).
+# 'memoria' es por proceso; 'archivo' se comparte entre los procesos del servidor; 'redis' entre servidores.
+CACHE_BACKEND = config('CACHE_BACKEND', default='memoria')
+if CACHE_BACKEND == 'redis':
+    CACHES = {'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': config('REDIS_URL', default='redis://127.0.0.1:6379/1'),
+    }}
+elif CACHE_BACKEND == 'archivo':
+    CACHES = {'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': config('CACHE_DIR', default=str(BASE_DIR / 'cache')),
+    }}
+else:
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+CACHE_CATALOGOS_TTL = config('CACHE_CATALOGOS_TTL', default=3600, cast=int)
+# Respaldo por si alguna escritura no pasa por las señales (p. ej. un cambio de carrera de un usuario)
+CACHE_ESTADISTICAS_TTL = config('CACHE_ESTADISTICAS_TTL', default=300, cast=int)
+CACHE_ESPERA_CALCULO = 10  # segundos que un proceso espera a que otro termine de calcular una entrada
+
+# Métricas por vista (config/metricas.py). Con varios procesos, METRICAS_DIR debe
+# ser un directorio compartido por todos y vaciarse al reiniciar el servicio
+METRICAS_DIR = config('METRICAS_DIR', default='')
+METRICAS_INTERVALO_VOLCADO = 5  # segundos
+# GET /metrics exige 'Authorization: Bearer <METRICAS_TOKEN>'. Sin token solo responde con DEBUG
+METRICAS_TOKEN = config('METRICAS_TOKEN', default='')
+
+# Consultas lentas (config/consultas_lentas.py): umbral y cada cuántas se guarda su EXPLAIN (0 = nunca)
+CONSULTAS_LENTAS_UMBRAL_MS = config('CONSULTAS_LENTAS_UMBRAL_MS', default=100, cast=float)
+CONSULTAS_LENTAS_MUESTREO = config('CONSULTAS_LENTAS_MUESTREO', default=20, cast=int)
+
+# Caché local de usuarios autenticados (usuarios.autenticacion)
+AUTH_CACHE_TTL = config('AUTH_CACHE_TTL', default=60, cast=int)
+AUTH_CACHE_MAX = config('AUTH_CACHE_MAX', default=1024, cast=int)
+
 # --- CONFIGURACIÓN CORS (AJUSTADA PARA LA DEMO) ---
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
@@ -172,4 +211,52 @@ CORS_ALLOW_CREDENTIALS = True
 # CORS_ALLOW_ALL_ORIGINS = True
 
 # Custom User Model
-AUTH_USER_MODEL = 'usuarios.Usuario'
\ No newline at end of file
+AUTH_USER_MODEL = 'usuarios.Usuario'
+# Directorio donde el worker de reportes deja los PDF generados
+REPORTES_DIR = config('REPORTES_DIR', default=str(BASE_DIR / 'reportes_generados'))
+# Segundos que un worker retiene un reporte reclamado; vencidos, otro worker lo vuelve a tomar
+REPORTES_ARRIENDO = config('REPORTES_ARRIENDO', default=900, cast=int)
+
+# Auditoría: 'async' (cola + hilo de fondo), 'sync' u 'off'. Ver auditoria/escritor.py
+AUDITORIA_MODO = config('AUDITORIA_MODO', default='async')
+AUDITORIA_COLA_MAX = config('AUDITORIA_COLA_MAX', default=10000, cast=int)
+AUDITORIA_LOTE = config('AUDITORIA_LOTE', default=200, cast=int)
+# Registros que no se pudieron insertar; queda fuera del código (en producción, p. ej. /var/lib/reservas/...)
+AUDITORIA_SPOOL = config(
+    'AUDITORIA_SPOOL', default=str(Path.home() / '.local' / 'state' / 'reservas' / 'auditoria_pendientes.jsonl')
+)
+# IPs de los proxies inversos propios. Solo cuando la petición llega desde uno de ellos
+# se cree en X-Forwarded-For para la IP de origen auditada; si no, se usa REMOTE_ADDR
+AUDITORIA_PROXIES_CONFIABLES = config('AUDITORIA_PROXIES_CONFIABLES', default='', cast=Csv())
+# Particiones mensuales de auditoría (PostgreSQL): meses que se conservan y dónde se archivan los vencidos
+AUDITORIA_RETENCION_MESES = config('AUDITORIA_RETENCION_MESES', default=24, cast=int)
+AUDITORIA_ARCHIVO_DIR = config('AUDITORIA_ARCHIVO_DIR', default=str(BASE_DIR / 'auditoria_archivo'))
+
+# Correo. En desarrollo se imprime en consola; en producción configurar SMTP por variables de entorno
+EMAIL_BACKEND = config('EMAIL_BACKEND', default='django.core.mail.backends.console.EmailBackend')
+EMAIL_HOST = config('EMAIL_HOST', default='localhost')
+EMAIL_PORT = config('EMAIL_PORT', default=25, cast=int)
+EMAIL_HOST_USER = config('EMAIL_HOST_USER', default='')
+EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD', default='')
+EMAIL_USE_TLS = config('EMAIL_USE_TLS', default=False, cast=bool)
+DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL', default='reservas@inacap.cl')
+
+# Bandeja de salida de notificaciones (ver notificaciones/envio.py)
+NOTIFICACIONES_TIPOS = ['sistema', 'email']
+NOTIFICACIONES_BACKENDS = {
+    'sistema': 'notificaciones.backends.SistemaBackend',
+    'email': 'notificaciones.backends.EmailBackend',
+}
+NOTIFICACIONES_LOTE = config('NOTIFICACIONES_LOTE', default=100, cast=int)
+NOTIFICACIONES_MAX_INTENTOS = config('NOTIFICACIONES_MAX_INTENTOS', default=5, cast=int)
+NOTIFICACIONES_ESPERA_BASE = 30  # segundos antes del primer reintento; se duplica en cada uno
+NOTIFICACIONES_ESPERA_MAX = 3600
+NOTIFICACIONES_ARRIENDO = 300  # segundos que un worker retiene un lote reclamado
+
+# Eventos en vivo (reservas/tiempo_real.py). 'memoria' sirve con un solo proceso;
+# con varios workers ASGI usar 'postgres' (LISTEN/NOTIFY entre procesos)
+EVENTOS_BACKEND = config('EVENTOS_BACKEND', default='memoria')
+# Segundos de validez del ticket de un solo uso con que se abre el stream
+EVENTOS_TICKET_TTL = 30
+# Servido por WSGI, el stream se cierra a los N segundos para liberar el worker (el navegador reconecta)
+EVENTOS_WSGI_DURACION = config('EVENTOS_WSGI_DURACION', default=25, cast=int)
@@ -2,13 +2,16 @@ from django.contrib import admin
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
-from .views import home
+from .views import home, metricas_cache
+from .metricas import vista_metricas
 
 # Importar ViewSets
 from usuarios.views import CarreraViewSet, UsuarioViewSet, RolViewSet
 from espacios.views import EspacioViewSet
 from elementos.views import ElementoViewSet
-from reservas.views import ReservaViewSet
+from reservas.views import ReservaViewSet, SerieReservaViewSet, stream_eventos, ticket_eventos
+from auditoria.views import AuditoriaViewSet
+from notificaciones.views import NotificacionViewSet
 
 # Crear y configurar el router
 router = DefaultRouter()
@@ -17,7 +20,10 @@ router.register(r'roles', RolViewSet)
 router.register(r'espacios', EspacioViewSet)
 router.register(r'elementos', ElementoViewSet)
 router.register(r'reservas', ReservaViewSet)
+router.register(r'series-reservas', SerieReservaViewSet)
 router.register(r'carreras', CarreraViewSet)
+router.register(r'auditoria', AuditoriaViewSet)
+router.register(r'notificaciones', NotificacionViewSet, basename='notificacion')
 
 urlpatterns = [
     # Vista de bienvenida en la raíz
@@ -29,6 +35,16 @@ urlpatterns = [
     # --- AQUÍ ESTÁ LA SOLUCIÓN ---
     # Incluimos las URLs automáticas del router (CRUDs y acciones como 'pendientes')
     path('api/', include(router.urls)),
+
+    # Eventos de reservas en vivo (Server-Sent Events)
+    path('api/eventos/ticket/', ticket_eventos, name='eventos_ticket'),
+    path('api/eventos/stream/', stream_eventos, name='eventos_stream'),
+
+    # Métricas de la caché de catálogos y estadísticas (solo admin)
+    path('api/cache/metricas/', metricas_cache, name='metricas_cache'),
+
+    # Métricas por vista en formato Prometheus
+    path('metrics', vista_metricas, name='metricas'),
     
     # Autenticación JWT
     path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
@@ -1,5 +1,10 @@
 # backend/config/views.py
 from django.http import HttpResponse
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.response import Response
+
+from usuarios.permissions import IsAdminUserCustom
+from . import cache as cache_lectura
 
 def home(request):
     html = """
@@ -79,4 +84,11 @@ def home(request):
     </body>
     </html>
     """
-    return HttpResponse(html)
\ No newline at end of file
+    return HttpResponse(html)
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUserCustom])
+def metricas_cache(request):
+    """Aciertos y fallos de la caché versionada por familia (contadores de este proceso)"""
+    return Response(cache_lectura.metricas())
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class ElementosConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'elementos'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -1,6 +1,7 @@
 from django.db import models
+from config.mixins import ValoresDBMixin
 
-class Elemento(models.Model):
+class Elemento(ValoresDBMixin, models.Model):
     """Elementos disponibles para asignar a reservas"""
     
     CATEGORIA_CHOICES = [
@@ -49,6 +50,10 @@ class Elemento(models.Model):
         default='disponible',
         verbose_name='Estado'
     )
+    fecha_actualizacion = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Última Actualización'
+    )
     
     class Meta:
         verbose_name = 'Elemento'
@@ -1,7 +1,8 @@
 from rest_framework import serializers
 from .models import Elemento
+from config.serializers import CamposDinamicosMixin
 
-class ElementoSerializer(serializers.ModelSerializer):
+class ElementoSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     categoria_display = serializers.CharField(source='get_categoria_display', read_only=True)
     estado_display = serializers.CharField(source='get_estado_display', read_only=True)
     
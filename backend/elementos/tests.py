@@ -1,3 +1,40 @@
-from django.test import TestCase
+from datetime import date, timedelta
 
-# Create your tests here.
+from config.pruebas import ConsultasAdminTestCase
+from .models import Elemento
+
+
+class ElementoViewSetConsultasTest(ConsultasAdminTestCase):
+
+    def poblar(self, tamano):
+        self.completar(tamano, lambda i: Elemento.objects.create(
+            nombre=f'Elemento {i}', categoria='tecnologia', stock_total=10, stock_disponible=10
+        ))
+
+    def nuevo_elemento(self):
+        return Elemento.objects.create(nombre=f'Elemento nuevo {self.siguiente()}', categoria='audio', stock_total=5, stock_disponible=5)
+
+    def test_list(self):
+        self.assertConsultasAcotadas('/api/elementos/', maximo=2)
+
+    def test_retrieve(self):
+        self.assertConsultasAcotadas(lambda _: f'/api/elementos/{self.nuevo_elemento().id}/', maximo=2)
+
+    def test_disponibles(self):
+        self.assertConsultasAcotadas('/api/elementos/disponibles/', maximo=2)
+
+    def test_disponibilidad(self):
+        manana = date.today() + timedelta(days=1)
+        self.assertConsultasAcotadas(f'/api/elementos/disponibilidad/?fecha={manana.isoformat()}&hora_inicio=09:00&hora_fin=11:00', maximo=3)
+
+    def test_create(self):
+        self.assertConsultasAcotadas(
+            '/api/elementos/', maximo=1, metodo='post',
+            datos={'nombre': 'Proyector', 'categoria': 'tecnologia', 'stock_total': 4, 'stock_disponible': 4},
+        )
+
+    def test_partial_update(self):
+        self.assertConsultasAcotadas(lambda _: f'/api/elementos/{self.nuevo_elemento().id}/', maximo=2, metodo='patch', datos={'stock_disponible': 3})
+
+    def test_destroy(self):
+        self.assertConsultasAcotadas(lambda _: f'/api/elementos/{self.nuevo_elemento().id}/', maximo=5, metodo='delete')
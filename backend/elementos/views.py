@@ -1,21 +1,52 @@
 from rest_framework import viewsets, permissions
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from django.http import JsonResponse
+from datetime import datetime
 from .models import Elemento
 from .serializers import ElementoSerializer
+from usuarios.autenticacion import JWTLecturaSinEstado
+from config.mixins import CacheLecturaMixin, RespuestaCondicionalMixin
+from reservas import inventario
 
-class ElementoViewSet(viewsets.ModelViewSet):
+class ElementoViewSet(RespuestaCondicionalMixin, CacheLecturaMixin, viewsets.ModelViewSet):
     queryset = Elemento.objects.all()
     serializer_class = ElementoSerializer
     permission_classes = [permissions.IsAuthenticated]
+    # Las lecturas del catálogo se autentican solo con el token
+    authentication_classes = [JWTLecturaSinEstado]
+    # 'disponibilidad' depende de las reservas, no de esta tabla
+    acciones_condicionales = ('list', 'retrieve', 'disponibles')
+    familia_cache = 'elementos'
     
     @action(detail=False, methods=['get'])
     def disponibles(self, request):
         """Obtener elementos con stock disponible"""
         elementos = self.queryset.filter(estado='disponible', stock_disponible__gt=0)
-        serializer = self.get_serializer(elementos, many=True)
-        return Response(serializer.data)
+        return self.respuesta_cacheada(lambda: self.get_serializer(elementos, many=True).data)
+    
+    @action(detail=False, methods=['get'])
+    def disponibilidad(self, request):
+        """
+        Stock libre de cada elemento en una franja:
+        ?fecha=YYYY-MM-DD&hora_inicio=HH:MM&hora_fin=HH:MM[&elementos=1,2]
+        """
+        params = request.query_params
+        try:
+            fecha = datetime.strptime(params['fecha'], '%Y-%m-%d').date()
+            hora_inicio = datetime.strptime(params['hora_inicio'], '%H:%M').time()
+            hora_fin = datetime.strptime(params['hora_fin'], '%H:%M').time()
+            elemento_ids = [int(valor) for valor in params['elementos'].split(',') if valor] if params.get('elementos') else None
+        except (KeyError, ValueError):
+            raise ValidationError("Se requieren 'fecha' (YYYY-MM-DD), 'hora_inicio' y 'hora_fin' (HH:MM); 'elementos' es una lista de IDs")
+        if hora_fin <= hora_inicio:
+            raise ValidationError("La hora de fin debe ser posterior a la hora de inicio")
+        
+        if elemento_ids is None:
+            elemento_ids = list(self.queryset.filter(estado='disponible').values_list('id', flat=True))
+        resultado = inventario.disponibilidad(elemento_ids, fecha, hora_inicio, hora_fin)
+        return Response([{'elemento': elemento_id, **datos} for elemento_id, datos in sorted(resultado.items())])
     
 def index(request):
     return JsonResponse({"message": "API de elementos funcionando correctamente"})
\ No newline at end of file
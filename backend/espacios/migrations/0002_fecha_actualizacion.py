@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 14:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('espacios', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='espacio',
+            name='fecha_actualizacion',
+            field=models.DateTimeField(auto_now=True, verbose_name='Última Actualización'),
+        ),
+    ]
@@ -1,6 +1,7 @@
 from django.db import models
+from config.mixins import ValoresDBMixin
 
-class Espacio(models.Model):
+class Espacio(ValoresDBMixin, models.Model):
     """Espacios físicos disponibles para reserva"""
     
     TIPO_CHOICES = [
@@ -56,6 +57,10 @@ class Espacio(models.Model):
         default=True,
         verbose_name='Disponible para Reservas'
     )
+    fecha_actualizacion = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Última Actualización'
+    )
     
     class Meta:
         verbose_name = 'Espacio'
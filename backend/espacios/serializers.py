@@ -1,7 +1,8 @@
 from rest_framework import serializers
 from .models import Espacio
+from config.serializers import CamposDinamicosMixin
 
-class EspacioSerializer(serializers.ModelSerializer):
+class EspacioSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     tipo_display = serializers.CharField(source='get_tipo_display', read_only=True)
     estado_display = serializers.CharField(source='get_estado_display', read_only=True)
     
@@ -10,7 +11,7 @@ class EspacioSerializer(serializers.ModelSerializer):
         fields = '__all__'
         read_only_fields = ('id',)
 
-class EspacioListSerializer(serializers.ModelSerializer):
+class EspacioListSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     """Versión simplificada para listados"""
     tipo_display = serializers.CharField(source='get_tipo_display', read_only=True)
     
@@ -0,0 +1,10 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from config import cache as cache_lectura
+from .models import Espacio
+
+
+@receiver([post_save, post_delete], sender=Espacio)
+def espacio_modificado(sender, instance, **kwargs):
+    cache_lectura.invalidar('espacios')
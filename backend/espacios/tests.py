@@ -1,3 +1,50 @@
-from django.test import TestCase
+from datetime import date, timedelta
 
-# Create your tests here.
+from config.pruebas import ConsultasAdminTestCase
+from .models import Espacio
+
+
+class EspacioViewSetConsultasTest(ConsultasAdminTestCase):
+
+    def poblar(self, tamano):
+        self.completar(tamano, lambda i: Espacio.objects.create(
+            nombre=f'Sala {i}', tipo='salon', capacidad=30, ubicacion='Edificio A'
+        ))
+
+    def nuevo_espacio(self):
+        return Espacio.objects.create(nombre=f'Sala nueva {self.siguiente()}', tipo='salon', capacidad=30, ubicacion='Edificio B')
+
+    def rango(self):
+        desde = date.today()
+        return f'desde={desde.isoformat()}&hasta={(desde + timedelta(days=6)).isoformat()}'
+
+    def test_list(self):
+        self.assertConsultasAcotadas('/api/espacios/', maximo=2)
+
+    def test_retrieve(self):
+        self.assertConsultasAcotadas(lambda _: f'/api/espacios/{self.nuevo_espacio().id}/', maximo=2)
+
+    def test_disponibles(self):
+        self.assertConsultasAcotadas('/api/espacios/disponibles/', maximo=2)
+
+    # Disponibilidad: mapas de ocupación + series pendientes
+    def test_disponibilidad(self):
+        self.assertConsultasAcotadas(lambda _: f'/api/espacios/{self.nuevo_espacio().id}/disponibilidad/?{self.rango()}', maximo=3)
+
+    def test_disponibilidad_multiple(self):
+        self.assertConsultasAcotadas(f'/api/espacios/disponibilidad/?{self.rango()}', maximo=3)
+
+    def test_create(self):
+        self.assertConsultasAcotadas(
+            '/api/espacios/', maximo=2, metodo='post',
+            datos=lambda tamano: {'nombre': f'Sala creada {tamano}', 'tipo': 'salon', 'capacidad': 20, 'ubicacion': 'Edificio C'},
+        )
+
+    def test_partial_update(self):
+        self.assertConsultasAcotadas(lambda _: f'/api/espacios/{self.nuevo_espacio().id}/', maximo=2, metodo='patch', datos={'capacidad': 40})
+
+    def test_toggle_estado(self):
+        self.assertConsultasAcotadas(lambda _: f'/api/espacios/{self.nuevo_espacio().id}/toggle_estado/', maximo=2, metodo='post')
+
+    def test_destroy(self):
+        self.assertConsultasAcotadas(lambda _: f'/api/espacios/{self.nuevo_espacio().id}/', maximo=6, metodo='delete')
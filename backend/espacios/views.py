@@ -1,13 +1,40 @@
 from rest_framework import viewsets, permissions
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from django.http import JsonResponse
+from django.utils import timezone
+from datetime import datetime, timedelta
 from .models import Espacio
 from .serializers import EspacioSerializer, EspacioListSerializer
+from reservas import disponibilidad as motor_disponibilidad
+from usuarios.autenticacion import JWTLecturaSinEstado
+from config.mixins import CacheLecturaMixin, RespuestaCondicionalMixin
 
-class EspacioViewSet(viewsets.ModelViewSet):
+
+def _rango_fechas(request):
+    """Lee ?desde=&hasta= (YYYY-MM-DD). Por defecto, la semana que comienza hoy."""
+    hoy = timezone.localdate()
+    try:
+        desde = datetime.strptime(request.query_params['desde'], '%Y-%m-%d').date() if request.query_params.get('desde') else hoy
+        hasta = datetime.strptime(request.query_params['hasta'], '%Y-%m-%d').date() if request.query_params.get('hasta') else desde + timedelta(days=6)
+    except ValueError:
+        raise ValidationError("Las fechas deben tener formato YYYY-MM-DD")
+    
+    if hasta < desde:
+        raise ValidationError("'hasta' debe ser posterior a 'desde'")
+    if (hasta - desde).days >= motor_disponibilidad.MAX_DIAS_CONSULTA:
+        raise ValidationError(f"El rango no puede superar {motor_disponibilidad.MAX_DIAS_CONSULTA} días")
+    return desde, hasta
+
+class EspacioViewSet(RespuestaCondicionalMixin, CacheLecturaMixin, viewsets.ModelViewSet):
     queryset = Espacio.objects.all()
     permission_classes = [permissions.IsAuthenticated]
+    # Las lecturas del catálogo se autentican solo con el token
+    authentication_classes = [JWTLecturaSinEstado]
+    # 'disponibilidad' depende de las reservas, no de esta tabla
+    acciones_condicionales = ('list', 'retrieve', 'disponibles')
+    familia_cache = 'espacios'
     
     def get_serializer_class(self):
         if self.action == 'list':
@@ -30,8 +57,41 @@ class EspacioViewSet(viewsets.ModelViewSet):
     def disponibles(self, request):
         """Obtener solo espacios disponibles"""
         espacios = self.queryset.filter(disponible=True, estado='disponible')
-        serializer = self.get_serializer(espacios, many=True)
-        return Response(serializer.data)
+        return self.respuesta_cacheada(lambda: self.get_serializer(espacios, many=True).data)
+    
+    @action(detail=True, methods=['get'])
+    def disponibilidad(self, request, pk=None):
+        """Bloques libres de un espacio por día, calculados desde los mapas de ocupación"""
+        espacio = self.get_object()
+        desde, hasta = _rango_fechas(request)
+        dias = motor_disponibilidad.disponibilidad([espacio.id], desde, hasta)[espacio.id]
+        return Response({
+            'espacio': espacio.id,
+            'desde': desde,
+            'hasta': hasta,
+            'minutos_por_bloque': motor_disponibilidad.MINUTOS_POR_BLOQUE,
+            'dias': dias,
+        })
+    
+    @action(detail=False, methods=['get'], url_path='disponibilidad', url_name='disponibilidad-multiple')
+    def disponibilidad_multiple(self, request):
+        """Igual que /disponibilidad/ pero para varios espacios (?espacios=1,2,3). Sin filtro, todos los disponibles."""
+        ids = request.query_params.get('espacios')
+        if ids:
+            try:
+                espacio_ids = sorted({int(i) for i in ids.split(',') if i})
+            except ValueError:
+                raise ValidationError("'espacios' debe ser una lista de IDs separados por coma")
+        else:
+            espacio_ids = list(self.queryset.filter(disponible=True, estado='disponible').values_list('id', flat=True))
+        
+        desde, hasta = _rango_fechas(request)
+        return Response({
+            'desde': desde,
+            'hasta': hasta,
+            'minutos_por_bloque': motor_disponibilidad.MINUTOS_POR_BLOQUE,
+            'espacios': motor_disponibilidad.disponibilidad(espacio_ids, desde, hasta),
+        })
     
 def index(request):
     return JsonResponse({"message": "API de espacios funcionando correctamente"})
\ No newline at end of file
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Notificacion
+from .models import Notificacion, ContadorNotificaciones
 
 @admin.register(Notificacion)
 class NotificacionAdmin(admin.ModelAdmin):
@@ -7,7 +7,7 @@ class NotificacionAdmin(admin.ModelAdmin):
     list_filter = ('tipo', 'estado', 'fecha_creacion')
     search_fields = ('usuario__email', 'asunto', 'mensaje')
     date_hierarchy = 'fecha_creacion'
-    readonly_fields = ('fecha_creacion', 'fecha_envio', 'fecha_lectura')
+    readonly_fields = ('fecha_creacion', 'fecha_envio', 'fecha_lectura', 'intentos', 'proximo_intento', 'ultimo_error')
     
     fieldsets = (
         ('Destinatario', {
@@ -19,8 +19,18 @@ class NotificacionAdmin(admin.ModelAdmin):
         ('Estado', {
             'fields': ('estado', 'fecha_envio', 'fecha_lectura')
         }),
+        ('Entrega', {
+            'fields': ('intentos', 'proximo_intento', 'ultimo_error'),
+            'classes': ('collapse',)
+        }),
         ('Información', {
             'fields': ('fecha_creacion',),
             'classes': ('collapse',)
         }),
-    )
\ No newline at end of file
+    )
+
+@admin.register(ContadorNotificaciones)
+class ContadorNotificacionesAdmin(admin.ModelAdmin):
+    list_display = ('usuario', 'no_leidas')
+    search_fields = ('usuario__email',)
+    readonly_fields = ('usuario', 'no_leidas')
@@ -0,0 +1,50 @@
+"""
+Canales de entrega de notificaciones. Cada backend recibe un lote de
+Notificacion (con `usuario` cargado) y devuelve {id: error}, con None en las
+que se entregaron. Se eligen por tipo en settings.NOTIFICACIONES_BACKENDS.
+"""
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.utils.module_loading import import_string
+
+
+class SistemaBackend:
+    """Notificaciones dentro de la aplicación: la fila ya es la entrega"""
+
+    def enviar(self, notificaciones):
+        return {notificacion.pk: None for notificacion in notificaciones}
+
+
+class EmailBackend:
+    """Correo mediante el EMAIL_BACKEND de Django, con una sola conexión por lote"""
+
+    def enviar(self, notificaciones):
+        resultado = {}
+        with get_connection(fail_silently=False) as conexion:
+            for notificacion in notificaciones:
+                mensaje = EmailMessage(
+                    subject=notificacion.asunto,
+                    body=notificacion.mensaje,
+                    from_email=settings.DEFAULT_FROM_EMAIL,
+                    to=[notificacion.usuario.email],
+                    connection=conexion,
+                )
+                try:
+                    mensaje.send()
+                    resultado[notificacion.pk] = None
+                except Exception as exc:
+                    resultado[notificacion.pk] = f'{type(exc).__name__}: {exc}'
+        return resultado
+
+
+_backends = {}
+
+
+def backend_para(tipo):
+    """Instancia del backend configurado para `tipo`, o None si no hay"""
+    ruta = settings.NOTIFICACIONES_BACKENDS.get(tipo)
+    if ruta is None:
+        return None
+    if ruta not in _backends:
+        _backends[ruta] = import_string(ruta)()
+    return _backends[ruta]
@@ -0,0 +1,70 @@
+"""
+Bandeja de entrada: notificaciones del tipo 'sistema' de cada usuario.
+
+ContadorNotificaciones guarda cuántas tiene sin leer. Se ajusta con
+expresiones F (sin leer-modificar-escribir) en la misma transacción que crea
+o marca las notificaciones, así el indicador nunca requiere un COUNT.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from .models import Notificacion, ContadorNotificaciones
+
+TIPO_BANDEJA = 'sistema'
+
+
+def ajustar(usuario_id, delta):
+    """Suma `delta` al contador del usuario (crea la fila si no existe)"""
+    if not delta:
+        return
+    if ContadorNotificaciones.objects.filter(pk=usuario_id).update(no_leidas=F('no_leidas') + delta) or delta < 0:
+        return
+    try:
+        with transaction.atomic():
+            ContadorNotificaciones.objects.create(usuario_id=usuario_id, no_leidas=delta)
+    except IntegrityError:
+        # Otra transacción creó la fila entre el update y el insert
+        ContadorNotificaciones.objects.filter(pk=usuario_id).update(no_leidas=F('no_leidas') + delta)
+
+
+def no_leidas(usuario_id):
+    """Una lectura por clave primaria"""
+    return ContadorNotificaciones.objects.filter(pk=usuario_id).values_list('no_leidas', flat=True).first() or 0
+
+
+def bandeja(usuario_id):
+    return Notificacion.objects.filter(usuario_id=usuario_id, tipo=TIPO_BANDEJA)
+
+
+def marcar_leidas(usuario_id, ids=None, hasta_id=None):
+    """
+    Marca como leídas las notificaciones indicadas (`ids`), las de id <= `hasta_id`,
+    o todas si no se indica ninguno. Devuelve cuántas pasaron a leídas.
+    """
+    pendientes = bandeja(usuario_id).filter(fecha_lectura__isnull=True)
+    if ids is not None:
+        pendientes = pendientes.filter(id__in=ids)
+    if hasta_id is not None:
+        pendientes = pendientes.filter(id__lte=hasta_id)
+
+    with transaction.atomic():
+        marcadas = pendientes.update(fecha_lectura=timezone.now())
+        ajustar(usuario_id, -marcadas)
+    return marcadas
+
+
+def recalcular(usuario_ids=None):
+    """Rehace los contadores desde las notificaciones (mantenimiento)"""
+    bandeja_sin_leer = Notificacion.objects.filter(tipo=TIPO_BANDEJA, fecha_lectura__isnull=True)
+    if usuario_ids is not None:
+        bandeja_sin_leer = bandeja_sin_leer.filter(usuario_id__in=usuario_ids)
+    conteos = dict(bandeja_sin_leer.values('usuario_id').annotate(total=Count('id')).values_list('usuario_id', 'total'))
+    with transaction.atomic():
+        contadores = ContadorNotificaciones.objects.all()
+        if usuario_ids is not None:
+            contadores = contadores.filter(pk__in=usuario_ids)
+        contadores.exclude(pk__in=conteos).update(no_leidas=0)
+        for usuario_id, total in conteos.items():
+            ContadorNotificaciones.objects.update_or_create(pk=usuario_id, defaults={'no_leidas': total})
+    return conteos
@@ -0,0 +1,114 @@
+"""
+Bandeja de salida (outbox) de notificaciones.
+
+Quien genera un evento solo inserta filas Notificacion 'pendiente' en su misma
+transacción (encolar_notificacion): si la transacción se revierte, no queda
+aviso de algo que no ocurrió. El comando `enviar_notificaciones` las entrega:
+
+1. reclamar: en una transacción corta toma un lote de pendientes vencidas con
+   SELECT ... FOR UPDATE SKIP LOCKED (dos workers nunca toman la misma fila) y
+   les corre `proximo_intento` como arriendo. Si el worker muere a mitad de
+   camino, al vencer el arriendo otro las retoma.
+2. entregar: fuera de la transacción envía por el backend de cada tipo.
+3. marcar: enviada, o reintento con espera exponencial; tras
+   NOTIFICACIONES_MAX_INTENTOS queda 'fallida'.
+"""
+import random
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from . import bandeja
+from .backends import backend_para
+from .models import Notificacion
+
+
+def encolar_notificacion(usuario, asunto, mensaje, reserva=None, tipos=None):
+    """Crea las notificaciones pendientes (una por tipo). Llamar dentro de la transacción del evento."""
+    ahora = timezone.now()
+    tipos = tipos or settings.NOTIFICACIONES_TIPOS
+    with transaction.atomic():
+        creadas = Notificacion.objects.bulk_create([
+            Notificacion(
+                usuario=usuario, reserva=reserva, tipo=tipo, asunto=asunto, mensaje=mensaje,
+                fecha_creacion=ahora, proximo_intento=ahora,
+            )
+            for tipo in tipos
+        ])
+        # Las de la bandeja cuentan para el indicador de no leídas
+        bandeja.ajustar(usuario.pk, sum(1 for tipo in tipos if tipo == bandeja.TIPO_BANDEJA))
+    return creadas
+
+
+def espera_reintento(intentos):
+    """Espera exponencial con variación aleatoria para no reintentar todos a la vez"""
+    base = settings.NOTIFICACIONES_ESPERA_BASE * (2 ** (intentos - 1))
+    return timedelta(seconds=min(base, settings.NOTIFICACIONES_ESPERA_MAX) * random.uniform(0.8, 1.2))
+
+
+def reclamar(limite):
+    """Toma hasta `limite` pendientes vencidas y las arrienda a este worker. Devuelve sus IDs."""
+    ahora = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            Notificacion.objects.select_for_update(skip_locked=True)
+            .filter(estado='pendiente', proximo_intento__lte=ahora)
+            .order_by('proximo_intento')
+            .values_list('id', flat=True)[:limite]
+        )
+        if ids:
+            Notificacion.objects.filter(id__in=ids).update(
+                proximo_intento=ahora + timedelta(seconds=settings.NOTIFICACIONES_ARRIENDO)
+            )
+    return ids
+
+
+def _marcar(notificaciones, resultados):
+    ahora = timezone.now()
+    enviadas = [n.pk for n in notificaciones if resultados.get(n.pk, 'Sin resultado') is None]
+    if enviadas:
+        Notificacion.objects.filter(id__in=enviadas, estado='pendiente').update(
+            estado='enviada', fecha_envio=ahora, ultimo_error=None,
+        )
+
+    fallidas = [n for n in notificaciones if n.pk not in enviadas]
+    for notificacion in fallidas:
+        notificacion.intentos += 1
+        notificacion.ultimo_error = resultados.get(notificacion.pk) or 'Sin resultado del backend'
+        if notificacion.intentos >= settings.NOTIFICACIONES_MAX_INTENTOS:
+            notificacion.estado = 'fallida'
+        else:
+            notificacion.proximo_intento = ahora + espera_reintento(notificacion.intentos)
+    Notificacion.objects.bulk_update(fallidas, ['intentos', 'ultimo_error', 'estado', 'proximo_intento'])
+    return len(enviadas), len(fallidas)
+
+
+def entregar(ids):
+    """Envía las notificaciones reclamadas y registra el resultado. Devuelve (enviadas, fallidas)."""
+    notificaciones = list(Notificacion.objects.select_related('usuario').filter(id__in=ids, estado='pendiente'))
+    por_tipo = defaultdict(list)
+    for notificacion in notificaciones:
+        por_tipo[notificacion.tipo].append(notificacion)
+
+    resultados = {}
+    for tipo, grupo in por_tipo.items():
+        backend = backend_para(tipo)
+        if backend is None:
+            resultados.update({n.pk: f"No hay backend configurado para '{tipo}'" for n in grupo})
+            continue
+        try:
+            resultados.update(backend.enviar(grupo))
+        except Exception as exc:
+            resultados.update({n.pk: f'{type(exc).__name__}: {exc}' for n in grupo})
+    return _marcar(notificaciones, resultados)
+
+
+def procesar_lote(limite=None):
+    """Un ciclo del worker: reclamar y entregar. Devuelve (enviadas, fallidas)."""
+    ids = reclamar(limite or settings.NOTIFICACIONES_LOTE)
+    if not ids:
+        return 0, 0
+    return entregar(ids)
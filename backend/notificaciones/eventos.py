@@ -0,0 +1,57 @@
+"""Notificaciones que generan los eventos de reservas (se encolan en la misma transacción)"""
+from .envio import encolar_notificacion
+
+
+def _detalle(reserva):
+    return (
+        f"{reserva.espacio.nombre}, {reserva.fecha_reserva:%d/%m/%Y} "
+        f"de {reserva.hora_inicio:%H:%M} a {reserva.hora_fin:%H:%M}"
+    )
+
+
+def reserva_creada(reserva):
+    encolar_notificacion(
+        reserva.usuario, 'Solicitud de reserva recibida',
+        f"Recibimos tu solicitud de reserva: {_detalle(reserva)}. Te avisaremos cuando sea revisada.",
+        reserva=reserva,
+    )
+
+
+def reserva_aprobada(reserva):
+    encolar_notificacion(
+        reserva.usuario, 'Reserva aprobada',
+        f"Tu reserva fue aprobada: {_detalle(reserva)}.",
+        reserva=reserva,
+    )
+
+
+def reserva_rechazada(reserva):
+    motivo = f" Motivo: {reserva.motivo_rechazo}" if reserva.motivo_rechazo else ''
+    encolar_notificacion(
+        reserva.usuario, 'Reserva rechazada',
+        f"Tu reserva fue rechazada: {_detalle(reserva)}.{motivo}",
+        reserva=reserva,
+    )
+
+
+def lote_creado(usuario, cantidad):
+    encolar_notificacion(
+        usuario, 'Solicitudes de reserva recibidas',
+        f"Recibimos {cantidad} solicitudes de reserva. Te avisaremos cuando sean revisadas.",
+    )
+
+
+def serie_resuelta(serie, reservas_creadas=0):
+    if serie.estado == 'aprobada':
+        asunto = 'Serie de reservas aprobada'
+        texto = f"fue aprobada ({reservas_creadas} reservas)."
+    else:
+        asunto = 'Serie de reservas rechazada'
+        motivo = f" Motivo: {serie.motivo_rechazo}" if serie.motivo_rechazo else ''
+        texto = f"fue rechazada.{motivo}"
+    encolar_notificacion(
+        serie.usuario, asunto,
+        f"Tu serie de reservas en {serie.espacio.nombre} "
+        f"({serie.fecha_inicio:%d/%m/%Y} al {serie.fecha_fin:%d/%m/%Y}, "
+        f"{serie.hora_inicio:%H:%M}-{serie.hora_fin:%H:%M}) {texto}",
+    )
@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+
+class Command(BaseCommand):
+    help = (
+        'Entrega las notificaciones pendientes de la bandeja de salida. '
+        'Se pueden ejecutar varios procesos a la vez: cada uno reclama lotes distintos.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=None, help='Notificaciones por ciclo')
+        parser.add_argument('--intervalo', type=float, default=2, help='Segundos de espera cuando no hay pendientes')
+        parser.add_argument('--una-vez', action='store_true', help='Entregar lo pendiente y terminar')
+
+    def handle(self, *args, **options):
+        from notificaciones.envio import procesar_lote
+
+        while True:
+            close_old_connections()
+            enviadas, fallidas = procesar_lote(options['lote'])
+            if enviadas or fallidas:
+                self.stdout.write(f'{enviadas} enviadas, {fallidas} con error')
+            elif options['una_vez']:
+                return
+            else:
+                time.sleep(options['intervalo'])
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Rehace los contadores de notificaciones no leídas a partir de las notificaciones'
+
+    def handle(self, *args, **options):
+        from notificaciones.bandeja import recalcular
+
+        conteos = recalcular()
+        self.stdout.write(self.style.SUCCESS(f'{len(conteos)} usuarios con notificaciones sin leer'))
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.6 on 2026-10-18 14:28
+
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notificaciones', '0003_initial'),
+        ('reservas', '0010_seriereserva'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notificacion',
+            name='intentos',
+            field=models.PositiveSmallIntegerField(default=0, verbose_name='Intentos de Envío'),
+        ),
+        migrations.AddField(
+            model_name='notificacion',
+            name='proximo_intento',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='Próximo Intento'),
+        ),
+        migrations.AddField(
+            model_name='notificacion',
+            name='ultimo_error',
+            field=models.TextField(blank=True, null=True, verbose_name='Último Error'),
+        ),
+        migrations.AddIndex(
+            model_name='notificacion',
+            index=models.Index(condition=models.Q(('estado', 'pendiente')), fields=['proximo_intento'], name='notificacion_pendiente_idx'),
+        ),
+    ]
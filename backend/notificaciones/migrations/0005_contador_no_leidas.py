@@ -0,0 +1,52 @@
+# Generated by Django 5.2.6 on 2026-10-18 14:30
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def poblar_contadores(apps, schema_editor):
+    Notificacion = apps.get_model('notificaciones', 'Notificacion')
+    ContadorNotificaciones = apps.get_model('notificaciones', 'ContadorNotificaciones')
+    conteos = (
+        Notificacion.objects.filter(tipo='sistema', fecha_lectura__isnull=True)
+        .values('usuario_id').annotate(total=Count('id'))
+    )
+    ContadorNotificaciones.objects.bulk_create(
+        [ContadorNotificaciones(usuario_id=c['usuario_id'], no_leidas=c['total']) for c in conteos],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notificaciones', '0004_cola_envio'),
+        ('reservas', '0010_seriereserva'),
+        ('usuarios', '0003_carrera_usuario_carrera'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContadorNotificaciones',
+            fields=[
+                ('usuario', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='contador_notificaciones', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Usuario')),
+                ('no_leidas', models.IntegerField(default=0, verbose_name='No Leídas')),
+            ],
+            options={
+                'verbose_name': 'Contador de Notificaciones',
+                'verbose_name_plural': 'Contadores de Notificaciones',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='notificacion',
+            index=models.Index(fields=['usuario', 'tipo', 'fecha_creacion', 'id'], name='notificacion_bandeja_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notificacion',
+            index=models.Index(condition=models.Q(('fecha_lectura__isnull', True)), fields=['usuario', 'fecha_creacion', 'id'], name='notificacion_no_leida_idx'),
+        ),
+        migrations.RunPython(poblar_contadores, migrations.RunPython.noop),
+    ]
@@ -65,11 +65,67 @@ class Notificacion(models.Model):
         default=timezone.now,
         verbose_name='Fecha de Creación'
     )
+    # Entrega (ver notificaciones/envio.py)
+    intentos = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='Intentos de Envío'
+    )
+    proximo_intento = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Próximo Intento'
+    )
+    ultimo_error = models.TextField(
+        blank=True,
+        null=True,
+        verbose_name='Último Error'
+    )
     
     class Meta:
         verbose_name = 'Notificación'
         verbose_name_plural = 'Notificaciones'
         ordering = ['-fecha_creacion']
+        indexes = [
+            # Cola de salida: solo las pendientes, por orden de intento
+            models.Index(
+                fields=['proximo_intento'], name='notificacion_pendiente_idx',
+                condition=models.Q(estado='pendiente'),
+            ),
+            # Bandeja del usuario paginada por (fecha_creacion, id)
+            models.Index(fields=['usuario', 'tipo', 'fecha_creacion', 'id'], name='notificacion_bandeja_idx'),
+            # Solo las no leídas (marcar como leídas, filtro ?no_leidas=1)
+            models.Index(
+                fields=['usuario', 'fecha_creacion', 'id'], name='notificacion_no_leida_idx',
+                condition=models.Q(fecha_lectura__isnull=True),
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.asunto} - {self.usuario.email}"
+
+
+class ContadorNotificaciones(models.Model):
+    """
+    Notificaciones del sistema sin leer por usuario, desnormalizado para que el
+    indicador del encabezado sea una lectura por clave primaria. Se ajusta con
+    expresiones F al crear notificaciones y al marcarlas como leídas
+    (notificaciones/bandeja.py).
+    """
+    
+    usuario = models.OneToOneField(
+        Usuario,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='contador_notificaciones',
+        verbose_name='Usuario'
+    )
+    no_leidas = models.IntegerField(
+        default=0,
+        verbose_name='No Leídas'
+    )
+    
+    class Meta:
+        verbose_name = 'Contador de Notificaciones'
+        verbose_name_plural = 'Contadores de Notificaciones'
     
     def __str__(self):
-        return f"{self.asunto} - {self.usuario.email}"
\ No newline at end of file
+        return f"{self.usuario_id}: {self.no_leidas} sin leer"
@@ -13,4 +13,16 @@ class NotificacionSerializer(serializers.ModelSerializer):
         read_only_fields = ('fecha_creacion', 'fecha_envio', 'fecha_lectura')
     
     def get_leida(self, obj):
-        return obj.fecha_lectura is not None
\ No newline at end of file
+        return obj.fecha_lectura is not None
+
+class NotificacionBandejaSerializer(serializers.ModelSerializer):
+    """Vista liviana para la bandeja del usuario (sin datos de entrega)"""
+    leida = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = Notificacion
+        fields = ('id', 'reserva', 'asunto', 'mensaje', 'fecha_creacion', 'fecha_lectura', 'leida')
+        read_only_fields = fields
+    
+    def get_leida(self, obj):
+        return obj.fecha_lectura is not None
@@ -1,3 +1,140 @@
-from django.test import TestCase
+from datetime import date, timedelta
 
-# Create your tests here.
+from django.core import mail
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from usuarios.models import Usuario, Rol, Carrera
+from espacios.models import Espacio
+from reservas.models import Reserva
+from . import bandeja
+from .envio import encolar_notificacion, procesar_lote, reclamar
+from .models import Notificacion
+
+
+class BackendQueFalla:
+    def enviar(self, notificaciones):
+        return {notificacion.pk: 'SMTP no disponible' for notificacion in notificaciones}
+
+
+class BandejaSalidaTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        carrera = Carrera.objects.create(nombre_carrera='Ingeniería en Informática', area='Tecnología')
+        cls.admin = Usuario.objects.create_user(
+            email='admin@inacap.cl', password='x', nombre='Ana', apellido='Admin',
+            rol=Rol.objects.create(nombre_rol='admin'), carrera=carrera
+        )
+        cls.solicitante = Usuario.objects.create_user(
+            email='docente@inacap.cl', password='x', nombre='Pedro', apellido='Docente',
+            rol=Rol.objects.create(nombre_rol='solicitante'), carrera=carrera
+        )
+        cls.espacio = Espacio.objects.create(nombre='Sala 1', tipo='salon', capacidad=30, ubicacion='Edificio A')
+
+    def test_eventos_de_reserva_encolan_notificaciones(self):
+        client = APIClient()
+        client.force_authenticate(self.solicitante)
+        respuesta = client.post('/api/reservas/', {
+            'espacio': self.espacio.id, 'fecha_reserva': (date.today() + timedelta(days=1)).isoformat(),
+            'hora_inicio': '09:00', 'hora_fin': '10:00', 'motivo': 'Clase',
+        }, format='json')
+        self.assertEqual(respuesta.status_code, 201)
+        reserva = Reserva.objects.get()
+
+        client.force_authenticate(self.admin)
+        client.post(f'/api/reservas/{reserva.id}/aprobar/')
+
+        asuntos = Notificacion.objects.filter(usuario=self.solicitante, reserva=reserva).values_list('asunto', 'tipo')
+        self.assertCountEqual(asuntos, [
+            ('Solicitud de reserva recibida', 'sistema'), ('Solicitud de reserva recibida', 'email'),
+            ('Reserva aprobada', 'sistema'), ('Reserva aprobada', 'email'),
+        ])
+        self.assertFalse(Notificacion.objects.exclude(estado='pendiente').exists())
+
+    def test_worker_entrega_por_tipo(self):
+        encolar_notificacion(self.solicitante, 'Reserva aprobada', 'Tu reserva fue aprobada')
+        self.assertEqual(procesar_lote(), (2, 0))
+
+        self.assertFalse(Notificacion.objects.exclude(estado='enviada').exists())
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['docente@inacap.cl'])
+        self.assertEqual(procesar_lote(), (0, 0))
+
+    def test_reclamadas_no_se_entregan_dos_veces(self):
+        encolar_notificacion(self.solicitante, 'Aviso', 'Texto', tipos=['sistema'])
+        self.assertEqual(len(reclamar(10)), 1)
+        # Otro worker no ve la fila mientras dura el arriendo
+        self.assertEqual(reclamar(10), [])
+
+    @override_settings(
+        NOTIFICACIONES_BACKENDS={'email': 'notificaciones.tests.BackendQueFalla'},
+        NOTIFICACIONES_MAX_INTENTOS=2,
+    )
+    def test_reintentos_con_espera_y_falla_definitiva(self):
+        encolar_notificacion(self.solicitante, 'Aviso', 'Texto', tipos=['email'])
+        antes = timezone.now()
+        self.assertEqual(procesar_lote(), (0, 1))
+
+        notificacion = Notificacion.objects.get()
+        self.assertEqual((notificacion.estado, notificacion.intentos), ('pendiente', 1))
+        self.assertEqual(notificacion.ultimo_error, 'SMTP no disponible')
+        self.assertGreater(notificacion.proximo_intento, antes + timedelta(seconds=20))
+        # Aún no vence la espera
+        self.assertEqual(procesar_lote(), (0, 0))
+
+        Notificacion.objects.update(proximo_intento=timezone.now())
+        procesar_lote()
+        notificacion.refresh_from_db()
+        self.assertEqual((notificacion.estado, notificacion.intentos), ('fallida', 2))
+
+
+class BandejaEntradaTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = Usuario.objects.create_user(
+            email='docente@inacap.cl', password='x', nombre='Pedro', apellido='Docente',
+            rol=Rol.objects.create(nombre_rol='solicitante')
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+        for i in range(5):
+            encolar_notificacion(self.usuario, f'Aviso {i}', 'Texto')
+        self.ids = list(Notificacion.objects.filter(tipo='sistema').order_by('id').values_list('id', flat=True))
+
+    def test_indicador_es_una_lectura_por_clave(self):
+        with self.assertNumQueries(1):
+            respuesta = self.client.get('/api/notificaciones/no_leidas/')
+        # Los correos no cuentan: solo la bandeja del sistema
+        self.assertEqual(respuesta.data, {'no_leidas': 5})
+
+    def test_marcar_leidas_ajusta_el_contador(self):
+        respuesta = self.client.post('/api/notificaciones/marcar_leidas/', {'ids': self.ids[:2]}, format='json')
+        self.assertEqual(respuesta.data, {'marcadas': 2, 'no_leidas': 3})
+        # Repetir no descuenta dos veces
+        respuesta = self.client.post('/api/notificaciones/marcar_leidas/', {'hasta_id': self.ids[2]}, format='json')
+        self.assertEqual(respuesta.data, {'marcadas': 1, 'no_leidas': 2})
+        respuesta = self.client.post('/api/notificaciones/marcar_leidas/', {}, format='json')
+        self.assertEqual(respuesta.data, {'marcadas': 2, 'no_leidas': 0})
+        self.assertEqual(bandeja.recalcular([self.usuario.pk]), {})
+        self.assertEqual(bandeja.no_leidas(self.usuario.pk), 0)
+
+    def test_marcar_leidas_valida_el_cuerpo(self):
+        url = '/api/notificaciones/marcar_leidas/'
+        self.assertEqual(self.client.post(url, [self.ids[0]], format='json').status_code, 400)
+        self.assertEqual(self.client.post(url, {'ids': str(self.ids[0])}, format='json').status_code, 400)
+        self.assertEqual(bandeja.no_leidas(self.usuario.pk), 5)
+
+    def test_listado_paginado_por_cursor(self):
+        respuesta = self.client.get('/api/notificaciones/', {'page_size': 3})
+        self.assertEqual([n['id'] for n in respuesta.data['results']], self.ids[::-1][:3])
+        siguiente = self.client.get(respuesta.data['next'])
+        self.assertEqual([n['id'] for n in siguiente.data['results']], self.ids[::-1][3:])
+
+        self.client.post('/api/notificaciones/marcar_leidas/', {'ids': self.ids[:4]}, format='json')
+        respuesta = self.client.get('/api/notificaciones/', {'no_leidas': 1})
+        self.assertEqual([n['id'] for n in respuesta.data['results']], [self.ids[4]])
@@ -1,3 +1,59 @@
-from django.shortcuts import render
+from rest_framework import viewsets, permissions
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import CursorPagination
+from rest_framework.response import Response
 
-# Create your views here.
+from usuarios.autenticacion import JWTLecturaSinEstado
+from . import bandeja
+from .serializers import NotificacionBandejaSerializer
+
+
+class PaginacionBandeja(CursorPagination):
+    """Keyset por (fecha_creacion, id): cada página cuesta lo mismo sin importar la profundidad"""
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('-fecha_creacion', '-id')
+
+
+class NotificacionViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Bandeja de notificaciones del usuario autenticado.
+    ?no_leidas=1 lista solo las no leídas.
+    """
+    serializer_class = NotificacionBandejaSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = PaginacionBandeja
+    # Solo se necesita el ID del usuario: las lecturas no consultan la tabla de usuarios
+    authentication_classes = [JWTLecturaSinEstado]
+
+    def get_queryset(self):
+        queryset = bandeja.bandeja(self.request.user.pk)
+        if self.request.query_params.get('no_leidas') in ('1', 'true'):
+            queryset = queryset.filter(fecha_lectura__isnull=True)
+        return queryset
+
+    @action(detail=False, methods=['get'])
+    def no_leidas(self, request):
+        """Indicador del encabezado: una lectura por clave primaria"""
+        return Response({'no_leidas': bandeja.no_leidas(request.user.pk)})
+
+    @action(detail=False, methods=['post'])
+    def marcar_leidas(self, request):
+        """{'ids': [..]} marca esas; {'hasta_id': n} las de id <= n; sin parámetros, todas"""
+        if not isinstance(request.data, dict):
+            raise ValidationError({'detail': "El cuerpo debe ser un objeto JSON"})
+        ids = request.data.get('ids')
+        hasta_id = request.data.get('hasta_id')
+        # Un string también es iterable: "123" no puede convertirse en [1, 2, 3]
+        if ids is not None and not isinstance(ids, list):
+            raise ValidationError("'ids' debe ser una lista de IDs y 'hasta_id' un ID")
+        try:
+            ids = [int(valor) for valor in ids] if ids is not None else None
+            hasta_id = int(hasta_id) if hasta_id is not None else None
+        except (TypeError, ValueError):
+            raise ValidationError("'ids' debe ser una lista de IDs y 'hasta_id' un ID")
+
+        marcadas = bandeja.marcar_leidas(request.user.pk, ids=ids, hasta_id=hasta_id)
+        return Response({'marcadas': marcadas, 'no_leidas': bandeja.no_leidas(request.user.pk)})
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Reserva, ReservaElemento
+from .models import Reserva, ReservaElemento, SerieReserva
 
 class ReservaElementoInline(admin.TabularInline):
     model = ReservaElemento
@@ -44,4 +44,12 @@ class ReservaAdmin(admin.ModelAdmin):
 class ReservaElementoAdmin(admin.ModelAdmin):
     list_display = ('reserva', 'elemento', 'cantidad_solicitada', 'cantidad_asignada')
     list_filter = ('elemento',)
-    search_fields = ('reserva__id', 'elemento__nombre')
\ No newline at end of file
+    search_fields = ('reserva__id', 'elemento__nombre')
+
+@admin.register(SerieReserva)
+class SerieReservaAdmin(admin.ModelAdmin):
+    list_display = ('id', 'espacio', 'usuario', 'fecha_inicio', 'fecha_fin', 'hora_inicio', 'hora_fin', 'estado')
+    list_filter = ('estado', 'espacio')
+    search_fields = ('usuario__email', 'espacio__nombre', 'motivo')
+    # El estado se cambia con las acciones de la API, que materializan o cancelan las ocurrencias
+    readonly_fields = ('estado', 'aprobado_por', 'fecha_aprobacion', 'fecha_creacion')
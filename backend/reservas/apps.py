@@ -4,3 +4,12 @@ from django.apps import AppConfig
 class ReservasConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'reservas'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from config import consultas_lentas
+        from . import signals  # noqa: F401
+
+        # Consultas lentas de comandos e hilos, que no pasan por MetricasMiddleware
+        connection_created.connect(consultas_lentas.instalar, dispatch_uid='consultas_lentas_instalar')
@@ -0,0 +1,73 @@
+from collections import defaultdict
+
+from .models import Reserva
+
+# Estados que ocupan el espacio: una reserva rechazada, cancelada o completada
+# ya no bloquea el horario.
+ESTADOS_OCUPAN_ESPACIO = ('pendiente', 'aprobada')
+
+
+def _consulta_solapes(espacio_ids, fechas, hora_min, hora_max, excluir_ids=()):
+    """
+    Una sola consulta sobre el índice (espacio, fecha_reserva, hora_inicio, hora_fin).
+    Trae las reservas activas que podrían chocar con cualquiera de los bloques pedidos.
+    """
+    reservas = Reserva.objects.filter(
+        espacio_id__in=espacio_ids,
+        fecha_reserva__in=fechas,
+        estado__in=ESTADOS_OCUPAN_ESPACIO,
+        hora_inicio__lt=hora_max,
+        hora_fin__gt=hora_min,
+    )
+    if excluir_ids:
+        reservas = reservas.exclude(id__in=excluir_ids)
+    return reservas.values_list('id', 'espacio_id', 'fecha_reserva', 'hora_inicio', 'hora_fin')
+
+
+def buscar_conflictos(espacio_id, fecha_reserva, hora_inicio, hora_fin, excluir_id=None):
+    """
+    Devuelve los IDs de reservas activas que se solapan con [hora_inicio, hora_fin)
+    en el mismo espacio y fecha.
+    """
+    reservas = Reserva.objects.filter(
+        espacio_id=espacio_id,
+        fecha_reserva=fecha_reserva,
+        estado__in=ESTADOS_OCUPAN_ESPACIO,
+        hora_inicio__lt=hora_fin,
+        hora_fin__gt=hora_inicio,
+    )
+    if excluir_id:
+        reservas = reservas.exclude(id=excluir_id)
+    return list(reservas.values_list('id', flat=True))
+
+
+def verificar_bloques(bloques, excluir_ids=()):
+    """
+    Verifica muchos bloques candidatos en una sola ida a la base de datos.
+
+    `bloques` es una lista de dicts con 'espacio', 'fecha_reserva', 'hora_inicio'
+    y 'hora_fin' (ya validados). Devuelve, en el mismo orden, la lista de IDs de
+    reservas que chocan con cada bloque.
+    """
+    if not bloques:
+        return []
+
+    ocupadas = defaultdict(list)
+    filas = _consulta_solapes(
+        {b['espacio'] for b in bloques},
+        {b['fecha_reserva'] for b in bloques},
+        min(b['hora_inicio'] for b in bloques),
+        max(b['hora_fin'] for b in bloques),
+        excluir_ids,
+    )
+    for reserva_id, espacio_id, fecha, inicio, fin in filas:
+        ocupadas[(espacio_id, fecha)].append((inicio, fin, reserva_id))
+
+    resultado = []
+    for b in bloques:
+        candidatas = ocupadas.get((b['espacio'], b['fecha_reserva']), [])
+        resultado.append([
+            reserva_id for inicio, fin, reserva_id in candidatas
+            if inicio < b['hora_fin'] and fin > b['hora_inicio']
+        ])
+    return resultado
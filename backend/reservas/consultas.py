@@ -0,0 +1,102 @@
+from django.db.models import Prefetch
+
+from .models import ReservaElemento
+
+# Relaciones que recorre cada campo anidado de ReservaSerializer
+# (UsuarioSerializer lee rol y carrera)
+RELACIONES_POR_CAMPO = {
+    'espacio_detalle': ('espacio',),
+    'usuario_detalle': ('usuario__rol', 'usuario__carrera'),
+    'aprobado_por_detalle': ('aprobado_por__rol', 'aprobado_por__carrera'),
+}
+
+# Columnas que usa la tabla de detalle del reporte PDF
+CAMPOS_REPORTE = (
+    'fecha_reserva', 'hora_inicio', 'hora_fin', 'estado',
+    'usuario__nombre', 'usuario__apellido', 'usuario__carrera__nombre_carrera',
+    'espacio__nombre',
+)
+
+
+def _con_detalle(queryset, expandidos=None):
+    """
+    Todo lo que necesita ReservaSerializer en 1 consulta + 1 prefetch de elementos.
+    Con `expandidos` (ver CamposDinamicosMixin) solo se cargan los anidados pedidos.
+    """
+    if expandidos is None:
+        expandidos = set(RELACIONES_POR_CAMPO) | {'elementos'}
+    relaciones = [r for campo in RELACIONES_POR_CAMPO if campo in expandidos for r in RELACIONES_POR_CAMPO[campo]]
+    if relaciones:
+        queryset = queryset.select_related(*relaciones)
+    if 'elementos' in expandidos:
+        # Orden fijo: ReservaElemento no define ordering y la proyección usa el mismo
+        queryset = queryset.prefetch_related(
+            Prefetch('elementos', queryset=ReservaElemento.objects.select_related('elemento').order_by('id'))
+        )
+    return queryset
+
+
+def _para_reporte(queryset, expandidos=None):
+    return queryset.select_related('usuario__carrera', 'espacio').only(*CAMPOS_REPORTE)
+
+
+CONSTRUCTORES_POR_ACCION = {
+    'list': _con_detalle,
+    'retrieve': _con_detalle,
+    'mis_reservas': _con_detalle,
+    'pendientes': _con_detalle,
+    'aprobar': _con_detalle,
+    'rechazar': _con_detalle,
+    'exportar_reporte': _para_reporte,
+}
+
+
+def construir_queryset(accion, queryset, expandidos=None):
+    """Aplica select_related/prefetch_related/only según lo que serializa cada acción"""
+    constructor = CONSTRUCTORES_POR_ACCION.get(accion)
+    return constructor(queryset, expandidos) if constructor else queryset
+
+
+def filtrar_reporte(queryset, start_date=None, end_date=None, carrera_id=None, area=None):
+    """Filtros del informe PDF (los mismos para la descarga directa y los trabajos en segundo plano)"""
+    if start_date and end_date:
+        queryset = queryset.filter(fecha_reserva__range=[start_date, end_date])
+    # Por la carrera con que se contó la reserva, como las estadísticas (ver estadisticas._filtro_carrera)
+    if carrera_id:
+        queryset = queryset.filter(carrera_estadisticas_id=carrera_id)
+    if area:
+        queryset = queryset.filter(carrera_estadisticas__area=area)
+    return queryset.order_by('-fecha_reserva')
+
+
+# Columnas del feed del calendario, en el orden en que las devuelve values_list
+CAMPOS_CALENDARIO = (
+    'id', 'espacio_id', 'espacio__nombre', 'fecha_reserva', 'hora_inicio', 'hora_fin', 'estado', 'motivo',
+)
+
+
+def _minutos(hora):
+    return hora.hour * 60 + hora.minute
+
+
+def calendario_columnar(queryset):
+    """
+    Proyección compacta para el calendario: arreglos paralelos (una posición por
+    reserva) y un diccionario con los nombres de los espacios. Una sola consulta.
+    """
+    datos = {
+        'ids': [], 'espacios': [], 'fechas': [], 'inicio': [], 'fin': [], 'estados': [], 'motivos': [],
+    }
+    nombres = {}
+    filas = queryset.order_by('fecha_reserva', 'hora_inicio', 'id').values_list(*CAMPOS_CALENDARIO)
+    for id_, espacio_id, espacio_nombre, fecha, hora_inicio, hora_fin, estado, motivo in filas:
+        datos['ids'].append(id_)
+        datos['espacios'].append(espacio_id)
+        datos['fechas'].append(fecha.isoformat())
+        datos['inicio'].append(_minutos(hora_inicio))
+        datos['fin'].append(_minutos(hora_fin))
+        datos['estados'].append(estado)
+        datos['motivos'].append(motivo)
+        nombres[espacio_id] = espacio_nombre
+    datos['nombres_espacios'] = nombres
+    return datos
@@ -0,0 +1,160 @@
+from collections import defaultdict
+from datetime import time, timedelta
+from functools import lru_cache, reduce
+from operator import or_
+
+from django.db.models import Q
+
+from .conflictos import ESTADOS_OCUPAN_ESPACIO
+from .models import Reserva, OcupacionDiaria
+
+# Cada día se divide en 96 bloques de 15 minutos. El bit i del mapa indica que
+# el bloque [i*15, (i+1)*15) minutos está ocupado.
+MINUTOS_POR_BLOQUE = 15
+BLOQUES_POR_DIA = 24 * 60 // MINUTOS_POR_BLOQUE
+BYTES_POR_DIA = BLOQUES_POR_DIA // 8
+
+# Mismo horario que muestra el calendario del frontend
+HORA_APERTURA = time(8, 0)
+HORA_CIERRE = time(22, 0)
+
+MAX_DIAS_CONSULTA = 62
+
+
+def _segundos(hora):
+    return hora.hour * 3600 + hora.minute * 60 + hora.second
+
+
+def mascara_horario(hora_inicio, hora_fin):
+    """Bits de los bloques que toca el intervalo [hora_inicio, hora_fin)"""
+    tam_bloque = MINUTOS_POR_BLOQUE * 60
+    primero = _segundos(hora_inicio) // tam_bloque
+    ultimo = -(-_segundos(hora_fin) // tam_bloque)  # redondeo hacia arriba
+    if ultimo <= primero:
+        return 0
+    return ((1 << (ultimo - primero)) - 1) << primero
+
+
+def a_bytes(mascara):
+    return mascara.to_bytes(BYTES_POR_DIA, 'little')
+
+
+def desde_bytes(bloques):
+    return int.from_bytes(bytes(bloques), 'little')
+
+
+def recalcular_dias(dias):
+    """
+    Reconstruye el mapa de los pares (espacio_id, fecha) indicados a partir de
+    las reservas activas. Se usa cuando una reserva se crea, cambia de estado o
+    de horario: solo se leen las reservas de esos días mediante el índice de solapes.
+    """
+    dias = set(dias)
+    if not dias:
+        return
+
+    mascaras = dict.fromkeys(dias, 0)
+    filas = Reserva.objects.filter(
+        espacio_id__in={espacio_id for espacio_id, _ in dias},
+        fecha_reserva__in={fecha for _, fecha in dias},
+        estado__in=ESTADOS_OCUPAN_ESPACIO,
+    ).values_list('espacio_id', 'fecha_reserva', 'hora_inicio', 'hora_fin')
+    for espacio_id, fecha, inicio, fin in filas:
+        if (espacio_id, fecha) in mascaras:
+            mascaras[(espacio_id, fecha)] |= mascara_horario(inicio, fin)
+
+    libres = [Q(espacio_id=espacio_id, fecha=fecha) for (espacio_id, fecha), mascara in mascaras.items() if not mascara]
+    if libres:
+        OcupacionDiaria.objects.filter(reduce(or_, libres)).delete()
+
+    OcupacionDiaria.objects.bulk_create(
+        [
+            OcupacionDiaria(espacio_id=espacio_id, fecha=fecha, bloques=a_bytes(mascara))
+            for (espacio_id, fecha), mascara in mascaras.items() if mascara
+        ],
+        update_conflicts=True,
+        unique_fields=['espacio', 'fecha'],
+        update_fields=['bloques'],
+    )
+
+
+def reconstruir(desde, hasta, espacio_ids=None):
+    """Reconstruye por completo el rango [desde, hasta] (comando de mantenimiento)"""
+    ocupacion = OcupacionDiaria.objects.filter(fecha__range=[desde, hasta])
+    reservas = Reserva.objects.filter(fecha_reserva__range=[desde, hasta], estado__in=ESTADOS_OCUPAN_ESPACIO)
+    if espacio_ids:
+        ocupacion = ocupacion.filter(espacio_id__in=espacio_ids)
+        reservas = reservas.filter(espacio_id__in=espacio_ids)
+
+    mascaras = defaultdict(int)
+    for espacio_id, fecha, inicio, fin in reservas.values_list(
+            'espacio_id', 'fecha_reserva', 'hora_inicio', 'hora_fin').iterator(chunk_size=5000):
+        mascaras[(espacio_id, fecha)] |= mascara_horario(inicio, fin)
+
+    ocupacion.delete()
+    OcupacionDiaria.objects.bulk_create(
+        [
+            OcupacionDiaria(espacio_id=espacio_id, fecha=fecha, bloques=a_bytes(mascara))
+            for (espacio_id, fecha), mascara in mascaras.items()
+        ],
+        batch_size=1000,
+    )
+    return len(mascaras)
+
+
+@lru_cache(maxsize=4096)
+def bloques_libres(mascara, apertura=HORA_APERTURA, cierre=HORA_CIERRE):
+    """Convierte un mapa de bits en intervalos libres ['HH:MM', 'HH:MM'] dentro del horario"""
+    primero = _segundos(apertura) // (MINUTOS_POR_BLOQUE * 60)
+    ultimo = _segundos(cierre) // (MINUTOS_POR_BLOQUE * 60)
+
+    libres = []
+    inicio = None
+    for bloque in range(primero, ultimo):
+        ocupado = (mascara >> bloque) & 1
+        if not ocupado and inicio is None:
+            inicio = bloque
+        elif ocupado and inicio is not None:
+            libres.append((inicio, bloque))
+            inicio = None
+    if inicio is not None:
+        libres.append((inicio, ultimo))
+
+    # Tupla: el resultado se comparte entre llamadas gracias a la caché
+    return tuple((_formatear(a), _formatear(b)) for a, b in libres)
+
+
+def _formatear(bloque):
+    minutos = bloque * MINUTOS_POR_BLOQUE
+    return f"{minutos // 60:02d}:{minutos % 60:02d}"
+
+
+def disponibilidad(espacio_ids, desde, hasta):
+    """
+    Intervalos libres por espacio y día, leyendo los mapas precalculados (los
+    días sin fila no tienen reservas activas). Encima se marcan las ocurrencias
+    de las series pendientes, que no tienen filas pero también bloquean el
+    horario al crear una reserva.
+    """
+    # Importación local: series.py usa este módulo al aprobar y cancelar
+    from .series import ocupacion_series
+
+    espacio_ids = list(espacio_ids)
+    mascaras = defaultdict(int, {
+        (espacio_id, fecha): desde_bytes(bloques)
+        for espacio_id, fecha, bloques in OcupacionDiaria.objects.filter(
+            espacio_id__in=espacio_ids, fecha__range=[desde, hasta]
+        ).values_list('espacio_id', 'fecha', 'bloques')
+    })
+
+    dias = [desde + timedelta(days=i) for i in range((hasta - desde).days + 1)]
+    for clave, intervalos in ocupacion_series(espacio_ids, dias, time.min, time.max).items():
+        for inicio, fin, _ in intervalos:
+            mascaras[clave] |= mascara_horario(inicio, fin)
+    return {
+        espacio_id: {
+            dia.isoformat(): bloques_libres(mascaras.get((espacio_id, dia), 0))
+            for dia in dias
+        }
+        for espacio_id in espacio_ids
+    }
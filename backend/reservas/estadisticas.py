@@ -0,0 +1,168 @@
+from django.db import connection
+from django.db.models import Count, Sum, Q, F
+
+from .models import Reserva, ReservaElemento
+from . import resumenes
+
+TOP = 5
+
+
+def _filtro_carrera(carrera_id=None, area=None):
+    """
+    Por la carrera con que se contó la reserva (Reserva.carrera_estadisticas),
+    igual que los resúmenes diarios: el total no depende de qué camino responde.
+    """
+    filtro = Q()
+    if carrera_id:
+        filtro &= Q(carrera_estadisticas_id=carrera_id)
+    if area:
+        filtro &= Q(carrera_estadisticas__area=area)
+    return filtro
+
+
+def _filtro_reservas(fecha_inicio, fecha_fin, carrera_id=None, area=None):
+    return Q(fecha_reserva__range=[fecha_inicio, fecha_fin]) & _filtro_carrera(carrera_id, area)
+
+
+def _top(conteos, n=TOP):
+    """Ordena {nombre: total} de mayor a menor (desempate por nombre) y corta en n"""
+    return sorted(conteos.items(), key=lambda item: (-item[1], str(item[0])))[:n]
+
+
+def _series_grouping_sets(reservas):
+    """
+    PostgreSQL: las tres agrupaciones (carrera, espacio, día) en una sola consulta
+    con GROUPING SETS sobre el conjunto filtrado.
+    """
+    base = reservas.order_by().values(
+        carrera=F('carrera_estadisticas__nombre_carrera'),
+        espacio_nombre=F('espacio__nombre'),
+        fecha=F('fecha_reserva'),
+    )
+    sql_base, params = base.query.sql_with_params()
+    sql = f"""
+        SELECT carrera, espacio_nombre, fecha, COUNT(*),
+               GROUPING(carrera), GROUPING(espacio_nombre)
+        FROM ({sql_base}) AS base
+        GROUP BY GROUPING SETS ((carrera), (espacio_nombre), (fecha))
+    """
+    carreras, espacios, dias = {}, {}, {}
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        for carrera, espacio, fecha, total, sin_carrera, sin_espacio in cursor.fetchall():
+            if not sin_carrera:
+                carreras[carrera] = total
+            elif not sin_espacio:
+                espacios[espacio] = total
+            else:
+                dias[fecha] = total
+    return carreras, espacios, dias
+
+
+def _series_separadas(reservas):
+    """Resto de motores: una consulta agrupada por cada serie"""
+    carreras = {
+        item['carrera_estadisticas__nombre_carrera']: item['total']
+        for item in reservas.values('carrera_estadisticas__nombre_carrera').annotate(total=Count('id'))
+    }
+    espacios = {
+        item['espacio__nombre']: item['total']
+        for item in reservas.values('espacio__nombre').annotate(total=Count('id'))
+    }
+    dias = {
+        item['fecha_reserva']: item['total']
+        for item in reservas.values('fecha_reserva').annotate(total=Count('id'))
+    }
+    return carreras, espacios, dias
+
+
+def resumen_estados(fecha_inicio=None, fecha_fin=None, carrera_id=None, area=None):
+    """Cantidad de reservas por estado (resumen del reporte PDF)"""
+    if fecha_inicio and fecha_fin and resumenes.rango_cubierto(fecha_inicio, fecha_fin):
+        por_estado = resumenes.series(fecha_inicio, fecha_fin, carrera_id, area)[0]
+        return {'total': sum(por_estado.values()), **{estado: por_estado[estado] for estado, _ in Reserva.ESTADO_CHOICES}}
+
+    if fecha_inicio and fecha_fin:
+        filtro = _filtro_reservas(fecha_inicio, fecha_fin, carrera_id, area)
+    else:
+        filtro = _filtro_carrera(carrera_id, area)
+    return Reserva.objects.filter(filtro).aggregate(
+        total=Count('id'),
+        **{estado: Count('id', filter=Q(estado=estado)) for estado, _ in Reserva.ESTADO_CHOICES}
+    )
+
+
+def calcular_estadisticas(fecha_inicio, fecha_fin, hoy, carrera_id=None, area=None):
+    """
+    Calcula los KPIs, gráficos y agenda del dashboard con el mínimo de consultas:
+    1 para todos los conteos, 1 (PostgreSQL) para las series agrupadas,
+    1 para los elementos y 1 para los eventos de hoy.
+
+    Si el rango está cubierto por los resúmenes diarios, los KPIs y gráficos
+    se leen de ellos en lugar de agrupar las reservas.
+    """
+    filtro = _filtro_reservas(fecha_inicio, fecha_fin, carrera_id, area)
+    hoy_q = Q(fecha_reserva=hoy)
+    pendiente_q = Q(estado='pendiente')
+
+    if resumenes.rango_cubierto(fecha_inicio, fecha_fin):
+        por_estado, carreras, espacios, dias = resumenes.series(fecha_inicio, fecha_fin, carrera_id, area)
+        top_elementos = resumenes.top_elementos(fecha_inicio, fecha_fin, carrera_id, area, TOP)
+        conteos = Reserva.objects.filter(hoy_q | pendiente_q).aggregate(
+            total_hoy=Count('id', filter=hoy_q),
+            total_pendientes=Count('id', filter=pendiente_q),
+        )
+        conteos.update(
+            total=sum(por_estado.values()),
+            aprobadas=por_estado['aprobada'],
+            rechazadas=por_estado['rechazada'],
+        )
+    else:
+        # 1. KPIs del rango, agenda de hoy y pendientes globales en un solo agregado condicional
+        conteos = Reserva.objects.filter(filtro | hoy_q | pendiente_q).aggregate(
+            total=Count('id', filter=filtro),
+            aprobadas=Count('id', filter=filtro & Q(estado='aprobada')),
+            rechazadas=Count('id', filter=filtro & Q(estado='rechazada')),
+            total_hoy=Count('id', filter=hoy_q),
+            total_pendientes=Count('id', filter=pendiente_q),
+        )
+
+        # 2. Series para gráficos
+        reservas_filtradas = Reserva.objects.filter(filtro)
+        if connection.vendor == 'postgresql':
+            carreras, espacios, dias = _series_grouping_sets(reservas_filtradas)
+        else:
+            carreras, espacios, dias = _series_separadas(reservas_filtradas)
+
+        top_elementos = ReservaElemento.objects.filter(reserva__in=reservas_filtradas).values('elemento__nombre').annotate(
+            total_solicitado=Sum('cantidad_solicitada')).order_by('-total_solicitado')[:TOP]
+
+    total = conteos['total']
+    aprobadas = conteos['aprobadas']
+    tasa_aprobacion = round((aprobadas / total * 100), 1) if total > 0 else 0
+
+    # 3. Próximos eventos aprobados de hoy
+    eventos = list(
+        Reserva.objects.filter(hoy_q, estado='aprobada')
+        .values('hora_inicio', 'espacio__nombre', 'motivo').order_by('hora_inicio')[:3]
+    )
+
+    return {
+        'kpis': {
+            'total': total,
+            'aprobadas': aprobadas,
+            'rechazadas': conteos['rechazadas'],
+            'tasa_aprobacion': tasa_aprobacion,
+        },
+        'graficos': {
+            'carreras': [{'name': nombre or 'Sin Carrera', 'value': valor} for nombre, valor in _top(carreras)],
+            'espacios': [{'name': nombre, 'reservas': valor} for nombre, valor in _top(espacios)],
+            'elementos': [{'name': item['elemento__nombre'], 'cantidad': item['total_solicitado']} for item in top_elementos],
+            'diario': [{'fecha': fecha.strftime('%Y-%m-%d'), 'total': valor} for fecha, valor in sorted(dias.items())],
+        },
+        'agenda_hoy': {
+            'total_hoy': conteos['total_hoy'],
+            'eventos': eventos,
+            'pendientes_accion': conteos['total_pendientes'],
+        },
+    }
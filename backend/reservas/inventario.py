@@ -0,0 +1,224 @@
+"""
+Stock de elementos por franja horaria.
+
+Cada ReservaElemento de una reserva activa tiene una ElementoAsignacion con su
+intervalo. El uso de un elemento en [inicio, fin) es el máximo de unidades
+asignadas simultáneamente dentro del intervalo (barrido de eventos sobre las
+asignaciones que se solapan). La capacidad es el stock_disponible del elemento.
+
+Para asignar se bloquean las filas de los elementos (select_for_update, siempre
+en orden de ID para no provocar deadlocks), se vuelve a medir el uso y recién
+entonces se crean las asignaciones.
+"""
+import random
+import time
+from collections import defaultdict
+
+from django.db import OperationalError, transaction
+
+from elementos.models import Elemento
+from .models import ElementoAsignacion, ReservaElemento
+
+# Reintentos ante bloqueos o deadlocks de la base de datos
+MAX_REINTENTOS = 3
+ESPERA_BASE_REINTENTO = 0.05
+
+
+class StockInsuficiente(Exception):
+    """`faltantes` es {elemento_id: {'solicitado', 'disponible'}}"""
+
+    def __init__(self, faltantes):
+        super().__init__("Stock insuficiente")
+        self.faltantes = faltantes
+
+
+def _uso_maximo(intervalos):
+    """Máximo de unidades simultáneas dadas tuplas (inicio, fin, cantidad)"""
+    eventos = []
+    for inicio, fin, cantidad in intervalos:
+        eventos.append((inicio, cantidad))
+        eventos.append((fin, -cantidad))
+    # En el mismo instante las salidas van antes que las entradas: [inicio, fin)
+    eventos.sort(key=lambda evento: (evento[0], evento[1]))
+    uso = maximo = 0
+    for _, delta in eventos:
+        uso += delta
+        maximo = max(maximo, uso)
+    return maximo
+
+
+def asignaciones_existentes(elemento_ids, fechas, hora_min, hora_max, excluir_reserva_id=None):
+    """
+    {(elemento_id, fecha): [(inicio, fin, cantidad), ...]} con las asignaciones
+    que tocan la ventana [hora_min, hora_max) de esas fechas. Una consulta.
+    """
+    asignaciones = ElementoAsignacion.objects.filter(
+        elemento_id__in=elemento_ids,
+        fecha__in=fechas,
+        hora_inicio__lt=hora_max,
+        hora_fin__gt=hora_min,
+    )
+    if excluir_reserva_id:
+        asignaciones = asignaciones.exclude(reserva_elemento__reserva_id=excluir_reserva_id)
+
+    intervalos = defaultdict(list)
+    filas = asignaciones.values_list('elemento_id', 'fecha', 'hora_inicio', 'hora_fin', 'cantidad')
+    for elemento_id, fecha, inicio, fin, cantidad in filas:
+        intervalos[(elemento_id, fecha)].append((inicio, fin, cantidad))
+    return intervalos
+
+
+def uso_en_franja(intervalos, hora_inicio, hora_fin):
+    """Uso máximo dentro de [hora_inicio, hora_fin) contando solo la parte de cada intervalo que cae en ella"""
+    return _uso_maximo(
+        (max(inicio, hora_inicio), min(fin, hora_fin), cantidad)
+        for inicio, fin, cantidad in intervalos
+        if inicio < hora_fin and fin > hora_inicio
+    )
+
+
+def uso_maximo(elemento_ids, fecha, hora_inicio, hora_fin, excluir_reserva_id=None):
+    """{elemento_id: unidades ocupadas en el peor momento de [hora_inicio, hora_fin)}. Una consulta."""
+    intervalos = asignaciones_existentes(elemento_ids, [fecha], hora_inicio, hora_fin, excluir_reserva_id)
+    return {
+        elemento_id: uso_en_franja(intervalos.get((elemento_id, fecha), ()), hora_inicio, hora_fin)
+        for elemento_id in elemento_ids
+    }
+
+
+def disponibilidad(elemento_ids, fecha, hora_inicio, hora_fin):
+    """
+    {elemento_id: {'stock', 'en_uso', 'disponible'}} para la franja pedida.
+    Dos consultas en total, sin importar cuántos elementos se pidan.
+    """
+    stock = dict(Elemento.objects.filter(id__in=elemento_ids).values_list('id', 'stock_disponible'))
+    uso = uso_maximo(list(stock), fecha, hora_inicio, hora_fin)
+    return {
+        elemento_id: {'stock': total, 'en_uso': uso[elemento_id], 'disponible': max(total - uso[elemento_id], 0)}
+        for elemento_id, total in stock.items()
+    }
+
+
+def bloquear_stock(elemento_ids):
+    """
+    Bloquea las filas de los elementos (siempre en orden de ID) hasta el fin de
+    la transacción y devuelve {id: stock_disponible} de los que están disponibles.
+    """
+    return dict(
+        Elemento.objects.select_for_update().filter(id__in=elemento_ids, estado='disponible')
+        .order_by('id').values_list('id', 'stock_disponible')
+    )
+
+
+def comprobar_stock(solicitudes, fecha, hora_inicio, hora_fin, excluir_reserva_id=None):
+    """
+    Bloquea los elementos de `solicitudes` ({elemento_id: cantidad}) y lanza
+    StockInsuficiente si alguno no alcanza en la franja. Debe llamarse dentro
+    de una transacción.
+    """
+    ids = sorted(solicitudes)
+    stock = bloquear_stock(ids)
+    uso = uso_maximo(ids, fecha, hora_inicio, hora_fin, excluir_reserva_id=excluir_reserva_id)
+
+    faltantes = {}
+    for elemento_id in ids:
+        libres = stock.get(elemento_id, 0) - uso[elemento_id]
+        if solicitudes[elemento_id] > libres:
+            faltantes[elemento_id] = {'solicitado': solicitudes[elemento_id], 'disponible': max(libres, 0)}
+    if faltantes:
+        raise StockInsuficiente(faltantes)
+
+
+def asignar(reserva, solicitudes):
+    """
+    Crea los ReservaElemento de `reserva` y compromete su stock.
+    `solicitudes` es {elemento_id: cantidad}. Debe llamarse dentro de una
+    transacción; lanza StockInsuficiente si algún elemento no alcanza.
+    """
+    if not solicitudes:
+        return []
+
+    ids = sorted(solicitudes)
+    comprobar_stock(solicitudes, reserva.fecha_reserva, reserva.hora_inicio, reserva.hora_fin, excluir_reserva_id=reserva.pk)
+
+    # La señal post_save de ReservaElemento registra cada asignación (ver registrar)
+    return [
+        ReservaElemento.objects.create(
+            reserva=reserva, elemento_id=elemento_id,
+            cantidad_solicitada=solicitudes[elemento_id], cantidad_asignada=solicitudes[elemento_id],
+        )
+        for elemento_id in ids
+    ]
+
+
+def _cantidad(reserva_elemento):
+    return reserva_elemento.cantidad_asignada or reserva_elemento.cantidad_solicitada
+
+
+def verificar(reserva_id, fecha, hora_inicio, hora_fin):
+    """
+    Antes de mover o reactivar una reserva existente: bloquea sus elementos y
+    lanza StockInsuficiente si no caben en la nueva franja (sin contar su propio uso).
+    """
+    solicitudes = {}
+    for reserva_elemento in ReservaElemento.objects.filter(reserva_id=reserva_id):
+        solicitudes[reserva_elemento.elemento_id] = solicitudes.get(reserva_elemento.elemento_id, 0) + _cantidad(reserva_elemento)
+    if solicitudes:
+        comprobar_stock(solicitudes, fecha, hora_inicio, hora_fin, excluir_reserva_id=reserva_id)
+
+
+def registrar(reserva_elemento, creado):
+    """Crea o actualiza la asignación de un ReservaElemento de una reserva activa"""
+    reserva = reserva_elemento.reserva
+    valores = {
+        'elemento_id': reserva_elemento.elemento_id,
+        'fecha': reserva.fecha_reserva,
+        'hora_inicio': reserva.hora_inicio,
+        'hora_fin': reserva.hora_fin,
+        'cantidad': _cantidad(reserva_elemento),
+    }
+    if creado:
+        ElementoAsignacion.objects.create(reserva_elemento=reserva_elemento, **valores)
+    else:
+        ElementoAsignacion.objects.update_or_create(reserva_elemento=reserva_elemento, defaults=valores)
+
+
+def liberar(reserva_id):
+    """Devuelve el stock comprometido por una reserva (rechazo, cancelación)"""
+    ElementoAsignacion.objects.filter(reserva_elemento__reserva_id=reserva_id).delete()
+
+
+def reactivar(reserva):
+    """Vuelve a comprometer el stock de una reserva que estaba rechazada o cancelada"""
+    liberar(reserva.pk)
+    ElementoAsignacion.objects.bulk_create([
+        ElementoAsignacion(
+            reserva_elemento=reserva_elemento, elemento_id=reserva_elemento.elemento_id, fecha=reserva.fecha_reserva,
+            hora_inicio=reserva.hora_inicio, hora_fin=reserva.hora_fin, cantidad=_cantidad(reserva_elemento),
+        )
+        for reserva_elemento in ReservaElemento.objects.filter(reserva_id=reserva.pk)
+    ])
+
+
+def mover(reserva):
+    """Actualiza el intervalo de las asignaciones cuando cambia la fecha u horario de la reserva"""
+    ElementoAsignacion.objects.filter(reserva_elemento__reserva_id=reserva.pk).update(
+        fecha=reserva.fecha_reserva, hora_inicio=reserva.hora_inicio, hora_fin=reserva.hora_fin,
+    )
+
+
+def con_reintentos(funcion):
+    """
+    Ejecuta `funcion` en una transacción y la reintenta (con espera creciente)
+    si la base de datos aborta por deadlock o espera de bloqueo. Solo reintenta
+    cuando es la transacción externa: dentro de otra, la falla se propaga.
+    """
+    reintentable = not transaction.get_connection().in_atomic_block
+    for intento in range(MAX_REINTENTOS):
+        try:
+            with transaction.atomic():
+                return funcion()
+        except OperationalError:
+            if not reintentable or intento == MAX_REINTENTOS - 1:
+                raise
+            time.sleep(ESPERA_BASE_REINTENTO * (2 ** intento) * (1 + random.random()))
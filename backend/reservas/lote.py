@@ -0,0 +1,189 @@
+"""
+Creación de reservas en lote (POST /api/reservas/bulk/).
+
+El lote se valida en conjunto con un número fijo de consultas:
+- espacios existentes (bloqueados con select_for_update),
+- choques con reservas activas (conflictos.verificar_bloques) y con series
+  pendientes (series.series_en_conflicto),
+- choques dentro del mismo lote (en memoria, en el orden recibido),
+- stock de elementos por franja (inventario.asignaciones_existentes).
+
+Luego se inserta con bulk_create. Como bulk_create no emite señales, las
+ocupaciones diarias, los resúmenes, el libro de stock y la auditoría se
+actualizan aquí.
+"""
+from collections import Counter, defaultdict
+
+from config import cache as cache_lectura
+from espacios.models import Espacio
+from .models import Reserva, ReservaElemento, ElementoAsignacion
+from .conflictos import verificar_bloques
+from . import disponibilidad, inventario, resumenes, series, tiempo_real
+from auditoria import signals as auditoria
+from notificaciones import eventos
+
+MODO_TODO_O_NADA = 'todo_o_nada'
+MODO_PARCIAL = 'parcial'
+MODOS = (MODO_TODO_O_NADA, MODO_PARCIAL)
+MAX_RESERVAS_POR_LOTE = 1000
+
+TAMANO_LOTE_INSERT = 500
+
+
+def _solapa(a, b):
+    return a['hora_inicio'] < b['hora_fin'] and b['hora_inicio'] < a['hora_fin']
+
+
+def _validar_espacios(items, errores):
+    ids = {item['espacio'] for item in items.values()}
+    existentes = set(Espacio.objects.select_for_update().filter(id__in=ids).order_by('id').values_list('id', flat=True))
+    for indice, item in items.items():
+        if item['espacio'] not in existentes:
+            errores[indice].append(f"El espacio {item['espacio']} no existe")
+
+
+def _validar_solapes(items, errores):
+    indices = [i for i in items if not errores[i]]
+    bloques = [items[i] for i in indices]
+    for indice, choques, choques_series in zip(indices, verificar_bloques(bloques), series.series_en_conflicto(bloques)):
+        if choques or choques_series:
+            errores[indice].append("El espacio ya tiene una reserva en ese horario")
+
+    # Dentro del lote gana la que viene primero
+    aceptadas = defaultdict(list)
+    for indice in indices:
+        if errores[indice]:
+            continue
+        item = items[indice]
+        clave = (item['espacio'], item['fecha_reserva'])
+        if any(_solapa(item, otra) for otra in aceptadas[clave]):
+            errores[indice].append("Se solapa con otra reserva del mismo lote")
+        else:
+            aceptadas[clave].append(item)
+
+
+def _validar_stock(items, errores):
+    con_elementos = {i: item for i, item in items.items() if not errores[i] and item.get('elementos')}
+    if not con_elementos:
+        return
+
+    elemento_ids = sorted({e for item in con_elementos.values() for e in item['elementos']})
+    stock = inventario.bloquear_stock(elemento_ids)
+    intervalos = inventario.asignaciones_existentes(
+        elemento_ids,
+        {item['fecha_reserva'] for item in con_elementos.values()},
+        min(item['hora_inicio'] for item in con_elementos.values()),
+        max(item['hora_fin'] for item in con_elementos.values()),
+    )
+    for indice, item in con_elementos.items():
+        faltantes = []
+        for elemento_id, cantidad in item['elementos'].items():
+            ocupados = intervalos[(elemento_id, item['fecha_reserva'])]
+            libres = stock.get(elemento_id, 0) - inventario.uso_en_franja(ocupados, item['hora_inicio'], item['hora_fin'])
+            if cantidad > libres:
+                faltantes.append(
+                    f"Elemento {elemento_id}: se solicitaron {cantidad} y hay {max(libres, 0)} disponibles en ese horario"
+                )
+        if faltantes:
+            errores[indice].extend(faltantes)
+            continue
+        # Lo aceptado cuenta para los siguientes ítems del lote
+        for elemento_id, cantidad in item['elementos'].items():
+            intervalos[(elemento_id, item['fecha_reserva'])].append((item['hora_inicio'], item['hora_fin'], cantidad))
+
+
+def insertar(usuario, items, **campos):
+    """
+    Inserta las reservas aceptadas y mantiene las tablas derivadas. Devuelve {indice: id}.
+    `campos` se aplica a todas las reservas (p. ej. estado y serie al aprobar una serie).
+    """
+    indices = list(items)
+    reservas = Reserva.objects.bulk_create(
+        [
+            Reserva(
+                usuario=usuario, carrera_estadisticas_id=usuario.carrera_id,
+                espacio_id=items[i]['espacio'], fecha_reserva=items[i]['fecha_reserva'],
+                hora_inicio=items[i]['hora_inicio'], hora_fin=items[i]['hora_fin'], motivo=items[i]['motivo'],
+                **campos,
+            )
+            for i in indices
+        ],
+        batch_size=TAMANO_LOTE_INSERT,
+    )
+
+    elementos = []
+    for reserva, indice in zip(reservas, indices):
+        for elemento_id, cantidad in items[indice].get('elementos', {}).items():
+            elementos.append(ReservaElemento(
+                reserva=reserva, elemento_id=elemento_id, cantidad_solicitada=cantidad, cantidad_asignada=cantidad,
+            ))
+    elementos = ReservaElemento.objects.bulk_create(elementos, batch_size=TAMANO_LOTE_INSERT)
+    ElementoAsignacion.objects.bulk_create(
+        [
+            ElementoAsignacion(
+                reserva_elemento=re, elemento_id=re.elemento_id, fecha=re.reserva.fecha_reserva,
+                hora_inicio=re.reserva.hora_inicio, hora_fin=re.reserva.hora_fin, cantidad=re.cantidad_asignada,
+            )
+            for re in elementos
+        ],
+        batch_size=TAMANO_LOTE_INSERT,
+    )
+
+    # Lo que harían las señales post_save, en conjunto
+    disponibilidad.recalcular_dias({(r.espacio_id, r.fecha_reserva) for r in reservas})
+    carrera_id = usuario.carrera_id
+    deltas_elementos = Counter()
+    for re in elementos:
+        deltas_elementos[(re.reserva.fecha_reserva, re.elemento_id, carrera_id, re.reserva.estado)] += re.cantidad_solicitada
+    resumenes.aplicar_deltas(
+        Counter((r.fecha_reserva, r.espacio_id, carrera_id, r.estado) for r in reservas),
+        deltas_elementos,
+    )
+    # bulk_create no emite señales
+    auditoria.registrar_lote(reservas)
+    cache_lectura.invalidar('reservas')
+    tiempo_real.publicar([
+        tiempo_real.evento_reserva(r, tiempo_real.TIPO_POR_ESTADO.get(r.estado, 'reserva_creada')) for r in reservas
+    ])
+    return {indice: reserva.pk for indice, reserva in zip(indices, reservas)}
+
+
+def crear_lote(usuario, items, modo=MODO_TODO_O_NADA, errores_previos=None):
+    """
+    `items` es una lista de reservas validadas por ReservaLoteItemSerializer
+    (None en las posiciones que no pasaron esa validación; sus mensajes vienen
+    en `errores_previos`). Devuelve un resultado por posición:
+    {'indice', 'creada', 'id'} o {'indice', 'creada': False, 'errores'}.
+    """
+    errores = defaultdict(list)
+
+    def crear():
+        # Se recalcula desde cero en cada intento de con_reintentos
+        errores.clear()
+        for indice, mensajes in (errores_previos or {}).items():
+            errores[indice].extend(mensajes)
+
+        validos = {i: item for i, item in enumerate(items) if item is not None and not errores[i]}
+        if validos:
+            _validar_espacios(validos, errores)
+            _validar_solapes(validos, errores)
+            _validar_stock(validos, errores)
+
+        aceptados = {i: item for i, item in validos.items() if not errores[i]}
+        hay_errores = any(errores[i] for i in range(len(items)))
+        if not aceptados or (modo == MODO_TODO_O_NADA and hay_errores):
+            return {}
+        creadas = insertar(usuario, aceptados)
+        eventos.lote_creado(usuario, len(creadas))
+        return creadas
+
+    creadas = inventario.con_reintentos(crear)
+
+    resultados = []
+    for indice in range(len(items)):
+        if indice in creadas:
+            resultados.append({'indice': indice, 'creada': True, 'id': creadas[indice]})
+        else:
+            mensajes = errores[indice] or ["No se creó porque otras reservas del lote tienen errores"]
+            resultados.append({'indice': indice, 'creada': False, 'errores': mensajes})
+    return resultados
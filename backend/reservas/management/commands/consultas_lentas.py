@@ -0,0 +1,49 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = 'Muestra las consultas lentas agrupadas por huella, sumando los volcados de todos los procesos (METRICAS_DIR)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limite', type=int, default=20, help='Cantidad de huellas a mostrar')
+        parser.add_argument(
+            '--orden', choices=['total', 'maximo', 'cantidad'], default='total',
+            help='Criterio de orden (por defecto, tiempo total acumulado)',
+        )
+        parser.add_argument('--planes', action='store_true', help='Incluir el último plan EXPLAIN muestreado')
+        parser.add_argument('--json', action='store_true', help='Salida en JSON')
+
+    def handle(self, *args, **options):
+        from config import consultas_lentas, metricas
+
+        if metricas.Volcador.directorio() is None:
+            raise CommandError('Configure METRICAS_DIR: las estadísticas se leen de los volcados de cada proceso')
+
+        instantaneas = [datos.get('consultas_lentas', {}) for datos in metricas.volcador.otros_procesos(incluir_propio=True)]
+        huellas = consultas_lentas.combinar(instantaneas)
+        ordenadas = sorted(huellas.items(), key=lambda item: item[1][options['orden']], reverse=True)[:options['limite']]
+
+        if options['json']:
+            self.stdout.write(json.dumps(
+                [{'id': identificador, **datos} for identificador, datos in ordenadas], ensure_ascii=False, indent=2,
+            ))
+            return
+
+        if not ordenadas:
+            self.stdout.write('Sin consultas lentas registradas')
+            return
+        for identificador, datos in ordenadas:
+            promedio = datos['total'] / datos['cantidad'] * 1000
+            self.stdout.write(self.style.WARNING(
+                f"[{identificador}] {datos['cantidad']} veces, total {datos['total'] * 1000:.0f} ms, "
+                f"promedio {promedio:.1f} ms, máximo {datos['maximo'] * 1000:.1f} ms"
+            ))
+            self.stdout.write(f"  {datos['sql']}")
+            for vista, cantidad in datos['vistas'].most_common():
+                self.stdout.write(f'  vista {vista}: {cantidad}')
+            for sitio, cantidad in datos['sitios'].most_common():
+                self.stdout.write(f'  sitio {sitio}: {cantidad}')
+            if options['planes'] and datos['plan']:
+                self.stdout.write('  plan:\n    ' + datos['plan'].replace('\n', '\n    '))
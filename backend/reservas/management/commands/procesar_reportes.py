@@ -0,0 +1,49 @@
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+
+def _iniciar_proceso():
+    # Cada proceso hijo arranca Django por su cuenta (contexto spawn)
+    import django
+    django.setup()
+
+
+def _procesar(job_id):
+    from reservas.trabajos import procesar
+    return procesar(job_id)
+
+
+class Command(BaseCommand):
+    help = 'Genera en segundo plano los reportes PDF pendientes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--procesos', type=int, default=2, help='Procesos generadores en paralelo')
+        parser.add_argument('--intervalo', type=float, default=5, help='Segundos de espera cuando no hay trabajos')
+        parser.add_argument('--una-vez', action='store_true', help='Procesar lo pendiente y terminar')
+
+    def handle(self, *args, **options):
+        from reservas.trabajos import reclamar_pendientes
+
+        procesos = max(1, options['procesos'])
+        contexto = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=procesos, mp_context=contexto, initializer=_iniciar_proceso) as pool:
+            while True:
+                close_old_connections()
+                ids = reclamar_pendientes(procesos)
+                futuros = {pool.submit(_procesar, job_id): job_id for job_id in ids}
+                for futuro in as_completed(futuros):
+                    job_id = futuros[futuro]
+                    try:
+                        futuro.result()
+                        self.stdout.write(self.style.SUCCESS(f'Reporte {job_id} generado'))
+                    except Exception as exc:
+                        self.stderr.write(f'Reporte {job_id} falló: {exc}')
+
+                if options['una_vez'] and not ids:
+                    break
+                if not ids:
+                    time.sleep(options['intervalo'])
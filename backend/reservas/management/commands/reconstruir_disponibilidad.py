@@ -0,0 +1,30 @@
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from reservas.disponibilidad import reconstruir
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye los mapas de ocupación diaria de los espacios para un rango de fechas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', help='Fecha inicial (YYYY-MM-DD). Por defecto, hoy.')
+        parser.add_argument('--hasta', help='Fecha final (YYYY-MM-DD). Por defecto, un año desde hoy.')
+        parser.add_argument('--espacio', type=int, action='append', dest='espacios',
+                            help='Limitar a un espacio (se puede repetir)')
+
+    def handle(self, *args, **options):
+        hoy = timezone.localdate()
+        try:
+            desde = datetime.strptime(options['desde'], '%Y-%m-%d').date() if options['desde'] else hoy
+            hasta = datetime.strptime(options['hasta'], '%Y-%m-%d').date() if options['hasta'] else hoy + timedelta(days=365)
+        except ValueError:
+            raise CommandError('Las fechas deben tener formato YYYY-MM-DD')
+
+        if hasta < desde:
+            raise CommandError('--hasta debe ser posterior a --desde')
+
+        total = reconstruir(desde, hasta, options['espacios'])
+        self.stdout.write(self.style.SUCCESS(f'Ocupación reconstruida: {total} días con reservas entre {desde} y {hasta}'))
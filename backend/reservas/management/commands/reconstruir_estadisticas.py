@@ -0,0 +1,31 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Min
+
+from reservas.models import Reserva
+from reservas.resumenes import reconstruir
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye los resúmenes diarios de reservas y elementos para un rango de fechas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', help='Fecha inicial (YYYY-MM-DD). Por defecto, la primera reserva.')
+        parser.add_argument('--hasta', help='Fecha final (YYYY-MM-DD). Sin ella la cobertura queda abierta.')
+
+    def handle(self, *args, **options):
+        try:
+            desde = datetime.strptime(options['desde'], '%Y-%m-%d').date() if options['desde'] else None
+            hasta = datetime.strptime(options['hasta'], '%Y-%m-%d').date() if options['hasta'] else None
+        except ValueError:
+            raise CommandError('Las fechas deben tener formato YYYY-MM-DD')
+
+        desde = desde or Reserva.objects.aggregate(primera=Min('fecha_reserva'))['primera']
+        if desde is None:
+            raise CommandError('No hay reservas para resumir')
+        if hasta and hasta < desde:
+            raise CommandError('--hasta debe ser posterior a --desde')
+
+        fin = reconstruir(desde, hasta)
+        self.stdout.write(self.style.SUCCESS(f'Resúmenes reconstruidos entre {desde} y {fin}'))
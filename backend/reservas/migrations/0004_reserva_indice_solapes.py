@@ -0,0 +1,20 @@
+# Generated by Django 5.2.6 on 2026-10-18 13:57
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('espacios', '0001_initial'),
+        ('reservas', '0003_reserva_motivo_rechazo'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reserva',
+            index=models.Index(fields=['espacio', 'fecha_reserva', 'hora_inicio', 'hora_fin'], name='reservas_re_espacio_f40379_idx'),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.6 on 2026-10-18 13:59
+
+import django.db.models.deletion
+from collections import defaultdict
+
+from django.db import migrations, models
+
+
+def poblar_ocupacion(apps, schema_editor):
+    from reservas.disponibilidad import mascara_horario, a_bytes
+
+    Reserva = apps.get_model('reservas', 'Reserva')
+    OcupacionDiaria = apps.get_model('reservas', 'OcupacionDiaria')
+
+    mascaras = defaultdict(int)
+    reservas = Reserva.objects.filter(estado__in=['pendiente', 'aprobada']).values_list(
+        'espacio_id', 'fecha_reserva', 'hora_inicio', 'hora_fin')
+    for espacio_id, fecha, inicio, fin in reservas.iterator(chunk_size=5000):
+        mascaras[(espacio_id, fecha)] |= mascara_horario(inicio, fin)
+
+    OcupacionDiaria.objects.bulk_create(
+        [
+            OcupacionDiaria(espacio_id=espacio_id, fecha=fecha, bloques=a_bytes(mascara))
+            for (espacio_id, fecha), mascara in mascaras.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('espacios', '0001_initial'),
+        ('reservas', '0004_reserva_indice_solapes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OcupacionDiaria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField(verbose_name='Fecha')),
+                ('bloques', models.BinaryField(verbose_name='Bloques Ocupados')),
+                ('espacio', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ocupacion_diaria', to='espacios.espacio', verbose_name='Espacio')),
+            ],
+            options={
+                'verbose_name': 'Ocupación Diaria',
+                'verbose_name_plural': 'Ocupaciones Diarias',
+                'unique_together': {('espacio', 'fecha')},
+            },
+        ),
+        migrations.RunPython(poblar_ocupacion, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.2.6 on 2026-10-18 14:02
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('elementos', '0001_initial'),
+        ('espacios', '0001_initial'),
+        ('reservas', '0005_ocupaciondiaria'),
+        ('usuarios', '0003_carrera_usuario_carrera'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CoberturaEstadisticas',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('desde', models.DateField(verbose_name='Desde')),
+                ('hasta', models.DateField(blank=True, null=True, verbose_name='Hasta (vacío = sin límite)')),
+                ('fecha_generacion', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Fecha de Generación')),
+            ],
+            options={
+                'verbose_name': 'Cobertura de Estadísticas',
+                'verbose_name_plural': 'Coberturas de Estadísticas',
+            },
+        ),
+        migrations.CreateModel(
+            name='ReservaDailyStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField(verbose_name='Fecha')),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('aprobada', 'Aprobada'), ('rechazada', 'Rechazada'), ('cancelada', 'Cancelada'), ('completada', 'Completada')], max_length=20, verbose_name='Estado')),
+                ('total', models.PositiveIntegerField(default=0, verbose_name='Total de Reservas')),
+                ('carrera', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='usuarios.carrera', verbose_name='Carrera')),
+                ('espacio', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='espacios.espacio', verbose_name='Espacio')),
+            ],
+            options={
+                'verbose_name': 'Estadística Diaria de Reservas',
+                'verbose_name_plural': 'Estadísticas Diarias de Reservas',
+                'constraints': [models.UniqueConstraint(fields=('fecha', 'espacio', 'carrera', 'estado'), name='reserva_daily_stat_unica', nulls_distinct=False)],
+            },
+        ),
+        migrations.CreateModel(
+            name='ReservaElementoDailyStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField(verbose_name='Fecha')),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('aprobada', 'Aprobada'), ('rechazada', 'Rechazada'), ('cancelada', 'Cancelada'), ('completada', 'Completada')], max_length=20, verbose_name='Estado')),
+                ('cantidad', models.PositiveIntegerField(default=0, verbose_name='Cantidad Solicitada')),
+                ('carrera', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='usuarios.carrera', verbose_name='Carrera')),
+                ('elemento', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='elementos.elemento', verbose_name='Elemento')),
+            ],
+            options={
+                'verbose_name': 'Estadística Diaria de Elementos',
+                'verbose_name_plural': 'Estadísticas Diarias de Elementos',
+                'constraints': [models.UniqueConstraint(fields=('fecha', 'elemento', 'carrera', 'estado'), name='reserva_elemento_daily_stat_unica', nulls_distinct=False)],
+            },
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.6 on 2026-10-18 14:06
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservas', '0006_estadisticas_diarias'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reserva',
+            name='fecha_actualizacion',
+            field=models.DateTimeField(auto_now=True, verbose_name='Última Actualización'),
+        ),
+        migrations.CreateModel(
+            name='ReporteJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('parametros', models.JSONField(blank=True, default=dict, verbose_name='Filtros del Reporte')),
+                ('version_datos', models.CharField(max_length=100, verbose_name='Versión de los Datos')),
+                ('clave', models.CharField(db_index=True, max_length=64, verbose_name='Clave de Caché')),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('procesando', 'Procesando'), ('completado', 'Completado'), ('fallido', 'Fallido')], default='pendiente', max_length=20, verbose_name='Estado')),
+                ('archivo', models.CharField(blank=True, max_length=255, verbose_name='Archivo Generado')),
+                ('error', models.TextField(blank=True, null=True, verbose_name='Error')),
+                ('fecha_creacion', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Fecha de Creación')),
+                ('fecha_inicio', models.DateTimeField(blank=True, null=True, verbose_name='Inicio de Generación')),
+                ('fecha_fin', models.DateTimeField(blank=True, null=True, verbose_name='Fin de Generación')),
+                ('solicitado_por', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reportes_solicitados', to=settings.AUTH_USER_MODEL, verbose_name='Solicitado por')),
+            ],
+            options={
+                'verbose_name': 'Trabajo de Reporte',
+                'verbose_name_plural': 'Trabajos de Reporte',
+                'ordering': ['-fecha_creacion'],
+                'indexes': [models.Index(fields=['estado', 'fecha_creacion'], name='reservas_re_estado_05ea50_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.6 on 2026-10-18 14:11
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('espacios', '0001_initial'),
+        ('reservas', '0007_reportejob'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reserva',
+            index=models.Index(fields=['fecha_creacion', 'id'], name='reserva_cursor_idx'),
+        ),
+    ]
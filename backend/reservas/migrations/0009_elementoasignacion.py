@@ -0,0 +1,52 @@
+# Generated by Django 5.2.6 on 2026-10-18 14:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def poblar_asignaciones(apps, schema_editor):
+    ReservaElemento = apps.get_model('reservas', 'ReservaElemento')
+    ElementoAsignacion = apps.get_model('reservas', 'ElementoAsignacion')
+
+    filas = ReservaElemento.objects.filter(reserva__estado__in=['pendiente', 'aprobada']).values_list(
+        'id', 'elemento_id', 'cantidad_asignada', 'cantidad_solicitada',
+        'reserva__fecha_reserva', 'reserva__hora_inicio', 'reserva__hora_fin')
+    ElementoAsignacion.objects.bulk_create(
+        [
+            ElementoAsignacion(
+                reserva_elemento_id=re_id, elemento_id=elemento_id, cantidad=asignada or solicitada,
+                fecha=fecha, hora_inicio=inicio, hora_fin=fin,
+            )
+            for re_id, elemento_id, asignada, solicitada, fecha, inicio, fin in filas.iterator(chunk_size=5000)
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('elementos', '0001_initial'),
+        ('reservas', '0008_reserva_indice_cursor'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ElementoAsignacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField(verbose_name='Fecha')),
+                ('hora_inicio', models.TimeField(verbose_name='Hora de Inicio')),
+                ('hora_fin', models.TimeField(verbose_name='Hora de Fin')),
+                ('cantidad', models.PositiveIntegerField(verbose_name='Cantidad')),
+                ('elemento', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='asignaciones', to='elementos.elemento', verbose_name='Elemento')),
+                ('reserva_elemento', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='asignacion', to='reservas.reservaelemento', verbose_name='Elemento de Reserva')),
+            ],
+            options={
+                'verbose_name': 'Asignación de Elemento',
+                'verbose_name_plural': 'Asignaciones de Elementos',
+                'indexes': [models.Index(fields=['elemento', 'fecha', 'hora_inicio', 'hora_fin'], name='reservas_el_element_30ea23_idx')],
+            },
+        ),
+        migrations.RunPython(poblar_asignaciones, migrations.RunPython.noop),
+    ]
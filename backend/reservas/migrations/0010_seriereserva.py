@@ -0,0 +1,53 @@
+# Generated by Django 5.2.6 on 2026-10-18 14:19
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('espacios', '0001_initial'),
+        ('reservas', '0009_elementoasignacion'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SerieReserva',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hora_inicio', models.TimeField(verbose_name='Hora de Inicio')),
+                ('hora_fin', models.TimeField(verbose_name='Hora de Fin')),
+                ('motivo', models.TextField(verbose_name='Motivo de la Reserva')),
+                ('dias_semana', models.JSONField(default=list, help_text='Lista de días (0 = lunes ... 6 = domingo)', verbose_name='Días de la Semana')),
+                ('intervalo_semanas', models.PositiveSmallIntegerField(default=1, verbose_name='Cada cuántas semanas')),
+                ('fecha_inicio', models.DateField(verbose_name='Fecha de Inicio')),
+                ('fecha_fin', models.DateField(verbose_name='Fecha de Término')),
+                ('excepciones', models.JSONField(blank=True, default=list, help_text='Fechas ISO (YYYY-MM-DD) en que la serie no se realiza', verbose_name='Fechas Excluidas')),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('aprobada', 'Aprobada'), ('rechazada', 'Rechazada'), ('cancelada', 'Cancelada')], default='pendiente', max_length=20, verbose_name='Estado')),
+                ('motivo_rechazo', models.TextField(blank=True, null=True, verbose_name='Motivo de Rechazo')),
+                ('fecha_creacion', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Fecha de Creación')),
+                ('fecha_aprobacion', models.DateTimeField(blank=True, null=True, verbose_name='Fecha de Aprobación')),
+                ('aprobado_por', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='series_aprobadas', to=settings.AUTH_USER_MODEL, verbose_name='Aprobado por')),
+                ('espacio', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='series', to='espacios.espacio', verbose_name='Espacio')),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='series_creadas', to=settings.AUTH_USER_MODEL, verbose_name='Solicitante')),
+            ],
+            options={
+                'verbose_name': 'Serie de Reservas',
+                'verbose_name_plural': 'Series de Reservas',
+                'ordering': ['-fecha_creacion'],
+            },
+        ),
+        migrations.AddField(
+            model_name='reserva',
+            name='serie',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ocurrencias', to='reservas.seriereserva', verbose_name='Serie'),
+        ),
+        migrations.AddIndex(
+            model_name='seriereserva',
+            index=models.Index(fields=['espacio', 'estado', 'fecha_inicio', 'fecha_fin'], name='reservas_se_espacio_61a8d7_idx'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.6 on 2026-10-18 15:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from reservas import resumenes
+
+
+def poblar_carrera_y_resumenes(apps, schema_editor):
+    """
+    Fija la carrera de las reservas existentes con la actual de su solicitante y
+    reconstruye los resúmenes completos: las reservas anteriores a 0006 no se
+    habían contado y sus cambios de estado descontaban de filas ajenas.
+    """
+    Reserva = apps.get_model('reservas', 'Reserva')
+    Usuario = apps.get_model('usuarios', 'Usuario')
+
+    Reserva.objects.update(carrera_estadisticas_id=models.Subquery(
+        Usuario.objects.filter(pk=models.OuterRef('usuario_id')).values('carrera_id')[:1]
+    ))
+    primera = Reserva.objects.aggregate(primera=models.Min('fecha_reserva'))['primera']
+    if primera is not None:
+        resumenes.reconstruir(primera, apps=apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservas', '0010_seriereserva'),
+        ('usuarios', '0004_fecha_actualizacion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reserva',
+            name='carrera_estadisticas',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='usuarios.carrera', verbose_name='Carrera (estadísticas)'),
+        ),
+        migrations.RunPython(poblar_carrera_y_resumenes, migrations.RunPython.noop),
+    ]
@@ -1,10 +1,110 @@
 from django.db import models
 from django.utils import timezone
-from usuarios.models import Usuario
+from usuarios.models import Usuario, Carrera
 from espacios.models import Espacio
 from elementos.models import Elemento
+from config.mixins import ValoresDBMixin
 
-class Reserva(models.Model):
+class SerieReserva(models.Model):
+    """
+    Reserva recurrente (p. ej. una clase semanal), al estilo de una RRULE:
+    ciertos días de la semana, cada `intervalo_semanas`, entre fecha_inicio y
+    fecha_fin, salvo las fechas de `excepciones`. Mientras está pendiente sus
+    ocurrencias no existen como filas: se generan al consultarlas (reservas/series.py).
+    Al aprobarla se materializan como Reservas aprobadas ligadas a la serie.
+    """
+    
+    ESTADO_CHOICES = [
+        ('pendiente', 'Pendiente'),
+        ('aprobada', 'Aprobada'),
+        ('rechazada', 'Rechazada'),
+        ('cancelada', 'Cancelada'),
+    ]
+    
+    usuario = models.ForeignKey(
+        Usuario,
+        on_delete=models.PROTECT,
+        related_name='series_creadas',
+        verbose_name='Solicitante'
+    )
+    espacio = models.ForeignKey(
+        Espacio,
+        on_delete=models.PROTECT,
+        related_name='series',
+        verbose_name='Espacio'
+    )
+    hora_inicio = models.TimeField(
+        verbose_name='Hora de Inicio'
+    )
+    hora_fin = models.TimeField(
+        verbose_name='Hora de Fin'
+    )
+    motivo = models.TextField(
+        verbose_name='Motivo de la Reserva'
+    )
+    dias_semana = models.JSONField(
+        default=list,
+        verbose_name='Días de la Semana',
+        help_text='Lista de días (0 = lunes ... 6 = domingo)'
+    )
+    intervalo_semanas = models.PositiveSmallIntegerField(
+        default=1,
+        verbose_name='Cada cuántas semanas'
+    )
+    fecha_inicio = models.DateField(
+        verbose_name='Fecha de Inicio'
+    )
+    fecha_fin = models.DateField(
+        verbose_name='Fecha de Término'
+    )
+    excepciones = models.JSONField(
+        default=list,
+        blank=True,
+        verbose_name='Fechas Excluidas',
+        help_text='Fechas ISO (YYYY-MM-DD) en que la serie no se realiza'
+    )
+    estado = models.CharField(
+        max_length=20,
+        choices=ESTADO_CHOICES,
+        default='pendiente',
+        verbose_name='Estado'
+    )
+    motivo_rechazo = models.TextField(
+        blank=True,
+        null=True,
+        verbose_name='Motivo de Rechazo'
+    )
+    aprobado_por = models.ForeignKey(
+        Usuario,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='series_aprobadas',
+        verbose_name='Aprobado por'
+    )
+    fecha_creacion = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Fecha de Creación'
+    )
+    fecha_aprobacion = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Fecha de Aprobación'
+    )
+    
+    class Meta:
+        verbose_name = 'Serie de Reservas'
+        verbose_name_plural = 'Series de Reservas'
+        ordering = ['-fecha_creacion']
+        indexes = [
+            models.Index(fields=['espacio', 'estado', 'fecha_inicio', 'fecha_fin']),
+        ]
+    
+    def __str__(self):
+        return f"{self.espacio.nombre} - {self.fecha_inicio} a {self.fecha_fin} ({self.get_estado_display()})"
+
+
+class Reserva(ValoresDBMixin, models.Model):
     """Reservas de espacios"""
     
     ESTADO_CHOICES = [
@@ -72,6 +172,29 @@ class Reserva(models.Model):
         blank=True,
         verbose_name='Fecha de Aprobación'
     )
+    fecha_actualizacion = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Última Actualización'
+    )
+    serie = models.ForeignKey(
+        SerieReserva,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='ocurrencias',
+        verbose_name='Serie'
+    )
+    # Clave de carrera con que la reserva se contó en los resúmenes diarios: así
+    # un cambio posterior de carrera del usuario no descuenta de otra fila
+    carrera_estadisticas = models.ForeignKey(
+        Carrera,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name='+',
+        verbose_name='Carrera (estadísticas)'
+    )
     
     class Meta:
         verbose_name = 'Reserva'
@@ -80,13 +203,25 @@ class Reserva(models.Model):
         indexes = [
             models.Index(fields=['fecha_reserva', 'hora_inicio']),
             models.Index(fields=['estado']),
+            models.Index(fields=['espacio', 'fecha_reserva', 'hora_inicio', 'hora_fin']),
+            # Paginación por cursor de la API
+            models.Index(fields=['fecha_creacion', 'id'], name='reserva_cursor_idx'),
         ]
     
     def __str__(self):
         return f"{self.espacio.nombre} - {self.fecha_reserva} ({self.get_estado_display()})"
 
+    def save(self, *args, **kwargs):
+        # La carrera se fija al crear la reserva o al cambiar de solicitante
+        previos = getattr(self, '_valores_db', {})
+        if self._state.adding or previos.get('usuario_id', self.usuario_id) != self.usuario_id:
+            self.carrera_estadisticas_id = self.usuario.carrera_id
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = set(kwargs['update_fields']) | {'carrera_estadisticas'}
+        super().save(*args, **kwargs)
+
 
-class ReservaElemento(models.Model):
+class ReservaElemento(ValoresDBMixin, models.Model):
     """Elementos asignados a cada reserva"""
     
     reserva = models.ForeignKey(
@@ -116,4 +251,261 @@ class ReservaElemento(models.Model):
         unique_together = ['reserva', 'elemento']
     
     def __str__(self):
-        return f"{self.elemento.nombre} x{self.cantidad_solicitada} - {self.reserva}"
\ No newline at end of file
+        return f"{self.elemento.nombre} x{self.cantidad_solicitada} - {self.reserva}"
+
+
+class ElementoAsignacion(models.Model):
+    """
+    Libro de stock comprometido: unidades de un elemento ocupadas en un
+    intervalo [hora_inicio, hora_fin) de una fecha. Existe mientras la reserva
+    está activa (pendiente o aprobada); ver reservas/inventario.py.
+    """
+
+    reserva_elemento = models.OneToOneField(
+        ReservaElemento,
+        on_delete=models.CASCADE,
+        related_name='asignacion',
+        verbose_name='Elemento de Reserva'
+    )
+    elemento = models.ForeignKey(
+        Elemento,
+        on_delete=models.CASCADE,
+        related_name='asignaciones',
+        verbose_name='Elemento'
+    )
+    fecha = models.DateField(
+        verbose_name='Fecha'
+    )
+    hora_inicio = models.TimeField(
+        verbose_name='Hora de Inicio'
+    )
+    hora_fin = models.TimeField(
+        verbose_name='Hora de Fin'
+    )
+    cantidad = models.PositiveIntegerField(
+        verbose_name='Cantidad'
+    )
+
+    class Meta:
+        verbose_name = 'Asignación de Elemento'
+        verbose_name_plural = 'Asignaciones de Elementos'
+        indexes = [
+            models.Index(fields=['elemento', 'fecha', 'hora_inicio', 'hora_fin']),
+        ]
+
+    def __str__(self):
+        return f"{self.elemento_id} x{self.cantidad} - {self.fecha} {self.hora_inicio}-{self.hora_fin}"
+
+class ReporteJob(models.Model):
+    """Solicitud de informe PDF generada en segundo plano por `procesar_reportes`"""
+    
+    ESTADO_CHOICES = [
+        ('pendiente', 'Pendiente'),
+        ('procesando', 'Procesando'),
+        ('completado', 'Completado'),
+        ('fallido', 'Fallido'),
+    ]
+    
+    solicitado_por = models.ForeignKey(
+        Usuario,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='reportes_solicitados',
+        verbose_name='Solicitado por'
+    )
+    parametros = models.JSONField(
+        default=dict,
+        blank=True,
+        verbose_name='Filtros del Reporte'
+    )
+    version_datos = models.CharField(
+        max_length=100,
+        verbose_name='Versión de los Datos'
+    )
+    clave = models.CharField(
+        max_length=64,
+        db_index=True,
+        verbose_name='Clave de Caché'
+    )
+    estado = models.CharField(
+        max_length=20,
+        choices=ESTADO_CHOICES,
+        default='pendiente',
+        verbose_name='Estado'
+    )
+    archivo = models.CharField(
+        max_length=255,
+        blank=True,
+        verbose_name='Archivo Generado'
+    )
+    error = models.TextField(
+        blank=True,
+        null=True,
+        verbose_name='Error'
+    )
+    fecha_creacion = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Fecha de Creación'
+    )
+    fecha_inicio = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Inicio de Generación'
+    )
+    fecha_fin = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Fin de Generación'
+    )
+    
+    class Meta:
+        verbose_name = 'Trabajo de Reporte'
+        verbose_name_plural = 'Trabajos de Reporte'
+        ordering = ['-fecha_creacion']
+        indexes = [
+            models.Index(fields=['estado', 'fecha_creacion']),
+        ]
+    
+    def __str__(self):
+        return f"Reporte {self.id} ({self.get_estado_display()})"
+
+
+class OcupacionDiaria(models.Model):
+    """Mapa de bits precalculado con los bloques de 15 minutos ocupados por espacio y día"""
+    
+    espacio = models.ForeignKey(
+        Espacio,
+        on_delete=models.CASCADE,
+        related_name='ocupacion_diaria',
+        verbose_name='Espacio'
+    )
+    fecha = models.DateField(
+        verbose_name='Fecha'
+    )
+    bloques = models.BinaryField(
+        verbose_name='Bloques Ocupados'
+    )
+    
+    class Meta:
+        verbose_name = 'Ocupación Diaria'
+        verbose_name_plural = 'Ocupaciones Diarias'
+        unique_together = ['espacio', 'fecha']
+    
+    def __str__(self):
+        return f"{self.espacio_id} - {self.fecha}"
+
+
+
+class ReservaDailyStat(models.Model):
+    """Resumen diario: cantidad de reservas por fecha, espacio, carrera del solicitante y estado"""
+    
+    fecha = models.DateField(
+        verbose_name='Fecha'
+    )
+    espacio = models.ForeignKey(
+        Espacio,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Espacio'
+    )
+    carrera = models.ForeignKey(
+        Carrera,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name='Carrera'
+    )
+    estado = models.CharField(
+        max_length=20,
+        choices=Reserva.ESTADO_CHOICES,
+        verbose_name='Estado'
+    )
+    total = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Total de Reservas'
+    )
+    
+    class Meta:
+        verbose_name = 'Estadística Diaria de Reservas'
+        verbose_name_plural = 'Estadísticas Diarias de Reservas'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['fecha', 'espacio', 'carrera', 'estado'],
+                nulls_distinct=False,
+                name='reserva_daily_stat_unica'
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.fecha} - {self.espacio_id} ({self.estado}): {self.total}"
+
+
+class ReservaElementoDailyStat(models.Model):
+    """Resumen diario: unidades solicitadas por fecha, elemento, carrera del solicitante y estado"""
+    
+    fecha = models.DateField(
+        verbose_name='Fecha'
+    )
+    elemento = models.ForeignKey(
+        Elemento,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Elemento'
+    )
+    carrera = models.ForeignKey(
+        Carrera,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name='Carrera'
+    )
+    estado = models.CharField(
+        max_length=20,
+        choices=Reserva.ESTADO_CHOICES,
+        verbose_name='Estado'
+    )
+    cantidad = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Cantidad Solicitada'
+    )
+    
+    class Meta:
+        verbose_name = 'Estadística Diaria de Elementos'
+        verbose_name_plural = 'Estadísticas Diarias de Elementos'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['fecha', 'elemento', 'carrera', 'estado'],
+                nulls_distinct=False,
+                name='reserva_elemento_daily_stat_unica'
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.fecha} - {self.elemento_id} ({self.estado}): {self.cantidad}"
+
+
+class CoberturaEstadisticas(models.Model):
+    """Rangos de fechas cuyos resúmenes diarios fueron reconstruidos y se mantienen al día"""
+    
+    desde = models.DateField(
+        verbose_name='Desde'
+    )
+    hasta = models.DateField(
+        null=True,
+        blank=True,
+        verbose_name='Hasta (vacío = sin límite)'
+    )
+    fecha_generacion = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Fecha de Generación'
+    )
+    
+    class Meta:
+        verbose_name = 'Cobertura de Estadísticas'
+        verbose_name_plural = 'Coberturas de Estadísticas'
+    
+    def __str__(self):
+        return f"{self.desde} - {self.hasta or '...'}"
@@ -0,0 +1,190 @@
+"""
+Serialización rápida (solo lectura) de listados de reservas.
+
+ReservaSerializer(many=True) recorre por cada fila todos sus campos con
+get_attribute/to_representation y vuelve a serializar el usuario, el espacio
+y los elementos anidados aunque se repitan en miles de filas. Aquí:
+- Los campos de ReservaSerializer y ReservaElementoSerializer se compilan una
+  vez a funciones que leen directo de la fila (`values()` o el __dict__ de la
+  instancia, ambos por attname), en el mismo orden y con el mismo
+  to_representation que usaría DRF.
+- Los anidados (usuario_detalle, espacio_detalle, aprobado_por_detalle y el
+  elemento_detalle de cada elemento) se leen con una consulta por tabla y se
+  serializan con su serializer real una sola vez por objeto en la petición;
+  las filas comparten ese dict.
+- Respeta ?fields= y ?expand= (CamposDinamicosMixin): los anidados que no van
+  en la respuesta no se consultan.
+
+La salida es la misma que la de ReservaSerializer; si se agrega a este un
+campo que la proyección no sabe compilar, falla al compilar en lugar de
+devolver algo distinto. La usan list, mis_reservas y pendientes.
+"""
+from collections import defaultdict
+
+from django.db.models import QuerySet
+from rest_framework import serializers
+
+from usuarios.models import Usuario
+from usuarios.serializers import UsuarioSerializer
+from espacios.models import Espacio
+from espacios.serializers import EspacioSerializer
+from elementos.serializers import ElementoSerializer
+from .models import ReservaElemento
+from .serializers import ReservaSerializer, ReservaElementoSerializer
+
+# Campo anidado -> (attname de la fila con la clave, tabla de búsqueda)
+ANIDADOS_RESERVA = {
+    'usuario_detalle': ('usuario_id', 'usuarios'),
+    'espacio_detalle': ('espacio_id', 'espacios'),
+    'aprobado_por_detalle': ('aprobado_por_id', 'usuarios'),
+    'elementos': ('id', 'elementos'),
+}
+ANIDADOS_ELEMENTO = {
+    'elemento_detalle': ('elemento_id', 'detalle_elementos'),
+}
+# Campos de relación inversa: sin filas relacionadas la lista va vacía
+LISTAS = {'elementos'}
+
+
+def _compilar_campo(modelo, nombre, campo, anidados):
+    """(attname, función(fila, tablas)) que devuelve lo mismo que el campo de DRF"""
+    if nombre in anidados:
+        attname, tabla = anidados[nombre]
+        vacio = [] if nombre in LISTAS else None
+        return attname, lambda fila, tablas: tablas[tabla].get(fila[attname], vacio)
+
+    if isinstance(campo, serializers.PrimaryKeyRelatedField):
+        attname = modelo._meta.get_field(campo.source).attname
+        return attname, lambda fila, tablas: fila[attname]
+
+    if campo.source.startswith('get_') and campo.source.endswith('_display'):
+        campo_modelo = modelo._meta.get_field(campo.source[len('get_'):-len('_display')])
+        opciones = dict(campo_modelo.flatchoices)
+        attname = campo_modelo.attname
+
+        def display(fila, tablas):
+            valor = fila[attname]
+            texto = opciones.get(valor, valor)
+            return None if texto is None else str(texto)
+        return attname, display
+
+    if '.' in campo.source or isinstance(campo, (serializers.SerializerMethodField, serializers.BaseSerializer)):
+        raise ValueError(f"La proyección de {modelo.__name__} no sabe compilar el campo '{nombre}'")
+
+    attname = modelo._meta.get_field(campo.source).attname
+    if type(campo) is serializers.CharField:
+        convertir = str
+    elif isinstance(campo, serializers.IntegerField):
+        convertir = int
+    else:
+        convertir = campo.to_representation
+
+    def getter(fila, tablas):
+        valor = fila[attname]
+        return None if valor is None else convertir(valor)
+    return attname, getter
+
+
+class Proyeccion:
+    """Campos de un serializer compilados a [(nombre, attname, función)]"""
+
+    def __init__(self, campos):
+        self.campos = campos
+
+    @classmethod
+    def compilar(cls, serializer_class, anidados):
+        modelo = serializer_class.Meta.model
+        return cls([
+            (nombre, *_compilar_campo(modelo, nombre, campo, anidados))
+            for nombre, campo in serializer_class().fields.items()
+        ])
+
+    def seleccionar(self, incluye):
+        """Proyección con solo los campos para los que `incluye(nombre)` es verdadero"""
+        if incluye is None:
+            return self
+        return Proyeccion([campo for campo in self.campos if incluye(campo[0])])
+
+    @property
+    def nombres(self):
+        return {nombre for nombre, _, _ in self.campos}
+
+    @property
+    def columnas(self):
+        return list(dict.fromkeys(['id'] + [attname for _, attname, _ in self.campos]))
+
+    def filas(self, filas, tablas):
+        campos = [(nombre, funcion) for nombre, _, funcion in self.campos]
+        return [{nombre: funcion(fila, tablas) for nombre, funcion in campos} for fila in filas]
+
+
+_compiladas = {}
+
+
+def _proyeccion(clave):
+    # Se compila al primer uso: los serializers se importan con las apps ya cargadas
+    if clave not in _compiladas:
+        _compiladas['reserva'] = Proyeccion.compilar(ReservaSerializer, ANIDADOS_RESERVA)
+        _compiladas['elemento'] = Proyeccion.compilar(ReservaElementoSerializer, ANIDADOS_ELEMENTO)
+    return _compiladas[clave]
+
+
+def _serializar_por_id(serializer_class, objetos):
+    serializer = serializer_class()
+    return {objeto.pk: serializer.to_representation(objeto) for objeto in objetos}
+
+
+def _tablas(proyeccion, filas, ids_reservas):
+    """Tablas de búsqueda {id: dict serializado} de los anidados que van en la respuesta"""
+    nombres = proyeccion.nombres
+    tablas = {}
+
+    ids_usuarios = set()
+    if 'usuario_detalle' in nombres:
+        ids_usuarios.update(fila['usuario_id'] for fila in filas)
+    if 'aprobado_por_detalle' in nombres:
+        ids_usuarios.update(fila['aprobado_por_id'] for fila in filas if fila['aprobado_por_id'] is not None)
+    if ids_usuarios:
+        tablas['usuarios'] = _serializar_por_id(
+            UsuarioSerializer, Usuario.objects.select_related('rol', 'carrera').filter(pk__in=ids_usuarios)
+        )
+    else:
+        tablas['usuarios'] = {}
+
+    if 'espacio_detalle' in nombres:
+        ids_espacios = {fila['espacio_id'] for fila in filas}
+        tablas['espacios'] = _serializar_por_id(EspacioSerializer, Espacio.objects.filter(pk__in=ids_espacios))
+
+    if 'elementos' in nombres:
+        proyeccion_elemento = _proyeccion('elemento')
+        detalle = ReservaElemento.objects.filter(reserva_id__in=ids_reservas).select_related('elemento').order_by('id')
+        elementos = defaultdict(list)
+        tablas_elemento = {'detalle_elementos': {}}
+        filas_elemento = []
+        serializer = ElementoSerializer()
+        for reserva_elemento in detalle:
+            elemento = reserva_elemento.elemento
+            if elemento.pk not in tablas_elemento['detalle_elementos']:
+                tablas_elemento['detalle_elementos'][elemento.pk] = serializer.to_representation(elemento)
+            filas_elemento.append(reserva_elemento.__dict__)
+        for fila, datos in zip(filas_elemento, proyeccion_elemento.filas(filas_elemento, tablas_elemento)):
+            elementos[fila['reserva_id']].append(datos)
+        tablas['elementos'] = elementos
+    return tablas
+
+
+def serializar(reservas, request=None):
+    """
+    Equivalente a ReservaSerializer(reservas, many=True, context={'request': request}).data.
+    `reservas` es un QuerySet (se lee con values(), sin instanciar modelos) o
+    una lista de instancias ya cargadas, como la página de la paginación.
+    """
+    proyeccion = _proyeccion('reserva').seleccionar(ReservaSerializer.seleccion(request))
+    if isinstance(reservas, QuerySet):
+        filas = list(reservas.values(*proyeccion.columnas))
+        # El detalle de elementos se filtra con la misma consulta como subconsulta
+        ids_reservas = reservas.values('id')
+    else:
+        filas = [reserva.__dict__ for reserva in reservas]
+        ids_reservas = [fila['id'] for fila in filas]
+    return proyeccion.filas(filas, _tablas(proyeccion, filas, ids_reservas))
@@ -0,0 +1,163 @@
+"""
+Generación del informe PDF de gestión de espacios.
+
+El detalle se arma en tablas del tamaño de una página que se van creando a
+medida que ReportLab las consume, por lo que nunca existe en memoria una tabla
+con todas las filas. El PDF se escribe en un archivo temporal que se envía
+por partes al cliente.
+"""
+import tempfile
+from datetime import datetime
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import letter, landscape
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+
+# Filas de detalle por tabla: aproximadamente una página carta apaisada
+FILAS_POR_BLOQUE = 28
+# Tamaño de lectura del queryset
+TAMANO_LOTE_CONSULTA = 2000
+# Hasta este tamaño el PDF se mantiene en memoria; sobre él pasa a disco
+MAX_PDF_EN_MEMORIA = 8 * 1024 * 1024
+
+ENCABEZADO_DETALLE = ['Fecha', 'Solicitante', 'Carrera', 'Espacio', 'Horario', 'Estado']
+ANCHOS_DETALLE = [70, 140, 140, 120, 90, 80]
+
+ESTILO_DETALLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.darkred),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 10),
+    ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+    ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.lightgrey]),
+])
+
+
+class _FlowablesPerezosos(list):
+    """
+    Lista que ReportLab consume desde el inicio (len, [0], del [0]) y que se
+    rellena desde un generador, manteniendo solo unos pocos elementos vivos.
+    """
+
+    def __init__(self, generador, reserva=4):
+        super().__init__()
+        self._generador = iter(generador)
+        self._reserva = reserva
+
+    def _rellenar(self):
+        while self._generador is not None and list.__len__(self) < self._reserva:
+            try:
+                self.append(next(self._generador))
+            except StopIteration:
+                self._generador = None
+
+    def __len__(self):
+        self._rellenar()
+        return list.__len__(self)
+
+    def __getitem__(self, indice):
+        self._rellenar()
+        return list.__getitem__(self, indice)
+
+
+def filas_reporte(reservas):
+    """Convierte un queryset de reservas en filas de texto, leyéndolo por lotes"""
+    for r in reservas.iterator(chunk_size=TAMANO_LOTE_CONSULTA):
+        carrera = r.usuario.carrera.nombre_carrera if r.usuario.carrera else "N/A"
+        fecha_fmt = r.fecha_reserva.strftime('%d/%m/%Y') if r.fecha_reserva else "-"
+        yield [
+            fecha_fmt,
+            f"{r.usuario.nombre} {r.usuario.apellido}",
+            carrera[:20],
+            r.espacio.nombre,
+            f"{r.hora_inicio} - {r.hora_fin}",
+            r.get_estado_display(),
+        ]
+
+
+def _tablas_detalle(filas):
+    bloque = []
+    for fila in filas:
+        bloque.append(fila)
+        if len(bloque) == FILAS_POR_BLOQUE:
+            yield _tabla_detalle(bloque)
+            bloque = []
+    if bloque:
+        yield _tabla_detalle(bloque)
+
+
+def _tabla_detalle(bloque):
+    t = Table([ENCABEZADO_DETALLE] + bloque, colWidths=ANCHOS_DETALLE, repeatRows=1)
+    t.setStyle(ESTILO_DETALLE)
+    return t
+
+
+def _formatear_periodo(start_date, end_date):
+    try:
+        fmt_start = datetime.strptime(start_date, '%Y-%m-%d').strftime('%d/%m/%Y') if start_date else "Inicio"
+        fmt_end = datetime.strptime(end_date, '%Y-%m-%d').strftime('%d/%m/%Y') if end_date else "Hoy"
+    except (TypeError, ValueError):
+        fmt_start, fmt_end = start_date, end_date
+    return fmt_start, fmt_end
+
+
+def _cabecera(resumen, start_date, end_date, area_nombre):
+    styles = getSampleStyleSheet()
+    title_style = ParagraphStyle('Title', parent=styles['Heading1'], fontSize=24, textColor=colors.darkred, spaceAfter=20, alignment=1)
+    yield Paragraph("INACAP - Informe de Gestión de Espacios", title_style)
+
+    fmt_start, fmt_end = _formatear_periodo(start_date, end_date)
+    info_text = f"<b>Generado el:</b> {datetime.now().strftime('%d/%m/%Y %H:%M')}<br/><b>Periodo:</b> {fmt_start} al {fmt_end}"
+    if area_nombre:
+        info_text += f" | <b>Área:</b> {area_nombre}"
+    yield Paragraph(info_text, styles['Normal'])
+    yield Spacer(1, 20)
+
+    total = resumen['total']
+    aprobadas = resumen['aprobada']
+    tasa_exito = (aprobadas / total * 100) if total > 0 else 0
+    data_summary = [
+        ['Total Solicitudes', 'Aprobadas', 'Rechazadas', 'Pendientes', 'Tasa Aprobación'],
+        [total, aprobadas, resumen['rechazada'], resumen['pendiente'], f"{tasa_exito:.1f}%"]
+    ]
+    t_summary = Table(data_summary, colWidths=[100, 80, 80, 80, 100])
+    t_summary.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.whitesmoke),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ('FONTSIZE', (0, 1), (-1, -1), 12),
+    ]))
+    yield t_summary
+    yield Spacer(1, 30)
+
+    yield Paragraph("Detalle de Transacciones", styles['Heading2'])
+    yield Spacer(1, 10)
+
+
+def generar_reporte_pdf(destino, resumen, filas, start_date=None, end_date=None, area_nombre=None):
+    """
+    Escribe el informe en `destino` (ruta o archivo binario).
+    `resumen` trae 'total', 'aprobada', 'rechazada' y 'pendiente'; `filas` es
+    cualquier iterable de filas de detalle (por ejemplo filas_reporte(queryset)).
+    """
+    doc = SimpleDocTemplate(destino, pagesize=landscape(letter), rightMargin=40, leftMargin=40, topMargin=40, bottomMargin=30)
+
+    def flowables():
+        yield from _cabecera(resumen, start_date, end_date, area_nombre)
+        yield from _tablas_detalle(filas)
+
+    doc.build(_FlowablesPerezosos(flowables()))
+
+
+def reporte_temporal(resumen, filas, **kwargs):
+    """Genera el informe en un archivo temporal (en memoria si es pequeño) posicionado al inicio"""
+    archivo = tempfile.SpooledTemporaryFile(max_size=MAX_PDF_EN_MEMORIA)
+    generar_reporte_pdf(archivo, resumen, filas, **kwargs)
+    archivo.seek(0)
+    return archivo
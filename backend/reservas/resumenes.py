@@ -0,0 +1,261 @@
+"""
+Resúmenes diarios (rollups) de reservas y elementos para las estadísticas.
+
+Se mantienen de forma incremental desde las señales de Reserva/ReservaElemento
+y se reconstruyen por rango con el comando `reconstruir_estadisticas`. Las
+lecturas solo los usan cuando el rango pedido está dentro de una cobertura
+registrada.
+"""
+from collections import Counter, defaultdict
+
+from django.apps import apps as apps_globales
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Sum, F, Max, Q, Value
+from django.db.models.functions import Greatest
+
+from .models import (
+    Reserva, ReservaElemento, ReservaDailyStat, ReservaElementoDailyStat, CoberturaEstadisticas
+)
+
+
+def _sumar(campo, delta):
+    # Los contadores son PositiveIntegerField: un descuento de más queda en 0 en vez de violar el CHECK
+    return Greatest(F(campo) + delta, Value(0))
+
+
+def _ajustar(modelo, campo, claves, delta):
+    """Suma `delta` a la fila de `claves` con una expresión F (atómico en la base de datos)"""
+    if not delta:
+        return
+    if modelo.objects.filter(**claves).update(**{campo: _sumar(campo, delta)}) or delta < 0:
+        return
+    try:
+        with transaction.atomic():
+            modelo.objects.create(**claves, **{campo: delta})
+    except IntegrityError:
+        # Otra transacción creó la fila entre el update y el insert
+        modelo.objects.filter(**claves).update(**{campo: _sumar(campo, delta)})
+
+
+def _ajustar_lote(modelo, campo, dimension, deltas):
+    """
+    Igual que _ajustar para muchas claves a la vez: bloquea las filas existentes,
+    las actualiza con un solo bulk_update e inserta las que faltan con bulk_create.
+    """
+    deltas = {clave: delta for clave, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    existentes = modelo.objects.select_for_update().filter(
+        fecha__in={clave[0] for clave in deltas},
+        **{f'{dimension}__in': {clave[1] for clave in deltas}},
+        estado__in={clave[3] for clave in deltas},
+    )
+    por_clave = {(f.fecha, getattr(f, dimension), f.carrera_id, f.estado): f for f in existentes}
+
+    actualizadas, nuevas = [], []
+    for clave, delta in deltas.items():
+        fila = por_clave.get(clave)
+        if fila is not None:
+            setattr(fila, campo, max(getattr(fila, campo) + delta, 0))
+            actualizadas.append(fila)
+        elif delta > 0:
+            fecha, valor, carrera_id, estado = clave
+            nuevas.append(modelo(fecha=fecha, carrera_id=carrera_id, estado=estado, **{dimension: valor, campo: delta}))
+
+    modelo.objects.bulk_update(actualizadas, [campo], batch_size=500)
+    try:
+        with transaction.atomic():
+            modelo.objects.bulk_create(nuevas, batch_size=500)
+    except IntegrityError:
+        # Otra transacción creó alguna de las filas: se resuelven de a una
+        for fila in nuevas:
+            _ajustar(modelo, campo, {
+                'fecha': fila.fecha, dimension: getattr(fila, dimension),
+                'carrera_id': fila.carrera_id, 'estado': fila.estado,
+            }, getattr(fila, campo))
+
+
+# Sobre este número de claves conviene actualizar en conjunto
+MIN_CLAVES_LOTE = 8
+
+
+def aplicar_deltas(deltas_reservas=None, deltas_elementos=None):
+    """
+    deltas_reservas: {(fecha, espacio_id, carrera_id, estado): delta}
+    deltas_elementos: {(fecha, elemento_id, carrera_id, estado): delta}
+    """
+    deltas_reservas = deltas_reservas or {}
+    deltas_elementos = deltas_elementos or {}
+    if len(deltas_reservas) + len(deltas_elementos) >= MIN_CLAVES_LOTE:
+        with transaction.atomic():
+            _ajustar_lote(ReservaDailyStat, 'total', 'espacio_id', deltas_reservas)
+            _ajustar_lote(ReservaElementoDailyStat, 'cantidad', 'elemento_id', deltas_elementos)
+        return
+
+    for (fecha, espacio_id, carrera_id, estado), delta in deltas_reservas.items():
+        _ajustar(ReservaDailyStat, 'total', {
+            'fecha': fecha, 'espacio_id': espacio_id, 'carrera_id': carrera_id, 'estado': estado,
+        }, delta)
+    for (fecha, elemento_id, carrera_id, estado), delta in deltas_elementos.items():
+        _ajustar(ReservaElementoDailyStat, 'cantidad', {
+            'fecha': fecha, 'elemento_id': elemento_id, 'carrera_id': carrera_id, 'estado': estado,
+        }, delta)
+
+
+# --- Mantenimiento incremental (llamado desde reservas/signals.py) ---
+# La carrera de la clave es Reserva.carrera_estadisticas, la misma con que se
+# contó la reserva, y no la carrera actual del usuario.
+
+def reserva_guardada(reserva, previos, creada):
+    nueva = (reserva.fecha_reserva, reserva.espacio_id, reserva.carrera_estadisticas_id, reserva.estado)
+    deltas = Counter({nueva: 1})
+    deltas_elementos = Counter()
+
+    if not creada:
+        vieja = (
+            previos.get('fecha_reserva'), previos.get('espacio_id'),
+            previos.get('carrera_estadisticas_id', reserva.carrera_estadisticas_id), previos.get('estado'),
+        )
+        deltas[vieja] -= 1
+        # Las unidades de sus elementos se mueven a la nueva clave
+        for elemento_id, cantidad in reserva.elementos.values_list('elemento_id', 'cantidad_solicitada'):
+            deltas_elementos[(vieja[0], elemento_id, vieja[2], vieja[3])] -= cantidad
+            deltas_elementos[(nueva[0], elemento_id, nueva[2], nueva[3])] += cantidad
+
+    aplicar_deltas(deltas, deltas_elementos)
+
+
+def reserva_eliminada(reserva):
+    aplicar_deltas({(reserva.fecha_reserva, reserva.espacio_id, reserva.carrera_estadisticas_id, reserva.estado): -1})
+
+
+def _clave_reserva(reserva_id):
+    return Reserva.objects.filter(pk=reserva_id).values_list(
+        'fecha_reserva', 'carrera_estadisticas_id', 'estado').first()
+
+
+def elemento_guardado(reserva_elemento, previos, creado):
+    clave = _clave_reserva(reserva_elemento.reserva_id)
+    if clave is None:
+        return
+    fecha, carrera_id, estado = clave
+
+    deltas = Counter({(fecha, reserva_elemento.elemento_id, carrera_id, estado): reserva_elemento.cantidad_solicitada})
+    if not creado:
+        elemento_previo = previos.get('elemento_id', reserva_elemento.elemento_id)
+        deltas[(fecha, elemento_previo, carrera_id, estado)] -= previos.get('cantidad_solicitada', 0)
+    aplicar_deltas(deltas_elementos=deltas)
+
+
+def elemento_eliminado(reserva_elemento):
+    # Al borrar una reserva en cascada sus elementos se eliminan antes que ella,
+    # así que la fila de la reserva todavía se puede leer.
+    clave = _clave_reserva(reserva_elemento.reserva_id)
+    if clave is None:
+        return
+    fecha, carrera_id, estado = clave
+    aplicar_deltas(deltas_elementos={
+        (fecha, reserva_elemento.elemento_id, carrera_id, estado): -reserva_elemento.cantidad_solicitada
+    })
+
+
+# --- Reconstrucción y cobertura ---
+
+def reconstruir(desde, hasta=None, apps=None):
+    """
+    Recalcula los resúmenes de [desde, hasta] a partir de las reservas y registra
+    la cobertura. Sin `hasta`, cubre hasta la última fecha con reservas y queda
+    abierta: desde ahí las señales mantienen los resúmenes al día.
+    `apps` permite usarla desde una migración con los modelos históricos.
+    """
+    apps = apps or apps_globales
+    Reserva = apps.get_model('reservas', 'Reserva')
+    ReservaElemento = apps.get_model('reservas', 'ReservaElemento')
+    ReservaDailyStat = apps.get_model('reservas', 'ReservaDailyStat')
+    ReservaElementoDailyStat = apps.get_model('reservas', 'ReservaElementoDailyStat')
+    CoberturaEstadisticas = apps.get_model('reservas', 'CoberturaEstadisticas')
+
+    fin = hasta or Reserva.objects.aggregate(ultima=Max('fecha_reserva'))['ultima'] or desde
+
+    with transaction.atomic():
+        ReservaDailyStat.objects.filter(fecha__gte=desde, fecha__lte=fin).delete()
+        ReservaElementoDailyStat.objects.filter(fecha__gte=desde, fecha__lte=fin).delete()
+
+        filas = (
+            Reserva.objects.filter(fecha_reserva__range=[desde, fin]).order_by()
+            .values('fecha_reserva', 'espacio_id', 'carrera_estadisticas_id', 'estado')
+            .annotate(total=Count('id'))
+        )
+        ReservaDailyStat.objects.bulk_create(
+            (
+                ReservaDailyStat(
+                    fecha=fila['fecha_reserva'], espacio_id=fila['espacio_id'],
+                    carrera_id=fila['carrera_estadisticas_id'], estado=fila['estado'], total=fila['total'],
+                )
+                for fila in filas.iterator(chunk_size=5000)
+            ),
+            batch_size=1000,
+        )
+
+        filas_elementos = (
+            ReservaElemento.objects.filter(reserva__fecha_reserva__range=[desde, fin]).order_by()
+            .values('reserva__fecha_reserva', 'elemento_id', 'reserva__carrera_estadisticas_id', 'reserva__estado')
+            .annotate(cantidad=Sum('cantidad_solicitada'))
+        )
+        ReservaElementoDailyStat.objects.bulk_create(
+            (
+                ReservaElementoDailyStat(
+                    fecha=fila['reserva__fecha_reserva'], elemento_id=fila['elemento_id'],
+                    carrera_id=fila['reserva__carrera_estadisticas_id'], estado=fila['reserva__estado'],
+                    cantidad=fila['cantidad'],
+                )
+                for fila in filas_elementos.iterator(chunk_size=5000)
+            ),
+            batch_size=1000,
+        )
+
+        CoberturaEstadisticas.objects.create(desde=desde, hasta=hasta)
+    return fin
+
+
+def rango_cubierto(desde, hasta):
+    return CoberturaEstadisticas.objects.filter(
+        Q(hasta__isnull=True) | Q(hasta__gte=hasta), desde__lte=desde
+    ).exists()
+
+
+# --- Lectura ---
+
+def _filtro(desde, hasta, carrera_id=None, area=None):
+    filtro = Q(fecha__range=[desde, hasta])
+    if carrera_id:
+        filtro &= Q(carrera_id=carrera_id)
+    if area:
+        filtro &= Q(carrera__area=area)
+    return filtro
+
+
+def series(desde, hasta, carrera_id=None, area=None):
+    """
+    Lee los resúmenes del rango en una sola consulta y arma en memoria los
+    totales por estado, carrera, espacio y día.
+    """
+    por_estado, carreras, espacios, dias = Counter(), Counter(), Counter(), defaultdict(int)
+    filas = ReservaDailyStat.objects.filter(_filtro(desde, hasta, carrera_id, area)).values_list(
+        'fecha', 'espacio__nombre', 'carrera__nombre_carrera', 'estado', 'total')
+    for fecha, espacio, carrera, estado, total in filas:
+        if not total:
+            continue
+        por_estado[estado] += total
+        carreras[carrera] += total
+        espacios[espacio] += total
+        dias[fecha] += total
+    return por_estado, carreras, espacios, dias
+
+
+def top_elementos(desde, hasta, carrera_id=None, area=None, n=5):
+    return (
+        ReservaElementoDailyStat.objects.filter(_filtro(desde, hasta, carrera_id, area))
+        .values('elemento__nombre').annotate(total_solicitado=Sum('cantidad'))
+        .filter(total_solicitado__gt=0).order_by('-total_solicitado')[:n]
+    )
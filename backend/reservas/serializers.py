@@ -1,8 +1,16 @@
+from datetime import date
+
+from django.urls import reverse
 from rest_framework import serializers
-from .models import Reserva, ReservaElemento
+from .models import Reserva, ReservaElemento, ReporteJob, SerieReserva
+from .conflictos import ESTADOS_OCUPAN_ESPACIO, buscar_conflictos
+from . import inventario, series
+from espacios.models import Espacio
 from usuarios.serializers import UsuarioSerializer
 from espacios.serializers import EspacioSerializer
 from elementos.serializers import ElementoSerializer
+from config.serializers import CamposDinamicosMixin
+from notificaciones import eventos
 
 class ReservaElementoSerializer(serializers.ModelSerializer):
     elemento_detalle = ElementoSerializer(source='elemento', read_only=True)
@@ -11,7 +19,12 @@ class ReservaElementoSerializer(serializers.ModelSerializer):
         model = ReservaElemento
         fields = ('id', 'elemento', 'elemento_detalle', 'cantidad_solicitada', 'cantidad_asignada')
 
-class ReservaSerializer(serializers.ModelSerializer):
+
+# Campos que definen qué franja ocupa una reserva
+CAMPOS_HORARIO = ('espacio', 'fecha_reserva', 'hora_inicio', 'hora_fin')
+
+
+class ReservaSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     usuario_detalle = UsuarioSerializer(source='usuario', read_only=True)
     espacio_detalle = EspacioSerializer(source='espacio', read_only=True)
     aprobado_por_detalle = UsuarioSerializer(source='aprobado_por', read_only=True)
@@ -20,10 +33,98 @@ class ReservaSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Reserva
-        fields = '__all__'
+        # carrera_estadisticas es interna de los resúmenes (reservas/resumenes.py)
+        exclude = ('carrera_estadisticas',)
         # AJUSTE DE SEGURIDAD: Agregamos 'motivo_rechazo' a solo lectura
         # para que nadie pueda manipularlo desde el frontend.
-        read_only_fields = ('fecha_creacion', 'fecha_aprobacion', 'aprobado_por', 'motivo_rechazo')
+        read_only_fields = ('fecha_creacion', 'fecha_aprobacion', 'aprobado_por', 'motivo_rechazo', 'serie')
+        # Anidados que se omiten al usar ?fields= / ?expand= (ver CamposDinamicosMixin)
+        expandibles = ('usuario_detalle', 'espacio_detalle', 'aprobado_por_detalle', 'elementos')
+
+    def _resultante(self, attrs):
+        """Horario y estado que tendrá la reserva tras el PUT/PATCH"""
+        return {campo: attrs.get(campo, getattr(self.instance, campo)) for campo in CAMPOS_HORARIO + ('estado',)}
+
+    def _ocupa_otro_horario(self, attrs):
+        """True si la edición mueve el horario de una reserva activa o vuelve a activarla"""
+        resultante = self._resultante(attrs)
+        if resultante['estado'] not in ESTADOS_OCUPAN_ESPACIO:
+            return False
+        if self.instance.estado not in ESTADOS_OCUPAN_ESPACIO:
+            return True
+        return any(resultante[campo] != getattr(self.instance, campo) for campo in CAMPOS_HORARIO)
+
+    def validate(self, attrs):
+        # Editar no puede dejar la reserva encima de otra (ni de una serie pendiente)
+        if self.instance is not None and self._ocupa_otro_horario(attrs):
+            resultante = self._resultante(attrs)
+            validar_horario(resultante)
+            validar_disponibilidad(resultante, excluir_id=self.instance.pk)
+        return attrs
+
+    def update(self, instance, validated_data):
+        if not self._ocupa_otro_horario(validated_data):
+            return super().update(instance, validated_data)
+        guardar = super().update
+
+        def actualizar():
+            # Mismo bloqueo que al crear: dos ediciones simultáneas no validan a la vez
+            resultante = self._resultante(validated_data)
+            list(Espacio.objects.select_for_update().filter(pk=resultante['espacio'].pk).values_list('pk'))
+            validar_disponibilidad(resultante, excluir_id=instance.pk)
+            # Sus elementos también tienen que caber en la nueva franja
+            try:
+                inventario.verificar(instance.pk, resultante['fecha_reserva'], resultante['hora_inicio'], resultante['hora_fin'])
+            except inventario.StockInsuficiente as exc:
+                raise error_stock(exc)
+            return guardar(instance, validated_data)
+
+        return inventario.con_reintentos(actualizar)
+
+def agrupar_elementos(value):
+    """Lista de {'elemento_id', 'cantidad'} -> {elemento_id: cantidad}, sumando repetidos"""
+    solicitudes = {}
+    for elemento_data in value:
+        # Asegúrate que el frontend envíe 'elemento_id' y 'cantidad'
+        elemento_id = elemento_data.get('elemento_id') or elemento_data.get('id') # Pequeña protección por si envían 'id'
+        try:
+            elemento_id, cantidad = int(elemento_id), int(elemento_data.get('cantidad'))
+        except (TypeError, ValueError):
+            raise serializers.ValidationError("Cada elemento debe indicar 'elemento_id' y 'cantidad'")
+        if cantidad <= 0:
+            raise serializers.ValidationError("La cantidad de cada elemento debe ser mayor a cero")
+        solicitudes[elemento_id] = solicitudes.get(elemento_id, 0) + cantidad
+    return solicitudes
+
+
+def validar_horario(attrs):
+    # Validar que hora_fin > hora_inicio
+    if attrs['hora_fin'] <= attrs['hora_inicio']:
+        raise serializers.ValidationError("La hora de fin debe ser posterior a la hora de inicio")
+    
+    # Validar que la fecha no sea pasada
+    if attrs['fecha_reserva'] < date.today():
+        raise serializers.ValidationError("No se pueden crear reservas en fechas pasadas")
+
+
+def validar_disponibilidad(attrs, excluir_id=None):
+    """El espacio no puede estar ocupado en ese horario por otra reserva activa"""
+    conflictos = buscar_conflictos(
+        attrs['espacio'].id, attrs['fecha_reserva'], attrs['hora_inicio'], attrs['hora_fin'], excluir_id
+    )
+    # Las series pendientes también ocupan el horario aunque no tengan filas
+    bloque = {**attrs, 'espacio': attrs['espacio'].id}
+    if conflictos or series.series_en_conflicto([bloque])[0]:
+        raise serializers.ValidationError("El espacio ya tiene una reserva en ese horario")
+
+
+def error_stock(exc):
+    """ValidationError con un mensaje por elemento de un StockInsuficiente"""
+    return serializers.ValidationError({'elementos': [
+        f"Elemento {elemento_id}: se solicitaron {d['solicitado']} y hay {d['disponible']} disponibles en ese horario"
+        for elemento_id, d in exc.faltantes.items()
+    ]})
+
 
 class ReservaCreateSerializer(serializers.ModelSerializer):
     elementos = serializers.ListField(
@@ -36,29 +137,129 @@ class ReservaCreateSerializer(serializers.ModelSerializer):
         model = Reserva
         fields = ('espacio', 'fecha_reserva', 'hora_inicio', 'hora_fin', 'motivo', 'elementos')
     
+    def validate_elementos(self, value):
+        return agrupar_elementos(value)
+    
     def validate(self, attrs):
-        # Validar que hora_fin > hora_inicio
-        if attrs['hora_fin'] <= attrs['hora_inicio']:
-            raise serializers.ValidationError("La hora de fin debe ser posterior a la hora de inicio")
+        validar_horario(attrs)
         
-        # Validar que la fecha no sea pasada
-        from datetime import date
-        if attrs['fecha_reserva'] < date.today():
-            raise serializers.ValidationError("No se pueden crear reservas en fechas pasadas")
+        # Validar que el espacio no esté ocupado en ese horario
+        validar_disponibilidad(attrs)
         
         return attrs
     
     def create(self, validated_data):
-        elementos_data = validated_data.pop('elementos', [])
-        reserva = Reserva.objects.create(**validated_data)
+        solicitudes = validated_data.pop('elementos', {})
         
-        # Crear elementos asociados
-        for elemento_data in elementos_data:
-            # Asegúrate que el frontend envíe 'elemento_id' y 'cantidad'
-            ReservaElemento.objects.create(
-                reserva=reserva,
-                elemento_id=elemento_data.get('elemento_id') or elemento_data.get('id'), # Pequeña protección por si envían 'id'
-                cantidad_solicitada=elemento_data['cantidad']
-            )
+        def crear():
+            # Bloqueamos la fila del espacio para que dos solicitudes simultáneas
+            # no pasen la validación de solape al mismo tiempo.
+            list(Espacio.objects.select_for_update().filter(pk=validated_data['espacio'].pk).values_list('pk'))
+            validar_disponibilidad(validated_data)
+            
+            reserva = Reserva.objects.create(**validated_data)
+            
+            # Crear elementos asociados comprometiendo su stock en el horario
+            try:
+                inventario.asignar(reserva, solicitudes)
+            except inventario.StockInsuficiente as exc:
+                raise error_stock(exc)
+            eventos.reserva_creada(reserva)
+            return reserva
         
-        return reserva
\ No newline at end of file
+        return inventario.con_reintentos(crear)
+
+
+class ReservaLoteItemSerializer(serializers.Serializer):
+    """Una reserva dentro de POST /api/reservas/bulk/ (los choques se validan en conjunto en lote.py)"""
+    espacio = serializers.IntegerField()
+    fecha_reserva = serializers.DateField()
+    hora_inicio = serializers.TimeField()
+    hora_fin = serializers.TimeField()
+    motivo = serializers.CharField()
+    elementos = serializers.ListField(child=serializers.DictField(), required=False)
+    
+    def validate_elementos(self, value):
+        return agrupar_elementos(value)
+    
+    def validate(self, attrs):
+        validar_horario(attrs)
+        return attrs
+
+
+class BloqueHorarioSerializer(serializers.Serializer):
+    """Bloque candidato para la verificación de conflictos en lote"""
+    espacio = serializers.IntegerField()
+    fecha_reserva = serializers.DateField()
+    hora_inicio = serializers.TimeField()
+    hora_fin = serializers.TimeField()
+    
+    def validate(self, attrs):
+        if attrs['hora_fin'] <= attrs['hora_inicio']:
+            raise serializers.ValidationError("La hora de fin debe ser posterior a la hora de inicio")
+        return attrs
+
+
+class SerieReservaSerializer(serializers.ModelSerializer):
+    espacio_nombre = serializers.CharField(source='espacio.nombre', read_only=True)
+    estado_display = serializers.CharField(source='get_estado_display', read_only=True)
+    
+    class Meta:
+        model = SerieReserva
+        fields = '__all__'
+        read_only_fields = (
+            'usuario', 'estado', 'motivo_rechazo', 'aprobado_por', 'fecha_creacion', 'fecha_aprobacion'
+        )
+    
+    def validate_dias_semana(self, value):
+        if not value or any(not isinstance(dia, int) or not 0 <= dia <= 6 for dia in value):
+            raise serializers.ValidationError("Debe indicar al menos un día, de 0 (lunes) a 6 (domingo)")
+        return sorted(set(value))
+    
+    def validate_excepciones(self, value):
+        try:
+            return sorted({date.fromisoformat(fecha).isoformat() for fecha in value})
+        except (TypeError, ValueError):
+            raise serializers.ValidationError("Las excepciones deben ser fechas con formato YYYY-MM-DD")
+    
+    def validate_intervalo_semanas(self, value):
+        if value < 1:
+            raise serializers.ValidationError("Debe ser al menos 1")
+        return value
+    
+    def validate(self, attrs):
+        validar_horario({**attrs, 'fecha_reserva': attrs['fecha_inicio']})
+        if attrs['fecha_fin'] < attrs['fecha_inicio']:
+            raise serializers.ValidationError("La fecha de término debe ser posterior a la de inicio")
+        if (attrs['fecha_fin'] - attrs['fecha_inicio']).days >= series.MAX_DIAS_SERIE:
+            raise serializers.ValidationError(f"La serie no puede abarcar más de {series.MAX_DIAS_SERIE} días")
+        return attrs
+    
+    def create(self, validated_data):
+        try:
+            return series.crear(**validated_data)
+        except series.ConflictoSerie as exc:
+            raise serializers.ValidationError({'conflictos': formatear_conflictos(exc.conflictos)})
+
+
+def formatear_conflictos(conflictos):
+    return [
+        {'fecha': c['fecha'].isoformat(), 'reservas': c['reservas'], 'series': c['series']}
+        for c in conflictos
+    ]
+
+
+class ReporteJobSerializer(serializers.ModelSerializer):
+    url_descarga = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ReporteJob
+        fields = ['id', 'estado', 'parametros', 'fecha_creacion', 'fecha_inicio', 'fecha_fin', 'error', 'url_descarga']
+        read_only_fields = fields
+
+    def get_url_descarga(self, obj):
+        if obj.estado != 'completado':
+            return None
+        ruta = reverse('reserva-descargar-reporte', kwargs={'job_id': obj.pk})
+        request = self.context.get('request')
+        return request.build_absolute_uri(ruta) if request else ruta
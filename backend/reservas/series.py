@@ -0,0 +1,290 @@
+"""
+Series de reservas recurrentes (SerieReserva).
+
+Una serie describe sus ocurrencias con una regla semanal (días, intervalo,
+fecha de término y excepciones) en lugar de guardarlas como filas:
+- `expandir` las genera bajo demanda solo para la ventana consultada.
+- Mientras la serie está pendiente, sus ocurrencias bloquean el horario igual
+  que una reserva pendiente (ver `series_en_conflicto`), sin existir en la tabla.
+- Al aprobarla se materializan de una vez como Reservas aprobadas (bulk_create)
+  dentro de una transacción; rechazarla no crea ni toca ninguna fila.
+"""
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.utils import timezone
+
+from config import cache as cache_lectura
+from espacios.models import Espacio
+from .models import Reserva, SerieReserva, ElementoAsignacion
+from .conflictos import ESTADOS_OCUPAN_ESPACIO, _consulta_solapes
+from . import disponibilidad, inventario, lote, resumenes, tiempo_real
+from auditoria import signals as auditoria
+from notificaciones import eventos
+
+# Una serie no puede abarcar más de un año
+MAX_DIAS_SERIE = 366
+
+
+class ConflictoSerie(Exception):
+    """`conflictos` es la lista devuelta por conflictos_serie"""
+
+    def __init__(self, conflictos):
+        super().__init__("La serie choca con reservas existentes")
+        self.conflictos = conflictos
+
+
+class SerieNoPendiente(Exception):
+    pass
+
+
+def expandir(serie, desde=None, hasta=None):
+    """
+    Genera las fechas de la serie dentro de [desde, hasta] (por defecto, toda
+    la serie), en orden y sin las excepciones. Las semanas se cuentan desde el
+    lunes de fecha_inicio, así `intervalo_semanas=2` alterna semanas completas.
+    """
+    desde = max(desde or serie.fecha_inicio, serie.fecha_inicio)
+    hasta = min(hasta or serie.fecha_fin, serie.fecha_fin)
+    dias = set(serie.dias_semana)
+    excluidas = set(serie.excepciones)
+    intervalo = serie.intervalo_semanas or 1
+    lunes_inicial = serie.fecha_inicio - timedelta(days=serie.fecha_inicio.weekday())
+
+    fecha = desde
+    while fecha <= hasta:
+        semana = (fecha - lunes_inicial).days // 7
+        if semana % intervalo == 0 and fecha.weekday() in dias and fecha.isoformat() not in excluidas:
+            yield fecha
+        fecha += timedelta(days=1)
+
+
+def ocupacion_series(espacio_ids, fechas, hora_min, hora_max, excluir_serie_id=None):
+    """
+    {(espacio_id, fecha): [(inicio, fin, serie_id), ...]} de las series pendientes
+    que tocan la ventana [hora_min, hora_max) en esas fechas. Una consulta; las
+    ocurrencias se expanden en memoria solo entre la menor y la mayor fecha pedida.
+    """
+    fechas = set(fechas)
+    if not fechas:
+        return {}
+    desde, hasta = min(fechas), max(fechas)
+    pendientes = SerieReserva.objects.filter(
+        espacio_id__in=espacio_ids,
+        estado='pendiente',
+        fecha_inicio__lte=hasta,
+        fecha_fin__gte=desde,
+        hora_inicio__lt=hora_max,
+        hora_fin__gt=hora_min,
+    )
+    if excluir_serie_id:
+        pendientes = pendientes.exclude(pk=excluir_serie_id)
+
+    ocupadas = defaultdict(list)
+    for serie in pendientes:
+        for fecha in expandir(serie, desde, hasta):
+            if fecha in fechas:
+                ocupadas[(serie.espacio_id, fecha)].append((serie.hora_inicio, serie.hora_fin, serie.pk))
+    return ocupadas
+
+
+def series_en_conflicto(bloques):
+    """
+    Como conflictos.verificar_bloques, pero contra las series pendientes:
+    devuelve, en el orden de `bloques`, los IDs de series que chocan con cada uno.
+    """
+    if not bloques:
+        return []
+    ocupadas = ocupacion_series(
+        {b['espacio'] for b in bloques},
+        {b['fecha_reserva'] for b in bloques},
+        min(b['hora_inicio'] for b in bloques),
+        max(b['hora_fin'] for b in bloques),
+    )
+    return [
+        [
+            serie_id for inicio, fin, serie_id in ocupadas.get((b['espacio'], b['fecha_reserva']), ())
+            if inicio < b['hora_fin'] and fin > b['hora_inicio']
+        ]
+        for b in bloques
+    ]
+
+
+def conflictos_serie(serie, desde=None):
+    """
+    Choques de todas las ocurrencias de la serie (desde `desde`) con reservas
+    activas y con otras series pendientes. Dos consultas en total.
+    Devuelve [{'fecha', 'reservas': [...], 'series': [...]}] solo con las fechas que chocan.
+    """
+    fechas = list(expandir(serie, desde))
+    if not fechas:
+        return []
+
+    reservas = defaultdict(list)
+    filas = _consulta_solapes([serie.espacio_id], fechas, serie.hora_inicio, serie.hora_fin)
+    for reserva_id, _, fecha, _, _ in filas:
+        reservas[fecha].append(reserva_id)
+    otras = ocupacion_series([serie.espacio_id], fechas, serie.hora_inicio, serie.hora_fin, excluir_serie_id=serie.pk)
+
+    conflictos = []
+    for fecha in fechas:
+        choques_series = [serie_id for _, _, serie_id in otras.get((serie.espacio_id, fecha), ())]
+        if reservas[fecha] or choques_series:
+            conflictos.append({'fecha': fecha, 'reservas': reservas[fecha], 'series': choques_series})
+    return conflictos
+
+
+def _bloquear(serie_id):
+    serie = SerieReserva.objects.select_for_update().get(pk=serie_id)
+    list(Espacio.objects.select_for_update().filter(pk=serie.espacio_id).values_list('pk'))
+    return serie
+
+
+def crear(**datos):
+    """Crea una serie pendiente si ninguna de sus ocurrencias choca (lanza ConflictoSerie)"""
+    def crear_():
+        list(Espacio.objects.select_for_update().filter(pk=datos['espacio'].pk).values_list('pk'))
+        serie = SerieReserva(**datos)
+        conflictos = conflictos_serie(serie)
+        if conflictos:
+            raise ConflictoSerie(conflictos)
+        serie.save()
+        return serie
+
+    return inventario.con_reintentos(crear_)
+
+
+def aprobar(serie_id, usuario):
+    """
+    Aprueba la serie completa en una transacción: vuelve a verificar los choques
+    de todas las ocurrencias futuras y las inserta como Reservas aprobadas.
+    Devuelve la serie y la cantidad de reservas creadas.
+    """
+    def aprobar_():
+        serie = _bloquear(serie_id)
+        if serie.estado != 'pendiente':
+            raise SerieNoPendiente(serie.get_estado_display())
+
+        hoy = timezone.localdate()
+        conflictos = conflictos_serie(serie, desde=hoy)
+        if conflictos:
+            raise ConflictoSerie(conflictos)
+
+        ahora = timezone.now()
+        items = {
+            indice: {
+                'espacio': serie.espacio_id, 'fecha_reserva': fecha,
+                'hora_inicio': serie.hora_inicio, 'hora_fin': serie.hora_fin, 'motivo': serie.motivo,
+            }
+            for indice, fecha in enumerate(expandir(serie, desde=hoy))
+        }
+        creadas = lote.insertar(
+            serie.usuario, items, estado='aprobada', aprobado_por=usuario, fecha_aprobacion=ahora, serie=serie,
+        ) if items else {}
+
+        serie.estado = 'aprobada'
+        serie.aprobado_por = usuario
+        serie.fecha_aprobacion = ahora
+        serie.save(update_fields=['estado', 'aprobado_por', 'fecha_aprobacion'])
+        eventos.serie_resuelta(serie, len(creadas))
+        return serie, len(creadas)
+
+    return inventario.con_reintentos(aprobar_)
+
+
+def rechazar(serie_id, motivo=None):
+    """Rechaza la serie pendiente; como sus ocurrencias no existen, es una sola fila"""
+    def rechazar_():
+        serie = _bloquear(serie_id)
+        if serie.estado != 'pendiente':
+            raise SerieNoPendiente(serie.get_estado_display())
+        serie.estado = 'rechazada'
+        serie.motivo_rechazo = motivo or serie.motivo_rechazo
+        serie.save(update_fields=['estado', 'motivo_rechazo'])
+        eventos.serie_resuelta(serie)
+        return serie
+
+    return inventario.con_reintentos(rechazar_)
+
+
+def _cancelar_ocurrencias(reservas):
+    """
+    Cancela con un UPDATE las ocurrencias dadas. Como update() no emite señales,
+    se ajustan aquí ocupaciones, resúmenes, stock comprometido y auditoría.
+    """
+    canceladas = list(
+        reservas.filter(estado__in=ESTADOS_OCUPAN_ESPACIO)
+        .only('id', 'usuario_id', 'espacio_id', 'fecha_reserva', 'hora_inicio', 'hora_fin', 'estado', 'carrera_estadisticas_id')
+    )
+    if not canceladas:
+        return 0
+    ids = [r.pk for r in canceladas]
+    Reserva.objects.filter(id__in=ids).update(estado='cancelada', fecha_actualizacion=timezone.now())
+    ElementoAsignacion.objects.filter(reserva_elemento__reserva_id__in=ids).delete()
+
+    deltas = Counter()
+    previos = {}
+    for r in canceladas:
+        deltas[(r.fecha_reserva, r.espacio_id, r.carrera_estadisticas_id, r.estado)] -= 1
+        deltas[(r.fecha_reserva, r.espacio_id, r.carrera_estadisticas_id, 'cancelada')] += 1
+        previos[r.pk] = {'estado': r.estado}
+        r.estado = 'cancelada'
+    disponibilidad.recalcular_dias({(r.espacio_id, r.fecha_reserva) for r in canceladas})
+    resumenes.aplicar_deltas(deltas)
+    auditoria.registrar_lote(canceladas, previos, campos=['estado'])
+    cache_lectura.invalidar('reservas')
+    tiempo_real.publicar([
+        tiempo_real.evento_reserva(r, 'reserva_cancelada', previos[r.pk]['estado']) for r in canceladas
+    ])
+    return len(canceladas)
+
+
+def cancelar(serie_id):
+    """Cancela la serie y sus ocurrencias futuras (las pasadas quedan como registro)"""
+    def cancelar_():
+        serie = _bloquear(serie_id)
+        if serie.estado not in ('pendiente', 'aprobada'):
+            raise SerieNoPendiente(serie.get_estado_display())
+        canceladas = _cancelar_ocurrencias(serie.ocurrencias.filter(fecha_reserva__gte=timezone.localdate()))
+        serie.estado = 'cancelada'
+        serie.save(update_fields=['estado'])
+        return serie, canceladas
+
+    return inventario.con_reintentos(cancelar_)
+
+
+def excluir(serie_id, fecha):
+    """Agrega `fecha` a las excepciones; si la serie ya está aprobada, cancela esa ocurrencia"""
+    def excluir_():
+        serie = _bloquear(serie_id)
+        if serie.estado not in ('pendiente', 'aprobada'):
+            raise SerieNoPendiente(serie.get_estado_display())
+        if fecha.isoformat() not in serie.excepciones:
+            serie.excepciones = sorted(serie.excepciones + [fecha.isoformat()])
+            serie.save(update_fields=['excepciones'])
+        _cancelar_ocurrencias(serie.ocurrencias.filter(fecha_reserva=fecha))
+        return serie
+
+    return inventario.con_reintentos(excluir_)
+
+
+def ocurrencias(serie, desde, hasta):
+    """
+    Ocurrencias de la ventana: las generadas por la regla y, si la serie está
+    aprobada, la reserva materializada de cada fecha (una consulta).
+    """
+    materializadas = {}
+    if serie.estado != 'pendiente':
+        materializadas = {
+            fecha: (reserva_id, estado)
+            for reserva_id, fecha, estado in serie.ocurrencias.filter(fecha_reserva__range=(desde, hasta))
+            .values_list('id', 'fecha_reserva', 'estado')
+        }
+    resultado = []
+    for fecha in expandir(serie, desde, hasta):
+        reserva_id, estado = materializadas.get(fecha, (None, serie.estado))
+        resultado.append({
+            'fecha': fecha, 'hora_inicio': serie.hora_inicio, 'hora_fin': serie.hora_fin,
+            'reserva': reserva_id, 'estado': estado,
+        })
+    return resultado
@@ -0,0 +1,95 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from config import cache as cache_lectura
+from .models import Reserva, ReservaElemento
+from . import disponibilidad, inventario, resumenes, tiempo_real
+from .conflictos import ESTADOS_OCUPAN_ESPACIO
+
+# Campos que afectan la ocupación del espacio
+CAMPOS_HORARIO = ('espacio_id', 'fecha_reserva', 'hora_inicio', 'hora_fin', 'estado')
+# Campos que forman la clave de los resúmenes diarios (la carrera cambia con el solicitante)
+CAMPOS_RESUMEN = ('espacio_id', 'fecha_reserva', 'estado', 'carrera_estadisticas_id', 'usuario_id')
+CAMPOS_SEGUIMIENTO = tuple(dict.fromkeys(CAMPOS_HORARIO + CAMPOS_RESUMEN))
+
+CAMPOS_ELEMENTO = ('elemento_id', 'cantidad_solicitada', 'cantidad_asignada')
+
+
+def _campos_cambiados(instance, campos):
+    previos = getattr(instance, '_valores_db', {})
+    return {campo for campo in campos if previos.get(campo) != getattr(instance, campo)}
+
+
+# Cualquier cambio (también motivo u horario) puede alterar las estadísticas cacheadas
+@receiver([post_save, post_delete], sender=Reserva)
+@receiver([post_save, post_delete], sender=ReservaElemento)
+def reservas_modificadas(sender, instance, **kwargs):
+    cache_lectura.invalidar('reservas')
+
+
+@receiver(post_save, sender=Reserva)
+def reserva_guardada(sender, instance, created, **kwargs):
+    previos = getattr(instance, '_valores_db', {})
+    cambios = _campos_cambiados(instance, CAMPOS_SEGUIMIENTO)
+    if not created and not cambios:
+        return
+
+    if created or cambios.intersection(CAMPOS_HORARIO):
+        dias = {(instance.espacio_id, instance.fecha_reserva)}
+        if previos.get('espacio_id') and previos.get('fecha_reserva'):
+            dias.add((previos['espacio_id'], previos['fecha_reserva']))
+        disponibilidad.recalcular_dias(dias)
+
+    if created or cambios.intersection(CAMPOS_RESUMEN):
+        resumenes.reserva_guardada(instance, previos, created)
+
+    if not created:
+        _actualizar_asignaciones(instance, previos, cambios)
+
+    if created:
+        tiempo_real.publicar([tiempo_real.evento_reserva(instance, 'reserva_creada')])
+    elif 'estado' in cambios and instance.estado in tiempo_real.TIPO_POR_ESTADO:
+        tipo = tiempo_real.TIPO_POR_ESTADO[instance.estado]
+        tiempo_real.publicar([tiempo_real.evento_reserva(instance, tipo, previos.get('estado'))])
+    elif cambios.intersection(CAMPOS_HORARIO):
+        # Cambió el espacio o el horario: el calendario tiene que liberar la franja anterior
+        tiempo_real.publicar([tiempo_real.evento_reserva(instance, 'reserva_modificada', previos.get('estado'))])
+
+    # La instancia queda sincronizada con la base de datos para el próximo save()
+    instance.sincronizar_valores_db(CAMPOS_SEGUIMIENTO)
+
+
+def _actualizar_asignaciones(instance, previos, cambios):
+    """
+    Libera el stock de elementos al dejar de estar activa, lo vuelve a
+    comprometer al reactivarse, o lo mueve si cambia el horario. El stock se
+    verifica antes de guardar (ReservaSerializer.update).
+    """
+    if 'estado' in cambios and instance.estado not in ESTADOS_OCUPAN_ESPACIO:
+        inventario.liberar(instance.pk)
+    elif 'estado' in cambios and previos.get('estado') not in ESTADOS_OCUPAN_ESPACIO:
+        inventario.reactivar(instance)
+    elif cambios.intersection(('fecha_reserva', 'hora_inicio', 'hora_fin')):
+        inventario.mover(instance)
+
+
+@receiver(post_delete, sender=Reserva)
+def reserva_eliminada(sender, instance, **kwargs):
+    disponibilidad.recalcular_dias({(instance.espacio_id, instance.fecha_reserva)})
+    resumenes.reserva_eliminada(instance)
+    tiempo_real.publicar([tiempo_real.evento_reserva(instance, 'reserva_eliminada', instance.estado)])
+
+
+@receiver(post_save, sender=ReservaElemento)
+def elemento_guardado(sender, instance, created, **kwargs):
+    if not created and not _campos_cambiados(instance, CAMPOS_ELEMENTO):
+        return
+    resumenes.elemento_guardado(instance, getattr(instance, '_valores_db', {}), created)
+    if instance.reserva.estado in ESTADOS_OCUPAN_ESPACIO:
+        inventario.registrar(instance, created)
+    instance.sincronizar_valores_db(CAMPOS_ELEMENTO)
+
+
+@receiver(post_delete, sender=ReservaElemento)
+def elemento_eliminado(sender, instance, **kwargs):
+    resumenes.elemento_eliminado(instance)
@@ -1,3 +1,1157 @@
-from django.test import TestCase
+import asyncio
+import io
+import json
+import tempfile
+import threading
+from collections import Counter
+from datetime import date, time, timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Q
+from django.test import AsyncClient, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework.utils.serializer_helpers import ReturnList
+
+from django.core.management import call_command
+
+from config import consultas_lentas, metricas
+from config.pruebas import ConsultasAcotadasMixin, medir_serializacion
+from config.renderers import JSONRapidoRenderer
+from usuarios.autenticacion import TokenConRolSerializer
+from usuarios.models import Usuario, Rol, Carrera
+from notificaciones.models import ContadorNotificaciones
+from auditoria.models import Auditoria
+from espacios.models import Espacio
+from elementos.models import Elemento
+from .models import (
+    Reserva, ReservaElemento, ReporteJob, ElementoAsignacion, OcupacionDiaria, ReservaDailyStat, SerieReserva,
+    CoberturaEstadisticas,
+)
+from .consultas import construir_queryset
+from .estadisticas import resumen_estados
+from .serializers import ReservaSerializer
+from . import inventario, resumenes, series, tiempo_real, trabajos
+
+# Techo holgado por reserva serializada con todos los anidados: atrapa regresiones grandes, no ruido
+MAX_MS_SERIALIZACION_POR_FILA = 10
+
+
+class DatosReservasMixin:
+    """Crea un conjunto de reservas con todas las relaciones que serializa la API"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.rol_admin = Rol.objects.create(nombre_rol='admin')
+        cls.rol_solicitante = Rol.objects.create(nombre_rol='solicitante')
+        cls.carrera = Carrera.objects.create(nombre_carrera='Ingeniería en Informática', area='Tecnología')
+        cls.admin = Usuario.objects.create_user(
+            email='admin@inacap.cl', password='x', nombre='Ana', apellido='Admin',
+            rol=cls.rol_admin, carrera=cls.carrera
+        )
+        cls.solicitante = Usuario.objects.create_user(
+            email='docente@inacap.cl', password='x', nombre='Pedro', apellido='Docente',
+            rol=cls.rol_solicitante, carrera=cls.carrera
+        )
+        cls.elementos = [
+            Elemento.objects.create(nombre=f'Elemento {i}', categoria='tecnologia', stock_total=100, stock_disponible=100)
+            for i in range(3)
+        ]
+
+    def setUp(self):
+        super().setUp()
+        self.total_reservas = 0
+
+    def crear_reservas(self, cantidad):
+        """Agrega `cantidad` reservas, cada una en un espacio distinto y con dos elementos"""
+        inicio = self.total_reservas
+        for i in range(inicio, inicio + cantidad):
+            espacio = Espacio.objects.create(nombre=f'Sala {i}', tipo='salon', capacidad=30, ubicacion='Edificio A')
+            reserva = Reserva.objects.create(
+                usuario=self.solicitante if i % 2 else self.admin,
+                espacio=espacio,
+                fecha_reserva=date.today() + timedelta(days=i % 7),
+                hora_inicio=time(9),
+                hora_fin=time(10),
+                motivo='Clase',
+                estado='aprobada' if i % 3 else 'pendiente',
+                aprobado_por=self.admin if i % 3 else None,
+            )
+            for elemento in self.elementos[:2]:
+                ReservaElemento.objects.create(reserva=reserva, elemento=elemento, cantidad_solicitada=1)
+        self.total_reservas += cantidad
+
+    def poblar(self, tamano):
+        self.crear_reservas(tamano - self.total_reservas)
+
+
+class ReservaViewSetConsultasTest(DatosReservasMixin, ConsultasAcotadasMixin, TestCase):
+    # Los listados usan reservas/proyeccion.py: reservas sin joins + una consulta
+    # por tabla anidada (usuarios, espacios y elementos con su detalle)
+
+    def test_list(self):
+        self.assertConsultasAcotadas('/api/reservas/', maximo=5)
+
+    def test_list_solicitante(self):
+        self.assertConsultasAcotadas('/api/reservas/', maximo=5, usuario=self.solicitante)
+
+    def test_retrieve(self):
+        self.crear_reservas(1)
+        reserva = Reserva.objects.order_by('id').first()
+        self.assertConsultasAcotadas(f'/api/reservas/{reserva.id}/', maximo=3)
+
+    def test_mis_reservas(self):
+        self.assertConsultasAcotadas('/api/reservas/mis_reservas/', maximo=4, usuario=self.solicitante)
+
+    def test_pendientes(self):
+        self.assertConsultasAcotadas('/api/reservas/pendientes/', maximo=4)
+
+    def test_exportar_reporte(self):
+        self.assertConsultasAcotadas('/api/reservas/exportar_reporte/', maximo=6)
+
+    def test_serializacion_sin_consultas(self):
+        # Con las relaciones precargadas, ReservaSerializer no vuelve a la base
+        tamano = self.TAMANOS[-1]
+        self.crear_reservas(tamano)
+        reservas = list(construir_queryset('list', Reserva.objects.all(), set(ReservaSerializer.Meta.expandibles)))
+        with self.assertNumQueries(0), medir_serializacion() as duraciones:
+            datos = ReservaSerializer(reservas, many=True).data
+        self.assertEqual(len(datos), tamano)
+
+        milisegundos = sum(duraciones) * 1000
+        self._registrar_tiempos({tamano: {'consultas': 0, 'total_ms': round(milisegundos, 2), 'serializacion_ms': round(milisegundos, 2)}})
+        self.assertLess(milisegundos / tamano, MAX_MS_SERIALIZACION_POR_FILA)
+
+
+@override_settings(AUDITORIA_MODO='off')
+class ReservaAccionesConsultasTest(DatosReservasMixin, ConsultasAcotadasMixin, TestCase):
+    """El resto de las acciones de ReservaViewSet, con la tabla de reservas en dos tamaños"""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.salas = 0
+        self.manana = date.today() + timedelta(days=1)
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        ajustes = override_settings(REPORTES_DIR=directorio.name)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+    def espacio_libre(self):
+        self.salas += 1
+        return Espacio.objects.create(nombre=f'Sala libre {self.salas}', tipo='salon', capacidad=30, ubicacion='Edificio C')
+
+    def nueva_reserva(self, estado='pendiente'):
+        return Reserva.objects.create(
+            usuario=self.solicitante, espacio=self.espacio_libre(), fecha_reserva=self.manana,
+            hora_inicio=time(9), hora_fin=time(10), motivo='Clase', estado=estado,
+        )
+
+    def cuerpo_reserva(self, _tamano=None):
+        return {
+            'espacio': self.espacio_libre().id, 'fecha_reserva': self.manana.isoformat(),
+            'hora_inicio': '09:00', 'hora_fin': '10:00', 'motivo': 'Clase',
+            'elementos': [{'elemento_id': self.elementos[0].id, 'cantidad': 1}],
+        }
+
+    def test_create(self):
+        self.assertConsultasAcotadas('/api/reservas/', maximo=26, metodo='post', datos=self.cuerpo_reserva, calentar=True)
+
+    def test_partial_update(self):
+        self.assertConsultasAcotadas(
+            lambda _: f'/api/reservas/{self.nueva_reserva().id}/', maximo=8, metodo='patch', datos={'motivo': 'Taller'},
+        )
+
+    def test_destroy(self):
+        self.assertConsultasAcotadas(lambda _: f'/api/reservas/{self.nueva_reserva().id}/', maximo=9, metodo='delete')
+
+    def test_aprobar(self):
+        self.assertConsultasAcotadas(lambda _: f'/api/reservas/{self.nueva_reserva().id}/aprobar/', maximo=19, metodo='post', calentar=True)
+
+    def test_rechazar(self):
+        self.assertConsultasAcotadas(
+            lambda _: f'/api/reservas/{self.nueva_reserva().id}/rechazar/', maximo=20, metodo='post',
+            datos={'motivo_rechazo': 'Sala en mantención'}, calentar=True,
+        )
+
+    def test_crear_lote(self):
+        self.assertConsultasAcotadas(
+            '/api/reservas/bulk/', maximo=29, metodo='post',
+            datos=lambda _: {'reservas': [self.cuerpo_reserva() for _ in range(3)]}, calentar=True,
+        )
+
+    def test_verificar_conflictos(self):
+        bloques = [
+            {'espacio': self.espacio_libre().id, 'fecha_reserva': self.manana.isoformat(), 'hora_inicio': '09:00', 'hora_fin': '10:00'}
+            for _ in range(3)
+        ]
+        self.assertConsultasAcotadas('/api/reservas/verificar_conflictos/', maximo=1, metodo='post', datos={'bloques': bloques})
+
+    def test_estadisticas(self):
+        self.assertConsultasAcotadas('/api/reservas/estadisticas/', maximo=7)
+
+    def test_solicitar_reporte(self):
+        self.assertConsultasAcotadas('/api/reservas/reportes/', maximo=3, metodo='post', datos={'area': 'Tecnología'})
+
+    def test_estado_reporte(self):
+        self.assertConsultasAcotadas(
+            lambda _: f'/api/reservas/reportes/{trabajos.solicitar_reporte({}, usuario=self.admin).id}/', maximo=2,
+        )
+
+    def test_descargar_reporte(self):
+        def reporte_completado(_tamano):
+            job = trabajos.solicitar_reporte({}, usuario=self.admin)
+            trabajos.reclamar_pendientes(1)
+            trabajos.procesar(job.id)
+            return f'/api/reservas/reportes/{job.id}/descargar/'
+
+        self.assertConsultasAcotadas(reporte_completado, maximo=2)
+
+
+class EdicionReservaTest(DatosReservasMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.espacio = Espacio.objects.create(nombre='Sala Edición', tipo='salon', capacidad=30, ubicacion='Edificio A')
+        self.manana = date.today() + timedelta(days=1)
+        self.ocupada, self.reserva = [
+            Reserva.objects.create(
+                usuario=self.solicitante, espacio=self.espacio, fecha_reserva=self.manana,
+                hora_inicio=time(hora), hora_fin=time(hora + 1), motivo='Clase', estado='aprobada',
+            )
+            for hora in (9, 11)
+        ]
+
+    def test_verificar_conflictos_exige_un_objeto(self):
+        respuesta = self.client.post('/api/reservas/verificar_conflictos/', [], format='json')
+        self.assertEqual(respuesta.status_code, 400)
+
+    def test_editar_no_puede_solapar(self):
+        url = f'/api/reservas/{self.reserva.id}/'
+        respuesta = self.client.patch(url, {'hora_inicio': '09:30', 'hora_fin': '10:30'}, format='json')
+        self.assertEqual(respuesta.status_code, 400)
+        self.reserva.refresh_from_db()
+        self.assertEqual(self.reserva.hora_inicio, time(11))
+
+        # Moverla dentro de su propio horario o a uno libre sí se puede
+        respuesta = self.client.patch(url, {'hora_inicio': '10:00', 'hora_fin': '11:30'}, format='json')
+        self.assertEqual(respuesta.status_code, 200)
+
+    def test_reactivar_valida_el_horario(self):
+        self.reserva.estado = 'cancelada'
+        self.reserva.save()
+        Reserva.objects.create(
+            usuario=self.admin, espacio=self.espacio, fecha_reserva=self.manana,
+            hora_inicio=time(11), hora_fin=time(12), motivo='Otra', estado='aprobada',
+        )
+        respuesta = self.client.patch(f'/api/reservas/{self.reserva.id}/', {'estado': 'pendiente'}, format='json')
+        self.assertEqual(respuesta.status_code, 400)
+
+    def test_editar_sin_tocar_el_horario_no_lo_valida(self):
+        Reserva.objects.filter(pk=self.reserva.pk).update(fecha_reserva=date.today() - timedelta(days=3))
+        respuesta = self.client.patch(f'/api/reservas/{self.reserva.id}/', {'motivo': 'Taller'}, format='json')
+        self.assertEqual(respuesta.status_code, 200)
+
+
+    def elemento_unico(self, reserva):
+        """Elemento con una sola unidad, comprometida por `reserva`"""
+        elemento = Elemento.objects.create(nombre='Proyector único', categoria='tecnologia', stock_total=1, stock_disponible=1)
+        ReservaElemento.objects.create(reserva=reserva, elemento=elemento, cantidad_solicitada=1)
+        return elemento
+
+    def test_reactivar_reconstruye_el_libro_de_stock(self):
+        elemento = self.elemento_unico(self.reserva)
+        url = f'/api/reservas/{self.reserva.id}/'
+        self.assertEqual(self.client.patch(url, {'estado': 'cancelada'}, format='json').status_code, 200)
+        self.assertFalse(ElementoAsignacion.objects.filter(elemento=elemento).exists())
+
+        self.assertEqual(self.client.patch(url, {'estado': 'aprobada'}, format='json').status_code, 200)
+        asignacion = ElementoAsignacion.objects.get(elemento=elemento)
+        self.assertEqual((asignacion.fecha, asignacion.hora_inicio, asignacion.cantidad), (self.manana, time(11), 1))
+        self.assertEqual(inventario.uso_maximo([elemento.id], self.manana, time(11), time(12)), {elemento.id: 1})
+
+    def test_mover_no_puede_sobrepasar_el_stock(self):
+        otra_sala = Espacio.objects.create(nombre='Sala Vecina', tipo='salon', capacidad=30, ubicacion='Edificio A')
+        otra = Reserva.objects.create(
+            usuario=self.admin, espacio=otra_sala, fecha_reserva=self.manana,
+            hora_inicio=time(13), hora_fin=time(14), motivo='Taller', estado='aprobada',
+        )
+        elemento = self.elemento_unico(otra)
+        ReservaElemento.objects.create(reserva=self.reserva, elemento=elemento, cantidad_solicitada=1)
+
+        respuesta = self.client.patch(f'/api/reservas/{self.reserva.id}/', {'hora_inicio': '13:00', 'hora_fin': '14:00'}, format='json')
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertIn('elementos', respuesta.data)
+        self.assertEqual(inventario.uso_maximo([elemento.id], self.manana, time(13), time(14)), {elemento.id: 1})
+
+    def test_reactivar_no_puede_sobrepasar_el_stock(self):
+        elemento = self.elemento_unico(self.reserva)
+        url = f'/api/reservas/{self.reserva.id}/'
+        self.client.patch(url, {'estado': 'cancelada'}, format='json')
+        otra_sala = Espacio.objects.create(nombre='Sala Vecina', tipo='salon', capacidad=30, ubicacion='Edificio A')
+        otra = Reserva.objects.create(
+            usuario=self.admin, espacio=otra_sala, fecha_reserva=self.manana,
+            hora_inicio=time(11), hora_fin=time(12), motivo='Taller', estado='aprobada',
+        )
+        ReservaElemento.objects.create(reserva=otra, elemento=elemento, cantidad_solicitada=1)
+
+        respuesta = self.client.patch(url, {'estado': 'aprobada'}, format='json')
+        self.assertEqual(respuesta.status_code, 400)
+        self.reserva.refresh_from_db()
+        self.assertEqual(self.reserva.estado, 'cancelada')
+        self.assertEqual(inventario.uso_maximo([elemento.id], self.manana, time(11), time(12)), {elemento.id: 1})
+
+    def test_verificar_stock_de_una_reserva_existente(self):
+        elemento = self.elemento_unico(self.ocupada)
+        ReservaElemento.objects.create(reserva=self.reserva, elemento=elemento, cantidad_solicitada=1)
+        # Su propio uso (11 a 12) no cuenta; el de la otra reserva (9 a 10) sí
+        inventario.verificar(self.reserva.pk, self.manana, time(10), time(12))
+        with self.assertRaises(inventario.StockInsuficiente) as contexto:
+            inventario.verificar(self.reserva.pk, self.manana, time(9, 30), time(10, 30))
+        self.assertEqual(contexto.exception.faltantes, {elemento.id: {'solicitado': 1, 'disponible': 0}})
+
+
+class ProyeccionReservasTest(DatosReservasMixin, TestCase):
+    """Los listados con reservas/proyeccion.py responden los mismos bytes que ReservaSerializer"""
+
+    def setUp(self):
+        super().setUp()
+        self.crear_reservas(5)
+        # Casos borde: usuario sin carrera, sin elementos, rechazada con motivo y texto con U+2028
+        sin_carrera = Usuario.objects.create_user(
+            email='externo@inacap.cl', password=None, nombre='Íñigo', apellido='Externo', rol=self.rol_solicitante
+        )
+        Reserva.objects.create(
+            usuario=sin_carrera, espacio=Espacio.objects.first(), fecha_reserva=date.today(),
+            hora_inicio=time(18, 30), hora_fin=time(20), motivo='Ensayo\u2028coro "año" 2025', estado='rechazada',
+            motivo_rechazo='Sala ocupada', observaciones='', aprobado_por=self.admin, fecha_aprobacion=timezone.now(),
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def esperado(self, reservas, url):
+        request = Request(APIRequestFactory().get(url))
+        queryset = construir_queryset('list', reservas, ReservaSerializer.expandidos(request))
+        return JSONRenderer().render(ReservaSerializer(queryset, many=True, context={'request': request}).data)
+
+    def assertMismaRespuesta(self, url, reservas, usuario=None):
+        self.client.force_authenticate(usuario or self.admin)
+        respuesta = self.client.get(url)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.content, self.esperado(reservas, url))
+
+    def test_list(self):
+        self.assertMismaRespuesta('/api/reservas/', Reserva.objects.all())
+
+    def test_list_solicitante(self):
+        visibles = Reserva.objects.filter(Q(usuario=self.solicitante) | Q(estado='aprobada'))
+        self.assertMismaRespuesta('/api/reservas/', visibles, usuario=self.solicitante)
+
+    def test_fields_y_expand(self):
+        url = '/api/reservas/?fields=id,estado,estado_display,aprobado_por_detalle&expand=elementos'
+        self.assertMismaRespuesta(url, Reserva.objects.all())
+        self.assertMismaRespuesta('/api/reservas/?expand=usuario_detalle', Reserva.objects.all())
+
+    def test_mis_reservas(self):
+        reservas = Reserva.objects.filter(usuario=self.solicitante).order_by('-fecha_reserva')
+        self.assertMismaRespuesta('/api/reservas/mis_reservas/', reservas, usuario=self.solicitante)
+
+    def test_pendientes(self):
+        self.assertMismaRespuesta('/api/reservas/pendientes/', Reserva.objects.filter(estado='pendiente'))
+
+    def test_pagina_con_cursor(self):
+        respuesta = self.client.get('/api/reservas/?page_size=4')
+        primeras = Reserva.objects.order_by('-fecha_creacion', '-id')[:4]
+        self.assertEqual(
+            JSONRenderer().render(respuesta.data['results']),
+            self.esperado(Reserva.objects.filter(pk__in=[r.pk for r in primeras]).order_by('-fecha_creacion', '-id'), '/api/reservas/'),
+        )
+
+    def test_renderer_igual_a_drf(self):
+        datos = {
+            'fecha': timezone.now(), 'dia': date.today(), 'hora': time(9, 30), 'monto': Decimal('10.50'),
+            'texto': 'línea\u2028siguiente\u2029', 'lista': ReturnList([1, None, True, 2.5], serializer=None), 'claves': {1: 'a'},
+        }
+        self.assertEqual(JSONRapidoRenderer().render(datos), JSONRenderer().render(datos))
+        self.assertEqual(JSONRapidoRenderer().render(None), b'')
+        con_sangria = JSONRapidoRenderer().render({'a': 1}, 'application/json; indent=2')
+        self.assertEqual(con_sangria, JSONRenderer().render({'a': 1}, 'application/json; indent=2'))
+
+
+class PaginacionYCamposTest(DatosReservasMixin, ConsultasAcotadasMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_sin_parametros_devuelve_arreglo(self):
+        self.crear_reservas(3)
+        respuesta = self.client.get('/api/reservas/')
+        self.assertIsInstance(respuesta.data, list)
+        self.assertEqual(len(respuesta.data), 3)
+
+    def test_cursor_recorre_todas_las_reservas(self):
+        self.crear_reservas(7)
+        vistos = []
+        url = '/api/reservas/?page_size=3'
+        while url:
+            respuesta = self.client.get(url)
+            self.assertLessEqual(len(respuesta.data['results']), 3)
+            vistos.extend(r['id'] for r in respuesta.data['results'])
+            url = respuesta.data['next']
+        esperados = list(Reserva.objects.order_by('-fecha_creacion', '-id').values_list('id', flat=True))
+        self.assertEqual(vistos, esperados)
+
+    def test_fields_limita_campos(self):
+        self.crear_reservas(2)
+        campos = 'id,espacio,fecha_reserva,hora_inicio,hora_fin,estado'
+        respuesta = self.client.get(f'/api/reservas/?fields={campos}')
+        self.assertEqual(set(respuesta.data[0]), set(campos.split(',')))
+
+    def test_expand_agrega_anidado(self):
+        self.crear_reservas(2)
+        respuesta = self.client.get('/api/reservas/?fields=id&expand=espacio_detalle')
+        self.assertEqual(set(respuesta.data[0]), {'id', 'espacio_detalle'})
+        # Los serializers anidados conservan todos sus campos
+        self.assertIn('nombre', respuesta.data[0]['espacio_detalle'])
+
+    def test_fields_sin_anidados_evita_joins(self):
+        # Rol del usuario + listado, sin joins ni prefetch de elementos
+        self.assertConsultasAcotadas('/api/reservas/?fields=id,espacio,estado', maximo=2)
+
+    def test_fields_en_catalogos(self):
+        respuesta = self.client.get('/api/elementos/?fields=id,nombre')
+        self.assertEqual(set(respuesta.data[0]), {'id', 'nombre'})
+
+
+class CalendarioTest(DatosReservasMixin, ConsultasAcotadasMixin, TestCase):
+
+    def url(self, **extra):
+        desde = date.today()
+        params = {'desde': desde.isoformat(), 'hasta': (desde + timedelta(days=30)).isoformat(), **extra}
+        return '/api/reservas/calendario/?' + '&'.join(f'{k}={v}' for k, v in params.items())
+
+    def test_columnar_respeta_visibilidad(self):
+        self.crear_reservas(6)
+        client = APIClient()
+        client.force_authenticate(self.solicitante)
+        datos = client.get(self.url()).data
+
+        visibles = Reserva.objects.filter(Q(usuario=self.solicitante) | Q(estado='aprobada'))
+        self.assertEqual(sorted(datos['ids']), sorted(visibles.values_list('id', flat=True)))
+        columnas = ('ids', 'espacios', 'fechas', 'inicio', 'fin', 'estados', 'motivos')
+        self.assertEqual({len(datos[c]) for c in columnas}, {len(datos['ids'])})
+        self.assertEqual(datos['inicio'][0], 9 * 60)
+        self.assertEqual(set(datos['nombres_espacios']), set(datos['espacios']))
+
+    def test_filtro_por_espacio(self):
+        self.crear_reservas(3)
+        reserva = Reserva.objects.first()
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        datos = client.get(self.url(espacio=reserva.espacio_id)).data
+        self.assertEqual(datos['ids'], [reserva.id])
+
+    def test_rango_invalido(self):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        self.assertEqual(client.get('/api/reservas/calendario/?desde=2025-03-10').status_code, 400)
+
+    def test_consultas(self):
+        self.assertConsultasAcotadas(self.url(), maximo=2)
+
+
+class InventarioElementosTest(DatosReservasMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.proyector = Elemento.objects.create(nombre='Proyector', categoria='tecnologia', stock_total=2, stock_disponible=2)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.manana = date.today() + timedelta(days=1)
+        self.salas = 0
+
+    def reservar(self, inicio, fin, cantidad):
+        self.salas += 1
+        espacio = Espacio.objects.create(nombre=f'Sala inv {self.salas}', tipo='salon', capacidad=30, ubicacion='Edificio B')
+        return self.client.post('/api/reservas/', {
+            'espacio': espacio.id, 'fecha_reserva': self.manana.isoformat(),
+            'hora_inicio': inicio, 'hora_fin': fin, 'motivo': 'Clase',
+            'elementos': [{'elemento_id': self.proyector.id, 'cantidad': cantidad}],
+        }, format='json')
+
+    def test_uso_maximo_barrido(self):
+        intervalos = [(time(9), time(11), 1), (time(10), time(12), 1), (time(11), time(13), 1)]
+        # A las 11:00 termina la primera justo cuando empieza la tercera
+        self.assertEqual(inventario._uso_maximo(intervalos), 2)
+
+    def test_no_sobreasigna_stock(self):
+        self.assertEqual(self.reservar('09:00', '10:00', 2).status_code, 201)
+        respuesta = self.reservar('09:30', '10:30', 1)
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertIn('elementos', respuesta.data)
+        # Intervalos semiabiertos: empezar cuando termina la otra no choca
+        self.assertEqual(self.reservar('10:00', '11:00', 2).status_code, 201)
+
+    def test_rechazo_libera_stock(self):
+        self.reservar('09:00', '10:00', 2)
+        reserva = Reserva.objects.latest('id')
+        self.client.post(f'/api/reservas/{reserva.id}/rechazar/')
+        self.assertFalse(ElementoAsignacion.objects.filter(reserva_elemento__reserva=reserva).exists())
+        self.assertEqual(self.reservar('09:00', '10:00', 2).status_code, 201)
+
+    def test_disponibilidad_en_una_consulta_por_tabla(self):
+        self.reservar('09:00', '10:00', 1)
+        url = (f'/api/elementos/disponibilidad/?fecha={self.manana.isoformat()}&hora_inicio=09:30&hora_fin=11:00'
+               f'&elementos={",".join(str(e.id) for e in self.elementos + [self.proyector])}')
+        with CaptureQueriesContext(connection) as consultas:
+            datos = self.client.get(url).data
+        self.assertEqual(len(consultas), 2)
+        proyector = next(d for d in datos if d['elemento'] == self.proyector.id)
+        self.assertEqual((proyector['en_uso'], proyector['disponible']), (1, 1))
+
+
+class ResumenesDiariosTest(DatosReservasMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.espacio = Espacio.objects.create(nombre='Sala resumen', tipo='salon', capacidad=30, ubicacion='Edificio A')
+        self.manana = date.today() + timedelta(days=1)
+
+    def reserva(self, inicio):
+        return Reserva.objects.create(
+            usuario=self.solicitante, espacio=self.espacio, fecha_reserva=self.manana,
+            hora_inicio=time(inicio), hora_fin=time(inicio + 1), motivo='Clase',
+        )
+
+    def totales(self):
+        return {
+            (fila.carrera_id, fila.estado): fila.total
+            for fila in ReservaDailyStat.objects.filter(fecha=self.manana, espacio=self.espacio)
+        }
+
+    def test_reserva_no_contada_no_deja_totales_negativos(self):
+        anterior = self.reserva(9)
+        # Como las reservas anteriores a los resúmenes: existe, pero no se contó
+        ReservaDailyStat.objects.all().delete()
+        nueva = self.reserva(11)
+
+        for reserva in (anterior, nueva):
+            respuesta = self.client.post(f'/api/reservas/{reserva.id}/aprobar/')
+            self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(self.totales(), {(self.carrera.id, 'pendiente'): 0, (self.carrera.id, 'aprobada'): 2})
+
+    def test_cambio_de_carrera_descuenta_la_fila_contada(self):
+        reserva = self.reserva(9)
+        otra = Carrera.objects.create(nombre_carrera='Diseño Gráfico', area='Diseño')
+        Usuario.objects.filter(pk=self.solicitante.pk).update(carrera=otra)
+
+        self.client.post(f'/api/reservas/{reserva.id}/aprobar/')
+        self.assertEqual(self.totales(), {(self.carrera.id, 'pendiente'): 0, (self.carrera.id, 'aprobada'): 1})
+
+        # La reconstrucción usa la misma carrera que el mantenimiento incremental
+        call_command('reconstruir_estadisticas', desde=self.manana.isoformat(), stdout=io.StringIO())
+        self.assertEqual(self.totales(), {(self.carrera.id, 'aprobada'): 1})
+
+    def test_resumenes_y_reservas_filtran_por_la_misma_carrera(self):
+        self.reserva(9)
+        otra = Carrera.objects.create(nombre_carrera='Diseño Gráfico', area='Diseño')
+        Usuario.objects.filter(pk=self.solicitante.pk).update(carrera=otra)
+        call_command('reconstruir_estadisticas', desde=self.manana.isoformat(), stdout=io.StringIO())
+        self.assertTrue(resumenes.rango_cubierto(self.manana, self.manana))
+
+        def totales():
+            return [
+                resumen_estados(self.manana, self.manana, carrera_id)['total']
+                for carrera_id in (self.carrera.id, otra.id)
+            ]
+        cubiertos = totales()
+        CoberturaEstadisticas.objects.all().delete()
+        self.assertEqual(totales(), cubiertos)
+        self.assertEqual(cubiertos, [1, 0])
+
+    def test_la_carrera_interna_no_se_expone(self):
+        reserva = self.reserva(9)
+        self.assertNotIn('carrera_estadisticas', self.client.get(f'/api/reservas/{reserva.id}/').data)
+        self.assertNotIn('carrera_estadisticas', self.client.get('/api/reservas/').data[0])
+
+
+class CreacionLoteTest(DatosReservasMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.espacios = [
+            Espacio.objects.create(nombre=f'Lab {i}', tipo='laboratorio', capacidad=20, ubicacion='Edificio C')
+            for i in range(3)
+        ]
+        self.manana = date.today() + timedelta(days=1)
+
+    def item(self, espacio, inicio, fin, **extra):
+        return {
+            'espacio': espacio.id, 'fecha_reserva': self.manana.isoformat(),
+            'hora_inicio': inicio, 'hora_fin': fin, 'motivo': 'Laboratorio', **extra,
+        }
+
+    def enviar(self, items, modo):
+        return self.client.post('/api/reservas/bulk/', {'modo': modo, 'reservas': items}, format='json')
+
+    def test_cuerpo_que_no_es_objeto(self):
+        self.assertEqual(self.client.post('/api/reservas/bulk/', [1], format='json').status_code, 400)
+
+    def test_todo_o_nada_no_crea_si_hay_errores(self):
+        items = [
+            self.item(self.espacios[0], '09:00', '10:00'),
+            self.item(self.espacios[0], '09:30', '10:30'),  # choca con la anterior del lote
+        ]
+        respuesta = self.enviar(items, 'todo_o_nada')
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertFalse(Reserva.objects.exists())
+        self.assertIn('mismo lote', respuesta.data['resultados'][1]['errores'][0])
+
+    def test_parcial_crea_las_validas(self):
+        Reserva.objects.create(
+            usuario=self.admin, espacio=self.espacios[1], fecha_reserva=self.manana,
+            hora_inicio=time(12), hora_fin=time(13), motivo='Existente',
+        )
+        items = [
+            self.item(self.espacios[0], '09:00', '10:00'),
+            self.item(self.espacios[1], '12:30', '13:30'),  # choca con la existente
+            self.item(self.espacios[2], '11:00', '10:00'),  # horario inválido
+            self.item(self.espacios[2], '10:00', '11:00', elementos=[{'elemento_id': self.elementos[0].id, 'cantidad': 3}]),
+        ]
+        respuesta = self.enviar(items, 'parcial')
+        self.assertEqual(respuesta.status_code, 201)
+        self.assertEqual([r['creada'] for r in respuesta.data['resultados']], [True, False, False, True])
+
+        # Tablas derivadas que normalmente mantienen las señales
+        creada = Reserva.objects.get(pk=respuesta.data['resultados'][3]['id'])
+        self.assertEqual(ElementoAsignacion.objects.get(reserva_elemento__reserva=creada).cantidad, 3)
+        self.assertTrue(OcupacionDiaria.objects.filter(espacio=self.espacios[2], fecha=self.manana).exists())
+        self.assertEqual(
+            ReservaDailyStat.objects.filter(fecha=self.manana, espacio=self.espacios[0]).get().total, 1
+        )
+
+    def test_stock_compartido_dentro_del_lote(self):
+        elemento = Elemento.objects.create(nombre='Kit', categoria='tecnologia', stock_total=1, stock_disponible=1)
+        pedido = [{'elemento_id': elemento.id, 'cantidad': 1}]
+        items = [
+            self.item(self.espacios[0], '09:00', '10:00', elementos=pedido),
+            self.item(self.espacios[1], '09:30', '10:30', elementos=pedido),
+        ]
+        respuesta = self.enviar(items, 'parcial')
+        self.assertEqual([r['creada'] for r in respuesta.data['resultados']], [True, False])
+
+    def test_consultas_constantes(self):
+        # El contador de no leídas ya existe: así ambos lotes solo lo actualizan
+        ContadorNotificaciones.objects.create(usuario=self.admin)
+        conteos = []
+        # Fechas distintas en cada lote para que ambos inserten resúmenes nuevos
+        for cantidad, desplazamiento in ((10, 0), (40, 100)):
+            items = [
+                self.item(self.espacios[i % 3], '09:00', '09:45',
+                          fecha_reserva=(self.manana + timedelta(days=desplazamiento + i // 3)).isoformat())
+                for i in range(cantidad)
+            ]
+            with CaptureQueriesContext(connection) as consultas:
+                self.assertEqual(self.enviar(items, 'todo_o_nada').status_code, 201)
+            conteos.append(len(consultas))
+        self.assertEqual(conteos[0], conteos[1])
+
+
+class SerieReservaTest(DatosReservasMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.solicitante)
+        self.espacio = Espacio.objects.create(nombre='Lab Series', tipo='laboratorio', capacidad=20, ubicacion='Edificio D')
+        # Lunes de la próxima semana: la serie completa queda en el futuro
+        hoy = date.today()
+        self.lunes = hoy + timedelta(days=7 - hoy.weekday())
+
+    def datos(self, **extra):
+        return {
+            'espacio': self.espacio.id, 'hora_inicio': '08:00', 'hora_fin': '09:30', 'motivo': 'Clase semanal',
+            'dias_semana': [0, 2], 'fecha_inicio': self.lunes.isoformat(),
+            'fecha_fin': (self.lunes + timedelta(weeks=4) - timedelta(days=1)).isoformat(), **extra,
+        }
+
+    def crear_serie(self, **extra):
+        respuesta = self.client.post('/api/series-reservas/', self.datos(**extra), format='json')
+        self.assertEqual(respuesta.status_code, 201, respuesta.data)
+        return SerieReserva.objects.get(pk=respuesta.data['id'])
+
+    def test_expansion_respeta_intervalo_y_excepciones(self):
+        serie = SerieReserva(
+            espacio=self.espacio, hora_inicio=time(8), hora_fin=time(9), dias_semana=[0, 2], intervalo_semanas=2,
+            fecha_inicio=self.lunes + timedelta(days=2), fecha_fin=self.lunes + timedelta(weeks=5),
+            excepciones=[(self.lunes + timedelta(weeks=2)).isoformat()],
+        )
+        self.assertEqual(list(series.expandir(serie)), [
+            self.lunes + timedelta(days=2),
+            self.lunes + timedelta(weeks=2, days=2),
+            self.lunes + timedelta(weeks=4), self.lunes + timedelta(weeks=4, days=2),
+        ])
+        # Solo la ventana pedida
+        ventana = series.expandir(serie, self.lunes + timedelta(weeks=3), self.lunes + timedelta(weeks=4))
+        self.assertEqual(list(ventana), [self.lunes + timedelta(weeks=4)])
+
+    def test_serie_pendiente_bloquea_sin_materializar(self):
+        serie = self.crear_serie()
+        self.assertFalse(Reserva.objects.exists())
+
+        respuesta = self.client.get(f'/api/series-reservas/{serie.id}/ocurrencias/')
+        self.assertEqual(len(respuesta.data), 8)
+        self.assertIsNone(respuesta.data[0]['reserva'])
+
+        # Una reserva suelta, una del lote y otra serie chocan con las ocurrencias
+        miercoles = (self.lunes + timedelta(days=9)).isoformat()
+        suelta = {'espacio': self.espacio.id, 'fecha_reserva': miercoles, 'hora_inicio': '09:00', 'hora_fin': '10:00', 'motivo': 'x'}
+        self.assertEqual(self.client.post('/api/reservas/', suelta, format='json').status_code, 400)
+        respuesta = self.client.post('/api/reservas/bulk/', {'reservas': [suelta]}, format='json')
+        self.assertEqual(respuesta.status_code, 400)
+        respuesta = self.client.post('/api/series-reservas/', self.datos(dias_semana=[2, 4]), format='json')
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual(len(respuesta.data['conflictos']), 4)
+
+    def test_aprobar_materializa_la_serie_completa(self):
+        serie = self.crear_serie(excepciones=[(self.lunes + timedelta(days=2)).isoformat()])
+        self.assertEqual(self.client.post(f'/api/series-reservas/{serie.id}/aprobar/').status_code, 403)
+
+        self.client.force_authenticate(self.admin)
+        respuesta = self.client.post(f'/api/series-reservas/{serie.id}/aprobar/')
+        self.assertEqual(respuesta.status_code, 200, respuesta.data)
+        self.assertEqual(respuesta.data['reservas_creadas'], 7)
+
+        ocurrencias = Reserva.objects.filter(serie=serie)
+        self.assertEqual(ocurrencias.filter(estado='aprobada', aprobado_por=self.admin).count(), 7)
+        self.assertEqual(OcupacionDiaria.objects.filter(espacio=self.espacio).count(), 7)
+        self.assertEqual(ReservaDailyStat.objects.filter(espacio=self.espacio, estado='aprobada').count(), 7)
+        self.assertEqual(self.client.post(f'/api/series-reservas/{serie.id}/rechazar/').status_code, 400)
+
+        # Excluir una fecha cancela esa ocurrencia; cancelar la serie, el resto
+        url = f'/api/series-reservas/{serie.id}/excluir/'
+        self.assertEqual(self.client.post(url, [self.lunes.isoformat()], format='json').status_code, 400)
+        self.assertEqual(self.client.post(url, {'fecha': 20300107}, format='json').status_code, 400)
+        self.client.post(f'/api/series-reservas/{serie.id}/excluir/', {'fecha': self.lunes.isoformat()}, format='json')
+        self.assertEqual(ocurrencias.get(fecha_reserva=self.lunes).estado, 'cancelada')
+        respuesta = self.client.post(f'/api/series-reservas/{serie.id}/cancelar/')
+        self.assertEqual(respuesta.data['reservas_canceladas'], 6)
+        self.assertFalse(ocurrencias.exclude(estado='cancelada').exists())
+        self.assertFalse(ReservaDailyStat.objects.filter(espacio=self.espacio, estado='aprobada', total__gt=0).exists())
+
+    def test_disponibilidad_descuenta_series_pendientes(self):
+        self.crear_serie()
+        miercoles = self.lunes + timedelta(days=2)
+        respuesta = self.client.get(
+            f'/api/espacios/{self.espacio.id}/disponibilidad/?desde={self.lunes.isoformat()}&hasta={miercoles.isoformat()}'
+        )
+        dias = respuesta.data['dias']
+        # Lo que se ofrece como libre es lo que POST /api/reservas/ acepta
+        self.assertEqual(dias[self.lunes.isoformat()], (('09:30', '22:00'),))
+        self.assertEqual(dias[(self.lunes + timedelta(days=1)).isoformat()], (('08:00', '22:00'),))
+        self.assertEqual(dias[miercoles.isoformat()], (('09:30', '22:00'),))
+
+    @override_settings(AUDITORIA_MODO='sync')
+    def test_aprobar_y_cancelar_se_auditan(self):
+        serie = self.crear_serie()
+        self.client.force_authenticate(self.admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/api/series-reservas/{serie.id}/aprobar/')
+        ids = set(Reserva.objects.filter(serie=serie).values_list('id', flat=True))
+        registros = Auditoria.objects.filter(tabla_afectada='reservas_reserva', registro_id__in=ids)
+        self.assertEqual(set(registros.filter(accion='CREATE').values_list('registro_id', flat=True)), ids)
+
+        # La cancelación es un UPDATE masivo, sin señales
+        self.client.force_authenticate(self.solicitante)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/api/series-reservas/{serie.id}/cancelar/')
+        canceladas = registros.filter(accion='UPDATE')
+        self.assertEqual(set(canceladas.values_list('registro_id', flat=True)), ids)
+        self.assertEqual(
+            {(r.usuario_id, r.valores_previos['estado'], r.valores_nuevos['estado']) for r in canceladas},
+            {(self.solicitante.id, 'aprobada', 'cancelada')},
+        )
+
+    def test_rechazar_no_crea_reservas(self):
+        serie = self.crear_serie()
+        self.client.force_authenticate(self.admin)
+        respuesta = self.client.post(f'/api/series-reservas/{serie.id}/rechazar/', {'motivo_rechazo': 'Sin cupo'}, format='json')
+        self.assertEqual(respuesta.data['estado'], 'rechazada')
+        self.assertFalse(Reserva.objects.exists())
+        # Ya no bloquea el horario
+        self.assertEqual(series.series_en_conflicto([{
+            'espacio': self.espacio.id, 'fecha_reserva': self.lunes, 'hora_inicio': time(8), 'hora_fin': time(9),
+        }]), [[]])
+
+
+@override_settings(AUDITORIA_MODO='off')
+class EventosTiempoRealTest(DatosReservasMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.espacio = Espacio.objects.create(nombre='Sala Eventos', tipo='salon', capacidad=30, ubicacion='Edificio A')
+
+    def token(self, usuario):
+        return str(TokenConRolSerializer.get_token(usuario).access_token)
+
+    def test_filtro_por_rol(self):
+        propio = {'usuario_id': self.solicitante.pk, 'estado': 'pendiente'}
+        ajeno = {'usuario_id': self.admin.pk, 'estado': 'rechazada'}
+        aprobado = {'usuario_id': self.admin.pk, 'estado': 'aprobada'}
+        # Una reserva ajena que deja de estar aprobada libera la franja del calendario
+        ya_no_aprobado = {'usuario_id': self.admin.pk, 'estado': 'cancelada', 'estado_anterior': 'aprobada'}
+        filtro = tiempo_real.filtro_para(str(self.solicitante.pk), 'solicitante')
+        self.assertEqual([filtro(e) for e in (propio, ajeno, aprobado, ya_no_aprobado)], [True, False, True, True])
+        filtro = tiempo_real.filtro_para(self.admin.pk, 'admin')
+        self.assertTrue(all(filtro(e) for e in (propio, ajeno, aprobado)))
+
+    def test_se_publica_solo_al_confirmar(self):
+        with mock.patch.object(tiempo_real.difusor, 'publicar') as publicar:
+            with self.captureOnCommitCallbacks(execute=True):
+                reserva = Reserva.objects.create(
+                    usuario=self.solicitante, espacio=self.espacio, fecha_reserva=date.today() + timedelta(days=1),
+                    hora_inicio=time(9), hora_fin=time(10), motivo='Clase',
+                )
+                self.assertFalse(publicar.called)
+            with self.captureOnCommitCallbacks(execute=True):
+                reserva.estado = 'aprobada'
+                reserva.save()
+                reserva.motivo = 'Otro motivo'
+                reserva.save()
+            reserva_id = reserva.pk
+            with self.captureOnCommitCallbacks(execute=True):
+                reserva.estado = 'cancelada'
+                reserva.save()
+                reserva.delete()
+        eventos = [llamada.args[0] for llamada in publicar.call_args_list]
+        self.assertEqual(
+            [(e['tipo'], e['estado_anterior']) for e in eventos],
+            [('reserva_creada', None), ('reserva_aprobada', 'pendiente'), ('reserva_cancelada', 'aprobada'),
+             ('reserva_eliminada', 'cancelada')],
+        )
+        self.assertEqual({e['id'] for e in eventos}, {reserva_id})
+
+    def ticket(self, usuario):
+        cliente = APIClient()
+        cliente.credentials(HTTP_AUTHORIZATION=f'Bearer {self.token(usuario)}')
+        respuesta = cliente.post('/api/eventos/ticket/')
+        self.assertEqual(respuesta.status_code, 200)
+        return respuesta.data['ticket']
+
+    def test_stream_requiere_ticket_de_un_solo_uso(self):
+        self.assertEqual(self.client.post('/api/eventos/ticket/').status_code, 401)
+        self.assertEqual(self.client.get('/api/eventos/stream/').status_code, 401)
+        self.assertEqual(self.client.get('/api/eventos/stream/', {'ticket': 'x.y.z'}).status_code, 401)
+        # El JWT ya no se acepta en la URL
+        self.assertEqual(self.client.get('/api/eventos/stream/', {'token': self.token(self.admin)}).status_code, 401)
+
+        ticket = self.ticket(self.admin)
+        with override_settings(EVENTOS_WSGI_DURACION=0):
+            respuesta = self.client.get('/api/eventos/stream/', {'ticket': ticket})
+            self.assertEqual(respuesta.status_code, 200)
+            respuesta.close()
+            self.assertEqual(self.client.get('/api/eventos/stream/', {'ticket': ticket}).status_code, 401)
+
+        vencido = self.ticket(self.admin)
+        with mock.patch('django.core.signing.time.time', return_value=timezone.now().timestamp() + 60):
+            self.assertEqual(self.client.get('/api/eventos/stream/', {'ticket': vencido}).status_code, 401)
+
+    @override_settings(EVENTOS_WSGI_DURACION=1)
+    def test_stream_wsgi_se_cierra_solo(self):
+        respuesta = self.client.get('/api/eventos/stream/', {'ticket': self.ticket(self.solicitante)})
+        contenido = iter(respuesta.streaming_content)
+        self.assertEqual(next(contenido), b'retry: 1000\n\n')
+        self.assertEqual(tiempo_real.difusor.conexiones, 1)
+
+        tiempo_real.difusor.publicar({
+            'tipo': 'reserva_creada', 'id': 2, 'usuario_id': self.solicitante.pk, 'estado': 'pendiente',
+            'espacio_id': self.espacio.pk, 'fecha_reserva': '2030-01-07', 'hora_inicio': '09:00', 'hora_fin': '10:00',
+        })
+        self.assertIn(b'event: reserva_creada\n', next(contenido))
+        # Sin más eventos, un ping y el stream termina al cumplirse la duración
+        self.assertEqual(list(contenido), [b': ping\n\n'])
+        self.assertEqual(tiempo_real.difusor.conexiones, 0)
+
+    async def test_stream_entrega_eventos_visibles(self):
+        ticket = await sync_to_async(self.ticket)(self.solicitante)
+        respuesta = await AsyncClient().get('/api/eventos/stream/', {'ticket': ticket})
+        self.assertEqual(respuesta['Content-Type'], 'text/event-stream')
+        contenido = respuesta.streaming_content
+        self.assertTrue((await anext(contenido)).startswith(b'retry:'))
+        self.assertEqual(tiempo_real.difusor.conexiones, 1)
+
+        base = {'espacio_id': self.espacio.pk, 'fecha_reserva': '2030-01-07', 'hora_inicio': '09:00', 'hora_fin': '10:00'}
+        tiempo_real.difusor.publicar({**base, 'tipo': 'reserva_rechazada', 'id': 1, 'usuario_id': self.admin.pk, 'estado': 'rechazada'})
+        tiempo_real.difusor.publicar({**base, 'tipo': 'reserva_creada', 'id': 2, 'usuario_id': self.solicitante.pk, 'estado': 'pendiente'})
+        mensaje = (await anext(contenido)).decode()
+        self.assertIn('event: reserva_creada\n', mensaje)
+        self.assertIn('"id":2', mensaje)
+
+        # Al desconectarse el cliente, el handler ASGI cancela la tarea que lee el stream
+        lectura = asyncio.ensure_future(anext(contenido))
+        await asyncio.sleep(0)
+        lectura.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await lectura
+        self.assertEqual(tiempo_real.difusor.conexiones, 0)
+
+
+class EstadisticasCacheTest(DatosReservasMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.crear_reservas(3)
+
+    def test_cacheadas_por_filtro_e_invalidadas_por_reservas(self):
+        url = '/api/reservas/estadisticas/'
+        total = self.client.get(url).data['kpis']['total']
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url).data['kpis']['total'], total)
+        # Otro filtro es otra entrada
+        self.assertEqual(self.client.get(url, {'carrera': self.carrera.id + 1}).data['kpis']['total'], 0)
+
+        espacio = Espacio.objects.create(nombre='Sala Nueva', tipo='salon', capacidad=10, ubicacion='Edificio C')
+        Reserva.objects.create(
+            usuario=self.admin, espacio=espacio, fecha_reserva=date.today(),
+            hora_inicio=time(9), hora_fin=time(10), motivo='Clase',
+        )
+        self.assertEqual(self.client.get(url).data['kpis']['total'], total + 1)
+
+
+@override_settings(METRICAS_TOKEN='secreto')
+class MetricasVistasTest(DatosReservasMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        metricas.registro.reiniciar()
+        metricas.cache_lectura.reiniciar_metricas()
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.crear_reservas(2)
+
+    def metricas(self):
+        return self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secreto').content.decode()
+
+    def test_registra_por_accion_y_expone_prometheus(self):
+        respuesta = self.client.get('/api/reservas/estadisticas/')
+        self.assertRegex(respuesta['Server-Timing'], r'^app;dur=[\d.]+, db;dur=[\d.]+;desc="\d+ consultas"$')
+        self.client.get('/api/no-existe/')
+
+        texto = self.metricas()
+        etiquetas = '{vista="ReservaViewSet.estadisticas",metodo="GET"}'
+        self.assertIn(f'http_peticion_segundos_count{etiquetas} 1', texto)
+        self.assertIn('http_peticion_segundos_bucket{vista="ReservaViewSet.estadisticas",metodo="GET",le="+Inf"} 1', texto)
+        consultas = next(l for l in texto.splitlines() if l.startswith(f'http_peticion_consultas_sum{etiquetas}'))
+        self.assertGreater(int(consultas.split()[-1]), 0)
+        self.assertIn('http_respuestas_total{vista="ReservaViewSet.estadisticas",codigo="200"} 1', texto)
+        self.assertIn('http_respuestas_total{vista="sin_vista",codigo="404"} 1', texto)
+        self.assertIn('cache_lectura_total{familia="estadisticas",evento="fallos"} 1', texto)
+
+    async def test_mide_consultas_bajo_asgi(self):
+        token = str(TokenConRolSerializer.get_token(self.admin).access_token)
+        respuesta = await AsyncClient().get('/api/reservas/pendientes/', headers={'Authorization': f'Bearer {token}'})
+        self.assertEqual(respuesta.status_code, 200)
+        # El contador se instala en el hilo donde corre la vista síncrona
+        self.assertRegex(respuesta['Server-Timing'], r'desc="[1-9]\d* consultas"$')
+        serie = next(s for s in metricas.registro.instantanea()['series'] if s['vista'] == 'ReservaViewSet.pendientes')
+        self.assertGreater(serie['consultas_suma'], 0)
+
+    def test_suma_los_procesos_del_directorio_compartido(self):
+        self.client.get('/api/reservas/pendientes/')
+        with tempfile.TemporaryDirectory() as directorio, override_settings(METRICAS_DIR=directorio):
+            # Otro proceso con la misma vista
+            otro = metricas.Registro()
+            otro.registrar('ReservaViewSet.pendientes', 'GET', 200, 0.02, 3, 0.004, 1500)
+            with open(f'{directorio}/metricas_999999.json', 'w') as archivo:
+                json.dump(otro.instantanea(), archivo)
+
+            texto = self.metricas()
+        self.assertIn('http_peticion_segundos_count{vista="ReservaViewSet.pendientes",metodo="GET"} 2', texto)
+        self.assertIn('http_respuestas_total{vista="ReservaViewSet.pendientes",codigo="200"} 2', texto)
+
+    def test_token_de_metricas(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer otro').status_code, 403)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secreto').status_code, 200)
+        # Sin token configurado no es pública, salvo en desarrollo
+        with override_settings(METRICAS_TOKEN=''):
+            self.assertEqual(self.client.get('/metrics').status_code, 403)
+            with override_settings(DEBUG=True):
+                self.assertEqual(self.client.get('/metrics').status_code, 200)
+
+
+@override_settings(CONSULTAS_LENTAS_UMBRAL_MS=0, CONSULTAS_LENTAS_MUESTREO=1)
+class ConsultasLentasTest(DatosReservasMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.crear_reservas(2)
+        # Con umbral 0 también se registran las consultas del propio setUp
+        consultas_lentas.registro.reiniciar()
+
+    def test_huella_normaliza_valores(self):
+        self.assertEqual(
+            consultas_lentas.huella("SELECT *  FROM t\nWHERE id IN (%s, %s, %s) AND nombre = 'o''higgins' LIMIT 21"),
+            'SELECT * FROM t WHERE id IN (...) AND nombre = ? LIMIT ?',
+        )
+
+    def test_registra_vista_sitio_y_plan(self):
+        with self.assertLogs('consultas_lentas', 'WARNING') as logs:
+            self.client.get('/api/reservas/estadisticas/')
+        self.assertTrue(any('vista=ReservaViewSet.estadisticas' in linea for linea in logs.output))
+
+        huellas = consultas_lentas.registro.instantanea().values()
+        del_calculo = [h for h in huellas if any(s.startswith('reservas/estadisticas.py:') for s in h['sitios'])]
+        self.assertTrue(del_calculo)
+        self.assertTrue(all(h['vistas'] == {'ReservaViewSet.estadisticas': h['cantidad']} for h in del_calculo))
+        # Con muestreo 1 cada SELECT lento guarda su plan
+        self.assertTrue(any(h['plan'] for h in del_calculo))
+
+    def test_registra_consultas_fuera_de_peticiones(self):
+        def trabajo():
+            # Conexión nueva del hilo (SELECT 1: las tablas están bloqueadas por la transacción del test)
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute('SELECT 1')
+            finally:
+                connection.close()
+
+        hilo = threading.Thread(target=trabajo, name='prueba-worker')
+        with self.assertLogs('consultas_lentas', 'WARNING') as logs:
+            hilo.start()
+            hilo.join()
+            Reserva.objects.filter(estado='aprobada').exists()
+        self.assertTrue(any('vista=hilo:prueba-worker' in linea for linea in logs.output))
+        self.assertTrue(any('vista=comando:' in linea for linea in logs.output))
+
+        # Las consultas de una petición se registran una sola vez, bajo la vista
+        consultas_lentas.registro.reiniciar()
+        with self.assertLogs('consultas_lentas', 'WARNING'):
+            self.client.get('/api/reservas/pendientes/')
+        vistas = Counter()
+        for datos in consultas_lentas.registro.instantanea().values():
+            vistas.update(datos['vistas'])
+        self.assertEqual(set(vistas), {'ReservaViewSet.pendientes'})
+
+    def conexion_postgres(self, en_transaccion):
+        conexion = mock.Mock(vendor='postgresql', in_atomic_block=en_transaccion)
+        conexion.get_autocommit.return_value = not en_transaccion
+        cursor = conexion.connection.cursor.return_value
+        cursor.fetchall.return_value = [('Seq Scan on reservas_reserva',)]
+        return conexion, cursor
+
+    def test_explain_en_postgres_fuera_y_dentro_de_transaccion(self):
+        sql = 'SELECT * FROM reservas_reserva WHERE id = %s'
+        # En autocommit (GET sin atomic) no hay transacción donde abrir un SAVEPOINT
+        conexion, cursor = self.conexion_postgres(en_transaccion=False)
+        self.assertEqual(consultas_lentas.explicar(conexion, sql, (1,)), 'Seq Scan on reservas_reserva')
+        self.assertEqual(
+            [llamada.args[0] for llamada in cursor.execute.call_args_list],
+            ['BEGIN', f'EXPLAIN (ANALYZE, BUFFERS) {sql}', 'ROLLBACK'],
+        )
+
+        conexion, cursor = self.conexion_postgres(en_transaccion=True)
+        consultas_lentas.explicar(conexion, sql, (1,))
+        self.assertEqual(
+            [llamada.args[0] for llamada in cursor.execute.call_args_list],
+            [
+                'SAVEPOINT explain_consulta_lenta', f'EXPLAIN (ANALYZE, BUFFERS) {sql}',
+                'ROLLBACK TO SAVEPOINT explain_consulta_lenta', 'RELEASE SAVEPOINT explain_consulta_lenta',
+            ],
+        )
+
+    def test_comando_suma_los_volcados(self):
+        with self.assertLogs('consultas_lentas', 'WARNING'):
+            self.client.get('/api/reservas/pendientes/')
+            self.client.get('/api/reservas/pendientes/')
+        salida = io.StringIO()
+        with tempfile.TemporaryDirectory() as directorio, override_settings(METRICAS_DIR=directorio):
+            metricas.volcador.volcar()
+            call_command('consultas_lentas', '--json', '--orden', 'cantidad', stdout=salida)
+        huellas = json.loads(salida.getvalue())
+        self.assertEqual(huellas[0]['vistas'], {'ReservaViewSet.pendientes': 2})
+        self.assertGreaterEqual(huellas[0]['cantidad'], 2)
+
+
+class ReporteJobTest(DatosReservasMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        ajustes = override_settings(REPORTES_DIR=directorio.name)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        self.client = APIClient()
+        self.client.force_authenticate(self.solicitante)
+        self.crear_reservas(3)
+
+    def test_cuerpo_que_no_es_objeto(self):
+        self.assertEqual(self.client.post('/api/reservas/reportes/', ['area'], format='json').status_code, 400)
+        self.assertFalse(ReporteJob.objects.exists())
+
+    def test_reutiliza_reporte_si_los_datos_no_cambian(self):
+        respuesta = self.client.post('/api/reservas/reportes/', {'area': 'Tecnología'}, format='json')
+        self.assertEqual(respuesta.status_code, 202)
+        job_id = respuesta.data['id']
+
+        self.assertEqual(trabajos.reclamar_pendientes(5), [job_id])
+        trabajos.procesar(job_id)
+
+        estado = self.client.get(f'/api/reservas/reportes/{job_id}/')
+        self.assertEqual(estado.data['estado'], 'completado')
+        descarga = self.client.get(f'/api/reservas/reportes/{job_id}/descargar/')
+        self.assertEqual(descarga.status_code, 200)
+        self.assertTrue(b''.join(descarga.streaming_content).startswith(b'%PDF'))
+
+        repetido = self.client.post('/api/reservas/reportes/', {'area': 'Tecnología'}, format='json')
+        self.assertEqual(repetido.status_code, 200)
+        self.assertEqual(repetido.data['id'], job_id)
+
+        # Un cambio en las reservas invalida el archivo en caché
+        reserva = Reserva.objects.first()
+        reserva.estado = 'rechazada'
+        reserva.save()
+        nuevo = self.client.post('/api/reservas/reportes/', {'area': 'Tecnología'}, format='json')
+        self.assertEqual(nuevo.status_code, 202)
+        self.assertNotEqual(nuevo.data['id'], job_id)
+
+    def test_reclama_de_nuevo_si_el_worker_muere(self):
+        job_id = self.client.post('/api/reservas/reportes/', {'area': 'Tecnología'}, format='json').data['id']
+        self.assertEqual(trabajos.reclamar_pendientes(5), [job_id])
+        # El worker muere sin terminar: mientras dure el arriendo nadie más lo toma
+        self.assertEqual(trabajos.reclamar_pendientes(5), [])
+
+        with override_settings(REPORTES_ARRIENDO=0):
+            self.assertEqual(trabajos.reclamar_pendientes(5), [job_id])
+        trabajos.procesar(job_id)
+        repetido = self.client.post('/api/reservas/reportes/', {'area': 'Tecnología'}, format='json')
+        self.assertEqual((repetido.data['id'], repetido.data['estado']), (job_id, 'completado'))
+
+    def test_reporte_ajeno_no_visible(self):
+        job = ReporteJob.objects.create(solicitado_por=self.admin, version_datos='-', clave='x' * 64)
+        self.assertEqual(self.client.get(f'/api/reservas/reportes/{job.id}/').status_code, 404)
@@ -0,0 +1,242 @@
+"""
+Eventos en vivo de reservas para el stream SSE (/api/eventos/stream/).
+
+Cuando una reserva se crea o cambia a aprobada, rechazada o cancelada, el
+evento se publica al confirmarse la transacción. Cada conexión SSE es una
+corrutina suscrita al Difusor del proceso, que solo tiene una cola pequeña:
+mantener miles de conexiones ociosas cuesta memoria, no hilos.
+
+EVENTOS_BACKEND en settings:
+- 'memoria': el evento se entrega a los suscriptores del mismo proceso.
+  Sirve con un solo proceso ASGI o en desarrollo.
+- 'postgres': se publica con pg_notify y cada proceso ASGI lo recibe con
+  LISTEN (un hilo por proceso) y lo reparte a sus suscriptores. Así un
+  evento generado en cualquier worker llega a todas las conexiones.
+
+El stream está pensado para un servidor ASGI (config/asgi.py). Servido por
+WSGI cada conexión ocupa un worker, así que se usa una SuscripcionSincrona y
+la respuesta se cierra a los EVENTOS_WSGI_DURACION segundos; el navegador se
+vuelve a conectar.
+
+EventSource no admite cabeceras, y un JWT en la URL queda en los logs de
+acceso. Por eso el stream se abre con un ticket: firmado, válido solo para
+el stream, por EVENTOS_TICKET_TTL segundos y una sola vez.
+"""
+import asyncio
+import itertools
+import json
+import logging
+import queue
+import secrets
+import select
+import threading
+import time
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.db import connection, transaction
+
+logger = logging.getLogger(__name__)
+
+CANAL_POSTGRES = 'reservas_eventos'
+# Eventos en espera por conexión; si un cliente no alcanza a leerlos se descartan los más antiguos
+MAX_COLA_SUSCRIPTOR = 100
+
+TIPO_POR_ESTADO = {
+    'aprobada': 'reserva_aprobada',
+    'rechazada': 'reserva_rechazada',
+    'cancelada': 'reserva_cancelada',
+}
+
+
+def _backend():
+    return getattr(settings, 'EVENTOS_BACKEND', 'memoria')
+
+
+class Suscripcion:
+
+    def __init__(self, loop, filtro):
+        self.loop = loop
+        self.filtro = filtro
+        self.cola = asyncio.Queue(maxsize=MAX_COLA_SUSCRIPTOR)
+
+    def notificar(self, evento):
+        # Se llama desde cualquier hilo; la cola solo se toca dentro de su loop
+        self.loop.call_soon_threadsafe(self._entregar, evento)
+
+    def _entregar(self, evento):
+        # Corre en el loop del suscriptor
+        if self.cola.full():
+            self.cola.get_nowait()
+        self.cola.put_nowait(evento)
+
+
+class SuscripcionSincrona:
+    """Para el stream servido por WSGI: la lee el hilo del worker bloqueándose en la cola"""
+
+    def __init__(self, filtro):
+        self.filtro = filtro
+        self.cola = queue.Queue(maxsize=MAX_COLA_SUSCRIPTOR)
+
+    def notificar(self, evento):
+        while True:
+            try:
+                self.cola.put_nowait(evento)
+                return
+            except queue.Full:
+                try:
+                    self.cola.get_nowait()
+                except queue.Empty:
+                    pass
+
+
+class Difusor:
+    """Reparte eventos a las suscripciones del proceso. `publicar` se puede llamar desde cualquier hilo."""
+
+    def __init__(self):
+        self._suscripciones = set()
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def suscribir(self, filtro, sincrona=False):
+        suscripcion = SuscripcionSincrona(filtro) if sincrona else Suscripcion(asyncio.get_running_loop(), filtro)
+        with self._lock:
+            self._suscripciones.add(suscripcion)
+        if _backend() == 'postgres':
+            oyente.iniciar()
+        return suscripcion
+
+    def desuscribir(self, suscripcion):
+        with self._lock:
+            self._suscripciones.discard(suscripcion)
+
+    @property
+    def conexiones(self):
+        return len(self._suscripciones)
+
+    def publicar(self, evento):
+        evento = {**evento, 'seq': next(self._ids)}
+        with self._lock:
+            destinatarios = [s for s in self._suscripciones if s.filtro(evento)]
+        for suscripcion in destinatarios:
+            try:
+                suscripcion.notificar(evento)
+            except RuntimeError:
+                # El loop ya se cerró: la conexión se está terminando
+                self.desuscribir(suscripcion)
+
+
+difusor = Difusor()
+
+
+class OyentePostgres:
+    """Hilo que hace LISTEN en su propia conexión y pasa cada NOTIFY al difusor"""
+
+    def __init__(self):
+        self._hilo = None
+        self._lock = threading.Lock()
+
+    def iniciar(self):
+        with self._lock:
+            if self._hilo is None or not self._hilo.is_alive():
+                self._hilo = threading.Thread(target=self._ejecutar, name='eventos-listen', daemon=True)
+                self._hilo.start()
+
+    def _conectar(self):
+        conexion = connection.get_new_connection(connection.get_connection_params())
+        conexion.set_session(autocommit=True)
+        with conexion.cursor() as cursor:
+            cursor.execute(f'LISTEN {CANAL_POSTGRES}')
+        return conexion
+
+    def _ejecutar(self):
+        while True:
+            try:
+                conexion = self._conectar()
+                while True:
+                    if select.select([conexion], [], [], 30) == ([], [], []):
+                        continue
+                    conexion.poll()
+                    while conexion.notifies:
+                        aviso = conexion.notifies.pop(0)
+                        difusor.publicar(json.loads(aviso.payload))
+            except Exception:
+                logger.exception("Se perdió la conexión LISTEN de eventos; reintentando")
+                time.sleep(5)
+
+
+oyente = OyentePostgres()
+
+
+def evento_reserva(reserva, tipo, estado_anterior=None):
+    """`estado_anterior` permite avisar a quien veía la reserva aprobada que dejó de estarlo"""
+    return {
+        'tipo': tipo,
+        'id': reserva.pk,
+        'usuario_id': reserva.usuario_id,
+        'espacio_id': reserva.espacio_id,
+        'fecha_reserva': reserva.fecha_reserva.isoformat(),
+        'hora_inicio': reserva.hora_inicio.strftime('%H:%M'),
+        'hora_fin': reserva.hora_fin.strftime('%H:%M'),
+        'estado': reserva.estado,
+        'estado_anterior': estado_anterior,
+    }
+
+
+def _emitir(eventos):
+    if _backend() == 'postgres':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT pg_notify(%s, carga) FROM unnest(%s::text[]) AS carga',
+                [CANAL_POSTGRES, [json.dumps(evento) for evento in eventos]],
+            )
+    else:
+        for evento in eventos:
+            difusor.publicar(evento)
+
+
+def publicar(eventos):
+    """Publica los eventos cuando la transacción en curso se confirma"""
+    if eventos:
+        transaction.on_commit(lambda: _emitir(eventos))
+
+
+def filtro_para(usuario_id, rol):
+    """
+    Admin y coordinador ven todo; el resto, lo suyo y lo aprobado (igual que el
+    calendario), también cuando una reserva aprobada se cancela, rechaza o elimina.
+    """
+    if rol in ('admin', 'coordinador'):
+        return lambda evento: True
+    usuario_id = str(usuario_id)
+    return lambda evento: (
+        str(evento['usuario_id']) == usuario_id
+        or evento['estado'] == 'aprobada'
+        or evento.get('estado_anterior') == 'aprobada'
+    )
+
+
+# --- Tickets del stream ---
+
+SAL_TICKET = 'reservas.tiempo_real.ticket'
+
+
+def emitir_ticket(usuario_id, rol):
+    """Ticket firmado para abrir /api/eventos/stream/?ticket=... una sola vez"""
+    return signing.dumps({'u': usuario_id, 'r': rol, 'n': secrets.token_urlsafe(12)}, salt=SAL_TICKET, compress=True)
+
+
+async def canjear_ticket(ticket):
+    """
+    (usuario_id, rol) si el ticket es válido, no venció y no se había usado; si no, None.
+    El uso se marca en la caché, compartida entre procesos con Redis.
+    """
+    ttl = settings.EVENTOS_TICKET_TTL
+    try:
+        datos = signing.loads(ticket, salt=SAL_TICKET, max_age=ttl)
+    except signing.BadSignature:
+        return None
+    if not await cache.aadd(f"eventos:ticket:{datos['n']}", True, ttl + 1):
+        return None
+    return datos['u'], datos['r']
@@ -0,0 +1,135 @@
+"""
+Informes PDF en segundo plano.
+
+Cada solicitud queda como un ReporteJob. El archivo generado se guarda en
+REPORTES_DIR con el nombre de su clave: un hash de los filtros y de la versión
+de los datos. Si se vuelve a pedir el mismo informe y las reservas no han
+cambiado, se reutiliza el archivo sin generar nada.
+
+Un worker que reclama un trabajo lo arrienda por REPORTES_ARRIENDO segundos
+desde fecha_inicio: si el proceso muere a mitad de camino, al vencer el
+arriendo otro worker lo vuelve a reclamar.
+"""
+import hashlib
+import json
+import os
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max, Q
+from django.utils import timezone
+
+from .consultas import construir_queryset, filtrar_reporte
+from .estadisticas import resumen_estados
+from .models import Reserva, ReporteJob
+from .reportes import filas_reporte, generar_reporte_pdf
+
+PARAMETROS_REPORTE = ('start_date', 'end_date', 'carrera', 'area')
+
+
+def normalizar_parametros(datos):
+    return {nombre: str(datos[nombre]) for nombre in PARAMETROS_REPORTE if datos.get(nombre)}
+
+
+def reservas_del_reporte(parametros):
+    return filtrar_reporte(
+        construir_queryset('exportar_reporte', Reserva.objects.all()),
+        parametros.get('start_date'), parametros.get('end_date'),
+        parametros.get('carrera'), parametros.get('area'),
+    )
+
+
+def version_datos(parametros):
+    """
+    Sello barato de las reservas que entran en el informe: cualquier alta,
+    baja o modificación cambia la cantidad, el ID máximo o la última actualización.
+    """
+    sello = reservas_del_reporte(parametros).order_by().aggregate(
+        total=Count('id'), ultimo_id=Max('id'), actualizada=Max('fecha_actualizacion'),
+    )
+    actualizada = sello['actualizada'].isoformat() if sello['actualizada'] else '-'
+    return f"{sello['total']}:{sello['ultimo_id'] or 0}:{actualizada}"
+
+
+def clave_reporte(parametros, version):
+    contenido = json.dumps({'parametros': parametros, 'version': version}, sort_keys=True)
+    return hashlib.sha256(contenido.encode()).hexdigest()
+
+
+def directorio_reportes():
+    directorio = Path(settings.REPORTES_DIR)
+    directorio.mkdir(parents=True, exist_ok=True)
+    return directorio
+
+
+def ruta_archivo(job):
+    return Path(settings.REPORTES_DIR) / job.archivo
+
+
+def solicitar_reporte(datos, usuario=None):
+    """
+    Devuelve un trabajo para los filtros pedidos: uno ya completado con la misma
+    clave (caché), uno en curso con la misma clave, o uno nuevo en cola.
+    """
+    parametros = normalizar_parametros(datos)
+    version = version_datos(parametros)
+    clave = clave_reporte(parametros, version)
+
+    existentes = ReporteJob.objects.filter(clave=clave, estado__in=['pendiente', 'procesando', 'completado'])
+    for job in existentes:
+        if job.estado != 'completado' or ruta_archivo(job).exists():
+            return job
+
+    return ReporteJob.objects.create(
+        solicitado_por=usuario, parametros=parametros, version_datos=version, clave=clave,
+    )
+
+
+def _reclamables(ahora):
+    """Pendientes, o en proceso con el arriendo vencido (su worker murió)"""
+    vencimiento = ahora - timedelta(seconds=settings.REPORTES_ARRIENDO)
+    return Q(estado='pendiente') | Q(estado='procesando', fecha_inicio__lt=vencimiento)
+
+
+def reclamar_pendientes(limite):
+    """Marca como 'procesando' hasta `limite` trabajos reclamables sin chocar con otros workers"""
+    ahora = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            ReporteJob.objects.select_for_update(skip_locked=True)
+            .filter(_reclamables(ahora)).order_by('fecha_creacion')
+            .values_list('id', flat=True)[:limite]
+        )
+        ReporteJob.objects.filter(id__in=ids).update(estado='procesando', fecha_inicio=ahora)
+    return ids
+
+
+def procesar(job_id):
+    """Genera el PDF de un trabajo reclamado. Se ejecuta dentro de los procesos del worker."""
+    job = ReporteJob.objects.get(pk=job_id)
+    parametros = job.parametros
+    nombre = f"{job.clave}.pdf"
+    destino = directorio_reportes() / nombre
+    temporal = destino.with_suffix(f".{os.getpid()}.tmp")
+
+    try:
+        if not destino.exists():
+            resumen = resumen_estados(
+                parametros.get('start_date'), parametros.get('end_date'),
+                parametros.get('carrera'), parametros.get('area'),
+            )
+            generar_reporte_pdf(
+                str(temporal), resumen, filas_reporte(reservas_del_reporte(parametros)),
+                start_date=parametros.get('start_date'), end_date=parametros.get('end_date'),
+                area_nombre=parametros.get('area'),
+            )
+            os.replace(temporal, destino)
+    except Exception as exc:
+        temporal.unlink(missing_ok=True)
+        ReporteJob.objects.filter(pk=job_id).update(estado='fallido', error=str(exc), fecha_fin=timezone.now())
+        raise
+
+    ReporteJob.objects.filter(pk=job_id).update(estado='completado', archivo=nombre, fecha_fin=timezone.now())
+    return job_id
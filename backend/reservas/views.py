@@ -1,57 +1,174 @@
-from rest_framework import viewsets, permissions, status
-from rest_framework.decorators import action
+from rest_framework import viewsets, mixins, permissions, status
+from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.exceptions import PermissionDenied, ValidationError
+from rest_framework.renderers import BrowsableAPIRenderer
 from rest_framework.response import Response
+from django.conf import settings
 from django.utils import timezone
-from django.db.models import Count, Sum, Q 
-from django.http import HttpResponse, HttpResponseForbidden, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.db import transaction
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import Q
+from django.http import JsonResponse, FileResponse, StreamingHttpResponse
 from datetime import datetime
-import io
+import asyncio
+import json
+import queue
+import time
 
-# --- IMPORTACIONES PARA PDF (ReportLab) ---
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import letter, landscape
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
 
-from .models import Reserva, ReservaElemento
-from .serializers import ReservaSerializer, ReservaCreateSerializer
+from .models import Reserva, ReporteJob, SerieReserva
+from .serializers import (
+    ReservaSerializer, ReservaCreateSerializer, ReservaLoteItemSerializer, BloqueHorarioSerializer, ReporteJobSerializer,
+    SerieReservaSerializer, formatear_conflictos,
+)
+from .conflictos import verificar_bloques
+from .consultas import construir_queryset, filtrar_reporte, calendario_columnar
+from .disponibilidad import MAX_DIAS_CONSULTA
+from .estadisticas import calcular_estadisticas, resumen_estados
+from .reportes import filas_reporte, reporte_temporal
+from . import lote, proyeccion, series, tiempo_real, trabajos
+from usuarios.autenticacion import UsuarioToken
+from config import cache as cache_lectura
+from config.renderers import JSONRapidoRenderer
+from usuarios.permissions import obtener_rol
+from notificaciones import eventos
 
 class ReservaViewSet(viewsets.ModelViewSet):
     queryset = Reserva.objects.all()
     permission_classes = [permissions.IsAuthenticated]
+    renderer_classes = [JSONRapidoRenderer, BrowsableAPIRenderer]
+    # Orden estable para la paginación por cursor (config.pagination)
+    cursor_ordering = ('-fecha_creacion', '-id')
     
     def get_serializer_class(self):
         if self.action == 'create':
             return ReservaCreateSerializer
         return ReservaSerializer
     
+    def _queryset_accion(self):
+        """Queryset base con las relaciones que necesita la acción actual (evita N+1)"""
+        expandidos = ReservaSerializer.expandidos(self.request)
+        return construir_queryset(self.action, self.queryset.all(), expandidos)
+    
     def get_queryset(self):
         user = self.request.user
+        queryset = self._queryset_accion()
         # Admin y Coordinador ven todo
-        if user.rol.nombre_rol in ['admin', 'coordinador']:
-            return self.queryset.all()
+        if obtener_rol(user) in ['admin', 'coordinador']:
+            return queryset
         
         # --- SOLUCIÓN CALENDARIO ---
         # El solicitante ve:
         # 1. Sus propias reservas (Q(usuario=user)) -> Para ver sus estados
         # 2. O (|) las reservas de OTROS que ya estén 'aprobada' -> Para ver ocupación en calendario
-        return self.queryset.filter(Q(usuario=user) | Q(estado='aprobada'))
+        return queryset.filter(Q(usuario=user) | Q(estado='aprobada'))
     
     def perform_create(self, serializer):
         serializer.save(usuario=self.request.user)
 
+    def _listado(self, reservas):
+        """
+        Como el list() de DRF, pero con la proyección de reservas/proyeccion.py en
+        lugar de ReservaSerializer(many=True): las reservas se leen sin joins y
+        los anidados se consultan y serializan una vez por objeto.
+        """
+        reservas = reservas.select_related(None).prefetch_related(None)
+        page = self.paginate_queryset(reservas)
+        if page is not None:
+            return self.get_paginated_response(proyeccion.serializar(page, self.request))
+        return Response(proyeccion.serializar(reservas, self.request))
+
+    def list(self, request, *args, **kwargs):
+        return self._listado(self.filter_queryset(self.get_queryset()))
+
     # --- NUEVA ACCIÓN: MIS RESERVAS (EXCLUSIVO LISTA PERSONAL) ---
     @action(detail=False, methods=['get'])
     def mis_reservas(self, request):
         """Devuelve SOLO las reservas del usuario actual para su lista personal"""
-        reservas = self.queryset.filter(usuario=request.user).order_by('-fecha_reserva')
-        
-        page = self.paginate_queryset(reservas)
-        if page is not None:
-            return self.get_paginated_response(self.get_serializer(page, many=True).data)
+        reservas = self._queryset_accion().filter(usuario=request.user).order_by('-fecha_reserva')
+        return self._listado(reservas)
+
+    # --- CREACIÓN EN LOTE ---
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def crear_lote(self, request):
+        """
+        {'modo': 'todo_o_nada' | 'parcial', 'reservas': [{espacio, fecha_reserva, hora_inicio, hora_fin, motivo, elementos}]}
+        Responde un resultado por reserva, en el mismo orden.
+        """
+        datos = _cuerpo_objeto(request)
+        modo = datos.get('modo', lote.MODO_TODO_O_NADA)
+        items = datos.get('reservas')
+        if modo not in lote.MODOS:
+            raise ValidationError({'modo': f"Debe ser uno de: {', '.join(lote.MODOS)}"})
+        if not isinstance(items, list) or not items:
+            raise ValidationError({'reservas': "Debe ser una lista con al menos una reserva"})
+        if len(items) > lote.MAX_RESERVAS_POR_LOTE:
+            raise ValidationError({'reservas': f"El lote no puede superar {lote.MAX_RESERVAS_POR_LOTE} reservas"})
+
+        validados, errores = [], {}
+        for indice, item in enumerate(items):
+            serializer = ReservaLoteItemSerializer(data=item)
+            if serializer.is_valid():
+                validados.append(serializer.validated_data)
+            else:
+                validados.append(None)
+                errores[indice] = [
+                    f"{campo}: {mensaje}" if campo != 'non_field_errors' else str(mensaje)
+                    for campo, mensajes in serializer.errors.items() for mensaje in mensajes
+                ]
+
+        resultados = lote.crear_lote(request.user, validados, modo, errores)
+        creadas = sum(1 for r in resultados if r['creada'])
+        codigo = status.HTTP_201_CREATED if creadas else status.HTTP_400_BAD_REQUEST
+        return Response({
+            'modo': modo, 'creadas': creadas, 'rechazadas': len(resultados) - creadas, 'resultados': resultados,
+        }, status=codigo)
+
+    # --- FEED COMPACTO PARA EL CALENDARIO ---
+    @action(detail=False, methods=['get'])
+    def calendario(self, request):
+        """
+        ?desde=YYYY-MM-DD&hasta=YYYY-MM-DD[&espacio=1,2]
+        Devuelve las reservas visibles de la ventana en formato columnar (ver calendario_columnar).
+        """
+        try:
+            desde = datetime.strptime(request.query_params['desde'], '%Y-%m-%d').date()
+            hasta = datetime.strptime(request.query_params['hasta'], '%Y-%m-%d').date()
+        except (KeyError, ValueError):
+            raise ValidationError("Se requieren 'desde' y 'hasta' con formato YYYY-MM-DD")
+        if hasta < desde:
+            raise ValidationError("'hasta' debe ser posterior a 'desde'")
+        if (hasta - desde).days >= MAX_DIAS_CONSULTA:
+            raise ValidationError(f"El rango no puede superar {MAX_DIAS_CONSULTA} días")
+
+        # get_queryset aplica la visibilidad: propias + aprobadas de otros
+        reservas = self.get_queryset().filter(fecha_reserva__range=(desde, hasta))
+        if request.query_params.get('espacio'):
+            try:
+                espacio_ids = [int(valor) for valor in request.query_params['espacio'].split(',') if valor]
+            except ValueError:
+                raise ValidationError("'espacio' debe ser una lista de IDs separados por coma")
+            reservas = reservas.filter(espacio_id__in=espacio_ids)
+
+        return Response({'desde': desde.isoformat(), 'hasta': hasta.isoformat(), **calendario_columnar(reservas)})
+
+    # --- VERIFICACIÓN DE CONFLICTOS EN LOTE ---
+    @action(detail=False, methods=['post'])
+    def verificar_conflictos(self, request):
+        """Recibe {'bloques': [...]} y responde, para cada bloque, si choca con reservas activas"""
+        serializer = BloqueHorarioSerializer(data=_cuerpo_objeto(request).get('bloques', []), many=True)
+        serializer.is_valid(raise_exception=True)
+        bloques = serializer.validated_data
         
-        serializer = self.get_serializer(reservas, many=True)
-        return Response(serializer.data)
+        resultados = verificar_bloques(bloques)
+        return Response([
+            {**serializer.data[i], 'conflicto': bool(conflictos), 'reservas': conflictos}
+            for i, conflictos in enumerate(resultados)
+        ])
 
     # --- ENDPOINT DE ESTADÍSTICAS AVANZADAS (CORREGIDO) ---
     @action(detail=False, methods=['get'])
@@ -70,57 +187,19 @@ class ReservaViewSet(viewsets.ModelViewSet):
             fecha_inicio = hoy.replace(day=1)
             fecha_fin = hoy
 
-        # Para estadísticas usamos siempre .all() filtrado, no restringido por usuario
-        reservas_filtradas = self.queryset.all().filter(
-            fecha_reserva__range=[fecha_inicio, fecha_fin]
-        )
-
         # 2. Filtros Adicionales (Carrera / Área)
         carrera_id = request.query_params.get('carrera')
         area_nombre = request.query_params.get('area')
 
-        if carrera_id:
-            reservas_filtradas = reservas_filtradas.filter(usuario__carrera__id=carrera_id)
-        
-        if area_nombre:
-            reservas_filtradas = reservas_filtradas.filter(usuario__carrera__area=area_nombre)
-
-        # 3. Cálculo de KPIs
-        total = reservas_filtradas.count()
-        aprobadas = reservas_filtradas.filter(estado='aprobada').count()
-        rechazadas = reservas_filtradas.filter(estado='rechazada').count()
-        tasa_aprobacion = round((aprobadas / total * 100), 1) if total > 0 else 0
-
-        # 4. Gráficos
-        top_carreras = reservas_filtradas.values('usuario__carrera__nombre_carrera').annotate(total=Count('id')).order_by('-total')[:5]
-        data_carreras = [{'name': item['usuario__carrera__nombre_carrera'] or 'Sin Carrera', 'value': item['total']} for item in top_carreras]
-
-        top_elementos = ReservaElemento.objects.filter(reserva__in=reservas_filtradas).values('elemento__nombre').annotate(total_solicitado=Sum('cantidad_solicitada')).order_by('-total_solicitado')[:5]
-        data_elementos = [{'name': item['elemento__nombre'], 'cantidad': item['total_solicitado']} for item in top_elementos]
-
-        top_espacios = reservas_filtradas.values('espacio__nombre').annotate(total=Count('id')).order_by('-total')[:5]
-        data_espacios = [{'name': item['espacio__nombre'], 'reservas': item['total']} for item in top_espacios]
-
-        por_dia = reservas_filtradas.values('fecha_reserva').annotate(total=Count('id')).order_by('fecha_reserva')
-        data_diario = [{'fecha': item['fecha_reserva'].strftime('%Y-%m-%d'), 'total': item['total']} for item in por_dia]
-
-        # 8. Agenda Hoy & Pendientes
-        reservas_hoy = self.queryset.all().filter(fecha_reserva=hoy)
-        
-        # CORRECCIÓN: Contamos TODAS las pendientes históricas, no solo las de "hoy"
-        total_pendientes = self.queryset.all().filter(estado='pendiente').count()
-
-        agenda_hoy = {
-            'total_hoy': reservas_hoy.count(),
-            'eventos': reservas_hoy.filter(estado='aprobada').values('hora_inicio', 'espacio__nombre', 'motivo').order_by('hora_inicio')[:3],
-            'pendientes_accion': total_pendientes  # Ahora muestra el total real pendiente
-        }
-
-        return Response({
-            'kpis': {'total': total, 'aprobadas': aprobadas, 'rechazadas': rechazadas, 'tasa_aprobacion': tasa_aprobacion},
-            'graficos': {'carreras': data_carreras, 'espacios': data_espacios, 'elementos': data_elementos, 'diario': data_diario},
-            'agenda_hoy': agenda_hoy
-        })
+        # Para estadísticas usamos siempre la tabla completa, no restringida por usuario.
+        # Dependen de las reservas y de los nombres de carreras, espacios y elementos.
+        datos = cache_lectura.obtener(
+            'estadisticas', ('reservas', 'carreras', 'espacios', 'elementos'),
+            (fecha_inicio, fecha_fin, hoy, carrera_id, area_nombre),
+            lambda: calcular_estadisticas(fecha_inicio, fecha_fin, hoy, carrera_id, area_nombre),
+            timeout=settings.CACHE_ESTADISTICAS_TTL,
+        )
+        return Response(datos)
 
     # --- REPORTE PDF MEJORADO ---
     @action(detail=False, methods=['get'])
@@ -130,116 +209,270 @@ class ReservaViewSet(viewsets.ModelViewSet):
         carrera_id = request.query_params.get('carrera')
         area_nombre = request.query_params.get('area')
         
-        reservas = self.queryset.all()
-        if start_date and end_date:
-            reservas = reservas.filter(fecha_reserva__range=[start_date, end_date])
-        if carrera_id:
-            reservas = reservas.filter(usuario__carrera__id=carrera_id)
-        if area_nombre:
-            reservas = reservas.filter(usuario__carrera__area=area_nombre)
-            
-        reservas = reservas.order_by('-fecha_reserva')
-
-        total = reservas.count()
-        aprobadas = reservas.filter(estado='aprobada').count()
-        rechazadas = reservas.filter(estado='rechazada').count()
-        pendientes = reservas.filter(estado='pendiente').count()
-        tasa_exito = (aprobadas / total * 100) if total > 0 else 0
-
-        buffer = io.BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=landscape(letter), rightMargin=40, leftMargin=40, topMargin=40, bottomMargin=30)
-        elements = []
-        styles = getSampleStyleSheet()
-
-        title_style = ParagraphStyle('Title', parent=styles['Heading1'], fontSize=24, textColor=colors.darkred, spaceAfter=20, alignment=1)
-        elements.append(Paragraph("INACAP - Informe de Gestión de Espacios", title_style))
-        
-        try:
-            fmt_start = datetime.strptime(start_date, '%Y-%m-%d').strftime('%d/%m/%Y') if start_date else "Inicio"
-            fmt_end = datetime.strptime(end_date, '%Y-%m-%d').strftime('%d/%m/%Y') if end_date else "Hoy"
-        except:
-            fmt_start, fmt_end = start_date, end_date
-
-        info_text = f"<b>Generado el:</b> {datetime.now().strftime('%d/%m/%Y %H:%M')}<br/><b>Periodo:</b> {fmt_start} al {fmt_end}"
-        if area_nombre: info_text += f" | <b>Área:</b> {area_nombre}"
-        
-        elements.append(Paragraph(info_text, styles['Normal']))
-        elements.append(Spacer(1, 20))
+        reservas = filtrar_reporte(self._queryset_accion(), start_date, end_date, carrera_id, area_nombre)
+        resumen = resumen_estados(start_date, end_date, carrera_id, area_nombre)
 
-        data_summary = [
-            ['Total Solicitudes', 'Aprobadas', 'Rechazadas', 'Pendientes', 'Tasa Aprobación'],
-            [total, aprobadas, rechazadas, pendientes, f"{tasa_exito:.1f}%"]
-        ]
-        
-        t_summary = Table(data_summary, colWidths=[100, 80, 80, 80, 100])
-        t_summary.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.whitesmoke),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black),
-            ('FONTSIZE', (0, 1), (-1, -1), 12),
-        ]))
-        elements.append(t_summary)
-        elements.append(Spacer(1, 30))
-
-        elements.append(Paragraph("Detalle de Transacciones", styles['Heading2']))
-        elements.append(Spacer(1, 10))
-
-        data = [['Fecha', 'Solicitante', 'Carrera', 'Espacio', 'Horario', 'Estado']]
-        for r in reservas:
-            carrera = r.usuario.carrera.nombre_carrera if r.usuario.carrera else "N/A"
-            fecha_fmt = r.fecha_reserva.strftime('%d/%m/%Y') if r.fecha_reserva else "-"
-            
-            data.append([
-                fecha_fmt,
-                f"{r.usuario.nombre} {r.usuario.apellido}",
-                carrera[:20],
-                r.espacio.nombre,
-                f"{r.hora_inicio} - {r.hora_fin}",
-                r.get_estado_display()
-            ])
-
-        col_widths = [70, 140, 140, 120, 90, 80]
-        t = Table(data, colWidths=col_widths, repeatRows=1)
-        t.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.darkred),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 10),
-            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.lightgrey]),
-        ]))
-        
-        elements.append(t)
-        doc.build(elements)
-        buffer.seek(0)
-        response = HttpResponse(buffer, content_type='application/pdf')
+        # El detalle se lee por lotes y se dibuja en tablas de una página;
+        # el PDF se envía por partes desde un archivo temporal.
+        archivo = reporte_temporal(
+            resumen, filas_reporte(reservas),
+            start_date=start_date, end_date=end_date, area_nombre=area_nombre,
+        )
         filename = f"Reporte_Gestion_{datetime.now().strftime('%Y%m%d')}.pdf"
-        response['Content-Disposition'] = f'attachment; filename="{filename}"'
-        return response
+        return FileResponse(archivo, as_attachment=True, filename=filename, content_type='application/pdf')
+
+    # --- REPORTES EN SEGUNDO PLANO ---
+    def _job_visible(self, job_id):
+        user = self.request.user
+        jobs = ReporteJob.objects.all()
+        if obtener_rol(user) not in ['admin', 'coordinador']:
+            jobs = jobs.filter(solicitado_por=user)
+        return get_object_or_404(jobs, pk=job_id)
+
+    @action(detail=False, methods=['post'], url_path='reportes')
+    def solicitar_reporte(self, request):
+        """Encola el informe (o reutiliza uno idéntico ya generado). El worker es `procesar_reportes`."""
+        job = trabajos.solicitar_reporte(_cuerpo_objeto(request), usuario=request.user)
+        codigo = status.HTTP_200_OK if job.estado == 'completado' else status.HTTP_202_ACCEPTED
+        return Response(ReporteJobSerializer(job, context={'request': request}).data, status=codigo)
+
+    @action(detail=False, methods=['get'], url_path=r'reportes/(?P<job_id>[0-9]+)')
+    def estado_reporte(self, request, job_id=None):
+        job = self._job_visible(job_id)
+        return Response(ReporteJobSerializer(job, context={'request': request}).data)
+
+    @action(detail=False, methods=['get'], url_path=r'reportes/(?P<job_id>[0-9]+)/descargar')
+    def descargar_reporte(self, request, job_id=None):
+        job = self._job_visible(job_id)
+        ruta = trabajos.ruta_archivo(job) if job.estado == 'completado' else None
+        if ruta is None or not ruta.exists():
+            return Response({'error': 'El reporte aún no está disponible'}, status=status.HTTP_409_CONFLICT)
+        filename = f"Reporte_Gestion_{job.fecha_creacion.strftime('%Y%m%d')}.pdf"
+        return FileResponse(open(ruta, 'rb'), as_attachment=True, filename=filename, content_type='application/pdf')
 
+    # La notificación se encola en la misma transacción que el cambio de estado
     @action(detail=True, methods=['post'])
     def aprobar(self, request, pk=None):
         reserva = self.get_object()
-        reserva.estado = 'aprobada'
-        reserva.save()
+        with transaction.atomic():
+            reserva.estado = 'aprobada'
+            reserva.save()
+            eventos.reserva_aprobada(reserva)
         return Response(self.get_serializer(reserva).data)
 
     @action(detail=True, methods=['post'])
     def rechazar(self, request, pk=None):
         reserva = self.get_object()
-        reserva.estado = 'rechazada'
-        motivo = request.data.get('motivo_rechazo')
-        if motivo:
-            reserva.motivo_rechazo = motivo
-        reserva.save()
+        with transaction.atomic():
+            reserva.estado = 'rechazada'
+            motivo = request.data.get('motivo_rechazo')
+            if motivo:
+                reserva.motivo_rechazo = motivo
+            reserva.save()
+            eventos.reserva_rechazada(reserva)
         return Response(self.get_serializer(reserva).data)
 
     @action(detail=False, methods=['get'])
     def pendientes(self, request):
-        reservas = self.queryset.filter(estado='pendiente')
-        return Response(self.get_serializer(reservas, many=True).data)
\ No newline at end of file
+        reservas = self._queryset_accion().filter(estado='pendiente')
+        return Response(proyeccion.serializar(reservas.select_related(None).prefetch_related(None), request))
+
+
+def _cuerpo_objeto(request):
+    """request.data cuando el cuerpo es un objeto (JSON o formulario); un array u otro valor da 400"""
+    if not isinstance(request.data, dict):
+        raise ValidationError({'detail': "El cuerpo debe ser un objeto JSON"})
+    return request.data
+
+
+def _fecha_param(request, nombre, por_defecto=None):
+    valor = request.query_params.get(nombre) or _cuerpo_objeto(request).get(nombre)
+    if not valor:
+        if por_defecto is None:
+            raise ValidationError(f"Se requiere '{nombre}' con formato YYYY-MM-DD")
+        return por_defecto
+    try:
+        return datetime.strptime(valor, '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        raise ValidationError(f"'{nombre}' debe tener formato YYYY-MM-DD")
+
+
+class SerieReservaViewSet(mixins.CreateModelMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    Reservas recurrentes. Las ocurrencias de una serie pendiente no se guardan:
+    se generan por ventana en `ocurrencias`. Aprobar o rechazar actúa sobre la
+    serie completa en una sola transacción (ver reservas/series.py).
+    """
+    queryset = SerieReserva.objects.select_related('espacio')
+    serializer_class = SerieReservaSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    cursor_ordering = ('-fecha_creacion', '-id')
+
+    def get_queryset(self):
+        user = self.request.user
+        if obtener_rol(user) in ['admin', 'coordinador']:
+            return self.queryset.all()
+        return self.queryset.filter(Q(usuario=user) | Q(estado='aprobada'))
+
+    def perform_create(self, serializer):
+        serializer.save(usuario=self.request.user)
+
+    def _gestionable(self):
+        if obtener_rol(self.request.user) not in ['admin', 'coordinador']:
+            raise PermissionDenied("Solo administradores y coordinadores pueden aprobar o rechazar series")
+        return self.get_object()
+
+    def _ejecutar(self, operacion, *args):
+        try:
+            return operacion(*args)
+        except series.SerieNoPendiente as exc:
+            raise ValidationError(f"La serie está {str(exc).lower()}")
+        except series.ConflictoSerie as exc:
+            raise ValidationError({'conflictos': formatear_conflictos(exc.conflictos)})
+
+    @action(detail=True, methods=['get'])
+    def ocurrencias(self, request, pk=None):
+        """?desde=&hasta= (por defecto, toda la serie). Expande la regla solo en esa ventana."""
+        serie = self.get_object()
+        desde = _fecha_param(request, 'desde', serie.fecha_inicio)
+        hasta = _fecha_param(request, 'hasta', serie.fecha_fin)
+        if hasta < desde:
+            raise ValidationError("'hasta' debe ser posterior a 'desde'")
+        return Response(series.ocurrencias(serie, desde, hasta))
+
+    @action(detail=True, methods=['get'])
+    def conflictos(self, request, pk=None):
+        serie = self.get_object()
+        return Response(formatear_conflictos(series.conflictos_serie(serie, desde=timezone.localdate())))
+
+    @action(detail=True, methods=['post'])
+    def aprobar(self, request, pk=None):
+        serie, creadas = self._ejecutar(series.aprobar, self._gestionable().pk, request.user)
+        return Response({**self.get_serializer(serie).data, 'reservas_creadas': creadas})
+
+    @action(detail=True, methods=['post'])
+    def rechazar(self, request, pk=None):
+        serie = self._ejecutar(series.rechazar, self._gestionable().pk, request.data.get('motivo_rechazo'))
+        return Response(self.get_serializer(serie).data)
+
+    @action(detail=True, methods=['post'])
+    def cancelar(self, request, pk=None):
+        serie = self.get_object()
+        if serie.usuario_id != request.user.pk and obtener_rol(request.user) not in ['admin', 'coordinador']:
+            raise PermissionDenied("Solo el solicitante puede cancelar la serie")
+        serie, canceladas = self._ejecutar(series.cancelar, serie.pk)
+        return Response({**self.get_serializer(serie).data, 'reservas_canceladas': canceladas})
+
+    @action(detail=True, methods=['post'])
+    def excluir(self, request, pk=None):
+        """{'fecha': 'YYYY-MM-DD'}: quita esa fecha de la serie"""
+        serie = self.get_object()
+        if serie.usuario_id != request.user.pk and obtener_rol(request.user) not in ['admin', 'coordinador']:
+            raise PermissionDenied("Solo el solicitante puede modificar la serie")
+        serie = self._ejecutar(series.excluir, serie.pk, _fecha_param(request, 'fecha'))
+        return Response(self.get_serializer(serie).data)
+
+
+# Segundos entre comentarios de keepalive; evitan que proxies cierren la conexión ociosa
+SSE_KEEPALIVE = 15
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def ticket_eventos(request):
+    """
+    POST /api/eventos/ticket/: ticket de un solo uso para abrir el stream.
+    EventSource no envía cabeceras, y un JWT en la URL quedaría en los logs
+    de acceso; el ticket solo sirve para /api/eventos/stream/ y vence en
+    EVENTOS_TICKET_TTL segundos.
+    """
+    ticket = tiempo_real.emitir_ticket(request.user.pk, obtener_rol(request.user))
+    return Response({'ticket': ticket, 'expira_en': settings.EVENTOS_TICKET_TTL})
+
+
+async def _identidad_stream(request):
+    """(usuario_id, rol) desde ?ticket= o, para clientes que sí envían cabeceras, desde Authorization"""
+    ticket = request.GET.get('ticket')
+    if ticket:
+        return await tiempo_real.canjear_ticket(ticket)
+    autenticacion = JWTAuthentication()
+    cabecera = autenticacion.get_header(request)
+    crudo = autenticacion.get_raw_token(cabecera) if cabecera else None
+    if not crudo:
+        return None
+    try:
+        token = autenticacion.get_validated_token(crudo)
+    except (InvalidToken, TokenError):
+        return None
+    if jwt_settings.USER_ID_CLAIM not in token:
+        return None
+    usuario = UsuarioToken(token)
+    return usuario.pk, obtener_rol(usuario)
+
+
+def _mensaje_sse(evento):
+    datos = json.dumps(evento, separators=(',', ':'))
+    return f"id: {evento['seq']}\nevent: {evento['tipo']}\ndata: {datos}\n\n"
+
+
+async def _mensajes_asgi(filtro):
+    suscripcion = tiempo_real.difusor.suscribir(filtro)
+    try:
+        yield f"retry: {SSE_KEEPALIVE * 1000}\n\n"
+        while True:
+            try:
+                evento = await asyncio.wait_for(suscripcion.cola.get(), SSE_KEEPALIVE)
+            except asyncio.TimeoutError:
+                yield ": ping\n\n"
+                continue
+            yield _mensaje_sse(evento)
+    finally:
+        tiempo_real.difusor.desuscribir(suscripcion)
+
+
+def _mensajes_wsgi(filtro, duracion):
+    """
+    Bajo WSGI cada stream ocupa un worker: se cierra a los `duracion`
+    segundos y el cliente se reconecta (con un ticket nuevo) al instante.
+    """
+    suscripcion = tiempo_real.difusor.suscribir(filtro, sincrona=True)
+    limite = time.monotonic() + duracion
+    try:
+        yield "retry: 1000\n\n"
+        while (restante := limite - time.monotonic()) > 0:
+            try:
+                evento = suscripcion.cola.get(timeout=min(SSE_KEEPALIVE, restante))
+            except queue.Empty:
+                yield ": ping\n\n"
+                continue
+            yield _mensaje_sse(evento)
+    finally:
+        tiempo_real.difusor.desuscribir(suscripcion)
+
+
+async def stream_eventos(request):
+    """
+    GET /api/eventos/stream/?ticket=... (text/event-stream). Envía
+    reserva_creada, reserva_aprobada, reserva_rechazada, reserva_cancelada,
+    reserva_modificada y reserva_eliminada según la visibilidad del rol. La identidad sale del ticket (o del JWT en
+    Authorization): la conexión no toma ninguna conexión a la base de datos
+    mientras está abierta.
+
+    Pensado para ASGI (config/asgi.py). Bajo WSGI Django consumiría un
+    iterador asíncrono completo antes de responder, así que ahí se usa un
+    generador síncrono que cierra el stream a los EVENTOS_WSGI_DURACION segundos.
+    """
+    identidad = await _identidad_stream(request)
+    if identidad is None:
+        return JsonResponse({'detail': 'Ticket inválido, vencido o ya usado'}, status=401)
+
+    filtro = tiempo_real.filtro_para(*identidad)
+    if isinstance(request, ASGIRequest):
+        mensajes = _mensajes_asgi(filtro)
+    else:
+        mensajes = _mensajes_wsgi(filtro, settings.EVENTOS_WSGI_DURACION)
+
+    respuesta = StreamingHttpResponse(mensajes, content_type='text/event-stream')
+    respuesta['Cache-Control'] = 'no-cache'
+    respuesta['X-Accel-Buffering'] = 'no'
+    return respuesta
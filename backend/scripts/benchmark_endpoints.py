@@ -0,0 +1,323 @@
+"""
+Benchmark de los endpoints de reservas más usados.
+
+Mide la latencia (p50/p95/p99) y el rendimiento (peticiones por segundo) de:
+- listado:          GET  /api/reservas/?page_size=100
+- listado_completo: GET  /api/reservas/ (sin paginar; no se corre por defecto)
+- estadisticas:     GET  /api/reservas/estadisticas/ (rango de un año)
+- exportar_reporte: GET  /api/reservas/exportar_reporte/ (se consume el PDF completo)
+- crear:            POST /api/reservas/ (horarios libres en fechas lejanas; se borran al terminar)
+
+Por defecto corre dentro del proceso con el cliente de pruebas de Django,
+contra la base configurada (sembrarla antes con crear_datos_prueba.py
+--sintetico), y cuenta además las consultas SQL por petición. Con --base-url
+mide un servidor en marcha por HTTP, con --concurrencia peticiones en paralelo.
+
+Los resultados se pueden guardar como línea base (--guardar-base) y comparar
+en corridas posteriores (--comparar): termina con código 1 si algún escenario
+empeora su p95 o su rendimiento más que --tolerancia.
+
+Uso:
+    python scripts/benchmark_endpoints.py
+    python scripts/benchmark_endpoints.py --repeticiones 50 --guardar-base base.json
+    python scripts/benchmark_endpoints.py --comparar base.json --tolerancia 0.2
+    python scripts/benchmark_endpoints.py --base-url http://localhost:8000 --email admin@inacap.cl \\
+        --password 'Inacap2025!' --espacio 1 --concurrencia 8
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, time as hora, timedelta
+
+# Agregar el directorio padre al path de Python
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+ESCENARIOS_POR_DEFECTO = ['listado', 'estadisticas', 'exportar_reporte', 'crear']
+# Las reservas de "crear" van a partir de esta cantidad de días desde hoy, una por hora
+DIAS_ADELANTE = 400
+HORAS_POR_DIA = 12
+MOTIVO = 'Benchmark'
+# El calendario acepta ventanas de hasta 62 días (disponibilidad.MAX_DIAS_CONSULTA)
+DIAS_VENTANA_CALENDARIO = 60
+
+
+def rutas(desde, hasta):
+    rango = f'start_date={desde.isoformat()}&end_date={hasta.isoformat()}'
+    return {
+        'listado': '/api/reservas/?page_size=100',
+        'listado_completo': '/api/reservas/',
+        'estadisticas': f'/api/reservas/estadisticas/?{rango}',
+        'exportar_reporte': f'/api/reservas/exportar_reporte/?{rango}',
+    }
+
+
+def cuerpo_reserva(espacio_id, indice):
+    """Reserva de una hora en el horario libre número `indice` (sin domingos)"""
+    lunes = date.today() + timedelta(days=DIAS_ADELANTE)
+    lunes += timedelta(days=-lunes.weekday() % 7)
+    dia = indice // HORAS_POR_DIA
+    fecha = lunes + timedelta(days=dia // 6 * 7 + dia % 6)
+    inicio = 8 + indice % HORAS_POR_DIA
+    return {
+        'espacio': espacio_id, 'fecha_reserva': fecha.isoformat(),
+        'hora_inicio': hora(inicio).isoformat(), 'hora_fin': hora(inicio + 1).isoformat(),
+        'motivo': MOTIVO,
+    }
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    if not ordenados:
+        return None
+    posicion = (len(ordenados) - 1) * p / 100
+    inferior = int(posicion)
+    superior = min(inferior + 1, len(ordenados) - 1)
+    return ordenados[inferior] + (ordenados[superior] - ordenados[inferior]) * (posicion - inferior)
+
+
+def resumir(duraciones, segundos_totales, consultas=None, errores=0):
+    ms = [d * 1000 for d in duraciones]
+    resumen = {
+        'peticiones': len(ms),
+        'errores': errores,
+        'p50_ms': round(percentil(ms, 50), 2),
+        'p95_ms': round(percentil(ms, 95), 2),
+        'p99_ms': round(percentil(ms, 99), 2),
+        'media_ms': round(statistics.fmean(ms), 2),
+        'peticiones_por_segundo': round(len(ms) / segundos_totales, 2) if segundos_totales else None,
+    }
+    if consultas:
+        resumen['consultas_por_peticion'] = round(statistics.fmean(consultas), 1)
+    return resumen
+
+
+class ClienteLocal:
+    """Peticiones dentro del proceso con el cliente de pruebas de Django"""
+
+    def __init__(self, email, frio):
+        import django
+        os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+        django.setup()
+
+        from django.conf import settings
+        from django.test import Client
+        from usuarios.autenticacion import TokenConRolSerializer
+        from usuarios.models import Usuario
+
+        if email:
+            usuario = Usuario.objects.get(email=email)
+        else:
+            usuario = Usuario.objects.filter(rol__nombre_rol='admin', is_active=True).order_by('pk').first()
+            if usuario is None:
+                raise SystemExit('No hay un usuario admin; indique uno con --email')
+        token = TokenConRolSerializer.get_token(usuario).access_token
+        hosts = [h for h in settings.ALLOWED_HOSTS if h and h != '*' and not h.startswith('.')]
+        self.cliente = Client(HTTP_AUTHORIZATION=f'Bearer {token}', HTTP_HOST=hosts[0] if hosts else 'localhost')
+        self.frio = frio
+        self._espacio = None
+
+    def espacio_benchmark(self):
+        from espacios.models import Espacio
+        if self._espacio is None:
+            self._espacio, _ = Espacio.objects.get_or_create(
+                nombre='Espacio benchmark', defaults={'tipo': 'otro', 'capacidad': 10, 'ubicacion': 'Benchmark'},
+            )
+        return self._espacio.pk
+
+    def pedir(self, metodo, ruta, datos=None):
+        """(segundos, consultas, ok)"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from config import cache as cache_lectura
+
+        if self.frio:
+            cache_lectura.invalidar('reservas')
+        with CaptureQueriesContext(connection) as capturadas:
+            inicio = time.perf_counter()
+            if metodo == 'POST':
+                respuesta = self.cliente.post(ruta, datos, content_type='application/json')
+            else:
+                respuesta = self.cliente.get(ruta)
+            if respuesta.streaming:
+                for _ in respuesta.streaming_content:
+                    pass
+            else:
+                respuesta.content
+            segundos = time.perf_counter() - inicio
+        return segundos, len(capturadas), respuesta.status_code < 400
+
+    def limpiar(self, espacio_id, desde, hasta):
+        from reservas.models import Reserva
+        Reserva.objects.filter(
+            espacio_id=espacio_id, motivo=MOTIVO, fecha_reserva__range=(desde, hasta),
+        ).delete()
+
+
+class ClienteHTTP:
+    """Peticiones a un servidor en marcha (--base-url) con urllib"""
+
+    def __init__(self, base_url, email, password, espacio):
+        self.base_url = base_url.rstrip('/')
+        self.espacio = espacio
+        if not (email and password):
+            raise SystemExit('--base-url necesita --email y --password')
+        respuesta = self._enviar('POST', '/api/token/', {'email': email, 'password': password}, autenticar=False)
+        self.token = json.loads(respuesta)['access']
+
+    def _enviar(self, metodo, ruta, datos=None, autenticar=True):
+        cabeceras = {'Content-Type': 'application/json'}
+        if autenticar:
+            cabeceras['Authorization'] = f'Bearer {self.token}'
+        cuerpo = json.dumps(datos).encode() if datos is not None else None
+        peticion = urllib.request.Request(self.base_url + ruta, data=cuerpo, headers=cabeceras, method=metodo)
+        with urllib.request.urlopen(peticion, timeout=300) as respuesta:
+            return respuesta.read()
+
+    def espacio_benchmark(self):
+        if not self.espacio:
+            raise SystemExit('El escenario "crear" contra --base-url necesita --espacio')
+        return self.espacio
+
+    def pedir(self, metodo, ruta, datos=None):
+        inicio = time.perf_counter()
+        try:
+            self._enviar(metodo, ruta, datos)
+            ok = True
+        except urllib.error.HTTPError:
+            ok = False
+        return time.perf_counter() - inicio, None, ok
+
+    def limpiar(self, espacio_id, desde, hasta):
+        # La respuesta de creación no trae el ID: se buscan en el calendario por ventanas
+        ventana = desde
+        while ventana <= hasta:
+            fin = min(ventana + timedelta(days=DIAS_VENTANA_CALENDARIO - 1), hasta)
+            calendario = json.loads(self._enviar(
+                'GET', f'/api/reservas/calendario/?desde={ventana.isoformat()}&hasta={fin.isoformat()}&espacio={espacio_id}',
+            ))
+            for reserva_id, motivo in zip(calendario['ids'], calendario['motivos']):
+                if motivo != MOTIVO:
+                    continue
+                try:
+                    self._enviar('DELETE', f'/api/reservas/{reserva_id}/')
+                except urllib.error.HTTPError:
+                    print(f'No se pudo borrar la reserva {reserva_id}', file=sys.stderr)
+            ventana = fin + timedelta(days=1)
+
+
+def correr(cliente, escenario, rutas_escenarios, repeticiones, calentamiento, concurrencia):
+    if escenario == 'crear':
+        espacio_id = cliente.espacio_benchmark()
+        peticiones = [('POST', '/api/reservas/', cuerpo_reserva(espacio_id, i)) for i in range(calentamiento + repeticiones)]
+    else:
+        peticiones = [('GET', rutas_escenarios[escenario], None)] * (calentamiento + repeticiones)
+
+    for metodo, ruta, datos in peticiones[:calentamiento]:
+        cliente.pedir(metodo, ruta, datos)
+
+    medidas = peticiones[calentamiento:]
+    inicio = time.perf_counter()
+    if concurrencia > 1:
+        with ThreadPoolExecutor(max_workers=concurrencia) as ejecutor:
+            resultados = list(ejecutor.map(lambda p: cliente.pedir(*p), medidas))
+    else:
+        resultados = [cliente.pedir(*p) for p in medidas]
+    total = time.perf_counter() - inicio
+
+    if escenario == 'crear':
+        cliente.limpiar(
+            espacio_id,
+            date.fromisoformat(peticiones[0][2]['fecha_reserva']),
+            date.fromisoformat(peticiones[-1][2]['fecha_reserva']),
+        )
+    return resumir(
+        [segundos for segundos, _, _ in resultados], total,
+        consultas=[c for _, c, _ in resultados if c is not None],
+        errores=sum(1 for _, _, ok in resultados if not ok),
+    )
+
+
+def comparar(resultados, base, tolerancia):
+    """Lista de regresiones: p95 mayor o rendimiento menor que la base más allá de la tolerancia"""
+    regresiones = []
+    for escenario, actual in resultados.items():
+        anterior = base.get(escenario)
+        if not anterior:
+            continue
+        if actual['p95_ms'] > anterior['p95_ms'] * (1 + tolerancia):
+            regresiones.append(f"{escenario}: p95 {anterior['p95_ms']} ms -> {actual['p95_ms']} ms")
+        if (actual['peticiones_por_segundo'] or 0) < (anterior['peticiones_por_segundo'] or 0) * (1 - tolerancia):
+            regresiones.append(
+                f"{escenario}: {anterior['peticiones_por_segundo']} -> {actual['peticiones_por_segundo']} peticiones/s"
+            )
+    return regresiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--escenarios', nargs='+', default=ESCENARIOS_POR_DEFECTO,
+                        choices=['listado', 'listado_completo', 'estadisticas', 'exportar_reporte', 'crear'])
+    parser.add_argument('--repeticiones', type=int, default=30)
+    parser.add_argument('--calentamiento', type=int, default=3, help='Peticiones previas que no se miden')
+    parser.add_argument('--desde', type=date.fromisoformat, help='Inicio del rango de estadísticas y reporte (por defecto, hace un año)')
+    parser.add_argument('--hasta', type=date.fromisoformat, help='Fin del rango (por defecto, hoy)')
+    parser.add_argument('--email', help='Usuario con el que se autentica (por defecto, el primer admin)')
+    parser.add_argument('--password', help='Contraseña del usuario (solo con --base-url)')
+    parser.add_argument('--base-url', help='Medir un servidor en marcha en lugar de correr dentro del proceso')
+    parser.add_argument('--espacio', type=int, help='Espacio para el escenario "crear" con --base-url')
+    parser.add_argument('--concurrencia', type=int, default=1, help='Peticiones en paralelo (solo con --base-url)')
+    parser.add_argument('--frio', action='store_true',
+                        help='Invalida la caché de reservas antes de cada petición (solo dentro del proceso)')
+    parser.add_argument('--guardar-base', help='Guardar los resultados como línea base en este archivo JSON')
+    parser.add_argument('--comparar', help='Comparar con la línea base de este archivo JSON')
+    parser.add_argument('--tolerancia', type=float, default=0.15, help='Empeoramiento aceptado respecto de la base (0.15 = 15%%)')
+    parser.add_argument('--salida', help='Guardar los resultados en un archivo JSON')
+    args = parser.parse_args()
+
+    if args.base_url:
+        cliente = ClienteHTTP(args.base_url, args.email, args.password, args.espacio)
+        concurrencia = args.concurrencia
+    else:
+        if args.concurrencia > 1:
+            parser.error('--concurrencia solo aplica con --base-url')
+        cliente = ClienteLocal(args.email, args.frio)
+        concurrencia = 1
+
+    hasta = args.hasta or date.today()
+    desde = args.desde or hasta - timedelta(days=365)
+    rutas_escenarios = rutas(desde, hasta)
+
+    resultados = {}
+    print(f"{'Escenario':<18} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'pet/s':>9} {'consultas':>10} {'errores':>8}")
+    for escenario in args.escenarios:
+        resumen = correr(cliente, escenario, rutas_escenarios, args.repeticiones, args.calentamiento, concurrencia)
+        resultados[escenario] = resumen
+        print(
+            f"{escenario:<18} {resumen['p50_ms']:>9} {resumen['p95_ms']:>9} {resumen['p99_ms']:>9} "
+            f"{resumen['peticiones_por_segundo']:>9} {resumen.get('consultas_por_peticion', '-'):>10} {resumen['errores']:>8}"
+        )
+
+    for archivo in (args.salida, args.guardar_base):
+        if archivo:
+            with open(archivo, 'w') as f:
+                json.dump(resultados, f, indent=2)
+
+    if args.comparar:
+        with open(args.comparar) as f:
+            regresiones = comparar(resultados, json.load(f), args.tolerancia)
+        if regresiones:
+            print('\nRegresiones respecto de la línea base:')
+            for regresion in regresiones:
+                print(f'- {regresion}')
+            sys.exit(1)
+        print('\nSin regresiones respecto de la línea base.')
+
+
+if __name__ == '__main__':
+    main()
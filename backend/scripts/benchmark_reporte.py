@@ -0,0 +1,83 @@
+"""
+Benchmark del informe PDF de exportar_reporte.
+
+Genera informes con filas sintéticas (1k, 10k y 100k por defecto) y registra
+el tiempo y el RSS máximo de cada uno. Cada tamaño corre en un proceso aparte
+para que el pico de memoria de uno no contamine la medición del siguiente.
+
+Uso:
+    python scripts/benchmark_reporte.py
+    python scripts/benchmark_reporte.py --filas 1000 10000 --salida resultados.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import time
+from datetime import date, timedelta
+
+# Agregar el directorio padre al path de Python
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from reservas.reportes import generar_reporte_pdf
+
+ESTADOS = ['Pendiente', 'Aprobada', 'Rechazada', 'Cancelada']
+
+
+def filas_sinteticas(cantidad):
+    inicio = date(2025, 3, 1)
+    for i in range(cantidad):
+        yield [
+            (inicio + timedelta(days=i % 300)).strftime('%d/%m/%Y'),
+            f"Usuario {i % 5000} Apellido",
+            f"Carrera {i % 40}"[:20],
+            f"Sala {i % 500}",
+            f"{8 + i % 12:02d}:00:00 - {9 + i % 12:02d}:30:00",
+            ESTADOS[i % len(ESTADOS)],
+        ]
+
+
+def _medir(cantidad, cola):
+    resumen = {'total': cantidad, 'aprobada': cantidad // 4, 'rechazada': cantidad // 4, 'pendiente': cantidad // 4}
+    rss_inicial = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    t0 = time.perf_counter()
+    with open(os.devnull, 'wb') as destino:
+        generar_reporte_pdf(destino, resumen, filas_sinteticas(cantidad), '2025-03-01', '2025-12-31')
+    segundos = time.perf_counter() - t0
+    # ru_maxrss viene en KB en Linux
+    cola.put({
+        'filas': cantidad,
+        'segundos': round(segundos, 2),
+        'filas_por_segundo': round(cantidad / segundos),
+        'rss_max_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        'rss_inicial_mb': round(rss_inicial / 1024, 1),
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--filas', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--salida', help='Guardar los resultados en un archivo JSON')
+    args = parser.parse_args()
+
+    contexto = multiprocessing.get_context('spawn')
+    resultados = []
+    print(f"{'Filas':>8} {'Segundos':>10} {'Filas/s':>10} {'RSS máx (MB)':>14}")
+    for cantidad in args.filas:
+        cola = contexto.Queue()
+        proceso = contexto.Process(target=_medir, args=(cantidad, cola))
+        proceso.start()
+        resultado = cola.get()
+        proceso.join()
+        resultados.append(resultado)
+        print(f"{resultado['filas']:>8} {resultado['segundos']:>10} {resultado['filas_por_segundo']:>10} {resultado['rss_max_mb']:>14}")
+
+    if args.salida:
+        with open(args.salida, 'w') as f:
+            json.dump(resultados, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""
+Benchmark de la serialización de listados de reservas.
+
+Compara el CPU (time.process_time) por cada 1.000 reservas entre:
+- antes:   queryset con select_related/prefetch + ReservaSerializer(many=True) + JSONRenderer
+- después: reservas/proyeccion.py + JSONRapidoRenderer (orjson)
+
+Lee las reservas más recientes de la base configurada (sembrarla antes con
+crear_datos_prueba.py --sintetico) y verifica que ambos caminos produzcan
+los mismos bytes. Se separa el tiempo de lectura + serialización del de
+renderizado a JSON, y se toma la mediana de las repeticiones.
+
+Uso:
+    python scripts/benchmark_serializacion.py
+    python scripts/benchmark_serializacion.py --filas 1000 10000 --repeticiones 5 --salida resultados.json
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+import django
+
+# Agregar el directorio padre al path de Python
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Configurar Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+django.setup()
+
+from rest_framework.renderers import JSONRenderer
+
+from config.renderers import JSONRapidoRenderer
+from reservas import proyeccion
+from reservas.consultas import construir_queryset
+from reservas.models import Reserva
+from reservas.serializers import ReservaSerializer
+
+
+def antes(reservas):
+    datos = ReservaSerializer(construir_queryset('list', reservas), many=True).data
+    return datos, JSONRenderer()
+
+
+def despues(reservas):
+    return proyeccion.serializar(reservas), JSONRapidoRenderer()
+
+
+def medir(camino, reservas, repeticiones):
+    """(mediana de CPU serializando, mediana de CPU renderizando, bytes de la última respuesta)"""
+    serializacion, render = [], []
+    for _ in range(repeticiones):
+        inicio = time.process_time()
+        datos, renderer = camino(reservas)
+        medio = time.process_time()
+        contenido = renderer.render(datos)
+        fin = time.process_time()
+        serializacion.append(medio - inicio)
+        render.append(fin - medio)
+    return statistics.median(serializacion), statistics.median(render), contenido
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--filas', type=int, nargs='+', default=[1000, 5000])
+    parser.add_argument('--repeticiones', type=int, default=3)
+    parser.add_argument('--salida', help='Guardar los resultados en un archivo JSON')
+    args = parser.parse_args()
+
+    total = Reserva.objects.count()
+    resultados = []
+    print(f"{'Filas':>7} {'Camino':>8} {'Serializar ms/1k':>17} {'Render ms/1k':>13} {'Total ms/1k':>12} {'KB':>8}")
+    for cantidad in args.filas:
+        if cantidad > total:
+            print(f"Se omiten {cantidad} filas: la base tiene {total} reservas", file=sys.stderr)
+            continue
+        ids = Reserva.objects.order_by('-fecha_creacion', '-id').values('id')[:cantidad]
+        reservas = Reserva.objects.filter(pk__in=ids).order_by('-fecha_creacion', '-id')
+
+        fila = {'filas': cantidad}
+        contenidos = {}
+        for nombre, camino in (('antes', antes), ('despues', despues)):
+            serializacion, render, contenidos[nombre] = medir(camino, reservas, args.repeticiones)
+            por_mil = 1000 / cantidad * 1000
+            fila[nombre] = {
+                'serializar_ms_por_1k': round(serializacion * por_mil, 1),
+                'render_ms_por_1k': round(render * por_mil, 1),
+                'total_ms_por_1k': round((serializacion + render) * por_mil, 1),
+            }
+            print(
+                f"{cantidad:>7} {nombre:>8} {fila[nombre]['serializar_ms_por_1k']:>17} {fila[nombre]['render_ms_por_1k']:>13} "
+                f"{fila[nombre]['total_ms_por_1k']:>12} {len(contenidos[nombre]) // 1024:>8}"
+            )
+        fila['mismos_bytes'] = contenidos['antes'] == contenidos['despues']
+        fila['aceleracion'] = round(fila['antes']['total_ms_por_1k'] / fila['despues']['total_ms_por_1k'], 1)
+        print(f"{'':>7} {'':>8} aceleración x{fila['aceleracion']}, mismos bytes: {'sí' if fila['mismos_bytes'] else 'NO'}")
+        resultados.append(fila)
+
+    if args.salida:
+        with open(args.salida, 'w') as f:
+            json.dump(resultados, f, indent=2)
+    if not all(fila['mismos_bytes'] for fila in resultados):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,3 +1,4 @@
+import argparse
 import os
 import sys
 import django
@@ -300,8 +301,58 @@ def crear_reservas_prueba():
     except Exception as e:
         print(f"Error al crear reservas: {str(e)}")
 
+def crear_datos_sinteticos(opciones):
+    """Genera datos a escala con scripts/datos_sinteticos.py"""
+    from datos_sinteticos import Generador
+
+    print("=" * 60)
+    print("GENERANDO DATOS SINTÉTICOS")
+    print("=" * 60)
+    Generador(
+        usuarios=opciones.usuarios,
+        espacios=opciones.espacios,
+        elementos=opciones.elementos,
+        reservas=opciones.reservas,
+        carreras=opciones.carreras,
+        desde=opciones.desde,
+        hasta=opciones.hasta,
+        lote=opciones.lote,
+        semilla=opciones.semilla,
+        usar_copy=False if opciones.sin_copy else None,
+    ).ejecutar()
+    print("\nUsuarios sint<N>@inacap.cl, todos con password: Inacap2025!")
+
+
+def argumentos():
+    parser = argparse.ArgumentParser(
+        description="Crea los datos de prueba de demostración o, con --sintetico, un volumen configurable."
+    )
+    parser.add_argument('--sintetico', action='store_true',
+                        help='Genera datos sintéticos a escala en lugar de los de demostración')
+    parser.add_argument('--usuarios', type=int, default=1000)
+    parser.add_argument('--espacios', type=int, default=50)
+    parser.add_argument('--elementos', type=int, default=30)
+    parser.add_argument('--carreras', type=int, default=20)
+    parser.add_argument('--reservas', type=int, default=100000)
+    hoy = date.today()
+    parser.add_argument('--desde', type=date.fromisoformat, default=date(hoy.year - 1, 1, 1),
+                        help='Primera fecha de reserva (YYYY-MM-DD). Por defecto, el 1 de enero del año pasado.')
+    parser.add_argument('--hasta', type=date.fromisoformat, default=date(hoy.year, 12, 31),
+                        help='Última fecha de reserva (YYYY-MM-DD). Por defecto, fin de este año.')
+    parser.add_argument('--lote', type=int, default=5000, help='Filas por inserción')
+    parser.add_argument('--semilla', type=int, default=2025, help='Semilla para datos reproducibles')
+    parser.add_argument('--sin-copy', action='store_true',
+                        help='Usa bulk_create también en PostgreSQL en lugar de COPY')
+    return parser.parse_args()
+
+
 def main():
     """Ejecutar todas las funciones de creación de datos"""
+    opciones = argumentos()
+    if opciones.sintetico:
+        crear_datos_sinteticos(opciones)
+        return
+
     print("=" * 60)
     print("CREANDO DATOS DE PRUEBA PARA EL SISTEMA")
     print("=" * 60)
@@ -0,0 +1,364 @@
+"""
+Generador de datos sintéticos a escala para pruebas de carga.
+
+Crea carreras, usuarios, espacios, elementos y reservas con distribuciones
+parecidas a las reales:
+- por fecha: semestres (marzo-junio y agosto-noviembre) con vacaciones de
+  verano e invierno más vacías, días hábiles más cargados que el sábado y
+  sin actividad el domingo;
+- por hora: punta de la mañana, baja al mediodía, tarde y vespertino;
+- por espacio: pocos espacios concentran la mayoría de las reservas;
+- por estado: las pasadas casi todas resueltas, las futuras más pendientes.
+
+Las reservas de un mismo espacio y día no se solapan. Todo se inserta en
+lotes: con bulk_create en cualquier motor y con COPY en PostgreSQL para las
+tablas grandes (reservas y sus elementos). Los IDs se asignan aquí y las
+secuencias se ajustan al final.
+
+Como bulk_create y COPY no emiten señales, al terminar se reconstruyen los
+mapas de ocupación y los resúmenes diarios y se invalida la caché de lectura.
+El stock comprometido de elementos (ElementoAsignacion) no se genera.
+
+Lo usa scripts/crear_datos_prueba.py --sintetico; se puede importar desde
+otros scripts una vez configurado Django.
+"""
+import csv
+import io
+import itertools
+import random
+import time as reloj
+from bisect import bisect_right
+from datetime import datetime, time, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from config import cache as cache_lectura
+from usuarios.models import Usuario, Rol, Carrera
+from espacios.models import Espacio
+from elementos.models import Elemento
+from reservas.models import Reserva, ReservaElemento
+from reservas.conflictos import ESTADOS_OCUPAN_ESPACIO
+
+CLAVE_SINTETICA = 'Inacap2025!'
+PREFIJO = 'sint'
+
+PESO_MES = {1: 0.15, 2: 0.1, 3: 1.0, 4: 1.0, 5: 1.0, 6: 0.9, 7: 0.35, 8: 1.0, 9: 0.8, 10: 1.0, 11: 1.0, 12: 0.5}
+PESO_DIA_SEMANA = (1.0, 1.0, 1.0, 1.0, 0.85, 0.25, 0.0)
+PESO_HORA_INICIO = {
+    8: 0.9, 9: 1.0, 10: 1.0, 11: 0.9, 12: 0.4, 13: 0.5, 14: 0.9,
+    15: 0.9, 16: 0.8, 17: 0.6, 18: 0.5, 19: 0.7, 20: 0.5, 21: 0.2,
+}
+DURACIONES_MIN = (60, 90, 120, 180)
+PESO_DURACION = (0.45, 0.25, 0.2, 0.1)
+ESTADOS_PASADAS = (('aprobada', 0.72), ('rechazada', 0.12), ('cancelada', 0.1), ('pendiente', 0.06))
+ESTADOS_FUTURAS = (('pendiente', 0.45), ('aprobada', 0.45), ('rechazada', 0.05), ('cancelada', 0.05))
+# Franjas de 30 minutos desde las 08:00 hasta las 23:00
+PRIMERA_HORA = 8
+FRANJAS = 30
+PROPORCION_CON_ELEMENTOS = 0.25
+INTENTOS_POR_RESERVA = 6
+
+AREAS = ('Tecnología', 'Salud', 'Administración', 'Construcción', 'Diseño', 'Mecánica', 'Gastronomía', 'Educación')
+TIPOS_ESPACIO = ('salon', 'salon', 'salon', 'laboratorio', 'laboratorio', 'auditorio', 'hall', 'patio', 'cancha')
+CATEGORIAS = ('mobiliario', 'tecnologia', 'audio', 'iluminacion', 'decoracion', 'otro')
+MOTIVOS = ('Clase', 'Taller', 'Ayudantía', 'Evaluación', 'Reunión de carrera', 'Charla', 'Ensayo', 'Actividad estudiantil')
+NOMBRES = ('Ana', 'Pedro', 'María', 'Juan', 'Camila', 'Diego', 'Valentina', 'Matías', 'Javiera', 'Felipe')
+APELLIDOS = ('González', 'Muñoz', 'Rojas', 'Díaz', 'Pérez', 'Soto', 'Contreras', 'Silva', 'Martínez', 'Sepúlveda')
+
+
+def _acumulados(pesos):
+    return list(itertools.accumulate(pesos))
+
+
+def _elegir(rng, valores, acumulados):
+    return valores[bisect_right(acumulados, rng.random() * acumulados[-1])]
+
+
+def _siguiente_id(modelo):
+    return (modelo.objects.aggregate(maximo=Max('id'))['maximo'] or 0) + 1
+
+
+def _ajustar_secuencias(*modelos):
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(no_style(), modelos):
+            cursor.execute(sql)
+
+
+def _valor_copy(valor):
+    if valor is None:
+        return r'\N'
+    if isinstance(valor, bool):
+        return 't' if valor else 'f'
+    return valor
+
+
+def _copiar(modelo, filas):
+    """COPY ... FROM STDIN de `filas` (dicts por attname), completando los campos faltantes con su default"""
+    campos = modelo._meta.concrete_fields
+    ahora = timezone.now()
+    columnas = ', '.join(connection.ops.quote_name(campo.column) for campo in campos)
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    for fila in filas:
+        valores = []
+        for campo in campos:
+            if campo.attname in fila:
+                valor = fila[campo.attname]
+            elif getattr(campo, 'auto_now', False) or getattr(campo, 'auto_now_add', False):
+                valor = ahora
+            else:
+                valor = campo.get_default()
+            valores.append(_valor_copy(campo.get_db_prep_save(valor, connection)))
+        escritor.writerow(valores)
+    buffer.seek(0)
+    with connection.cursor() as cursor:
+        cursor.copy_expert(
+            f"COPY {connection.ops.quote_name(modelo._meta.db_table)} ({columnas}) FROM STDIN WITH (FORMAT csv, NULL '\\N')",
+            buffer,
+        )
+
+
+def cargar(modelo, filas, usar_copy):
+    """Inserta un lote de filas (dicts por attname)"""
+    if not filas:
+        return
+    if usar_copy:
+        _copiar(modelo, filas)
+    else:
+        modelo.objects.bulk_create([modelo(**fila) for fila in filas])
+
+
+class Generador:
+
+    def __init__(self, usuarios, espacios, elementos, reservas, carreras, desde, hasta,
+                 lote=5000, semilla=2025, usar_copy=None, salida=print):
+        self.cantidades = {
+            'usuarios': usuarios, 'espacios': espacios, 'elementos': elementos,
+            'reservas': reservas, 'carreras': carreras,
+        }
+        self.desde = desde
+        self.hasta = hasta
+        self.lote = lote
+        self.rng = random.Random(semilla)
+        self.usar_copy = connection.vendor == 'postgresql' if usar_copy is None else usar_copy
+        if self.usar_copy and connection.vendor != 'postgresql':
+            raise ValueError('COPY solo está disponible en PostgreSQL')
+        self.salida = salida
+
+    def _informar(self, texto, inicio):
+        self.salida(f'{texto} ({reloj.perf_counter() - inicio:.1f} s)')
+
+    # --- Catálogos ---
+
+    def crear_roles(self):
+        for nombre, descripcion in Rol.ROLES:
+            Rol.objects.get_or_create(nombre_rol=nombre, defaults={'descripcion': descripcion})
+        return {rol.nombre_rol: rol.pk for rol in Rol.objects.all()}
+
+    def crear_carreras(self):
+        Carrera.objects.bulk_create([
+            Carrera(nombre_carrera=f'Carrera sintética {i:03d}', area=AREAS[i % len(AREAS)], codigo=f'{PREFIJO.upper()}{i:03d}')
+            for i in range(self.cantidades['carreras'])
+        ], ignore_conflicts=True)
+        return list(Carrera.objects.filter(nombre_carrera__startswith='Carrera sintética').values_list('pk', flat=True))
+
+    def crear_usuarios(self, roles, carreras):
+        inicio = reloj.perf_counter()
+        # Un solo hash para todos: calcularlo por usuario tomaría horas
+        clave = make_password(CLAVE_SINTETICA)
+        total = self.cantidades['usuarios']
+        for desde in range(0, total, self.lote):
+            usuarios = []
+            for i in range(desde, min(desde + self.lote, total)):
+                # 1 de cada 100 es coordinador; el resto, solicitantes
+                rol = 'coordinador' if i % 100 == 0 else 'solicitante'
+                usuarios.append(Usuario(
+                    email=f'{PREFIJO}{i}@inacap.cl', password=clave,
+                    nombre=NOMBRES[i % len(NOMBRES)], apellido=APELLIDOS[(i // len(NOMBRES)) % len(APELLIDOS)],
+                    rol_id=roles[rol], carrera_id=carreras[i % len(carreras)] if carreras else None,
+                ))
+            Usuario.objects.bulk_create(usuarios, ignore_conflicts=True)
+        sinteticos = Usuario.objects.filter(email__startswith=PREFIJO)
+        self._informar(f'{total} usuarios', inicio)
+        return (
+            list(sinteticos.filter(rol__nombre_rol='solicitante').values_list('pk', flat=True)),
+            list(Usuario.objects.filter(rol__nombre_rol__in=['coordinador', 'admin']).values_list('pk', flat=True)),
+        )
+
+    def crear_espacios(self):
+        Espacio.objects.bulk_create([
+            Espacio(
+                nombre=f'Espacio sintético {i:04d}', tipo=TIPOS_ESPACIO[i % len(TIPOS_ESPACIO)],
+                capacidad=20 + (i * 7) % 180, ubicacion=f'Edificio {chr(65 + i % 8)} - Piso {1 + i % 4}',
+            )
+            for i in range(self.cantidades['espacios'])
+        ], ignore_conflicts=True)
+        return list(Espacio.objects.filter(nombre__startswith='Espacio sintético').order_by('pk').values_list('pk', flat=True))
+
+    def crear_elementos(self):
+        # El nombre de Elemento no es único: se omiten los que ya existen
+        existentes = set(Elemento.objects.filter(nombre__startswith='Elemento sintético').values_list('nombre', flat=True))
+        Elemento.objects.bulk_create([
+            Elemento(
+                nombre=nombre, categoria=CATEGORIAS[i % len(CATEGORIAS)],
+                stock_total=10 + (i * 13) % 190, stock_disponible=10 + (i * 13) % 190,
+            )
+            for i, nombre in ((i, f'Elemento sintético {i:03d}') for i in range(self.cantidades['elementos']))
+            if nombre not in existentes
+        ])
+        return dict(Elemento.objects.filter(nombre__startswith='Elemento sintético').values_list('pk', 'stock_disponible'))
+
+    # --- Reservas ---
+
+    def _distribuciones(self, espacios):
+        fechas = []
+        fecha = self.desde
+        while fecha <= self.hasta:
+            peso = PESO_MES[fecha.month] * PESO_DIA_SEMANA[fecha.weekday()]
+            if peso:
+                fechas.append((fecha, peso))
+            fecha += timedelta(days=1)
+        if not fechas:
+            raise ValueError('El rango de fechas no tiene días hábiles')
+        # Popularidad de espacios tipo Zipf: los primeros concentran la demanda
+        pesos_espacios = [1 / (rango + 1) ** 0.8 for rango in range(len(espacios))]
+        horas = sorted(PESO_HORA_INICIO)
+        return {
+            'fechas': ([f for f, _ in fechas], _acumulados([p for _, p in fechas])),
+            'espacios': (espacios, _acumulados(pesos_espacios)),
+            'horas': (horas, _acumulados([PESO_HORA_INICIO[h] for h in horas])),
+            'duraciones': (DURACIONES_MIN, _acumulados(PESO_DURACION)),
+            'pasadas': ([e for e, _ in ESTADOS_PASADAS], _acumulados([p for _, p in ESTADOS_PASADAS])),
+            'futuras': ([e for e, _ in ESTADOS_FUTURAS], _acumulados([p for _, p in ESTADOS_FUTURAS])),
+        }
+
+    def _ubicar(self, dist, ocupadas):
+        """(espacio_id, fecha, franja_inicio, franjas) libre, o None si no encontró lugar"""
+        rng = self.rng
+        for _ in range(INTENTOS_POR_RESERVA):
+            espacio_id = _elegir(rng, *dist['espacios'])
+            fecha = _elegir(rng, *dist['fechas'])
+            hora = _elegir(rng, *dist['horas'])
+            franjas = _elegir(rng, *dist['duraciones']) // 30
+            inicio = (hora - PRIMERA_HORA) * 2 + (1 if rng.random() < 0.2 else 0)
+            if inicio + franjas > FRANJAS:
+                continue
+            mascara = ((1 << franjas) - 1) << inicio
+            clave = (espacio_id, fecha)
+            if ocupadas.get(clave, 0) & mascara:
+                continue
+            ocupadas[clave] = ocupadas.get(clave, 0) | mascara
+            return espacio_id, fecha, inicio, franjas
+        return None
+
+    def _ocupacion_existente(self):
+        """Máscaras de las reservas activas ya guardadas, para no solaparse con ellas"""
+        ocupadas = {}
+        existentes = Reserva.objects.filter(
+            espacio_id__in=self.espacios, fecha_reserva__range=(self.desde, self.hasta),
+            estado__in=ESTADOS_OCUPAN_ESPACIO,
+        ).values_list('espacio_id', 'fecha_reserva', 'hora_inicio', 'hora_fin')
+        for espacio_id, fecha, inicio, fin in existentes.iterator(chunk_size=self.lote):
+            primera = max(0, ((inicio.hour - PRIMERA_HORA) * 60 + inicio.minute) // 30)
+            ultima = min(FRANJAS, -(-((fin.hour - PRIMERA_HORA) * 60 + fin.minute) // 30))
+            if ultima > primera:
+                clave = (espacio_id, fecha)
+                ocupadas[clave] = ocupadas.get(clave, 0) | (((1 << (ultima - primera)) - 1) << primera)
+        return ocupadas
+
+    @staticmethod
+    def _hora(franja):
+        minutos = PRIMERA_HORA * 60 + franja * 30
+        return time(minutos // 60, minutos % 60)
+
+    def crear_reservas(self, solicitantes, aprobadores, elementos):
+        inicio_total = reloj.perf_counter()
+        rng = self.rng
+        dist = self._distribuciones(self.espacios)
+        hoy = timezone.localdate()
+        zona = timezone.get_current_timezone()
+        elemento_ids = list(elementos)
+        ocupadas = self._ocupacion_existente()
+        siguiente_reserva = _siguiente_id(Reserva)
+        siguiente_elemento = _siguiente_id(ReservaElemento)
+        carreras = dict(Usuario.objects.filter(pk__in=solicitantes).values_list('pk', 'carrera_id'))
+        creadas = sin_lugar = 0
+
+        total = self.cantidades['reservas']
+        while creadas + sin_lugar < total:
+            reservas, detalle = [], []
+            for _ in range(min(self.lote, total - creadas - sin_lugar)):
+                ubicacion = self._ubicar(dist, ocupadas)
+                if ubicacion is None:
+                    sin_lugar += 1
+                    continue
+                espacio_id, fecha, franja, franjas = ubicacion
+                estado = _elegir(rng, *(dist['pasadas'] if fecha < hoy else dist['futuras']))
+                creacion = timezone.make_aware(
+                    datetime.combine(fecha - timedelta(days=rng.randint(1, 30)), time(rng.randint(8, 20), rng.randint(0, 59))),
+                    zona,
+                )
+                resuelta = estado in ('aprobada', 'rechazada')
+                usuario_id = rng.choice(solicitantes)
+                fila = {
+                    'id': siguiente_reserva,
+                    'usuario_id': usuario_id,
+                    'carrera_estadisticas_id': carreras[usuario_id],
+                    'espacio_id': espacio_id,
+                    'fecha_reserva': fecha,
+                    'hora_inicio': self._hora(franja),
+                    'hora_fin': self._hora(franja + franjas),
+                    'motivo': rng.choice(MOTIVOS),
+                    'estado': estado,
+                    'motivo_rechazo': 'Espacio requerido por la dirección' if estado == 'rechazada' else None,
+                    'aprobado_por_id': rng.choice(aprobadores) if resuelta and aprobadores else None,
+                    'fecha_creacion': creacion,
+                    'fecha_aprobacion': creacion + timedelta(days=1) if resuelta else None,
+                }
+                reservas.append(fila)
+                if elemento_ids and rng.random() < PROPORCION_CON_ELEMENTOS:
+                    for elemento_id in rng.sample(elemento_ids, min(len(elemento_ids), rng.randint(1, 2))):
+                        cantidad = rng.randint(1, min(10, elementos[elemento_id]))
+                        detalle.append({
+                            'id': siguiente_elemento, 'reserva_id': siguiente_reserva, 'elemento_id': elemento_id,
+                            'cantidad_solicitada': cantidad,
+                            'cantidad_asignada': cantidad if estado == 'aprobada' else None,
+                        })
+                        siguiente_elemento += 1
+                siguiente_reserva += 1
+
+            with transaction.atomic():
+                cargar(Reserva, reservas, self.usar_copy)
+                cargar(ReservaElemento, detalle, self.usar_copy)
+            creadas += len(reservas)
+            self._informar(f'  {creadas}/{total} reservas', inicio_total)
+
+        _ajustar_secuencias(Reserva, ReservaElemento)
+        if sin_lugar:
+            self.salida(f'{sin_lugar} reservas no encontraron un horario libre y se omitieron')
+        return creadas
+
+    def ejecutar(self):
+        inicio = reloj.perf_counter()
+        roles = self.crear_roles()
+        carreras = self.crear_carreras()
+        solicitantes, aprobadores = self.crear_usuarios(roles, carreras)
+        self.espacios = self.crear_espacios()
+        elementos = self.crear_elementos()
+        self._informar(f'{len(carreras)} carreras, {len(self.espacios)} espacios, {len(elementos)} elementos', inicio)
+        if not solicitantes or not self.espacios:
+            raise ValueError('Se necesita al menos un usuario solicitante y un espacio para crear reservas')
+
+        creadas = self.crear_reservas(solicitantes, aprobadores, elementos)
+
+        # Las tablas derivadas se mantienen con señales que las cargas masivas no emiten
+        call_command('reconstruir_disponibilidad', desde=self.desde.isoformat(), hasta=self.hasta.isoformat())
+        call_command('reconstruir_estadisticas', desde=self.desde.isoformat())
+        cache_lectura.invalidar('carreras', 'espacios', 'elementos', 'reservas')
+        self._informar(f'{creadas} reservas creadas', inicio)
+        return creadas
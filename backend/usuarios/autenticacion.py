@@ -0,0 +1,182 @@
+"""
+Autenticación JWT con el rol del usuario resuelto sin consultas extra.
+
+- El token de acceso incluye los claims 'rol' (slug) y 'carrera_id'.
+- JWTAuthenticationCacheada carga el usuario junto con su rol y carrera en una
+  sola consulta y lo guarda en una caché LRU local al proceso, con expiración
+  (AUTH_CACHE_TTL). Los cambios en Usuario, Rol o Carrera la invalidan en el
+  proceso actual; en los demás procesos rige el TTL.
+- JWTLecturaSinEstado confía en los claims firmados del token para las
+  peticiones de solo lectura (GET, HEAD, OPTIONS) y no consulta la base de
+  datos. El resto de los métodos usa JWTAuthenticationCacheada.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework import permissions
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .models import Usuario, Rol, Carrera
+
+CLAIM_ROL = 'rol'
+CLAIM_CARRERA = 'carrera_id'
+
+
+class TokenConRolSerializer(TokenObtainPairSerializer):
+    """Emite tokens con el rol y la carrera del usuario como claims"""
+
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        token[CLAIM_ROL] = user.rol.nombre_rol if user.rol_id else None
+        token[CLAIM_CARRERA] = user.carrera_id
+        return token
+
+
+def _valores(instancia):
+    campos = instancia._meta.concrete_fields
+    return [campo.attname for campo in campos], [getattr(instancia, campo.attname) for campo in campos]
+
+
+class CacheUsuarios:
+    """
+    LRU con expiración de usuarios autenticados. Guarda los valores de las filas
+    (no las instancias) y arma un objeto nuevo en cada acierto, para que dos
+    peticiones nunca compartan la misma instancia.
+    """
+
+    def __init__(self, maximo, ttl):
+        self.maximo = maximo
+        self.ttl = ttl
+        self._datos = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obtener(self, user_id):
+        # El claim del token puede venir como texto: las claves siempre son str
+        user_id = str(user_id)
+        with self._lock:
+            entrada = self._datos.get(user_id)
+            if entrada is None:
+                return None
+            expira, filas = entrada
+            if expira < time.monotonic():
+                del self._datos[user_id]
+                return None
+            self._datos.move_to_end(user_id)
+
+        usuario_fila, rol_fila, carrera_fila = filas
+        usuario = Usuario.from_db('default', *usuario_fila)
+        if rol_fila:
+            usuario.rol = Rol.from_db('default', *rol_fila)
+        if carrera_fila:
+            usuario.carrera = Carrera.from_db('default', *carrera_fila)
+        return usuario
+
+    def guardar(self, usuario):
+        filas = (
+            _valores(usuario),
+            _valores(usuario.rol) if usuario.rol_id else None,
+            _valores(usuario.carrera) if usuario.carrera_id else None,
+        )
+        user_id = str(usuario.pk)
+        with self._lock:
+            self._datos[user_id] = (time.monotonic() + self.ttl, filas)
+            self._datos.move_to_end(user_id)
+            while len(self._datos) > self.maximo:
+                self._datos.popitem(last=False)
+
+    def invalidar(self, user_id=None):
+        with self._lock:
+            if user_id is None:
+                self._datos.clear()
+            else:
+                self._datos.pop(str(user_id), None)
+
+
+cache_usuarios = CacheUsuarios(
+    maximo=getattr(settings, 'AUTH_CACHE_MAX', 1024),
+    ttl=getattr(settings, 'AUTH_CACHE_TTL', 60),
+)
+
+
+class JWTAuthenticationCacheada(JWTAuthentication):
+    """JWTAuthentication que trae el usuario con su rol y carrera, y lo cachea"""
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+        user = cache_usuarios.obtener(user_id)
+        if user is None:
+            try:
+                user = Usuario.objects.select_related('rol', 'carrera').get(
+                    **{api_settings.USER_ID_FIELD: user_id}
+                )
+            except Usuario.DoesNotExist as e:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found") from e
+            cache_usuarios.guardar(user)
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+
+        return user
+
+
+class RolToken:
+    """Rol mínimo leído del token; expone lo mismo que usan los permisos"""
+
+    def __init__(self, nombre_rol):
+        self.nombre_rol = nombre_rol
+
+    def __bool__(self):
+        return bool(self.nombre_rol)
+
+
+class UsuarioToken(TokenUser):
+    """Usuario sin estado respaldado por los claims del token"""
+
+    @property
+    def rol(self):
+        return RolToken(self.token.get(CLAIM_ROL))
+
+    @property
+    def carrera_id(self):
+        return self.token.get(CLAIM_CARRERA)
+
+
+class JWTLecturaSinEstado(JWTAuthenticationCacheada):
+    """
+    Para endpoints de catálogo: las lecturas se autentican solo con el token
+    firmado (cero consultas); las escrituras cargan el usuario real.
+    Un cambio de rol se refleja en las lecturas cuando se emite un token nuevo.
+    """
+
+    def authenticate(self, request):
+        if request.method not in permissions.SAFE_METHODS:
+            return super().authenticate(request)
+
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+        if api_settings.USER_ID_CLAIM not in validated_token:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+        return UsuarioToken(validated_token), validated_token
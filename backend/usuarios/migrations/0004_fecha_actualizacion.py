@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-18 14:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usuarios', '0003_carrera_usuario_carrera'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='carrera',
+            name='fecha_actualizacion',
+            field=models.DateTimeField(auto_now=True, verbose_name='Última Actualización'),
+        ),
+        migrations.AddField(
+            model_name='rol',
+            name='fecha_actualizacion',
+            field=models.DateTimeField(auto_now=True, verbose_name='Última Actualización'),
+        ),
+    ]
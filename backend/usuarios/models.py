@@ -1,6 +1,7 @@
 from django.db import models
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
 from django.utils import timezone
+from config.mixins import ValoresDBMixin
 
 class Carrera(models.Model):
     """Modelo para las carreras impartidas en la institución de Temuco"""
@@ -22,6 +23,10 @@ class Carrera(models.Model):
         null=True,
         verbose_name='Área Académica'
     )
+    fecha_actualizacion = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Última Actualización'
+    )
     
     class Meta:
         verbose_name = 'Carrera'
@@ -60,6 +65,10 @@ class Rol(models.Model):
         blank=True,
         verbose_name='Permisos'
     )
+    fecha_actualizacion = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Última Actualización'
+    )
     
     class Meta:
         verbose_name = 'Rol'
@@ -115,7 +124,7 @@ class UsuarioManager(BaseUserManager):
         return self.create_user(email, password, **extra_fields)
 
 
-class Usuario(AbstractBaseUser, PermissionsMixin):
+class Usuario(ValoresDBMixin, AbstractBaseUser, PermissionsMixin):
     """Modelo personalizado de Usuario"""
     
     ESTADO_CHOICES = [
@@ -1,5 +1,18 @@
 from rest_framework import permissions
 
+
+def obtener_rol(user):
+    """
+    Slug del rol del usuario autenticado, o None.
+    No consulta la base de datos: el rol viene precargado por la autenticación
+    (JWTAuthenticationCacheada) o desde los claims del token (UsuarioToken).
+    """
+    if not (user and user.is_authenticated):
+        return None
+    rol = user.rol
+    return rol.nombre_rol if rol else None
+
+
 class IsAdminUserCustom(permissions.BasePermission):
     """
     Permite acceso total (CRUD) solo a usuarios con rol 'admin'.
@@ -7,8 +20,7 @@ class IsAdminUserCustom(permissions.BasePermission):
     """
     def has_permission(self, request, view):
         # Verifica que esté logueado y que su rol sea 'admin'
-        return bool(request.user and request.user.is_authenticated and 
-                    request.user.rol and request.user.rol.nombre_rol == 'admin')
+        return obtener_rol(request.user) == 'admin'
 
 class IsAdminOrReadOnly(permissions.BasePermission):
     """
@@ -21,5 +33,4 @@ class IsAdminOrReadOnly(permissions.BasePermission):
             return bool(request.user and request.user.is_authenticated)
         
         # Métodos de escritura solo para admin
-        return bool(request.user and request.user.is_authenticated and 
-                    request.user.rol and request.user.rol.nombre_rol == 'admin')
\ No newline at end of file
+        return obtener_rol(request.user) == 'admin'
@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from .models import Usuario, Rol, Carrera
+from config.serializers import CamposDinamicosMixin
 
 
 class CarreraSerializer(serializers.ModelSerializer):
@@ -12,7 +13,7 @@ class RolSerializer(serializers.ModelSerializer):
         model = Rol
         fields = '__all__'
 
-class UsuarioSerializer(serializers.ModelSerializer):
+class UsuarioSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     rol_nombre = serializers.CharField(source='rol.get_nombre_rol_display', read_only=True)
     # ESTE CAMPO ES CLAVE: Envía "admin", "coordinador" o "solicitante"
     rol_slug = serializers.CharField(source='rol.nombre_rol', read_only=True)
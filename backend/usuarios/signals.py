@@ -0,0 +1,23 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from config import cache as cache_lectura
+from .models import Usuario, Rol, Carrera
+from .autenticacion import cache_usuarios
+
+
+@receiver([post_save, post_delete], sender=Usuario)
+def usuario_modificado(sender, instance, **kwargs):
+    cache_usuarios.invalidar(instance.pk)
+
+
+# Un cambio de rol o de carrera afecta a muchos usuarios: se vacía la caché completa
+@receiver([post_save, post_delete], sender=Rol)
+@receiver([post_save, post_delete], sender=Carrera)
+def catalogo_modificado(sender, instance, **kwargs):
+    cache_usuarios.invalidar()
+
+
+@receiver([post_save, post_delete], sender=Carrera)
+def carrera_modificada(sender, instance, **kwargs):
+    cache_lectura.invalidar('carreras')
@@ -1,3 +1,265 @@
+import threading
+
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .autenticacion import cache_usuarios
+from config import cache as cache_lectura
+from config.pruebas import ConsultasAdminTestCase
+from espacios.models import Espacio
+from .models import Usuario, Rol, Carrera
+
+
+class AutenticacionCacheadaTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.rol_admin = Rol.objects.create(nombre_rol='admin')
+        cls.rol_solicitante = Rol.objects.create(nombre_rol='solicitante')
+        cls.carrera = Carrera.objects.create(nombre_carrera='Ingeniería en Informática', area='Tecnología')
+        cls.usuario = Usuario.objects.create_user(
+            email='docente@inacap.cl', password='clave-segura', nombre='Pedro', apellido='Docente',
+            rol=cls.rol_solicitante, carrera=cls.carrera
+        )
+
+    def setUp(self):
+        cache_usuarios.invalidar()
+        self.client = APIClient()
+        respuesta = self.client.post('/api/token/', {'email': 'docente@inacap.cl', 'password': 'clave-segura'}, format='json')
+        self.token = respuesta.data['access']
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.token}')
+
+    def test_token_incluye_rol_y_carrera(self):
+        claims = AccessToken(self.token)
+        self.assertEqual(claims['rol'], 'solicitante')
+        self.assertEqual(claims['carrera_id'], self.carrera.id)
+
+    def test_usuario_cacheado_sin_consultas(self):
+        self.client.get('/api/usuarios/me/')
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = self.client.get('/api/usuarios/me/')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(len(consultas), 0)
+
+    def test_cambio_de_rol_invalida_cache(self):
+        self.assertEqual(self.client.get('/api/usuarios/me/').data['rol_slug'], 'solicitante')
+        self.assertEqual(self.client.post('/api/carreras/', {'nombre_carrera': 'Diseño'}).status_code, 403)
+
+        self.usuario.rol = self.rol_admin
+        self.usuario.save()
+
+        self.assertEqual(self.client.get('/api/usuarios/me/').data['rol_slug'], 'admin')
+        self.assertEqual(self.client.post('/api/carreras/', {'nombre_carrera': 'Diseño'}).status_code, 201)
+
+    def test_lectura_de_catalogo_sin_estado(self):
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = self.client.get('/api/carreras/')
+        self.assertEqual(respuesta.status_code, 200)
+        # La versión de la tabla y el listado: el usuario sale de los claims del token
+        self.assertEqual(len(consultas), 2)
+
+    def test_token_invalido_rechazado(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer no-es-un-token')
+        self.assertEqual(self.client.get('/api/carreras/').status_code, 401)
+
+
+class CatalogoCondicionalTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = Usuario.objects.create_user(
+            email='admin@inacap.cl', password='x', nombre='Ana', apellido='Admin',
+            rol=Rol.objects.create(nombre_rol='admin')
+        )
+        cls.espacio = Espacio.objects.create(nombre='Sala 1', tipo='salon', capacidad=30, ubicacion='Edificio A')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.admin)}')
+
+    def test_304_sin_serializar(self):
+        respuesta = self.client.get('/api/espacios/')
+        etag = respuesta['ETag']
+        self.assertTrue(respuesta.has_header('Last-Modified'))
+        self.assertEqual(respuesta['Cache-Control'], 'private, no-cache')
+
+        # Solo la consulta de versión: ni el listado ni la serialización
+        with self.assertNumQueries(1):
+            respuesta = self.client.get('/api/espacios/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(respuesta.status_code, 304)
+        self.assertEqual(respuesta.content, b'')
+        self.assertEqual(respuesta['ETag'], etag)
+
+        # Otros parámetros son otra representación
+        self.assertEqual(self.client.get('/api/espacios/?fields=id', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_cambios_y_borrados_invalidan(self):
+        etag = self.client.get('/api/espacios/')['ETag']
+        self.client.post(f'/api/espacios/{self.espacio.id}/toggle_estado/')
+        respuesta = self.client.get('/api/espacios/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(respuesta.status_code, 200)
+
+        etag = respuesta['ETag']
+        Espacio.objects.create(nombre='Sala 2', tipo='salon', capacidad=10, ubicacion='Edificio B').delete()
+        self.assertEqual(self.client.get('/api/espacios/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        Espacio.objects.filter(pk=self.espacio.pk).delete()
+        self.assertEqual(self.client.get('/api/espacios/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_escrituras_y_acciones_dinamicas_sin_etag(self):
+        respuesta = self.client.post('/api/carreras/', {'nombre_carrera': 'Diseño'})
+        self.assertEqual(respuesta.status_code, 201)
+        self.assertFalse(respuesta.has_header('ETag'))
+        respuesta = self.client.get(f'/api/espacios/{self.espacio.id}/disponibilidad/')
+        self.assertFalse(respuesta.has_header('ETag'))
+        self.assertTrue(self.client.get('/api/carreras/').has_header('ETag'))
+
+
+class CacheLecturaTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = Usuario.objects.create_user(
+            email='admin@inacap.cl', password='x', nombre='Ana', apellido='Admin',
+            rol=Rol.objects.create(nombre_rol='admin')
+        )
+        cls.espacio = Espacio.objects.create(nombre='Sala 1', tipo='salon', capacidad=30, ubicacion='Edificio A')
+
+    def setUp(self):
+        cache.clear()
+        cache_lectura.reiniciar_metricas()
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.admin)}')
+
+    def test_listado_cacheado_e_invalidado_al_guardar(self):
+        self.client.get('/api/espacios/')
+        # Solo la versión para el ETag; el listado sale de la caché
+        with self.assertNumQueries(1):
+            respuesta = self.client.get('/api/espacios/')
+        self.assertEqual([e['nombre'] for e in respuesta.data], ['Sala 1'])
+
+        self.espacio.nombre = 'Sala Uno'
+        self.espacio.save()
+        self.assertEqual([e['nombre'] for e in self.client.get('/api/espacios/').data], ['Sala Uno'])
+        # Otros parámetros son otra entrada
+        self.assertEqual(self.client.get('/api/espacios/?fields=id').data, [{'id': self.espacio.id}])
+
+        self.assertEqual(cache_lectura.metricas()['espacios'], {
+            'aciertos': 1, 'fallos': 3, 'esperas': 0, 'calculos': 3, 'tasa_aciertos': 0.25,
+        })
+
+    def test_un_solo_calculo_concurrente(self):
+        clave = cache_lectura.clave_entrada('carreras', ('carreras',), 'x')
+        # Otro proceso tiene el candado y deja el valor poco después
+        cache.add(f'{clave}:calculando', 1)
+        threading.Timer(0.1, cache.set, (clave, ['calculado por otro'])).start()
+
+        valor = cache_lectura.obtener('carreras', ('carreras',), 'x', lambda: self.fail('no debía recalcular'))
+        self.assertEqual(valor, ['calculado por otro'])
+        self.assertEqual(cache_lectura.metricas()['carreras']['esperas'], 1)
+
+    def test_generacion_perdida_no_revive_entradas(self):
+        valor = cache_lectura.obtener('carreras', ('carreras',), 'x', lambda: 'viejo')
+        cache.delete('rt:gen:carreras')
+        self.assertEqual(cache_lectura.obtener('carreras', ('carreras',), 'x', lambda: 'nuevo'), 'nuevo')
+        self.assertEqual(valor, 'viejo')
+
+    def test_metricas_solo_admin(self):
+        self.client.get('/api/carreras/')
+        self.assertEqual(self.client.get('/api/cache/metricas/').data['carreras']['fallos'], 1)
+        solicitante = Usuario.objects.create_user(
+            email='docente@inacap.cl', password='x', nombre='Pedro', apellido='Docente',
+            rol=Rol.objects.create(nombre_rol='solicitante')
+        )
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(solicitante)}')
+        self.assertEqual(self.client.get('/api/cache/metricas/').status_code, 403)
+
+
+class UsuarioViewSetConsultasTest(ConsultasAdminTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.rol_solicitante = Rol.objects.create(nombre_rol='solicitante')
+        cls.carrera = Carrera.objects.create(nombre_carrera='Ingeniería en Informática', area='Tecnología')
+
+    def setUp(self):
+        super().setUp()
+        # El admin ya es una fila del listado
+        self.total = 1
+
+    def poblar(self, tamano):
+        self.completar(tamano, lambda i: Usuario.objects.create_user(
+            email=f'docente{i}@inacap.cl', password=None, nombre='Pedro', apellido='Docente',
+            rol=self.rol_solicitante, carrera=self.carrera
+        ))
+
+    def nuevo_usuario(self):
+        return Usuario.objects.create_user(
+            email=f'nuevo{self.siguiente()}@inacap.cl', password=None, nombre='María', apellido='Nueva', rol=self.rol_solicitante
+        )
+
+    def test_list(self):
+        self.assertConsultasAcotadas('/api/usuarios/', maximo=1)
+
+    def test_retrieve(self):
+        self.assertConsultasAcotadas(lambda _: f'/api/usuarios/{self.nuevo_usuario().id}/', maximo=1)
+
+    def test_me(self):
+        self.assertConsultasAcotadas('/api/usuarios/me/', maximo=2)
+
+    def test_create(self):
+        self.assertConsultasAcotadas(
+            '/api/usuarios/', maximo=6, metodo='post',
+            datos=lambda tamano: {
+                'email': f'creado{tamano}@inacap.cl', 'nombre': 'Juan', 'apellido': 'Creado',
+                'rol': self.rol_solicitante.id, 'carrera': self.carrera.id, 'password': 'clave-segura',
+            },
+        )
+
+    def test_partial_update(self):
+        self.assertConsultasAcotadas(lambda _: f'/api/usuarios/{self.nuevo_usuario().id}/', maximo=3, metodo='patch', datos={'telefono': '987654321'})
+
+    def test_destroy(self):
+        self.assertConsultasAcotadas(lambda _: f'/api/usuarios/{self.nuevo_usuario().id}/', maximo=14, metodo='delete')
+
+
+class CatalogosUsuariosConsultasTest(ConsultasAdminTestCase):
+    """CarreraViewSet y RolViewSet"""
+
+    def poblar(self, tamano):
+        # Carreras y roles crecen juntos; los roles extra no están entre las opciones, pero la tabla los acepta
+        def crear(i):
+            Carrera.objects.create(nombre_carrera=f'Carrera {i}', area='Tecnología')
+            Rol.objects.create(nombre_rol=f'rol_{i}')
+        self.completar(tamano, crear)
+
+    def nueva_carrera(self):
+        return Carrera.objects.create(nombre_carrera=f'Carrera nueva {self.siguiente()}', area='Salud')
+
+    def test_carreras_list(self):
+        self.assertConsultasAcotadas('/api/carreras/', maximo=2)
+
+    def test_carreras_retrieve(self):
+        self.assertConsultasAcotadas(lambda _: f'/api/carreras/{self.nueva_carrera().id}/', maximo=2)
+
+    def test_carreras_create(self):
+        self.assertConsultasAcotadas(
+            '/api/carreras/', maximo=3, metodo='post', datos=lambda tamano: {'nombre_carrera': f'Diseño {tamano}'},
+        )
+
+    def test_carreras_partial_update(self):
+        self.assertConsultasAcotadas(lambda _: f'/api/carreras/{self.nueva_carrera().id}/', maximo=3, metodo='patch', datos={'area': 'Diseño'})
+
+    def test_carreras_destroy(self):
+        # Incluye el SET NULL de Reserva.carrera_estadisticas
+        self.assertConsultasAcotadas(lambda _: f'/api/carreras/{self.nueva_carrera().id}/', maximo=7, metodo='delete')
+
+    def test_roles_list(self):
+        self.assertConsultasAcotadas('/api/roles/', maximo=2)
 
-# Create your tests here.
+    def test_roles_retrieve(self):
+        self.assertConsultasAcotadas(f'/api/roles/{self.admin.rol_id}/', maximo=2)
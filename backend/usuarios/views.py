@@ -5,20 +5,26 @@ from django.http import JsonResponse
 from .models import Carrera, Usuario, Rol
 from .serializers import CarreraSerializer, UsuarioSerializer, UsuarioCreateSerializer, RolSerializer
 from .permissions import IsAdminUserCustom, IsAdminOrReadOnly
+from .autenticacion import JWTLecturaSinEstado
+from config.mixins import CacheLecturaMixin, RespuestaCondicionalMixin
 
 
-class CarreraViewSet(viewsets.ModelViewSet):
+class CarreraViewSet(RespuestaCondicionalMixin, CacheLecturaMixin, viewsets.ModelViewSet):
     queryset = Carrera.objects.all()
+    familia_cache = 'carreras'
     serializer_class = CarreraSerializer
+    authentication_classes = [JWTLecturaSinEstado]
     permission_classes = [IsAdminOrReadOnly] # Solo administradores pueden crear las carreras
 
-class RolViewSet(viewsets.ReadOnlyModelViewSet):
+class RolViewSet(RespuestaCondicionalMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Rol.objects.all()
     serializer_class = RolSerializer
+    authentication_classes = [JWTLecturaSinEstado]
     permission_classes = [permissions.IsAuthenticated]
 
 class UsuarioViewSet(viewsets.ModelViewSet):
-    queryset = Usuario.objects.all()
+    # UsuarioSerializer lee el rol y la carrera de cada fila
+    queryset = Usuario.objects.select_related('rol', 'carrera')
     permission_classes = [IsAdminOrReadOnly] # Solo administradores pueden gestionar usuarios
     
     def get_serializer_class(self):
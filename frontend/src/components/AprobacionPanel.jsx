@@ -1,5 +1,6 @@
 import React, { useState, useEffect } from "react";
 import api from "../services/api";
+import suscribirEventos from "../services/eventosService";
 
 const AprobacionPanel = () => {
     const [solicitudes, setSolicitudes] = useState([]);
@@ -9,6 +10,8 @@ const AprobacionPanel = () => {
 
     useEffect(() => {
         cargarPendientes();
+        // Recarga cuando llega o se resuelve una solicitud, en vez de consultar periódicamente
+        return suscribirEventos(() => cargarPendientes());
     }, []);
 
     const cargarPendientes = async () => {
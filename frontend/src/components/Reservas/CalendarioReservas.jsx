@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useCallback } from 'react';
 import FullCalendar from '@fullcalendar/react';
 import dayGridPlugin from '@fullcalendar/daygrid';
 import timeGridPlugin from '@fullcalendar/timegrid';
@@ -8,11 +8,26 @@ import api from '../../services/api';
 import authService from '../../services/authService'; // Para verificar rol si quisieras
 import FormularioReserva from '../FormularioReserva';
 
+const COLORES_ESTADO = {
+    aprobada: { color: '#198754', textColor: '#ffffff' },
+    rechazada: { color: '#dc3545', textColor: '#ffffff' },
+};
+const COLOR_POR_DEFECTO = { color: '#ffc107', textColor: '#000000' };
+
+// Minutos desde medianoche -> 'HH:MM'
+const aHora = (minutos) => `${String(Math.floor(minutos / 60)).padStart(2, '0')}:${String(minutos % 60).padStart(2, '0')}`;
+
+// FullCalendar entrega el fin del rango como exclusivo; la API espera 'hasta' inclusivo
+const diaAnterior = (fechaIso) => {
+    const [anio, mes, dia] = fechaIso.split('-').map(Number);
+    const fecha = new Date(anio, mes - 1, dia - 1);
+    return `${fecha.getFullYear()}-${String(fecha.getMonth() + 1).padStart(2, '0')}-${String(fecha.getDate()).padStart(2, '0')}`;
+};
+
 const CalendarioReservas = () => {
     const [espacios, setEspacios] = useState([]);
     const [espacioSeleccionado, setEspacioSeleccionado] = useState(null); // null o objeto espacio
     const [verTodos, setVerTodos] = useState(false); // Nuevo estado para "Ver Todos"
-    const [eventos, setEventos] = useState([]);
     const [showFormulario, setShowFormulario] = useState(false);
     const [reservaProps, setReservaProps] = useState({});
 
@@ -32,34 +47,42 @@ const CalendarioReservas = () => {
                 }
             }
 
-            // 2. Cargar Reservas
-            const respReservas = await api.get('/reservas/');
-            if (Array.isArray(respReservas.data)) {
-                const eventosMapeados = respReservas.data.map(r => ({
-                    id: r.id,
-                    // Si vemos todos, es útil ver el nombre del espacio en el título
-                    title: `${r.espacio_detalle?.nombre || 'Sala'} - ${r.motivo}`,
-                    start: `${r.fecha_reserva}T${r.hora_inicio}`,
-                    end: `${r.fecha_reserva}T${r.hora_fin}`,
-                    color: r.estado === 'aprobada' ? '#198754' : (r.estado === 'rechazada' ? '#dc3545' : '#ffc107'),
-                    textColor: r.estado === 'aprobada' || r.estado === 'rechazada' ? '#ffffff' : '#000000',
-                    resourceId: r.espacio,
-                    extendedProps: { 
-                        espacioId: r.espacio,
-                        estado: r.estado 
-                    }
-                }));
-                setEventos(eventosMapeados);
-            }
         } catch (error) {
             console.error("Error cargando datos:", error);
         }
     };
 
-    // LÓGICA DE FILTRADO: Si verTodos es true, muestra todo. Si no, filtra por ID.
-    const eventosVisibles = verTodos 
-        ? eventos 
-        : (espacioSeleccionado ? eventos.filter(ev => Number(ev.extendedProps.espacioId) === Number(espacioSeleccionado.id)) : []);
+    // 2. Reservas: solo las de la semana/día visible, desde el feed compacto del calendario.
+    // Si verTodos es true pide todas; si no, solo las del espacio seleccionado.
+    const cargarEventos = useCallback(async (info, success, failure) => {
+        if (!verTodos && !espacioSeleccionado) {
+            success([]);
+            return;
+        }
+        try {
+            const params = { desde: info.startStr.slice(0, 10), hasta: diaAnterior(info.endStr.slice(0, 10)) };
+            if (!verTodos) params.espacio = espacioSeleccionado.id;
+
+            const { data } = await api.get('/reservas/calendario/', { params });
+            success(data.ids.map((id, i) => {
+                const espacioId = data.espacios[i];
+                const estado = data.estados[i];
+                return {
+                    id,
+                    // Si vemos todos, es útil ver el nombre del espacio en el título
+                    title: `${data.nombres_espacios[espacioId] || 'Sala'} - ${data.motivos[i]}`,
+                    start: `${data.fechas[i]}T${aHora(data.inicio[i])}`,
+                    end: `${data.fechas[i]}T${aHora(data.fin[i])}`,
+                    ...(COLORES_ESTADO[estado] || COLOR_POR_DEFECTO),
+                    resourceId: espacioId,
+                    extendedProps: { espacioId, estado }
+                };
+            }));
+        } catch (error) {
+            console.error("Error cargando reservas:", error);
+            failure(error);
+        }
+    }, [verTodos, espacioSeleccionado]);
 
     const handleDateSelect = (selectInfo) => {
         // VALIDACIÓN: No se puede reservar en modo "Todos" porque no sabríamos en qué sala ponerla
@@ -154,7 +177,7 @@ const CalendarioReservas = () => {
                                 selectable={true}
                                 selectMirror={true}
                                 select={handleDateSelect}
-                                events={eventosVisibles}
+                                events={cargarEventos}
                                 locale='es'
                                 slotMinTime="08:00:00"
                                 slotMaxTime="22:00:00"
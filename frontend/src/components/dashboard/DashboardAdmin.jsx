@@ -10,6 +10,7 @@ import interactionPlugin from '@fullcalendar/interaction';
 import bootstrap5Plugin from '@fullcalendar/bootstrap5';
 import api from "../../services/api";
 import authService from "../../services/authService";
+import suscribirEventos from "../../services/eventosService";
 
 const DashboardAdmin = () => {
     // --- ESTADOS ---
@@ -66,6 +67,13 @@ const DashboardAdmin = () => {
 
         // 2. Calendario para todos
         cargarCalendarioGlobal();
+
+        // 3. Cambios en vivo: recargar solo lo afectado cuando el backend avisa
+        const veEstadisticas = user && (user.rol_slug === 'admin' || user.rol_slug === 'coordinador');
+        return suscribirEventos(() => {
+            if (veEstadisticas) cargarEstadisticas();
+            cargarCalendarioGlobal();
+        });
     }, [filtros]); 
 
     const cargarEstadisticas = async () => {
@@ -0,0 +1,71 @@
+import api from './api';
+
+// Tipos que emite /api/eventos/stream/
+export const EVENTOS_RESERVA = [
+    'reserva_creada', 'reserva_aprobada', 'reserva_rechazada', 'reserva_cancelada', 'reserva_modificada', 'reserva_eliminada',
+];
+
+// Un lote o una serie aprobada llega como muchos eventos seguidos: se agrupan en una sola recarga
+const ESPERA_AGRUPAR_MS = 500;
+
+// Pausa antes de pedir un ticket nuevo cuando el stream se corta
+const ESPERA_RECONECTAR_MS = 1000;
+
+/**
+ * Abre el stream SSE de reservas y llama a `alCambiar(eventos)` cuando llegan cambios.
+ * EventSource no admite cabeceras: se pide un ticket de un solo uso (con el token en
+ * Authorization) y el ticket va en la URL. Cada ticket sirve una vez, así que al cortarse
+ * el stream se pide uno nuevo; tras reconectar se llama a `alCambiar([])` para recargar
+ * lo que pudo cambiar mientras tanto.
+ * Devuelve una función para cerrarlo (usar en el cleanup de useEffect).
+ */
+const suscribirEventos = (alCambiar, tipos = EVENTOS_RESERVA) => {
+    if (!localStorage.getItem('token') || typeof EventSource === 'undefined') return () => {};
+
+    let fuente = null;
+    let cerrado = false;
+    let pendientes = [];
+    let temporizador = null;
+    let reintento = null;
+
+    const recibir = (mensaje) => {
+        pendientes.push(JSON.parse(mensaje.data));
+        if (!temporizador) {
+            temporizador = setTimeout(() => {
+                const eventos = pendientes;
+                pendientes = [];
+                temporizador = null;
+                alCambiar(eventos);
+            }, ESPERA_AGRUPAR_MS);
+        }
+    };
+
+    const conectar = async (reconexion) => {
+        try {
+            const { data } = await api.post('/eventos/ticket/');
+            if (cerrado) return;
+            fuente = new EventSource(`${api.defaults.baseURL}/eventos/stream/?ticket=${encodeURIComponent(data.ticket)}`);
+        } catch (error) {
+            if (!cerrado) reintento = setTimeout(() => conectar(reconexion), ESPERA_RECONECTAR_MS * 5);
+            return;
+        }
+        tipos.forEach((tipo) => fuente.addEventListener(tipo, recibir));
+        if (reconexion) fuente.addEventListener('open', () => alCambiar([]), { once: true });
+        fuente.onerror = () => {
+            // EventSource reintentaría con el mismo ticket, que ya se usó
+            fuente.close();
+            if (!cerrado) reintento = setTimeout(() => conectar(true), ESPERA_RECONECTAR_MS);
+        };
+    };
+
+    conectar(false);
+
+    return () => {
+        cerrado = true;
+        clearTimeout(temporizador);
+        clearTimeout(reintento);
+        if (fuente) fuente.close();
+    };
+};
+
+export default suscribirEventos;